@@ -0,0 +1,127 @@
+import threading
+
+from app.register.database import db_registry
+
+
+class PermissionCache:
+    """
+    Per-worker cache of effective permissions
+
+    Keeps one RolePermissionSet per role_id plus a user_id -> role_id map.
+    Both are dropped when their version stamp changes:
+        'rbac'       - role_permissions / permissions rows changed
+        'rbac_users' - a user was added/removed or their role changed
+    so a permission check is a set lookup with no database round-trip.
+    """
+    __depends_on__ = ['VersionStamp', 'RolePermission', 'Permission', 'User', 'RolePermissionSet']
+
+    VERSION_KEY = 'rbac'
+    USER_VERSION_KEY = 'rbac_users'
+    MAX_USERS = 50000
+
+    _role_sets = {}
+    _role_version = None
+    _user_roles = {}
+    _user_version = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def register_invalidation(cls):
+        """Bump the rbac stamps on any committed ORM change to the source tables"""
+        from app.classes import VersionStamp
+        from app.models import RolePermission, Permission, User
+
+        VersionStamp.watch(RolePermission, cls.VERSION_KEY)
+        VersionStamp.watch(Permission, cls.VERSION_KEY, columns=['name'])
+        VersionStamp.watch(User, cls.USER_VERSION_KEY, columns=['role_id'])
+
+    @classmethod
+    def invalidate(cls):
+        """Drop compiled role permission sets in every worker"""
+        from app.classes import VersionStamp
+        VersionStamp.bump(cls.VERSION_KEY)
+
+    @classmethod
+    def get_role_id(cls, user_id):
+        """Get a user's role_id from the cache, loading it on a miss"""
+        from app.classes import VersionStamp
+
+        version = VersionStamp.current(cls.USER_VERSION_KEY)
+        if version != cls._user_version:
+            with cls._lock:
+                if version != cls._user_version:
+                    cls._user_roles = {}
+                    cls._user_version = version
+
+        key = str(user_id)
+        user_roles = cls._user_roles
+        if key in user_roles:
+            return user_roles[key]
+
+        from app.models import User
+        with db_registry.session_scope() as session:
+            row = session.query(User.role_id).filter(User.id == user_id).first()
+        role_id = row.role_id if row else None
+
+        if len(user_roles) >= cls.MAX_USERS:
+            user_roles.clear()
+        user_roles[key] = role_id
+        return role_id
+
+    @classmethod
+    def get_role_set(cls, role_id):
+        """Get the compiled permission set for a role, compiling it on a miss"""
+        from app.classes import VersionStamp
+
+        version = VersionStamp.current(cls.VERSION_KEY)
+        if version != cls._role_version:
+            with cls._lock:
+                if version != cls._role_version:
+                    cls._role_sets = {}
+                    cls._role_version = version
+
+        key = str(role_id)
+        role_sets = cls._role_sets
+        role_set = role_sets.get(key)
+        if role_set is None:
+            role_set = cls._compile_role(role_id)
+            role_sets[key] = role_set
+        return role_set
+
+    @classmethod
+    def get_user_set(cls, user_id):
+        """Get the compiled permission set for a user's role, or None"""
+        if not user_id:
+            return None
+        role_id = cls.get_role_id(user_id)
+        if not role_id:
+            return None
+        return cls.get_role_set(role_id)
+
+    @classmethod
+    def user_has_permission(cls, user_id, permission_name, wildcard=False):
+        """Check a user's permission; optionally also match wildcard grants"""
+        role_set = cls.get_user_set(user_id)
+        if role_set is None:
+            return False
+        if wildcard:
+            return role_set.allows(permission_name)
+        return role_set.has(permission_name)
+
+    @classmethod
+    def _compile_role(cls, role_id):
+        """Load every permission name granted to a role in one query"""
+        from app.classes import RolePermissionSet
+        from app.models import RolePermission, Permission
+
+        with db_registry.session_scope() as session:
+            rows = session.query(Permission.name).join(
+                RolePermission, RolePermission.permission_id == Permission.id
+            ).filter(
+                RolePermission.role_id == role_id
+            ).all()
+
+        return RolePermissionSet(role_id, [row.name for row in rows])
+
+
+PermissionCache.register_invalidation()
@@ -103,32 +103,13 @@ class RbacPermissionChecker:
         Returns:
             bool: True if wildcard permission found, False otherwise
         """
-        # Split the requested permission into parts
-        parts = permission_name.split(':')
-        if len(parts) != 3:
+        from app.classes import PermissionCache
+
+        # All 7 wildcard patterns are checked against the role's cached set
+        role_set = PermissionCache.get_user_set(user_id)
+        if role_set is None:
             return False
-        
-        service, resource, action = parts
-        
-        # Generate all possible wildcard combinations
-        wildcard_patterns = [
-            '*:*:*',                    # Full wildcard
-            f'{service}:*:*',          # Service wildcard
-            f'*:{resource}:*',         # Resource wildcard
-            f'*:*:{action}',           # Action wildcard
-            f'{service}:{resource}:*', # Service+Resource wildcard
-            f'{service}:*:{action}',   # Service+Action wildcard
-            f'*:{resource}:{action}',  # Resource+Action wildcard
-        ]
-        
-        # Check each wildcard pattern
-        for pattern in wildcard_patterns:
-            if self.role_permission_model.user_has_permission(
-                user_id, pattern
-            ):
-                return True
-        
-        return False
+        return role_set.has_wildcard(permission_name)
 
     def check_api_permission(self, user_id, permission_name, model_name=None, 
                            action=None, record_id=None, token_id=None):
@@ -236,10 +217,11 @@ class RbacPermissionChecker:
         return decorator
 
     def _log_audit(self, audit_context):
-        """Log the permission check"""
+        """Queue the permission check for the batched, sampled audit sink"""
         try:
             if self.rbac_audit_model:
-                self.rbac_audit_model.log_permission_check( **audit_context)
+                from app.classes import AuditSink
+                AuditSink.record(**audit_context)
         except Exception as e:
             # Don't let audit logging break the main flow
             print(f"Permission Checker RBAC audit logging failed: {e}")
@@ -44,7 +44,7 @@ class RolePermission(BaseModel):
 
     @classmethod
     def grant_permission(cls,  role_id, permission_name):
-        """Grant a permission to a role"""
+        """Grant a permission to a role (the commit bumps the 'rbac' cache stamp)"""
         db_session=db_registry._routing_session()
         # Direct usage now!
         permission = Permission.find_by_name(permission_name)
@@ -73,7 +73,7 @@ class RolePermission(BaseModel):
 
     @classmethod
     def revoke_permission(cls, role_id, permission_name):
-        """Revoke a permission from a role"""
+        """Revoke a permission from a role (the commit bumps the 'rbac' cache stamp)"""
         db_session=db_registry._routing_session()
         permission = Permission.find_by_name( permission_name)
         if not permission:
@@ -95,24 +95,13 @@ class RolePermission(BaseModel):
 
     @classmethod
     def user_has_permission(cls, user_id, permission_name):
-        """Check if a user has a specific permission through their role"""
-        db_session=db_registry._routing_session()
-        user = db_session.query(User).filter(User.id == user_id).first()
-        if not user or not user.role_id:
-            return False
-
-        # Find permission
-        permission = Permission.find_by_name(permission_name)
-        if not permission:
-            return False
-
-        # Check if role has permission
-        role_permission = db_session.query(cls).filter(
-            cls.role_id == user.role_id,
-            cls.permission_id == permission.id
-        ).first()
+        """Check if a user has a specific permission through their role
 
-        return role_permission is not None
+        Answered from the per-worker PermissionCache - no database round-trip
+        once the user's role set is compiled
+        """
+        from app.classes import PermissionCache
+        return PermissionCache.user_has_permission(user_id, permission_name)
 
     @classmethod
     def get_user_permissions(cls, user_id):
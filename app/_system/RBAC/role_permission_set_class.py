@@ -0,0 +1,42 @@
+class RolePermissionSet:
+    """
+    Compiled permission set for one role
+
+    Exact names live in a frozenset; names containing '*' are also indexed
+    separately so a wildcard check is at most 7 more set lookups.
+    """
+    __depends_on__ = []
+
+    def __init__(self, role_id, names):
+        self.role_id = role_id
+        self.names = frozenset(names)
+        self.wildcards = frozenset(name for name in self.names if '*' in name)
+
+    def has(self, permission_name):
+        """Exact permission check"""
+        return permission_name in self.names
+
+    def has_wildcard(self, permission_name):
+        """Check if any wildcard permission covers service:resource:action"""
+        if not self.wildcards:
+            return False
+
+        parts = permission_name.split(':')
+        if len(parts) != 3:
+            return False
+
+        service, resource, action = parts
+        wildcards = self.wildcards
+        return (
+            '*:*:*' in wildcards or
+            f'{service}:*:*' in wildcards or
+            f'*:{resource}:*' in wildcards or
+            f'*:*:{action}' in wildcards or
+            f'{service}:{resource}:*' in wildcards or
+            f'{service}:*:{action}' in wildcards or
+            f'*:{resource}:{action}' in wildcards
+        )
+
+    def allows(self, permission_name):
+        """Exact or wildcard check"""
+        return self.has(permission_name) or self.has_wildcard(permission_name)
@@ -13,5 +13,5 @@ def react_base_page():
     """Simple Single Page App Entrypoint using the TemplateRenderer"""
     from app.classes import TemplateRenderer
     renderer = TemplateRenderer()
-    return renderer.render_template("home", fragment_only=False)
+    return renderer.render_response("home", fragment_only=False)
 
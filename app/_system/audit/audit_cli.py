@@ -376,7 +376,7 @@ class AuditAnalysisCLI(BaseCLI):
         """Clean up old RBAC audit logs"""
         try:
             # Get count and cutoff using model method
-            old_count, cutoff_date = self.audit_log_model.cleanup_old_logs(self.session, days)
+            old_count, cutoff_date = self.audit_log_model.cleanup_old_logs(days)
 
             if old_count == 0:
                 self.output_info(f"No RBAC audit logs older than {days} days found")
@@ -388,7 +388,7 @@ class AuditAnalysisCLI(BaseCLI):
                 return 0
             else:
                 # Actually delete using model method
-                deleted = self.audit_log_model.delete_old_logs(self.session, cutoff_date)
+                deleted = self.audit_log_model.delete_old_logs(cutoff_date)
                 self.output_success(f"Deleted {deleted} RBAC audit logs older than {days} days")
                 return 0
 
@@ -398,6 +398,124 @@ class AuditAnalysisCLI(BaseCLI):
             self.output_error(f"Error during cleanup: {e}")
             return 1
 
+    def manage_partitions(self, action, days=90, detach=False, dry_run=False):
+        """
+        Partitioned storage for rbac_audit_logs
+
+        Actions:
+            setup: convert the table (the existing rows become one legacy partition)
+            status: list partitions
+            maintain: create upcoming partitions and drop those older than days
+            drop: drop (or detach) partitions older than days
+        """
+        partitions = self.audit_log_model.partitions()
+        self.log_info(f"Partition {action} for rbac_audit_logs")
+
+        try:
+            if action == 'setup':
+                statements = partitions.convert(dry_run=dry_run)
+                for statement in statements:
+                    self.output_info(statement)
+                if dry_run:
+                    self.output_warning("DRY RUN: nothing was changed")
+                else:
+                    self.output_success(f"rbac_audit_logs partitioned by {partitions.interval}")
+                return 0
+
+            if not partitions.is_partitioned():
+                self.output_warning("rbac_audit_logs is not partitioned - run 'partitions setup' first")
+                return 1
+
+            if action == 'status':
+                rows = [[
+                    p['name'],
+                    'DEFAULT' if p['is_default'] else (p['lower'].strftime('%Y-%m-%d') if p['lower'] else 'MIN'),
+                    '' if p['is_default'] else (p['upper'].strftime('%Y-%m-%d') if p['upper'] else 'MAX'),
+                    f"{p['rows']:,}"
+                ] for p in partitions.partitions()]
+                self.output_table(rows, headers=['Partition', 'From', 'To', 'Rows (est.)'])
+                return 0
+
+            cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+
+            if action == 'maintain' and not dry_run:
+                for statement in partitions.ensure():
+                    self.output_info(statement)
+
+            names = partitions.drop_before(cutoff, detach=detach, dry_run=dry_run)
+            verb = 'detach' if detach else 'drop'
+            if not names:
+                self.output_info(f"No partitions end before {cutoff:%Y-%m-%d}")
+            elif dry_run:
+                self.output_warning(f"DRY RUN: would {verb} {', '.join(names)}")
+            else:
+                self.output_success(f"{'Detached' if detach else 'Dropped'} {len(names)} partition(s): {', '.join(names)}")
+            return 0
+
+        except Exception as e:
+            self.log_error(f"Error during partition {action}: {e}")
+            self.output_error(f"Error during partition {action}: {e}")
+            return 1
+
+    def manage_rollup(self, action):
+        """
+        Hourly rollup behind the audit stats
+
+        Actions:
+            run: fold every closed hour since the high-water mark now
+            status: show the high-water mark and lag
+            reset: drop the rollup so the next run rebuilds it from the raw table
+        """
+        from app.classes import LogRollup
+        name = 'rbac_audit'
+
+        try:
+            if action == 'run':
+                hours = LogRollup.run_once(name)[name]
+                if hours is None:
+                    self.output_warning("Another process is running the rollup")
+                else:
+                    self.output_success(f"Rolled up {hours} hour(s)")
+                return 0
+
+            if action == 'reset':
+                LogRollup.reset(name)
+                self.output_success(f"Rollup {name} reset - the next run rebuilds it")
+                return 0
+
+            state = LogRollup.status()[name]
+            mark = state['high_water_mark']
+            rows = [
+                ['High-water mark', mark.strftime('%Y-%m-%d %H:%M') if mark else 'never run'],
+                ['Lag (minutes)', state['lag_minutes'] if state['lag_minutes'] is not None else '-'],
+                ['Last run', state['last_run_at'].strftime('%Y-%m-%d %H:%M:%S') if state['last_run_at'] else '-'],
+                ['Last run (ms)', state['last_duration_ms'] if state['last_duration_ms'] is not None else '-'],
+                ['Rows written', f"{state['rows_written']:,}"],
+            ]
+            self.output_table(rows, headers=['Rollup', name])
+            return 0
+
+        except Exception as e:
+            self.log_error(f"Error during rollup {action}: {e}")
+            self.output_error(f"Error during rollup {action}: {e}")
+            return 1
+
+    def tune_indexes(self):
+        """Add check_count and slim down the rbac_audit_logs indexes"""
+        self.log_info("Tuning rbac_audit_logs schema and indexes")
+
+        try:
+            statements = self.audit_log_model.tune_indexes()
+            for statement in statements:
+                self.output_info(statement)
+            self.output_success("rbac_audit_logs indexes tuned")
+            return 0
+
+        except Exception as e:
+            self.log_error(f"Error tuning indexes: {e}")
+            self.output_error(f"Error tuning indexes: {e}")
+            return 1
+
 
 def main():
     """Entry point"""
@@ -446,6 +564,22 @@ def main():
     cleanup_parser.add_argument('--days', type=int, default=90, help='Delete logs older than X days (default: 90)')
     cleanup_parser.add_argument('--no-dry-run', action='store_true', help='Actually delete (default is dry run)')
 
+    # Index tuning
+    subparsers.add_parser('tune-indexes', help='Add check_count and replace redundant audit log indexes')
+
+    # Partitioned storage
+    partitions_parser = subparsers.add_parser('partitions', help='Manage time partitions of the audit log table')
+    partitions_parser.add_argument('action', choices=['setup', 'status', 'maintain', 'drop'],
+                                   help='setup converts the table; maintain creates upcoming and drops expired partitions')
+    partitions_parser.add_argument('--days', type=int, default=90, help='Retention in days for maintain/drop (default: 90)')
+    partitions_parser.add_argument('--detach', action='store_true', help='Detach expired partitions instead of dropping them')
+    partitions_parser.add_argument('--dry-run', action='store_true', help='Show what would be done')
+
+    # Stats rollup
+    rollup_parser = subparsers.add_parser('rollup', help='Maintain the hourly rollup behind the audit stats')
+    rollup_parser.add_argument('action', choices=['run', 'status', 'reset'],
+                               help='run folds closed hours now; reset rebuilds from the raw table on the next run')
+
     args = parser.parse_args()
 
     if not args.command:
@@ -475,6 +609,12 @@ def main():
             return cli.show_suspicious_activity(args.hours, args.min_denials)
         elif args.command == 'cleanup':
             return cli.cleanup_old_logs(args.days, not args.no_dry_run)
+        elif args.command == 'tune-indexes':
+            return cli.tune_indexes()
+        elif args.command == 'partitions':
+            return cli.manage_partitions(args.action, args.days, args.detach, args.dry_run)
+        elif args.command == 'rollup':
+            return cli.manage_rollup(args.action)
 
     except KeyboardInterrupt:
         cli.output_info("\nOperation cancelled")
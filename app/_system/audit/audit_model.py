@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, JSON, Index, Boolean, func, case
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, JSON, Index, Boolean, Numeric, func, case, cast, inspect, text
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone, timedelta
@@ -6,6 +7,7 @@ import json
 from flask import g 
 
 from app.base.model import BaseModel
+from app.config import config
 from app.register.database import db_registry
 
 
@@ -17,7 +19,7 @@ class RbacAuditLog(BaseModel):
     RBAC Audit Log - Records all permission checks across the entire system
     Triggered whenever RBAC permissions are checked, regardless of interface
     """
-    __depends_on__ = ['User', 'UserToken','Permission']
+    __depends_on__ = ['User', 'UserToken','Permission', 'LogPartitions']
     __tablename__ = 'rbac_audit_logs'
 
     # User context
@@ -56,29 +58,52 @@ class RbacAuditLog(BaseModel):
     context_data = Column(JSON, nullable=True)  # Extra context (filters, params, etc.)
 
     # Performance tracking
-    check_duration_ms = Column(Integer, nullable=True)  # How long the permission check took
+    check_duration_ms = Column(Integer, nullable=True)  # How long the permission check took (average when aggregated)
+
+    # Number of checks this row stands for - AuditSink collapses identical grants
+    check_count = Column(Integer, nullable=False, default=1, server_default='1')
 
     # Relationships
     user = relationship("User", back_populates="rbac_audit_logs")
     token = relationship("UserToken", back_populates="rbac_audit_logs")
 
+    # Kept deliberately small: every index is maintained on every insert.
+    # Denial indexes are partial - granted rows (the vast majority) skip them.
     __table_args__ = (
-        Index('idx_rbac_audit_logs_user', 'user_id'),
         Index('idx_rbac_audit_logs_permission', 'permission_name'),
-        Index('idx_rbac_audit_logs_granted', 'permission_granted'),
         Index('idx_rbac_audit_logs_created', 'created_at'),
         Index('idx_rbac_audit_logs_interface', 'interface_type'),
         Index('idx_rbac_audit_logs_resource', 'resource_type', 'resource_name'),
         # Composite indexes for common queries
         Index('idx_rbac_audit_logs_user_permission', 'user_id', 'permission_name'),
-        Index('idx_rbac_audit_logs_denied', 'permission_granted', 'created_at'),
-        Index('idx_rbac_audit_logs_user_denied', 'user_id', 'permission_granted', 'created_at'),
+        Index('idx_rbac_audit_logs_denied', 'created_at',
+              postgresql_where=text('permission_granted = false')),
+        Index('idx_rbac_audit_logs_user_denied', 'user_id', 'created_at',
+              postgresql_where=text('permission_granted = false')),
+    )
+
+    # Indexes replaced by the definitions above; see tune_indexes()
+    REDUNDANT_INDEXES = [
+        'idx_rbac_audit_logs_user',       # prefix of idx_rbac_audit_logs_user_permission
+        'idx_rbac_audit_logs_granted',    # boolean, covered by the partial denial indexes
+    ]
+    REBUILT_INDEXES = ['idx_rbac_audit_logs_denied', 'idx_rbac_audit_logs_user_denied']
+
+    # Columns taken from a permission check's audit context
+    AUDIT_COLUMNS = (
+        'user_id', 'token_id', 'permission_name', 'permission_granted',
+        'access_denied_reason', 'resource_type', 'resource_name', 'resource_id',
+        'action_attempted', 'interface_type', 'endpoint', 'request_method',
+        'ip_address', 'user_agent', 'request_id', 'context_data', 'check_duration_ms'
     )
 
     @classmethod
     def log_permission_check(cls, **kwargs):
         """
-        Log a permission check
+        Log a permission check synchronously (INSERT + commit on the session)
+
+        Request-path checks should go through AuditSink.record instead,
+        which batches, samples and aggregates
 
         Usage:
         RbacAuditLog.log_permission_check(
@@ -185,33 +210,35 @@ class RbacAuditLog(BaseModel):
 
     @classmethod
     def get_performance_stats(cls, interface_type=None, hours=24):
-        """Get permission check performance statistics"""
+        """Get permission check performance statistics (from the hourly rollup plus recent raw rows)"""
+        from app.models import RbacAuditRollup
+
         cutoff_date = datetime.now(timezone.utc) - timedelta(hours=hours)
 
         db_session=db_registry._routing_session()
+        stats = RbacAuditRollup.stats_source(cutoff_date)
 
         query = db_session.query(
-            cls.interface_type,
-            cls.permission_name,
-            func.count(cls.id).label('total_checks'),
-            func.avg(cls.check_duration_ms).label('avg_duration'),
-            func.max(cls.check_duration_ms).label('max_duration'),
-            func.sum(case((cls.permission_granted == True, 1), else_=0)).label('granted'),
-            func.sum(case((cls.permission_granted == False, 1), else_=0)).label('denied')
+            stats.c.interface_type,
+            stats.c.permission_name,
+            func.sum(stats.c.timed_checks).label('total_checks'),
+            (cast(func.sum(stats.c.duration_total), Numeric) / func.sum(stats.c.timed_checks)).label('avg_duration'),
+            func.max(stats.c.duration_max).label('max_duration'),
+            func.sum(case((stats.c.permission_granted == True, stats.c.timed_checks), else_=0)).label('granted'),
+            func.sum(case((stats.c.permission_granted == False, stats.c.timed_checks), else_=0)).label('denied')
         ).filter(
-            cls.created_at >= cutoff_date,
-            cls.check_duration_ms.isnot(None)
+            stats.c.timed_checks > 0
         )
 
         if interface_type:
-            query = query.filter(cls.interface_type == interface_type)
+            query = query.filter(stats.c.interface_type == interface_type)
 
         return query.group_by(
-            cls.interface_type,
-            cls.permission_name
+            stats.c.interface_type,
+            stats.c.permission_name
         ).order_by(
-            cls.interface_type,
-            func.count(cls.id).desc()
+            stats.c.interface_type,
+            func.sum(stats.c.timed_checks).desc()
         ).all()
 
     @classmethod
@@ -225,9 +252,9 @@ class RbacAuditLog(BaseModel):
             cls.permission_name,
             cls.interface_type,
             cls.resource_type,
-            func.count(cls.id).label('attempts'),
-            func.sum(case((cls.permission_granted == True, 1), else_=0)).label('granted'),
-            func.sum(case((cls.permission_granted == False, 1), else_=0)).label('denied')
+            func.sum(cls.check_count).label('attempts'),
+            func.sum(case((cls.permission_granted == True, cls.check_count), else_=0)).label('granted'),
+            func.sum(case((cls.permission_granted == False, cls.check_count), else_=0)).label('denied')
         ).filter(
             cls.user_id == user_id,
             cls.created_at >= cutoff_date
@@ -252,48 +279,51 @@ class RbacAuditLog(BaseModel):
 
     @classmethod
     def get_permission_usage_stats(cls, days=7):
-        """Get permission usage statistics"""
+        """Get permission usage statistics (from the hourly rollup plus recent raw rows)"""
+        from app.models import RbacAuditRollup
+
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
         
         db_session=db_registry._routing_session()
+        stats = RbacAuditRollup.stats_source(cutoff_date)
 
         return db_session.query(
-            cls.permission_name,
-            cls.interface_type,
-            func.count(cls.id).label('total_checks'),
-            func.sum(case((cls.permission_granted == True, 1), else_=0)).label('granted'),
-            func.sum(case((cls.permission_granted == False, 1), else_=0)).label('denied'),
-            func.count(func.distinct(cls.user_id)).label('unique_users')
-        ).filter(
-            cls.created_at >= cutoff_date
+            stats.c.permission_name,
+            stats.c.interface_type,
+            func.sum(stats.c.check_count).label('total_checks'),
+            func.sum(case((stats.c.permission_granted == True, stats.c.check_count), else_=0)).label('granted'),
+            func.sum(case((stats.c.permission_granted == False, stats.c.check_count), else_=0)).label('denied'),
+            func.count(func.distinct(stats.c.user_id)).label('unique_users')
         ).group_by(
-            cls.permission_name,
-            cls.interface_type
+            stats.c.permission_name,
+            stats.c.interface_type
         ).order_by(
-            func.count(cls.id).desc()
+            func.sum(stats.c.check_count).desc()
         ).all()
 
     @classmethod
     def get_denial_analysis(cls, hours=24):
-        """Get permission denial analysis"""
+        """Get permission denial analysis (summary from the hourly rollup plus recent raw rows)"""
+        from app.models import RbacAuditRollup
+
         cutoff_date = datetime.now(timezone.utc) - timedelta(hours=hours)
         
         db_session=db_registry._routing_session()
+        stats = RbacAuditRollup.stats_source(cutoff_date)
 
         denial_summary = db_session.query(
-            cls.permission_name,
-            cls.interface_type,
-            cls.access_denied_reason,
-            func.count(cls.id).label('count')
+            stats.c.permission_name,
+            stats.c.interface_type,
+            stats.c.access_denied_reason,
+            func.sum(stats.c.row_count).label('count')
         ).filter(
-            cls.created_at >= cutoff_date,
-            cls.permission_granted == False
+            stats.c.permission_granted == False
         ).group_by(
-            cls.permission_name,
-            cls.interface_type,
-            cls.access_denied_reason
+            stats.c.permission_name,
+            stats.c.interface_type,
+            stats.c.access_denied_reason
         ).order_by(
-            func.count(cls.id).desc()
+            func.sum(stats.c.row_count).desc()
         ).all()
 
         recent_denials = db_session.query(cls)\
@@ -309,28 +339,40 @@ class RbacAuditLog(BaseModel):
     @classmethod
     def get_suspicious_activity(cls, hours=24, min_denials=5):
         """Get users with suspicious activity (many permission denials)"""
+        from app.models import RbacAuditRollup
+
         cutoff_date = datetime.now(timezone.utc) - timedelta(hours=hours)
         
         db_session=db_registry._routing_session()
+        stats = RbacAuditRollup.stats_source(cutoff_date)
 
         return db_session.query(
-            cls.user_id,
-            func.count(cls.id).label('total_denials'),
-            func.count(func.distinct(cls.permission_name)).label('unique_permissions'),
-            func.count(func.distinct(cls.ip_address)).label('unique_ips'),
-            func.max(cls.created_at).label('last_denial')
+            stats.c.user_id,
+            func.sum(stats.c.row_count).label('total_denials'),
+            func.count(func.distinct(stats.c.permission_name)).label('unique_permissions'),
+            func.count(func.distinct(stats.c.ip_address)).label('unique_ips'),
+            func.max(stats.c.last_seen).label('last_denial')
         ).filter(
-            cls.created_at >= cutoff_date,
-            cls.permission_granted == False,
-            cls.user_id.isnot(None)
+            stats.c.permission_granted == False,
+            stats.c.user_id.isnot(None)
         ).group_by(
-            cls.user_id
+            stats.c.user_id
         ).having(
-            func.count(cls.id) >= min_denials
+            func.sum(stats.c.row_count) >= min_denials
         ).order_by(
-            func.count(cls.id).desc()
+            func.sum(stats.c.row_count).desc()
         ).all()
 
+    @classmethod
+    def partitions(cls):
+        """Partition manager for rbac_audit_logs (see LogPartitions)"""
+        from app.classes import LogPartitions
+        return LogPartitions(
+            cls,
+            interval=config.get('rbac_audit_partition_interval', 'day'),
+            ahead=config.get('log_partition_premake', 7)
+        )
+
     @classmethod
     def cleanup_old_logs(cls, days=90):
         """Clean up old audit logs and return count"""
@@ -346,7 +388,22 @@ class RbacAuditLog(BaseModel):
 
     @classmethod
     def delete_old_logs(cls, cutoff_date):
-        """Actually delete old logs"""
+        """
+        Actually delete old logs
+
+        On a partitioned table whole partitions ending before the cutoff are
+        dropped instead; rows in a partition that straddles the cutoff stay
+        until the whole partition has expired
+
+        Returns:
+            int: rows deleted (estimated for dropped partitions)
+        """
+        partitions = cls.partitions()
+        if partitions.is_partitioned():
+            expired = partitions.expired(cutoff_date)
+            partitions.drop_before(cutoff_date)
+            return sum(partition['rows'] for partition in expired)
+
         db_session=db_registry._routing_session()
 
         deleted = db_session.query(cls)\
@@ -356,6 +413,36 @@ class RbacAuditLog(BaseModel):
         db_session.commit()
         return deleted
 
+    @classmethod
+    def tune_indexes(cls):
+        """
+        Bring an existing rbac_audit_logs table in line with the model:
+        add check_count, drop the redundant indexes and rebuild the denial
+        indexes as partial indexes
+
+        Returns:
+            list: SQL statements executed
+        """
+        statements = [
+            f"ALTER TABLE {cls.__tablename__} ADD COLUMN IF NOT EXISTS check_count INTEGER NOT NULL DEFAULT 1"
+        ]
+        for index_name in cls.REDUNDANT_INDEXES + cls.REBUILT_INDEXES:
+            statements.append(f"DROP INDEX IF EXISTS {index_name}")
+
+        with db_registry.session_scope() as session:
+            for statement in statements:
+                session.execute(text(statement))
+
+        # Recreate the rebuilt indexes from their model definitions
+        engine = db_registry.main_engine
+        existing = {index['name'] for index in inspect(engine).get_indexes(cls.__tablename__)}
+        for index in cls.__table__.indexes:
+            if index.name in cls.REBUILT_INDEXES and index.name not in existing:
+                index.create(engine)
+                statements.append(str(CreateIndex(index).compile(engine)))
+
+        return statements
+
     def to_dict(self):
         """Convert audit log to dictionary for API responses"""
         return {
@@ -0,0 +1,149 @@
+from sqlalchemy import (
+    Column, String, Text, DateTime, Integer, BigInteger, Boolean, Index,
+    select, insert, delete, union_all, func, case, literal
+)
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.base.model import Base
+
+
+class RbacAuditRollup(Base):
+    """
+    Hourly rollup of rbac_audit_logs for the audit dashboards and CLI
+
+    One row per hour, interface, permission, user and outcome. The denial
+    detail (reason, IP address) is only kept for denied checks, so the
+    granted checks - nearly all of them - collapse into few rows.
+    Maintained by LogRollup; rows are never updated after their hour closes.
+    """
+    __tablename__ = 'rbac_audit_rollups'
+    __depends_on__ = ['RbacAuditLog', 'LogRollup']
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    bucket = Column(DateTime(timezone=True), nullable=False)  # start of the hour (UTC)
+
+    interface_type = Column(String(20), nullable=True)
+    permission_name = Column(String(100), nullable=True)
+    user_id = Column(UUID(as_uuid=True), nullable=True)
+    permission_granted = Column(Boolean, nullable=True)
+    access_denied_reason = Column(Text, nullable=True)  # denials only
+    ip_address = Column(String(45), nullable=True)  # denials only
+
+    row_count = Column(BigInteger, nullable=False, default=0)  # raw rows
+    check_count = Column(BigInteger, nullable=False, default=0)  # checks (rows x check_count)
+    timed_checks = Column(BigInteger, nullable=False, default=0)  # checks with a duration
+    duration_total = Column(BigInteger, nullable=False, default=0)  # sum of duration x checks, ms
+    duration_max = Column(Integer, nullable=True)
+    last_seen = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('idx_rbac_audit_rollups_bucket', 'bucket'),
+    )
+
+    ROLLUP_NAME = 'rbac_audit'
+
+    # Columns shared by the rollup and the raw rows it is merged with
+    STATS_COLUMNS = (
+        'interface_type', 'permission_name', 'user_id', 'permission_granted',
+        'access_denied_reason', 'ip_address', 'row_count', 'check_count',
+        'timed_checks', 'duration_total', 'duration_max', 'last_seen'
+    )
+
+    @classmethod
+    def _raw_columns(cls):
+        """Raw rbac_audit_logs columns shaped like the rollup's"""
+        from app.models import RbacAuditLog
+
+        log = RbacAuditLog.__table__
+        denied = log.c.permission_granted == False
+        return {
+            'interface_type': log.c.interface_type,
+            'permission_name': log.c.permission_name,
+            'user_id': log.c.user_id,
+            'permission_granted': log.c.permission_granted,
+            'access_denied_reason': case((denied, log.c.access_denied_reason)),
+            'ip_address': case((denied, log.c.ip_address)),
+            'timed_checks': case((log.c.check_duration_ms.isnot(None), log.c.check_count), else_=0),
+            'duration_total': func.coalesce(log.c.check_duration_ms * log.c.check_count, 0),
+        }
+
+    @classmethod
+    def register_rollup(cls):
+        """Have LogRollup maintain this table"""
+        from app.classes import LogRollup
+        LogRollup.register(cls.ROLLUP_NAME, cls)
+
+    @classmethod
+    def get_source_table(cls):
+        from app.models import RbacAuditLog
+        return RbacAuditLog.__table__
+
+    @classmethod
+    def rollup(cls, connection, start, end):
+        """Replace the buckets in [start, end) from the raw table"""
+        log = cls.get_source_table()
+        table = cls.__table__
+        raw = cls._raw_columns()
+        bucket = func.date_trunc('hour', log.c.created_at)
+        keys = [
+            raw['interface_type'], raw['permission_name'], raw['user_id'],
+            raw['permission_granted'], raw['access_denied_reason'], raw['ip_address']
+        ]
+
+        aggregated = select(
+            bucket,
+            *keys,
+            func.count(),
+            func.sum(log.c.check_count),
+            func.sum(raw['timed_checks']),
+            func.sum(raw['duration_total']),
+            func.max(log.c.check_duration_ms),
+            func.max(log.c.created_at)
+        ).where(
+            log.c.created_at >= start,
+            log.c.created_at < end
+        ).group_by(bucket, *keys)
+
+        connection.execute(delete(table).where(table.c.bucket >= start, table.c.bucket < end))
+        result = connection.execute(insert(table).from_select(['bucket'] + list(cls.STATS_COLUMNS), aggregated))
+        return result.rowcount
+
+    @classmethod
+    def stats_source(cls, start):
+        """
+        Rollup buckets up to the high-water mark plus raw rows after it,
+        as one subquery with STATS_COLUMNS - aggregate it like the raw table
+        """
+        from app.classes import LogRollup
+
+        log = cls.get_source_table()
+        table = cls.__table__
+        raw = cls._raw_columns()
+        rollup_start, mark, raw_start = LogRollup.split(cls.ROLLUP_NAME, start)
+
+        raw_rows = select(
+            raw['interface_type'].label('interface_type'),
+            raw['permission_name'].label('permission_name'),
+            raw['user_id'].label('user_id'),
+            raw['permission_granted'].label('permission_granted'),
+            raw['access_denied_reason'].label('access_denied_reason'),
+            raw['ip_address'].label('ip_address'),
+            literal(1).label('row_count'),
+            log.c.check_count.label('check_count'),
+            raw['timed_checks'].label('timed_checks'),
+            raw['duration_total'].label('duration_total'),
+            log.c.check_duration_ms.label('duration_max'),
+            log.c.created_at.label('last_seen')
+        ).where(log.c.created_at >= raw_start)
+
+        if mark is None:
+            return raw_rows.subquery('audit_stats')
+
+        rollup_rows = select(*[table.c[name] for name in cls.STATS_COLUMNS]).where(
+            table.c.bucket >= rollup_start,
+            table.c.bucket < mark
+        )
+        return union_all(rollup_rows, raw_rows).subquery('audit_stats')
+
+
+RbacAuditRollup.register_rollup()
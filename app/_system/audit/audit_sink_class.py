@@ -0,0 +1,162 @@
+import json
+import random
+import threading
+from datetime import datetime, timezone
+
+from app.config import config
+
+
+class AuditSink:
+    """
+    Buffered writer for RBAC permission-check audit rows
+
+    - Denials are always kept
+    - Granted checks are kept with probability rbac_audit_grant_sample_rate
+    - Within one flush window, identical granted checks are collapsed into a
+      single row whose check_count says how many checks it stands for
+      (scaled back up by the sample rate)
+    - Rows are written by a BatchWriter as one executemany INSERT per batch,
+      in one transaction per batch instead of one per request
+
+    Usage:
+        AuditSink.record(user_id=..., permission_name=..., permission_granted=True, ...)
+    """
+    __depends_on__ = ['BatchWriter', 'RbacAuditLog', 'LogRollup']
+
+    # Fields that make two granted checks "identical" for aggregation
+    AGGREGATE_KEY = (
+        'user_id', 'token_id', 'permission_name', 'resource_type', 'resource_name',
+        'resource_id', 'action_attempted', 'interface_type', 'endpoint',
+        'request_method', 'ip_address', 'user_agent', 'request_id'
+    )
+
+    sample_rate = config.get('rbac_audit_grant_sample_rate', 1.0)
+    aggregate_grants = config.get('rbac_audit_aggregate_grants', True)
+
+    _writer = None
+    _writer_lock = threading.Lock()
+    sampled_out = 0
+
+    @classmethod
+    def get_writer(cls):
+        """Get the batch writer for rbac_audit_logs"""
+        if cls._writer is None:
+            with cls._writer_lock:
+                if cls._writer is None:
+                    from app.classes import BatchWriter, LogRollup
+                    from app.models import RbacAuditLog
+
+                    # Make sure the coming partitions exist before rows arrive
+                    RbacAuditLog.partitions().maintain_quietly()
+                    LogRollup.start()
+                    cls._writer = BatchWriter(
+                        'rbac_audit_logs',
+                        handler=cls._write_batch,
+                        batch_size=config.get('rbac_audit_batch_size', 1000),
+                        flush_interval_ms=config.get('rbac_audit_flush_ms', 2000),
+                        max_queue_size=config.get('rbac_audit_queue_size', 20000),
+                        overflow=config.get('rbac_audit_overflow', 'drop')
+                    )
+        return cls._writer
+
+    @classmethod
+    def record(cls, **kwargs):
+        """
+        Queue one permission check
+
+        Returns:
+            bool: True if the check was queued, False if sampled out or dropped
+        """
+        granted = bool(kwargs.get('permission_granted'))
+        if granted and cls.sample_rate < 1.0 and random.random() >= cls.sample_rate:
+            cls.sampled_out += 1
+            return False
+
+        kwargs['created_at'] = datetime.now(timezone.utc)
+        return cls.get_writer().put(kwargs)
+
+    @classmethod
+    def flush(cls):
+        """Write all queued audit rows now"""
+        if cls._writer is not None:
+            cls._writer.flush()
+
+    @classmethod
+    def stats(cls):
+        """Writer counters plus the number of granted checks sampled out"""
+        stats = cls.get_writer().stats()
+        stats['sampled_out'] = cls.sampled_out
+        stats['sample_rate'] = cls.sample_rate
+        return stats
+
+    @classmethod
+    def _write_batch(cls, connection, items):
+        """BatchWriter handler: aggregate granted checks, then one executemany INSERT"""
+        from app.models import RbacAuditLog
+
+        rows = cls._aggregate(items)
+        connection.execute(RbacAuditLog.__table__.insert(), rows)
+
+    @classmethod
+    def _aggregate(cls, items):
+        """Collapse identical granted checks into counted rows"""
+        weight = 1.0 / cls.sample_rate if 0 < cls.sample_rate < 1.0 else 1.0
+        rows = []
+        groups = {}
+
+        for item in items:
+            granted = bool(item.get('permission_granted'))
+            row = cls._to_row(item)
+
+            if not granted:
+                rows.append(row)
+                continue
+
+            row['check_count'] = weight
+            if not cls.aggregate_grants:
+                rows.append(row)
+                continue
+
+            key = tuple(str(item.get(field)) for field in cls.AGGREGATE_KEY)
+            key += (json.dumps(item.get('context_data'), sort_keys=True, default=str),)
+
+            group = groups.get(key)
+            if group is None:
+                row['_duration_total'] = row['check_duration_ms'] or 0
+                groups[key] = row
+                rows.append(row)
+            else:
+                group['check_count'] += weight
+                group['_duration_total'] += row['check_duration_ms'] or 0
+                if row['created_at'] < group['created_at']:
+                    group['created_at'] = row['created_at']
+
+        for row in rows:
+            if '_duration_total' in row:
+                checks = row['check_count'] / weight
+                row['check_duration_ms'] = int(round(row.pop('_duration_total') / checks))
+            row['check_count'] = max(1, int(round(row['check_count'])))
+
+        return rows
+
+    @classmethod
+    def _to_row(cls, item):
+        """Build a full, uniform insert row from check_permission's audit context"""
+        from app.models import RbacAuditLog
+
+        columns = RbacAuditLog.__table__.c
+        row = {}
+        for column in RbacAuditLog.AUDIT_COLUMNS:
+            value = item.get(column)
+            # Truncate to the column size - one oversized value would fail the whole batch
+            length = getattr(columns[column].type, 'length', None)
+            if length and isinstance(value, str) and len(value) > length:
+                value = value[:length]
+            row[column] = value
+        row['permission_granted'] = bool(row['permission_granted'])
+        row['interface_type'] = row['interface_type'] or 'unknown'
+        row['check_count'] = 1
+        row['is_active'] = True
+        row['created_at'] = item['created_at']
+        row['updated_at'] = item['created_at']
+        return row
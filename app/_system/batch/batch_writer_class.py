@@ -0,0 +1,238 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+
+from app.register.database import db_registry
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """
+    Bounded in-process queue drained by a background thread
+
+    Rows are collected until batch_size rows are waiting or flush_interval_ms
+    has passed, then written in one transaction on a dedicated pooled
+    connection - never on the request's scoped session. By default the
+    batch is one executemany INSERT into `table` (SQLAlchemy sends it to
+    psycopg2 as multi-row VALUES pages of up to 1000 rows, see
+    insertmanyvalues); pass `handler(connection, items)` to write batches
+    some other way.
+
+    Overflow behaviour when the queue is full:
+        'drop'        - discard the new item (default, never blocks a request)
+        'drop_oldest' - discard the oldest queued item to make room
+        'block'       - wait up to block_timeout_ms, then discard
+
+    Usage:
+        writer = BatchWriter('firewall_logs', table=FirewallLog.__table__)
+        writer.put({'ip_address': ip, ...})
+        writer.stats()
+    """
+    __depends_on__ = []
+
+    OVERFLOW_POLICIES = ('drop', 'drop_oldest', 'block')
+
+    # name -> writer, so health checks and shutdown can reach every instance
+    _writers = {}
+    _registry_lock = threading.Lock()
+    _atexit_registered = False
+
+    def __init__(self, name, table=None, handler=None, batch_size=500,
+                 flush_interval_ms=1000, max_queue_size=10000,
+                 overflow='drop', block_timeout_ms=50):
+        if table is None and handler is None:
+            raise ValueError("BatchWriter needs a table or a handler")
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy: {overflow}")
+
+        self.name = name
+        self.table = table
+        self.handler = handler or self._insert_rows
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(1, int(flush_interval_ms)) / 1000.0
+        self.overflow = overflow
+        self.block_timeout = max(0, int(block_timeout_ms)) / 1000.0
+
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue_size)))
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        # Counters
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_at = None
+        self.last_error = None
+
+        self._register(self)
+
+    @classmethod
+    def _register(cls, writer):
+        with cls._registry_lock:
+            cls._writers[writer.name] = writer
+            if not cls._atexit_registered:
+                atexit.register(cls.shutdown_all)
+                cls._atexit_registered = True
+
+    @classmethod
+    def get_writer(cls, name):
+        """Get a registered writer by name"""
+        return cls._writers.get(name)
+
+    @classmethod
+    def all_stats(cls):
+        """Get stats for every writer in this process"""
+        return {name: writer.stats() for name, writer in list(cls._writers.items())}
+
+    @classmethod
+    def shutdown_all(cls, timeout=5.0):
+        """Flush and stop every writer - registered with atexit for worker shutdown"""
+        for writer in list(cls._writers.values()):
+            try:
+                writer.stop(timeout=timeout)
+            except Exception as e:
+                logger.error(f"Failed to stop batch writer {writer.name}: {e}")
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        """Current counters for this writer"""
+        return {
+            'queue_depth': self.queue_depth,
+            'max_queue_size': self._queue.maxsize,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+            'overflow': self.overflow,
+            'last_flush_at': self.last_flush_at,
+            'last_error': self.last_error,
+        }
+
+    def put(self, item):
+        """
+        Queue an item for writing
+
+        Returns:
+            bool: True if queued, False if it was dropped
+        """
+        self._ensure_started()
+
+        try:
+            if self.overflow == 'block':
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            if self.overflow != 'drop_oldest' or not self._make_room(item):
+                self.dropped += 1
+                return False
+
+        self.enqueued += 1
+        return True
+
+    def _make_room(self, item):
+        """Discard the oldest queued item and queue the new one"""
+        try:
+            self._queue.get_nowait()
+            self.dropped += 1
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+    def _ensure_started(self):
+        """Start the flusher thread lazily, and again after a fork"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+
+        with self._start_lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                # Forked child: whatever the parent had queued is not ours
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._flush_lock = threading.Lock()
+            self._pid = pid
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"batch-writer-{self.name}",
+                daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        """Background loop: collect up to batch_size items or flush_interval, then write"""
+        while not self._stopping.is_set():
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                if self._stopping.is_set():
+                    break
+
+            if batch:
+                self._write(batch)
+
+    def flush(self):
+        """Synchronously write everything currently queued"""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self, timeout=5.0):
+        """Stop the flusher thread and write whatever is left"""
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+        self.flush()
+
+    def _write(self, batch):
+        """Write one batch in its own transaction"""
+        with self._flush_lock:
+            try:
+                with db_registry.main_engine.begin() as connection:
+                    self.handler(connection, batch)
+                self.written += len(batch)
+                self.batches += 1
+                self.last_flush_at = time.time()
+            except Exception as e:
+                self.failed += len(batch)
+                self.last_error = str(e)
+                logger.error(f"Batch writer {self.name} failed to write {len(batch)} rows: {e}")
+
+    def _insert_rows(self, connection, rows):
+        """Default handler: one executemany INSERT for the whole batch"""
+        connection.execute(self.table.insert(), rows)
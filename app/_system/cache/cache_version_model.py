@@ -0,0 +1,50 @@
+from sqlalchemy import Column, String, BigInteger, func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.base.model import BaseModel
+from app.register.database import db_registry
+
+
+class CacheVersion(BaseModel):
+    """
+    Version stamps for in-process caches
+    Each worker compares its cached structures against these counters,
+    so a change made in one gunicorn worker invalidates the others
+    """
+    __tablename__ = 'cache_versions'
+    __depends_on__ = []
+
+    name = Column(String(100), unique=True, nullable=False)  # "firewall", "rbac", etc.
+    version = Column(BigInteger, nullable=False, default=0)
+
+    @classmethod
+    def bump(cls, name):
+        """
+        Increment the version stamp for a cache in its own transaction
+
+        Call this AFTER the data change has been committed so no worker
+        can rebuild from the old rows under the new stamp
+
+        Returns:
+            int: The new version number
+        """
+        stmt = insert(cls.__table__).values(
+            name=name,
+            version=1
+        ).on_conflict_do_update(
+            index_elements=['name'],
+            set_={
+                'version': cls.__table__.c.version + 1,
+                'updated_at': func.now()
+            }
+        ).returning(cls.__table__.c.version)
+
+        with db_registry.session_scope() as session:
+            return session.execute(stmt).scalar()
+
+    @classmethod
+    def get_versions(cls):
+        """Get all version stamps as a {name: version} dict in one query"""
+        with db_registry.session_scope() as session:
+            rows = session.query(cls.name, cls.version).all()
+            return {name: version for name, version in rows}
@@ -0,0 +1,146 @@
+import time
+import logging
+import threading
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class VersionStamp:
+    """
+    Process-wide view of the cache_versions table
+
+    Every in-process cache keeps the version it was built from and asks
+    VersionStamp.current(name) whether it is still valid. The table is
+    polled at most once per poll interval per worker, so cache checks on
+    the request path cost no database round-trip.
+
+    Usage:
+        if cached_version != VersionStamp.current('firewall'):
+            rebuild()
+        ...
+        VersionStamp.bump('firewall')  # after committing a change
+
+    Models can also be watched so any ORM commit that touches them
+    (Miner CRUD, CLI edits, ...) bumps the stamp automatically:
+        VersionStamp.watch(RolePermission, 'rbac')
+    """
+    __depends_on__ = ['CacheVersion']
+
+    poll_interval = config.get('cache_version_poll_seconds', 5)
+
+    _versions = {}
+    _checked_at = 0.0
+    _lock = threading.Lock()
+    _watched = set()
+    _session_hooked = False
+
+    @classmethod
+    def current(cls, name):
+        """Get the latest known version for a cache name"""
+        if time.monotonic() - cls._checked_at >= cls.poll_interval:
+            cls.refresh()
+        return cls._versions.get(name, 0)
+
+    @classmethod
+    def refresh(cls, force=False):
+        """Reload all version stamps; only one thread polls at a time"""
+        if not cls._lock.acquire(blocking=force):
+            return
+        try:
+            if not force and time.monotonic() - cls._checked_at < cls.poll_interval:
+                return
+
+            from app.models import CacheVersion
+            cls._versions = CacheVersion.get_versions()
+        except Exception as e:
+            # Keep serving the last known versions; retry on the next interval
+            logger.error(f"Failed to refresh cache versions: {e}")
+        finally:
+            cls._checked_at = time.monotonic()
+            cls._lock.release()
+
+    @classmethod
+    def bump(cls, name):
+        """
+        Invalidate a cache in every worker
+
+        This worker sees the change immediately, the others on their next poll
+        """
+        from app.models import CacheVersion
+
+        try:
+            version = CacheVersion.bump(name)
+        except Exception as e:
+            logger.error(f"Failed to bump cache version for {name}: {e}")
+            # Still invalidate locally so at least this worker is fresh
+            version = cls._versions.get(name, 0) + 1
+
+        versions = dict(cls._versions)
+        versions[name] = version
+        cls._versions = versions
+        return version
+
+    @classmethod
+    def watch(cls, model, name, columns=None, events=('insert', 'update', 'delete')):
+        """
+        Bump a stamp after any committed insert/delete of `model`, or an
+        update that changes one of `columns` (any column when not given).
+        Pass `events` to ignore e.g. inserts when a new row cannot be cached yet.
+        """
+        key = (model, name, tuple(columns or ()), tuple(events))
+        if key in cls._watched:
+            return
+        cls._watched.add(key)
+
+        def mark(mapper, connection, target):
+            session = object_session(target)
+            if session is not None:
+                session.info.setdefault('cache_version_bumps', set()).add(name)
+
+        def mark_update(mapper, connection, target):
+            if columns:
+                attrs = inspect(target).attrs
+                if not any(attrs[column].history.has_changes() for column in columns):
+                    return
+            mark(mapper, connection, target)
+
+        if 'insert' in events:
+            event.listen(model, 'after_insert', mark)
+        if 'update' in events:
+            event.listen(model, 'after_update', mark_update)
+        if 'delete' in events:
+            event.listen(model, 'after_delete', mark)
+
+        if not cls._session_hooked:
+            event.listen(Session, 'after_commit', cls._after_commit)
+            event.listen(Session, 'after_rollback', cls._after_rollback)
+            cls._session_hooked = True
+
+    @classmethod
+    def mark_bulk(cls, session, model, event_name):
+        """
+        Mark the stamps watching `model` for a set-based statement
+
+        Bulk INSERT/UPDATE/DELETE statements skip the mapper events watch()
+        relies on, so callers mark them here; the stamps are bumped when the
+        session commits. Column filters are ignored - there is no per-row
+        history to check - so any watched update bumps.
+        """
+        for watched_model, name, columns, events in cls._watched:
+            if watched_model is model and event_name in events:
+                session.info.setdefault('cache_version_bumps', set()).add(name)
+
+    @classmethod
+    def _after_commit(cls, session):
+        """Bump every stamp marked during the committed transaction"""
+        for name in session.info.pop('cache_version_bumps', ()):
+            cls.bump(name)
+
+    @classmethod
+    def _after_rollback(cls, session):
+        session.info.pop('cache_version_bumps', None)
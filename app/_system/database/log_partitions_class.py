@@ -0,0 +1,343 @@
+import re
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.schema import AddConstraint, CreateIndex
+
+from app.register.database import db_registry
+
+logger = logging.getLogger(__name__)
+
+
+class LogPartitions:
+    """
+    Native PostgreSQL range partitioning by created_at for append-only log tables
+
+    Layout of a partitioned table `t`:
+        t_p20261017   one partition per day (or per week, starting Monday)
+        t_p_legacy    the table as it was before conversion, attached whole
+        t_p_default   catches rows outside every range, so inserts never fail
+
+    Partitions are created `ahead` periods in advance (maintain() is called
+    when a log writer starts and from the CLI), and retention drops or
+    detaches whole partitions whose range ends before the cutoff - no
+    DELETE, no bloat, no long locks. Queries filtered on created_at only
+    scan the partitions in range.
+
+    Tables that were never converted keep working; retention then falls
+    back to a plain DELETE.
+    """
+    __depends_on__ = []
+
+    INTERVALS = ('day', 'week')
+    PARTITION_KEY = 'created_at'
+
+    def __init__(self, model_class, interval='day', ahead=7):
+        if interval not in self.INTERVALS:
+            raise ValueError(f"Invalid partition interval '{interval}', expected one of: {', '.join(self.INTERVALS)}")
+        self.model_class = model_class
+        self.table = model_class.__table__
+        self.table_name = self.table.name
+        self.interval = interval
+        self.ahead = max(1, int(ahead))
+
+    # -----------------------------------------------------------------
+    # Periods
+    # -----------------------------------------------------------------
+
+    def period_start(self, moment):
+        """Start (UTC midnight) of the period containing moment"""
+        moment = moment.astimezone(timezone.utc) if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+        start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        if self.interval == 'week':
+            start -= timedelta(days=start.weekday())
+        return start
+
+    def period_length(self):
+        return timedelta(days=7 if self.interval == 'week' else 1)
+
+    def partition_name(self, start):
+        return f"{self.table_name}_p{start:%Y%m%d}"
+
+    @property
+    def legacy_name(self):
+        return f"{self.table_name}_p_legacy"
+
+    @property
+    def default_name(self):
+        return f"{self.table_name}_p_default"
+
+    # -----------------------------------------------------------------
+    # Inspection
+    # -----------------------------------------------------------------
+
+    def is_partitioned(self, conn=None):
+        """True when the table is a partitioned (parent) table"""
+        if conn is None:
+            with db_registry.main_engine.connect() as conn:
+                return self.is_partitioned(conn)
+        return bool(conn.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+            {'table': self.table_name}
+        ).scalar())
+
+    def partitions(self, conn=None):
+        """
+        Attached partitions, oldest first
+
+        Returns:
+            list of dicts: name, lower, upper (UTC datetimes; None for
+            MINVALUE / the default partition), is_default, rows (estimate)
+        """
+        if conn is None:
+            with db_registry.main_engine.connect() as conn:
+                return self.partitions(conn)
+
+        # Bounds are rendered in the session time zone
+        conn.execute(text("SET LOCAL TIME ZONE 'UTC'"))
+        rows = conn.execute(text("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:table)
+        """), {'table': self.table_name}).all()
+
+        partitions = []
+        for name, bound, estimate in rows:
+            lower, upper = self._parse_bound(bound)
+            partitions.append({
+                'name': name,
+                'lower': lower,
+                'upper': upper,
+                'is_default': bound.strip().upper() == 'DEFAULT',
+                'rows': max(int(estimate or 0), 0)
+            })
+
+        far_future = datetime.max.replace(tzinfo=timezone.utc)
+        far_past = datetime.min.replace(tzinfo=timezone.utc)
+        partitions.sort(key=lambda p: (p['is_default'], p['lower'] or far_past, p['upper'] or far_future))
+        return partitions
+
+    @staticmethod
+    def _parse_bound(bound):
+        """FOR VALUES FROM ('...') TO ('...') -> (lower, upper); MINVALUE/MAXVALUE -> None"""
+        values = re.findall(r"\(\s*(MINVALUE|MAXVALUE|'[^']*')\s*\)", bound)
+        parsed = []
+        for value in values[:2]:
+            if value in ('MINVALUE', 'MAXVALUE'):
+                parsed.append(None)
+            else:
+                parsed.append(datetime.fromisoformat(value.strip("'")).astimezone(timezone.utc))
+        while len(parsed) < 2:
+            parsed.append(None)
+        return parsed[0], parsed[1]
+
+    # -----------------------------------------------------------------
+    # Conversion
+    # -----------------------------------------------------------------
+
+    def convert_statements(self, boundary):
+        """
+        DDL that turns the existing table into a partitioned one
+
+        The old table is renamed and attached as one legacy partition for
+        everything before `boundary`, so no row is rewritten. Its indexes
+        and foreign keys are matched to the new parent's definitions.
+        """
+        table = self.table_name
+        legacy = self.legacy_name
+        statements = [
+            f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE",
+            f"ALTER TABLE {table} RENAME TO {legacy}",
+            f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey",
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) "
+            f"PARTITION BY RANGE ({self.PARTITION_KEY})",
+            f"ALTER TABLE {table} ALTER COLUMN {self.PARTITION_KEY} SET NOT NULL",
+            f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {self.PARTITION_KEY})",
+            f"UPDATE {legacy} SET {self.PARTITION_KEY} = now() WHERE {self.PARTITION_KEY} IS NULL",
+            f"ALTER TABLE {legacy} ALTER COLUMN {self.PARTITION_KEY} SET NOT NULL",
+            # The partition constraint is proven by this check instead of a second scan
+            f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_range "
+            f"CHECK ({self.PARTITION_KEY} < '{boundary.isoformat()}')",
+            f"ALTER TABLE {legacy} DROP CONSTRAINT {legacy}_pkey",
+            f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_pkey PRIMARY KEY (id, {self.PARTITION_KEY})",
+            f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')",
+            f"ALTER TABLE {legacy} DROP CONSTRAINT {legacy}_range",
+            f"CREATE TABLE {self.default_name} PARTITION OF {table} DEFAULT",
+        ]
+        return statements
+
+    def convert(self, dry_run=False):
+        """
+        Convert the table to a partitioned table and create upcoming partitions
+
+        Runs in one transaction holding an exclusive lock on the table, so
+        log writers wait for it. Building the legacy partition's new
+        primary key is the only step that reads the whole table.
+
+        Returns:
+            list: SQL statements (executed unless dry_run)
+        """
+        engine = db_registry.main_engine
+        with engine.connect() as conn:
+            if self.is_partitioned(conn):
+                raise ValueError(f"{self.table_name} is already partitioned")
+
+            # Everything up to the end of the current period goes to the legacy partition
+            boundary = self.period_start(datetime.now(timezone.utc)) + self.period_length()
+            statements = self.convert_statements(boundary)
+
+            # Existing indexes move aside with the legacy table; indexes created
+            # on the parent adopt them where the definitions match
+            legacy_indexes = conn.execute(text("""
+                SELECT indexname FROM pg_indexes
+                WHERE tablename = :table AND indexname <> :pkey
+            """), {'table': self.table_name, 'pkey': f"{self.table_name}_pkey"}).scalars().all()
+            rename_at = 2
+            for index_name in legacy_indexes:
+                statements.insert(rename_at, f"ALTER INDEX {index_name} RENAME TO {self._legacy_index_name(index_name)}")
+
+            dialect = engine.dialect
+            for index in self.table.indexes:
+                statements.append(str(CreateIndex(index).compile(dialect=dialect)))
+            # Matching foreign keys already on the legacy partition are adopted, not rebuilt
+            for constraint in self.table.foreign_key_constraints:
+                statements.append(str(AddConstraint(constraint).compile(dialect=dialect)))
+
+            if dry_run:
+                conn.rollback()
+                return statements + [f"-- then create partitions up to {self.ahead} {self.interval}(s) ahead"]
+
+            for statement in statements:
+                conn.execute(text(statement))
+
+            statements += self.ensure(conn)
+            conn.commit()
+        return statements
+
+    def _legacy_index_name(self, index_name):
+        # Identifiers are limited to 63 bytes
+        return f"{index_name[:55]}_legacy"
+
+    # -----------------------------------------------------------------
+    # Maintenance
+    # -----------------------------------------------------------------
+
+    def ensure(self, conn=None):
+        """
+        Create partitions from the current period up to `ahead` periods out
+
+        Periods already covered by a partition (the legacy one included)
+        are skipped.
+
+        Returns:
+            list: SQL statements executed
+        """
+        if conn is None:
+            with db_registry.main_engine.begin() as conn:
+                return self.ensure(conn)
+
+        if not self.is_partitioned(conn):
+            return []
+
+        ranges = [(p['lower'], p['upper']) for p in self.partitions(conn) if not p['is_default']]
+        period = self.period_length()
+        current = self.period_start(datetime.now(timezone.utc))
+
+        statements = []
+        for offset in range(self.ahead + 1):
+            lower = current + period * offset
+            upper = lower + period
+            if any(self._overlaps(lower, upper, other) for other in ranges):
+                continue
+            statements += self._create_partition(conn, self.partition_name(lower), lower, upper)
+            ranges.append((lower, upper))
+        return statements
+
+    @staticmethod
+    def _overlaps(lower, upper, other):
+        other_lower, other_upper = other
+        return (other_lower is None or other_lower < upper) and (other_upper is None or lower < other_upper)
+
+    def _create_partition(self, conn, name, lower, upper):
+        """Create one partition, moving matching rows out of the default partition first"""
+        table = self.table_name
+        bounds = f"FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        in_range = f"{self.PARTITION_KEY} >= '{lower.isoformat()}' AND {self.PARTITION_KEY} < '{upper.isoformat()}'"
+
+        has_default = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {'name': self.default_name}).scalar()
+        stray = has_default and conn.execute(
+            text(f"SELECT 1 FROM {self.default_name} WHERE {in_range} LIMIT 1")
+        ).scalar()
+
+        if not stray:
+            statements = [f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES {bounds}"]
+        else:
+            # A new range may not overlap rows already sitting in the default partition
+            statements = [
+                f"ALTER TABLE {table} DETACH PARTITION {self.default_name}",
+                f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}",
+                f"INSERT INTO {name} SELECT * FROM {self.default_name} WHERE {in_range}",
+                f"DELETE FROM {self.default_name} WHERE {in_range}",
+                f"ALTER TABLE {table} ATTACH PARTITION {self.default_name} DEFAULT",
+            ]
+
+        for statement in statements:
+            conn.execute(text(statement))
+        return statements
+
+    def expired(self, cutoff, conn=None):
+        """Partitions whose whole range lies before cutoff (never the default partition)"""
+        return [
+            p for p in self.partitions(conn)
+            if not p['is_default'] and p['upper'] is not None and p['upper'] <= cutoff
+        ]
+
+    def drop_before(self, cutoff, detach=False, dry_run=False):
+        """
+        Retention: drop (or detach, keeping the table) every partition that ends before cutoff
+
+        Rows newer than the cutoff in the same period stay until the whole
+        period has expired.
+
+        Returns:
+            list: names of the partitions dropped / detached (or that would be)
+        """
+        engine = db_registry.main_engine
+        with engine.begin() as conn:
+            expired = self.expired(cutoff, conn)
+            if dry_run:
+                return [p['name'] for p in expired]
+
+            for partition in expired:
+                conn.execute(text(f"ALTER TABLE {self.table_name} DETACH PARTITION {partition['name']}"))
+                if not detach:
+                    conn.execute(text(f"DROP TABLE {partition['name']}"))
+        return [p['name'] for p in expired]
+
+    def maintain(self, retention_days=None):
+        """
+        Create upcoming partitions and, with retention_days, drop expired ones
+
+        Safe to call repeatedly and on unpartitioned tables (no-op).
+
+        Returns:
+            dict: created statements and dropped partition names
+        """
+        result = {'created': [], 'dropped': []}
+        if not self.is_partitioned():
+            return result
+        result['created'] = self.ensure()
+        if retention_days:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+            result['dropped'] = self.drop_before(cutoff)
+        return result
+
+    def maintain_quietly(self):
+        """maintain() for writer start-up: never raises"""
+        try:
+            return self.maintain()
+        except Exception as e:
+            logger.warning(f"Partition maintenance for {self.table_name} failed: {e}")
+            return None
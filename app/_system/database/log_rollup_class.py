@@ -0,0 +1,239 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text, select, func
+
+from app.config import config
+from app.register.database import db_registry
+
+logger = logging.getLogger(__name__)
+
+
+class LogRollup:
+    """
+    Incremental hourly rollups of the append-only log tables
+
+    Each registered rollup model aggregates raw rows in [start, end) into
+    one row per hour bucket and group. A background thread in every worker
+    folds in each hour once it has closed (plus a grace period for batched
+    writers), advancing the rollup's high-water mark in the same
+    transaction; an advisory lock makes sure only one worker does the work.
+
+    Dashboards read the rollup up to the mark and only the raw rows after
+    it - normally the current, partial hour.
+
+    A rollup model provides:
+        get_source_table()                the raw log table
+        rollup(connection, start, end)    replace the buckets in [start, end), return rows written
+
+    Usage:
+        LogRollup.register('firewall_logs', FirewallLogRollup)
+        LogRollup.start()
+        rollup_start, mark, raw_start = LogRollup.split('firewall_logs', start_date)
+    """
+    __depends_on__ = ['LogRollupState']
+
+    BUCKET = timedelta(hours=1)
+
+    enabled = config.get('log_rollup_enabled', True)
+    interval = config.get('log_rollup_interval_seconds', 300)
+    grace = timedelta(seconds=config.get('log_rollup_grace_seconds', 120))
+    max_hours = config.get('log_rollup_max_hours', 24)
+
+    _rollups = {}  # name -> rollup model
+    _thread = None
+    _pid = None
+    _lock = threading.Lock()
+    _stopping = threading.Event()
+
+    @classmethod
+    def register(cls, name, model):
+        cls._rollups[name] = model
+
+    @classmethod
+    def names(cls):
+        return list(cls._rollups)
+
+    @staticmethod
+    def hour_start(moment):
+        return moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+    # -----------------------------------------------------------------
+    # Reading
+    # -----------------------------------------------------------------
+
+    @classmethod
+    def get_mark(cls, name):
+        from app.models import LogRollupState
+
+        with db_registry.main_engine.connect() as connection:
+            return LogRollupState.get_mark(connection, name)
+
+    @classmethod
+    def split(cls, name, start):
+        """
+        Where a stats window switches from rollup to raw rows
+
+        Windows are widened to the start of their first hour on the rollup
+        side.
+
+        Returns:
+            tuple: (rollup_start, mark, raw_start) - read buckets in
+            [rollup_start, mark) and raw rows from raw_start on; mark is
+            None when the rollup has nothing for this window
+        """
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        rollup_start = cls.hour_start(start)
+
+        try:
+            mark = cls.get_mark(name)
+        except Exception as e:
+            # Table not created yet: read everything raw
+            logger.warning(f"Log rollup {name} unavailable: {e}")
+            mark = None
+
+        if mark is None or mark <= rollup_start:
+            return rollup_start, None, start
+        return rollup_start, mark, max(start, mark)
+
+    # -----------------------------------------------------------------
+    # Processing
+    # -----------------------------------------------------------------
+
+    @classmethod
+    def run_once(cls, name=None):
+        """
+        Catch the rollups up to the last closed hour
+
+        Returns:
+            dict: name -> hours folded in this run (None if another worker holds the lock)
+        """
+        names = [name] if name else cls.names()
+        result = {}
+        for rollup_name in names:
+            if rollup_name not in cls._rollups:
+                raise ValueError(f"Unknown log rollup: {rollup_name}")
+            result[rollup_name] = cls._catch_up(rollup_name)
+        return result
+
+    @classmethod
+    def _catch_up(cls, name):
+        hours = 0
+        while True:
+            processed = cls._process_chunk(name)
+            if processed is None:
+                return None if hours == 0 else hours
+            if processed == 0:
+                return hours
+            hours += processed
+
+    @classmethod
+    def _process_chunk(cls, name):
+        """Fold up to max_hours closed hours after the mark; one transaction"""
+        from app.models import LogRollupState
+
+        model = cls._rollups[name]
+        source = model.get_source_table()
+        target = cls.hour_start(datetime.now(timezone.utc) - cls.grace)
+
+        with db_registry.main_engine.begin() as connection:
+            locked = connection.execute(
+                text("SELECT pg_try_advisory_xact_lock(hashtext(:key))"),
+                {'key': f"log_rollup:{name}"}
+            ).scalar()
+            if not locked:
+                return None
+
+            # date_trunc() works in the session time zone
+            connection.execute(text("SET LOCAL TIME ZONE 'UTC'"))
+
+            mark = LogRollupState.get_mark(connection, name)
+            if mark is None:
+                oldest = connection.execute(select(func.min(source.c.created_at))).scalar()
+                mark = cls.hour_start(oldest) if oldest else target
+
+            end = min(target, mark + cls.BUCKET * max(1, int(cls.max_hours)))
+            if end <= mark:
+                LogRollupState.set_mark(connection, name, mark)
+                return 0
+
+            started = time.monotonic()
+            rows_written = model.rollup(connection, mark, end)
+            duration_ms = int((time.monotonic() - started) * 1000)
+            LogRollupState.set_mark(connection, name, end, duration_ms, rows_written or 0)
+
+        logger.info(f"Log rollup {name}: {mark:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M} in {duration_ms}ms")
+        return int((end - mark) / cls.BUCKET)
+
+    @classmethod
+    def reset(cls, name):
+        """Forget a rollup's mark and rows, so the next run rebuilds it from the raw table"""
+        from app.models import LogRollupState
+
+        model = cls._rollups[name]
+        with db_registry.main_engine.begin() as connection:
+            connection.execute(model.__table__.delete())
+            state = LogRollupState.__table__
+            connection.execute(state.delete().where(state.c.name == name))
+
+    @classmethod
+    def status(cls):
+        """Mark, lag and last run for every registered rollup"""
+        from app.models import LogRollupState
+
+        with db_registry.main_engine.connect() as connection:
+            states = LogRollupState.get_states(connection)
+
+        now = datetime.now(timezone.utc)
+        result = {}
+        for name in cls.names():
+            state = states.get(name)
+            mark = state.high_water_mark if state else None
+            result[name] = {
+                'high_water_mark': mark,
+                'lag_minutes': int((now - mark).total_seconds() // 60) if mark else None,
+                'last_run_at': state.last_run_at if state else None,
+                'last_duration_ms': state.last_duration_ms if state else None,
+                'rows_written': state.rows_written if state else 0,
+            }
+        return result
+
+    # -----------------------------------------------------------------
+    # Background thread
+    # -----------------------------------------------------------------
+
+    @classmethod
+    def start(cls):
+        """Start this worker's rollup thread (again after a fork); no-op when disabled"""
+        if not cls.enabled:
+            return
+
+        pid = os.getpid()
+        if cls._thread is not None and cls._pid == pid and cls._thread.is_alive():
+            return
+
+        with cls._lock:
+            if cls._thread is not None and cls._pid == pid and cls._thread.is_alive():
+                return
+            cls._pid = pid
+            cls._stopping.clear()
+            cls._thread = threading.Thread(target=cls._run, name="log-rollup", daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def stop(cls):
+        cls._stopping.set()
+
+    @classmethod
+    def _run(cls):
+        while not cls._stopping.is_set():
+            for name in cls.names():
+                try:
+                    cls._catch_up(name)
+                except Exception as e:
+                    logger.error(f"Log rollup {name} failed: {e}")
+            cls._stopping.wait(max(1, int(cls.interval)))
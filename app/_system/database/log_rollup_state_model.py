@@ -0,0 +1,57 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.base.model import BaseModel
+
+
+class LogRollupState(BaseModel):
+    """
+    High-water marks for the log rollup tables
+    Every raw row with created_at before high_water_mark has been folded
+    into the rollup; stats read the rollup up to the mark and raw rows after it
+    """
+    __tablename__ = 'log_rollup_states'
+    __depends_on__ = []
+
+    name = Column(String(100), unique=True, nullable=False)  # "rbac_audit", "firewall_logs", ...
+    high_water_mark = Column(DateTime(timezone=True), nullable=True)
+    last_run_at = Column(DateTime(timezone=True), nullable=True)
+    last_duration_ms = Column(Integer, nullable=True)
+    rows_written = Column(BigInteger, nullable=False, default=0)
+
+    @classmethod
+    def get_mark(cls, connection, name):
+        """High-water mark for a rollup, or None if it has never run"""
+        table = cls.__table__
+        return connection.execute(
+            select(table.c.high_water_mark).where(table.c.name == name)
+        ).scalar()
+
+    @classmethod
+    def set_mark(cls, connection, name, mark, duration_ms=None, rows_written=0):
+        """Move the high-water mark, in the caller's transaction"""
+        table = cls.__table__
+        stmt = insert(table).values(
+            name=name,
+            high_water_mark=mark,
+            last_run_at=func.now(),
+            last_duration_ms=duration_ms,
+            rows_written=rows_written
+        ).on_conflict_do_update(
+            index_elements=['name'],
+            set_={
+                'high_water_mark': mark,
+                'last_run_at': func.now(),
+                'last_duration_ms': duration_ms,
+                'rows_written': table.c.rows_written + rows_written,
+                'updated_at': func.now()
+            }
+        )
+        connection.execute(stmt)
+
+    @classmethod
+    def get_states(cls, connection):
+        """All rollup states as {name: row}"""
+        table = cls.__table__
+        rows = connection.execute(select(table)).all()
+        return {row.name: row for row in rows}
@@ -6,6 +6,7 @@ Manage IP whitelist/blacklist patterns from command line
 
 import argparse
 import sys
+from datetime import datetime, timedelta, timezone
 
 # Add your app path to import the model and config
 sys.path.append('/web/ahoy2.radiatorusa.com')
@@ -250,6 +251,7 @@ class FirewallCLI(BaseCLI):
                 pattern.is_active = False
 
             self.session.commit()
+            self.firewall_model.invalidate_rules()
             self.log_critical(f"EMERGENCY UNBAN COMPLETED: removed {len(patterns)} rule(s) for {ip_pattern}")
             self.output_success(f"Removed {len(patterns)} blocking rule(s) for {ip_pattern}")
             return 0
@@ -259,6 +261,116 @@ class FirewallCLI(BaseCLI):
             self.output_error(f"Error during emergency unban: {e}")
             return 1
 
+    def manage_partitions(self, action, days=30, detach=False, dry_run=False):
+        """
+        Partitioned storage for firewall_logs
+
+        Actions:
+            setup: convert the table (the existing rows become one legacy partition)
+            status: list partitions
+            maintain: create upcoming partitions and drop those older than days
+            drop: drop (or detach) partitions older than days
+        """
+        log_model = self.get_model('FirewallLog')
+        if not log_model:
+            self.output_error("FirewallLog model not found in registry")
+            return 1
+
+        partitions = log_model.partitions()
+        self.log_info(f"Partition {action} for firewall_logs")
+
+        try:
+            if action == 'setup':
+                statements = partitions.convert(dry_run=dry_run)
+                for statement in statements:
+                    self.output_info(statement)
+                if dry_run:
+                    self.output_warning("DRY RUN: nothing was changed")
+                else:
+                    self.output_success(f"firewall_logs partitioned by {partitions.interval}")
+                return 0
+
+            if not partitions.is_partitioned():
+                self.output_warning("firewall_logs is not partitioned - run 'partitions setup' first")
+                return 1
+
+            if action == 'status':
+                rows = [[
+                    p['name'],
+                    'DEFAULT' if p['is_default'] else (p['lower'].strftime('%Y-%m-%d') if p['lower'] else 'MIN'),
+                    '' if p['is_default'] else (p['upper'].strftime('%Y-%m-%d') if p['upper'] else 'MAX'),
+                    f"{p['rows']:,}"
+                ] for p in partitions.partitions()]
+                self.output_table(rows, headers=['Partition', 'From', 'To', 'Rows (est.)'])
+                return 0
+
+            cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+
+            if action == 'maintain' and not dry_run:
+                for statement in partitions.ensure():
+                    self.output_info(statement)
+
+            names = partitions.drop_before(cutoff, detach=detach, dry_run=dry_run)
+            if not names:
+                self.output_info(f"No partitions end before {cutoff:%Y-%m-%d}")
+            elif dry_run:
+                self.output_warning(f"DRY RUN: would {'detach' if detach else 'drop'} {', '.join(names)}")
+            else:
+                self.output_success(f"{'Detached' if detach else 'Dropped'} {len(names)} partition(s): {', '.join(names)}")
+            return 0
+
+        except Exception as e:
+            self.log_error(f"Error during partition {action}: {e}")
+            self.output_error(f"Error during partition {action}: {e}")
+            return 1
+
+    def manage_rollup(self, action):
+        """
+        Hourly rollup behind the firewall stats
+
+        Actions:
+            run: fold every closed hour since the high-water mark now
+            status: show the high-water mark and lag
+            reset: drop the rollup so the next run rebuilds it from the raw table
+        """
+        from app.classes import LogRollup
+        name = 'firewall_logs'
+
+        try:
+            if action == 'run':
+                # The rollup scans firewall_logs by created_at
+                for index_name in self.get_model('FirewallLog').create_indexes():
+                    self.log_info(f"Checked index {index_name}")
+
+                hours = LogRollup.run_once(name)[name]
+                if hours is None:
+                    self.output_warning("Another process is running the rollup")
+                else:
+                    self.output_success(f"Rolled up {hours} hour(s)")
+                return 0
+
+            if action == 'reset':
+                LogRollup.reset(name)
+                self.output_success(f"Rollup {name} reset - the next run rebuilds it")
+                return 0
+
+            state = LogRollup.status()[name]
+            mark = state['high_water_mark']
+            rows = [
+                ['High-water mark', mark.strftime('%Y-%m-%d %H:%M') if mark else 'never run'],
+                ['Lag (minutes)', state['lag_minutes'] if state['lag_minutes'] is not None else '-'],
+                ['Last run', state['last_run_at'].strftime('%Y-%m-%d %H:%M:%S') if state['last_run_at'] else '-'],
+                ['Last run (ms)', state['last_duration_ms'] if state['last_duration_ms'] is not None else '-'],
+                ['Rows written', f"{state['rows_written']:,}"],
+            ]
+            self.output_table(rows, headers=['Rollup', name])
+            return 0
+
+        except Exception as e:
+            self.log_error(f"Error during rollup {action}: {e}")
+            self.output_error(f"Error during rollup {action}: {e}")
+            return 1
+
     def close(self):
         """Clean up database session"""
         self.log_debug("Closing firewall CLI")
@@ -311,6 +423,19 @@ def main():
     unban_parser = subparsers.add_parser('unban', help='Emergency unban IP (remove block rules)')
     unban_parser.add_argument('ip', help='IP address to unban')
 
+    # Partitioned request log storage
+    partitions_parser = subparsers.add_parser('partitions', help='Manage time partitions of the request log table')
+    partitions_parser.add_argument('action', choices=['setup', 'status', 'maintain', 'drop'],
+                                   help='setup converts the table; maintain creates upcoming and drops expired partitions')
+    partitions_parser.add_argument('--days', type=int, default=30, help='Retention in days for maintain/drop (default: 30)')
+    partitions_parser.add_argument('--detach', action='store_true', help='Detach expired partitions instead of dropping them')
+    partitions_parser.add_argument('--dry-run', action='store_true', help='Show what would be done')
+
+    # Stats rollup
+    rollup_parser = subparsers.add_parser('rollup', help='Maintain the hourly rollup behind the firewall stats')
+    rollup_parser.add_argument('action', choices=['run', 'status', 'reset'],
+                               help='run folds closed hours now; reset rebuilds from the raw table on the next run')
+
     args = parser.parse_args()
 
     if not args.command:
@@ -355,6 +480,12 @@ def main():
         elif args.command == 'unban':
             return cli.emergency_unban(args.ip)
 
+        elif args.command == 'partitions':
+            return cli.manage_partitions(args.action, args.days, args.detach, args.dry_run)
+
+        elif args.command == 'rollup':
+            return cli.manage_rollup(args.action)
+
     except KeyboardInterrupt:
         if cli:
             cli.log_info("Operation cancelled by user")
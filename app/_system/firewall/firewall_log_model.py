@@ -1,15 +1,17 @@
 import datetime
-from sqlalchemy import Column, String, Boolean, DateTime, Text, func, desc
+import threading
+from sqlalchemy import Column, String, Boolean, DateTime, Text, Index, func, desc
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 
 from app.base.model import Base
+from app.config import config
 from app.register.database import db_registry
 
 class FirewallLog(Base):
     """Model for logging IP access requests"""
     __tablename__ = 'firewall_logs'
-    __depends_on__=[]
+    __depends_on__=['BatchWriter', 'LogPartitions', 'LogRollup']
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     ip_address = Column(String(45), nullable=False)
@@ -22,30 +24,87 @@ class FirewallLog(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     request_data = Column(Text, nullable=True)  # Optional: Store additional request data as JSON
 
+    # Time-range scans: rollups, retention and the request log view
+    __table_args__ = (
+        Index('idx_firewall_logs_created', 'created_at'),
+    )
+
+    # Per-worker background writer, created on first use
+    _writer = None
+    _writer_lock = threading.Lock()
+
+    @classmethod
+    def get_writer(cls):
+        """Get the batch writer that drains request logs into firewall_logs"""
+        if cls._writer is None:
+            with cls._writer_lock:
+                if cls._writer is None:
+                    from app.classes import BatchWriter, LogRollup
+
+                    # Make sure the coming partitions exist before rows arrive
+                    cls.partitions().maintain_quietly()
+                    LogRollup.start()
+                    cls._writer = BatchWriter(
+                        'firewall_logs',
+                        table=cls.__table__,
+                        batch_size=config.get('firewall_log_batch_size', 500),
+                        flush_interval_ms=config.get('firewall_log_flush_ms', 1000),
+                        max_queue_size=config.get('firewall_log_queue_size', 10000),
+                        overflow=config.get('firewall_log_overflow', 'drop')
+                    )
+        return cls._writer
+
+    @classmethod
+    def create_indexes(cls):
+        """
+        Create model indexes missing from an existing firewall_logs table
+
+        Returns:
+            list: names of the indexes checked
+        """
+        engine = db_registry.main_engine
+        for index in cls.__table__.indexes:
+            index.create(engine, checkfirst=True)
+        return [index.name for index in cls.__table__.indexes]
+
+    @classmethod
+    def partitions(cls):
+        """Partition manager for firewall_logs (see LogPartitions)"""
+        from app.classes import LogPartitions
+        return LogPartitions(
+            cls,
+            interval=config.get('firewall_log_partition_interval', 'day'),
+            ahead=config.get('log_partition_premake', 7)
+        )
+
     @classmethod
     def log_request(cls,  ip_address, status, request_path=None, 
                    user_agent=None, request_method=None, referer=None, 
                    matched_rule=None, request_data=None):
-        """Log an IP request with status and metadata"""
-        db_session=db_registry._routing_session()
-        log_entry = cls(
-            ip_address=ip_address,
-            status=status,
-            request_path=request_path,
-            user_agent=user_agent,
-            request_method=request_method,
-            referer=referer,
-            matched_rule=matched_rule,
-            request_data=request_data
-        )
-        
-        try:
-            db_session.add(log_entry)
-            db_session.commit()
-            return True, f'Logged {"allowed" if status else "blocked"} request from {ip_address}'
-        except Exception as e:
-            db_session.rollback()
-            return False, f'Error logging request: {str(e)}'
+        """Queue an IP request log; rows are bulk-inserted by a background thread"""
+        # Truncate to column sizes here - a bad row would fail the whole batch
+        row = {
+            'id': uuid.uuid4(),
+            'ip_address': ip_address[:45] if ip_address else ip_address,
+            'status': status,
+            'request_path': request_path[:255] if request_path else request_path,
+            'user_agent': user_agent[:255] if user_agent else user_agent,
+            'request_method': request_method[:10] if request_method else request_method,
+            'referer': referer[:255] if referer else referer,
+            'matched_rule': matched_rule[:50] if matched_rule else matched_rule,
+            'created_at': datetime.datetime.now(datetime.timezone.utc),
+            'request_data': request_data
+        }
+
+        if cls.get_writer().put(row):
+            return True, f'Queued {"allowed" if status else "blocked"} request from {ip_address}'
+        return False, f'Log queue full, dropped request from {ip_address}'
+
+    @classmethod
+    def flush_logs(cls):
+        """Write all queued request logs now"""
+        if cls._writer is not None:
+            cls._writer.flush()
 
     @classmethod
     def get_request_logs(cls,  ip_address=None, status=None, days=7, 
@@ -80,67 +139,53 @@ class FirewallLog(Base):
     @classmethod
     def get_top_blocked_ips(cls, days=7, limit=20):
         """Get top blocked IPs in the past days"""
-        db_session=db_registry._routing_session()
-
-        end_date = datetime.datetime.utcnow()
-        start_date = end_date - datetime.timedelta(days=days)
-        
-        # Query for blocked IPs with counts
-        results = db_session.query(
-            cls.ip_address,
-            func.count(cls.id).label('count')
-        ).filter(
-            cls.created_at.between(start_date, end_date),
-            cls.status == False
-        ).group_by(
-            cls.ip_address
-        ).order_by(
-            desc('count')
-        ).limit(limit).all()
-        
-        return results
+        return cls._top_values('ip', False, days, limit, 'ip_address')
 
     @classmethod
     def get_top_allowed_ips(cls, days=7, limit=20):
         """Get top allowed IPs in the past days"""
+        return cls._top_values('ip', True, days, limit, 'ip_address')
+
+    @classmethod
+    def _top_values(cls, kind, status, days, limit, label):
+        """Most frequent IPs/paths with one status, from the hourly rollup plus recent raw rows"""
+        from app.models import FirewallLogRollup
+
         db_session=db_registry._routing_session()
+        start_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+        stats = FirewallLogRollup.stats_source(kind, start_date)
 
-        end_date = datetime.datetime.utcnow()
-        start_date = end_date - datetime.timedelta(days=days)
-        
-        # Query for allowed IPs with counts
-        results = db_session.query(
-            cls.ip_address,
-            func.count(cls.id).label('count')
+        return db_session.query(
+            stats.c.value.label(label),
+            func.sum(stats.c.request_count).label('count')
         ).filter(
-            cls.created_at.between(start_date, end_date),
-            cls.status == True
+            stats.c.status == status
         ).group_by(
-            cls.ip_address
+            stats.c.value
         ).order_by(
             desc('count')
         ).limit(limit).all()
-        
-        return results
 
     @classmethod
     def get_daily_stats(cls, days=7):
         """Get daily statistics for allowed/blocked requests"""
+        from app.models import FirewallLogRollup
+
         db_session=db_registry._routing_session()
-        end_date = datetime.datetime.utcnow()
-        start_date = end_date - datetime.timedelta(days=days)
-        
-        # Query for daily counts by status
+        start_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+
+        # Every request has an IP, so the per-IP counts add up to the totals
+        stats = FirewallLogRollup.stats_source('ip', start_date)
+        day = func.date_trunc('day', stats.c.seen_at)
+
         results = db_session.query(
-            func.date_trunc('day', cls.created_at).label('day'),
-            cls.status,
-            func.count(cls.id).label('count')
-        ).filter(
-            cls.created_at.between(start_date, end_date)
+            day.label('day'),
+            stats.c.status,
+            func.sum(stats.c.request_count).label('count')
         ).group_by(
-            'day', cls.status
+            day, stats.c.status
         ).order_by(
-            'day'
+            day
         ).all()
         
         return results
@@ -148,20 +193,18 @@ class FirewallLog(Base):
     @classmethod
     def get_path_stats(cls,  days=7, limit=10):
         """Get statistics for most accessed paths"""
+        from app.models import FirewallLogRollup
+
         db_session=db_registry._routing_session()
-        end_date = datetime.datetime.utcnow()
-        start_date = end_date - datetime.timedelta(days=days)
-        
-        # Query for path counts
+        start_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+        stats = FirewallLogRollup.stats_source('path', start_date)
+
         results = db_session.query(
-            cls.request_path,
-            cls.status,
-            func.count(cls.id).label('count')
-        ).filter(
-            cls.created_at.between(start_date, end_date),
-            cls.request_path.isnot(None)
+            stats.c.value.label('request_path'),
+            stats.c.status,
+            func.sum(stats.c.request_count).label('count')
         ).group_by(
-            cls.request_path, cls.status
+            stats.c.value, stats.c.status
         ).order_by(
             desc('count')
         ).limit(limit).all()
@@ -170,11 +213,21 @@ class FirewallLog(Base):
         
     @classmethod
     def clean_old_logs(cls, days_to_keep=30):
-        """Delete logs older than the specified number of days"""
+        """
+        Delete logs older than the specified number of days
+
+        On a partitioned table whole partitions ending before the cutoff are
+        dropped instead of deleting rows
+        """
         db_session=db_registry._routing_session()
         cutoff_date = datetime.datetime.utcnow() - datetime.timedelta(days=days_to_keep)
         
         try:
+            partitions = cls.partitions()
+            if partitions.is_partitioned():
+                dropped = partitions.drop_before(cutoff_date.replace(tzinfo=datetime.timezone.utc))
+                return True, f'Dropped {len(dropped)} old log partitions'
+
             deleted_count = db_session.query(cls).filter(
                 cls.created_at < cutoff_date
             ).delete()
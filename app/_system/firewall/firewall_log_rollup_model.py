@@ -0,0 +1,115 @@
+from sqlalchemy import (
+    Column, String, Boolean, DateTime, BigInteger, Index,
+    select, insert, delete, union_all, func, literal
+)
+
+from app.base.model import Base
+
+
+class FirewallLogRollup(Base):
+    """
+    Hourly request counts from firewall_logs for the firewall dashboards
+
+    Two kinds of rows per hour and status: per IP address ('ip') and per
+    request path ('path'). Every request has an IP, so the 'ip' rows also
+    give the hourly totals. Maintained by LogRollup.
+    """
+    __tablename__ = 'firewall_log_rollups'
+    __depends_on__ = ['FirewallLog', 'LogRollup']
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    bucket = Column(DateTime(timezone=True), nullable=False)  # start of the hour (UTC)
+    kind = Column(String(10), nullable=False)  # "ip" or "path"
+    value = Column(String(255), nullable=False)  # the IP address or request path
+    status = Column(Boolean, nullable=False)  # True = allowed, False = blocked
+    request_count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('idx_firewall_log_rollups_bucket', 'bucket', 'kind'),
+    )
+
+    ROLLUP_NAME = 'firewall_logs'
+
+    # kind -> raw column
+    KINDS = {
+        'ip': 'ip_address',
+        'path': 'request_path',
+    }
+
+    @classmethod
+    def register_rollup(cls):
+        """Have LogRollup maintain this table"""
+        from app.classes import LogRollup
+        LogRollup.register(cls.ROLLUP_NAME, cls)
+
+    @classmethod
+    def get_source_table(cls):
+        from app.models import FirewallLog
+        return FirewallLog.__table__
+
+    @classmethod
+    def rollup(cls, connection, start, end):
+        """Replace the buckets in [start, end) from the raw table"""
+        log = cls.get_source_table()
+        table = cls.__table__
+        bucket = func.date_trunc('hour', log.c.created_at)
+
+        connection.execute(delete(table).where(table.c.bucket >= start, table.c.bucket < end))
+
+        written = 0
+        for kind, column_name in cls.KINDS.items():
+            column = log.c[column_name]
+            aggregated = select(
+                bucket, literal(kind), column, log.c.status, func.count()
+            ).where(
+                log.c.created_at >= start,
+                log.c.created_at < end,
+                column.isnot(None)
+            ).group_by(bucket, column, log.c.status)
+
+            result = connection.execute(
+                insert(table).from_select(['bucket', 'kind', 'value', 'status', 'request_count'], aggregated)
+            )
+            written += result.rowcount
+        return written
+
+    @classmethod
+    def stats_source(cls, kind, start):
+        """
+        Rollup buckets of one kind up to the high-water mark plus raw rows
+        after it, as one subquery: value, status, seen_at, request_count
+        """
+        from app.classes import LogRollup
+
+        log = cls.get_source_table()
+        table = cls.__table__
+        column = log.c[cls.KINDS[kind]]
+        rollup_start, mark, raw_start = LogRollup.split(cls.ROLLUP_NAME, start)
+
+        raw_rows = select(
+            column.label('value'),
+            log.c.status.label('status'),
+            log.c.created_at.label('seen_at'),
+            literal(1).label('request_count')
+        ).where(
+            log.c.created_at >= raw_start,
+            column.isnot(None)
+        )
+
+        if mark is None:
+            return raw_rows.subquery('firewall_stats')
+
+        rollup_rows = select(
+            table.c.value,
+            table.c.status,
+            table.c.bucket.label('seen_at'),
+            table.c.request_count
+        ).where(
+            table.c.kind == kind,
+            table.c.bucket >= rollup_start,
+            table.c.bucket < mark
+        )
+        return union_all(rollup_rows, raw_rows).subquery('firewall_stats')
+
+
+FirewallLogRollup.register_rollup()
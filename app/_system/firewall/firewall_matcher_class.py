@@ -0,0 +1,200 @@
+import heapq
+import ipaddress
+import logging
+import threading
+from bisect import bisect_right
+
+from app.register.database import db_registry
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledRuleSet:
+    """
+    Immutable, pre-resolved view of the active firewall rules
+
+    Every rule is turned into an integer range [start, end]. Overlapping
+    ranges are flattened into disjoint intervals, each holding the rule
+    with the lowest order that covers it, so a lookup is a single bisect.
+    """
+    __depends_on__ = []
+
+    def __init__(self, version, rules, pattern_count, allow_exists):
+        self.version = version
+        self.pattern_count = pattern_count
+        self.allow_exists = allow_exists
+        self._tables = {
+            4: self._flatten([r for r in rules if r['ip_version'] == 4]),
+            6: self._flatten([r for r in rules if r['ip_version'] == 6]),
+        }
+
+    @staticmethod
+    def _flatten(rules):
+        """
+        Flatten prioritized, possibly overlapping ranges into disjoint ones
+
+        Returns:
+            tuple: (starts, ends, winners) parallel lists sorted by start
+        """
+        if not rules:
+            return [], [], []
+
+        boundaries = sorted(
+            {r['start'] for r in rules} | {r['end'] + 1 for r in rules}
+        )
+        by_start = sorted(rules, key=lambda r: r['start'])
+
+        starts, ends, winners = [], [], []
+        heap = []  # (rank, end, rule)
+        next_rule = 0
+
+        for i, point in enumerate(boundaries[:-1]):
+            while next_rule < len(by_start) and by_start[next_rule]['start'] == point:
+                rule = by_start[next_rule]
+                heapq.heappush(heap, (rule['rank'], rule['end'], rule))
+                next_rule += 1
+
+            # Drop rules that ended before this interval
+            while heap and heap[0][1] < point:
+                heapq.heappop(heap)
+
+            if not heap:
+                continue
+
+            winner = heap[0][2]
+            interval_end = boundaries[i + 1] - 1
+
+            # Merge with the previous interval when the same rule wins
+            if winners and winners[-1] is winner and ends[-1] + 1 == point:
+                ends[-1] = interval_end
+            else:
+                starts.append(point)
+                ends.append(interval_end)
+                winners.append(winner)
+
+        return starts, ends, winners
+
+    def match(self, ip_address):
+        """Return the highest priority rule covering the address, or None"""
+        try:
+            ip = ipaddress.ip_address(ip_address)
+        except ValueError:
+            # Invalid IP format - cannot match
+            return None
+
+        starts, ends, winners = self._tables[ip.version]
+        value = int(ip)
+        index = bisect_right(starts, value) - 1
+        if index >= 0 and value <= ends[index]:
+            return winners[index]
+        return None
+
+    def check(self, ip_address):
+        """
+        Check if an IP address should be allowed access based on rule order
+
+        Returns:
+            tuple: (allowed, reason)
+        """
+        if not self.pattern_count:
+            return True, "Access allowed by default (no patterns defined)"
+
+        rule = self.match(ip_address)
+        if rule:
+            if rule['ip_type'] == 'allow':
+                return True, f"IP allowed by pattern: {rule['ip_pattern']} (order: {rule['order']})"
+            return False, f"IP blocked by pattern: {rule['ip_pattern']} (order: {rule['order']})"
+
+        # If no patterns matched, use a default deny policy when allow rules exist
+        if self.allow_exists:
+            return False, "IP not in allowed list"
+        return True, "Access allowed by default (no matching rules)"
+
+
+class FirewallMatcher:
+    """
+    Per-worker cache of the compiled firewall rules
+
+    The rule set is rebuilt only when the 'firewall' version stamp changes,
+    which Firewall.add_pattern/update_pattern/delete_pattern bump after
+    committing. Request-time checks cost no database queries.
+    """
+    __depends_on__ = ['Firewall', 'VersionStamp']
+
+    VERSION_KEY = 'firewall'
+
+    _compiled = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def check(cls, ip_address):
+        """Check an IP address against the compiled rules"""
+        return cls.get_rules().check(ip_address)
+
+    @classmethod
+    def get_rules(cls):
+        """Get the compiled rule set, rebuilding it if the version changed"""
+        from app.classes import VersionStamp
+
+        version = VersionStamp.current(cls.VERSION_KEY)
+        compiled = cls._compiled
+        if compiled is not None and compiled.version == version:
+            return compiled
+
+        with cls._lock:
+            compiled = cls._compiled
+            if compiled is None or compiled.version != version:
+                try:
+                    compiled = cls._compile(version)
+                except Exception as e:
+                    # Keep enforcing the last good rules rather than failing requests
+                    if compiled is None:
+                        raise
+                    logger.error(f"Firewall rule compile failed, keeping version {compiled.version}: {e}")
+                    return compiled
+                cls._compiled = compiled
+        return compiled
+
+    @classmethod
+    def invalidate(cls):
+        """Drop the compiled rules in every worker"""
+        from app.classes import VersionStamp
+
+        VersionStamp.bump(cls.VERSION_KEY)
+
+    @classmethod
+    def _compile(cls, version):
+        """Load the active rules and compile them"""
+        from app.models import Firewall
+
+        with db_registry.session_scope() as session:
+            patterns = session.query(
+                Firewall.ip_pattern, Firewall.ip_type, Firewall.order
+            ).filter(
+                Firewall.is_active == True
+            ).order_by(Firewall.order, Firewall.ip_pattern).all()
+
+        rules = []
+        for rank, (ip_pattern, ip_type, order) in enumerate(patterns):
+            try:
+                if '/' in ip_pattern:
+                    network = ipaddress.ip_network(ip_pattern, strict=False)
+                else:
+                    network = ipaddress.ip_network(ip_pattern)
+            except ValueError:
+                logger.warning(f"Skipping invalid firewall pattern: {ip_pattern}")
+                continue
+
+            rules.append({
+                'rank': rank,
+                'ip_pattern': ip_pattern,
+                'ip_type': ip_type,
+                'order': order,
+                'ip_version': network.version,
+                'start': int(network.network_address),
+                'end': int(network.broadcast_address),
+            })
+
+        logger.info(f"Compiled {len(rules)} firewall rules (version {version})")
+        allow_exists = any(ip_type == 'allow' for _, ip_type, _ in patterns)
+        return CompiledRuleSet(version, rules, len(patterns), allow_exists)
@@ -1,4 +1,5 @@
 import ipaddress
+import logging
 from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, func, desc
 from sqlalchemy.dialects.postgresql import UUID, CIDR
 from sqlalchemy.orm import relationship
@@ -6,6 +7,9 @@ from sqlalchemy.orm import relationship
 from app.base.model import BaseModel
 from app.register.database import db_registry
 
+logger = logging.getLogger(__name__)
+
+
 class Firewall(BaseModel):
     """Model for storing IP whitelist/blacklist patterns with order priority"""
     __tablename__ = 'firewall'
@@ -109,14 +113,15 @@ class Firewall(BaseModel):
         # Check if pattern already exists
         existing = cls.find_by_pattern( ip_pattern)
         if existing:
-            if not existing.active:
+            if not existing.is_active:
                 # Reactivate the existing pattern
-                existing.active = True
+                existing.is_active = True
                 existing.ip_type = ip_type
                 existing.order = order
                 if description:
                     existing.description = description
                 db_session.commit()
+                cls.invalidate_rules()
                 return True, f"Reactivated {ip_type} pattern"
             return False, f"IP pattern already exists"
         
@@ -131,6 +136,7 @@ class Firewall(BaseModel):
         try:
             db_session.add(new_pattern)
             db_session.commit()
+            cls.invalidate_rules()
             return True, f"Added {ip_type} pattern"
         except Exception as e:
             db_session.rollback()
@@ -140,7 +146,7 @@ class Firewall(BaseModel):
     def update_pattern(cls, pattern_id, ip_type=None, description=None, active=None, order=None):
         """Update an IP pattern"""
         db_session=db_registry._routing_session()
-        pattern = cls.find_by_id(db_session, pattern_id)
+        pattern = cls.find_by_id(pattern_id)
         if not pattern:
             return False, "Pattern not found"
         
@@ -152,13 +158,14 @@ class Firewall(BaseModel):
             pattern.description = description
             
         if active is not None:
-            pattern.active = active
+            pattern.is_active = active
             
         if order is not None:
             pattern.order = order
         
         try:
             db_session.commit()
+            cls.invalidate_rules()
             return True, "Pattern updated successfully"
         except Exception as e:
             db_session.rollback()
@@ -173,8 +180,9 @@ class Firewall(BaseModel):
             return False, "Pattern not found"
         
         try:
-            pattern.active = False
+            pattern.is_active = False
             db_session.commit()
+            cls.invalidate_rules()
             return True, "Pattern deleted successfully"
         except Exception as e:
             db_session.rollback()
@@ -191,6 +199,7 @@ class Firewall(BaseModel):
         try:
             db_session.delete(pattern)
             db_session.commit()
+            cls.invalidate_rules()
             return True, "Pattern permanently deleted"
         except Exception as e:
             db_session.rollback()
@@ -199,34 +208,26 @@ class Firewall(BaseModel):
     @classmethod
     def check_ip_access(cls, ip_address):
         """Check if an IP address should be allowed access based on rule order
+
+        Served from the per-worker compiled rule set (see FirewallMatcher),
+        so this costs no database queries once the rules are compiled
         
         Returns:
             tuple: (allowed, reason)
                 - allowed (bool): True if access is allowed, False if blocked
                 - reason (str): Description of why access was allowed/blocked
         """
-        db_session=db_registry._routing_session()
-        # Get all active patterns ordered by priority (lower order value = higher priority)
-        patterns = db_session.query(cls).filter(cls.is_active == True).order_by(cls.order).all()
-        
-        # If no patterns defined, allow by default
-        if not patterns:
-            return True, "Access allowed by default (no patterns defined)"
-        
-        # Check patterns in order of priority
-        for pattern in patterns:
-            if cls._ip_matches_pattern(ip_address, pattern.ip_pattern):
-                if pattern.ip_type == 'allow':
-                    return True, f"IP allowed by pattern: {pattern.ip_pattern} (order: {pattern.order})"
-                else:
-                    return False, f"IP blocked by pattern: {pattern.ip_pattern} (order: {pattern.order})"
-        
-        # If no patterns matched, use a default deny policy when allow rules exist
-        allow_exists = db_session.query(cls).filter(cls.is_active == True, cls.ip_type == 'allow').first() is not None
-        if allow_exists:
-            return False, "IP not in allowed list"
-        else:
-            return True, "Access allowed by default (no matching rules)"
+        from app.classes import FirewallMatcher
+        return FirewallMatcher.check(ip_address)
+
+    @classmethod
+    def invalidate_rules(cls):
+        """Signal every worker to recompile its firewall rules"""
+        try:
+            from app.classes import FirewallMatcher
+            FirewallMatcher.invalidate()
+        except Exception as e:
+            logger.error(f"Firewall rule invalidation failed: {e}")
     
     @staticmethod
     def _ip_matches_pattern(ip, pattern):
@@ -1,8 +1,9 @@
+import os
 
 from flask import Blueprint, render_template_string, request, redirect, url_for, flash, g, jsonify
 from datetime import datetime
 
-from app.classes import AuthService
+from app.classes import AuthService, BatchWriter, TemplateCache, PageOutputCache
 
 # Create auth blueprint
 bp = Blueprint('api_health', __name__, url_prefix='/api')
@@ -10,4 +11,25 @@ bp = Blueprint('api_health', __name__, url_prefix='/api')
 
 @bp.route('/health')
 def health():
-    return jsonify({'status': 'ok', 'timestamp': datetime.utcnow().isoformat()}), 200
\ No newline at end of file
+    return jsonify({'status': 'ok', 'timestamp': datetime.utcnow().isoformat()}), 200
+
+
+@bp.route('/health/writers')
+def writer_health():
+    """Queue depth and drop counters for this worker's background writers"""
+    return jsonify({
+        'pid': os.getpid(),
+        'writers': BatchWriter.all_stats(),
+        'timestamp': datetime.utcnow().isoformat()
+    }), 200
+
+
+@bp.route('/health/render-cache')
+def render_cache_health():
+    """Hit counters for this worker's template and page output caches"""
+    return jsonify({
+        'pid': os.getpid(),
+        'templates': TemplateCache.stats(),
+        'pages': PageOutputCache.stats(),
+        'timestamp': datetime.utcnow().isoformat()
+    }), 200
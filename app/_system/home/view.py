@@ -9,7 +9,7 @@ def index():
         renderer = TemplateRenderer()
         
         # Render the page using the template system
-        rendered_content = renderer.render_page('home')
+        rendered_content = renderer.render_response('home')
         
         return rendered_content
         
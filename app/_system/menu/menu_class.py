@@ -1,4 +1,5 @@
 import uuid
+import threading
 from pprint import pprint
 from sqlalchemy import and_
 from typing import List, Dict, Optional, Union
@@ -16,8 +17,26 @@ from app.classes import RbacPermissionChecker
 from app.register.database import db_registry
 
 class MenuBuilder:
-
-    __depends_on__ = [ 'Menu','MenuTier','MenuLink','UserQuickLink','RolePermission','User','Permission','RbacPermissionChecker' ]
+    """
+    Builds menus and menu structures for users
+
+    Menus, tiers and links are loaded once (one query for menus, two per
+    menu tree) and kept per worker; which menus a role may see is resolved
+    from the compiled role permission sets. Everything is dropped when the
+    'menus' stamp (any committed Menu/MenuTier/MenuLink change) or the
+    'rbac' stamp (role permissions) changes, so warm requests run no menu
+    queries. Returned structures are shared - treat them as read-only.
+    """
+
+    __depends_on__ = [ 'Menu','MenuTier','MenuLink','UserQuickLink','RolePermission','User','Permission','RbacPermissionChecker','VersionStamp','PermissionCache' ]
+
+    VERSION_KEY = 'menus'
+
+    _menus = None       # all menus as dicts, ordered as loaded
+    _trees = {}         # menu name -> menu structure
+    _access = {}        # (menu name, role id) -> bool
+    _version = None
+    _lock = threading.Lock()
     
     def __init__(self):
         """
@@ -26,6 +45,75 @@ class MenuBuilder:
         self.rbac_checker = RbacPermissionChecker()
         self.db_session=db_registry._routing_session()
 
+    @classmethod
+    def register_invalidation(cls):
+        """Drop cached menus after any committed menu, tier or link change"""
+        from app.classes import VersionStamp
+
+        VersionStamp.watch(Menu, cls.VERSION_KEY)
+        VersionStamp.watch(MenuTier, cls.VERSION_KEY)
+        VersionStamp.watch(MenuLink, cls.VERSION_KEY)
+
+    @classmethod
+    def invalidate(cls):
+        """Drop cached menus in every worker"""
+        from app.classes import VersionStamp
+        VersionStamp.bump(cls.VERSION_KEY)
+
+    @classmethod
+    def _check_version(cls):
+        from app.classes import VersionStamp, PermissionCache
+
+        version = (
+            VersionStamp.current(cls.VERSION_KEY),
+            VersionStamp.current(PermissionCache.VERSION_KEY)
+        )
+        if version != cls._version:
+            with cls._lock:
+                if version != cls._version:
+                    cls._menus = None
+                    cls._trees = {}
+                    cls._access = {}
+                    cls._version = version
+
+    @classmethod
+    def _get_menus(cls):
+        """All menus (active or not) as plain dicts, loaded once per version"""
+        cls._check_version()
+        menus = cls._menus
+        if menus is None:
+            with db_registry.session_scope() as session:
+                rows = session.query(Menu).all()
+                menus = [{
+                    'id': str(menu.id),
+                    'name': menu.name,
+                    'slug': menu.slug,
+                    'icon': menu.icon,
+                    'display': menu.display,
+                    'description': menu.description,
+                    'is_active': menu.is_active
+                } for menu in rows]
+            cls._menus = menus
+        return menus
+
+    @staticmethod
+    def _public_menu(menu):
+        return {key: value for key, value in menu.items() if key != 'is_active'}
+
+    @classmethod
+    def _role_can_view(cls, role_id, menu_name):
+        """Whether a role holds menu:<name>:view, exactly or through a wildcard"""
+        from app.classes import PermissionCache
+
+        cls._check_version()
+        key = (menu_name, str(role_id))
+        allowed = cls._access.get(key)
+        if allowed is None:
+            role_set = PermissionCache.get_role_set(role_id)
+            allowed = role_set.allows(f"menu:{menu_name.lower()}:view")
+            cls._access[key] = allowed
+        return allowed
+
     def get_available_menu_names(self, user_id=None):
         """
         Get list of menu names available to a user.
@@ -41,26 +129,15 @@ class MenuBuilder:
             user_id = uuid.UUID(user_id)
         
         # Get all menus
-        all_menus = self.db_session.query(Menu).filter(
-            Menu.is_active == True
-        ).all()
-        print(f"user->{user_id}")
+        all_menus = [menu for menu in self._get_menus() if menu['is_active']]
 
         if not user_id:
             # No user specified, return all active menus
-            return [menu.name for menu in all_menus]
+            return [menu['name'] for menu in all_menus]
         
         # Check permissions for each menu
-        available_menus = []
-        for menu in all_menus:
-            permission_name = f"menu:{menu.name.lower()}:view"
-            print(f"permname:{permission_name}")
-            
-            # Check if user has permission
-            if self._user_has_menu_permission(user_id, menu.name):
-                available_menus.append(menu.name)
-        
-        return available_menus
+        return [menu['name'] for menu in all_menus
+                if self._user_has_menu_permission(user_id, menu['name'])]
 
     def get_available_menus(self, user_id=None):
         """
@@ -72,7 +149,6 @@ class MenuBuilder:
         Returns:
             List of menu dictionaries with details
         """
-        print(f"GETTING MENUS: {user_id}")
         is_admin=None
         if "11111111-1111-1111-1111-111111111111"==str(user_id):
             is_admin=True
@@ -82,26 +158,15 @@ class MenuBuilder:
         if user_id and isinstance(user_id, str):
             user_id = uuid.UUID(user_id)
         
-        # Get all menus
-        all_menus = self.db_session.query(Menu).filter(
-            Menu.is_active == True
-        ).all()
         available_menus = []
         if user_id:
-            for menu in all_menus:
-                print(f"Checking for permission {user_id} {menu.name}")
-                if self._user_has_menu_permission(user_id, menu.name):
-                    print(f"ADDING {menu.name}")
-                    if menu.name.lower()=='admin' and not is_admin:
+            for menu in self._get_menus():
+                if not menu['is_active']:
+                    continue
+                if self._user_has_menu_permission(user_id, menu['name']):
+                    if menu['name'].lower()=='admin' and not is_admin:
                         continue
-                    available_menus.append({
-                        'id': str(menu.id),
-                        'name': menu.name,
-                        'slug':menu.slug,
-                        'icon':menu.icon,
-                        'display': menu.display,
-                        'description': menu.description
-                    })
+                    available_menus.append(self._public_menu(menu))
             
         return available_menus
 
@@ -123,38 +188,61 @@ class MenuBuilder:
         # First check if user has access to this menu
         if user_id and not self._user_has_menu_permission(user_id, menu_name):
             return None  # User doesn't have permission to view this menu
-        
-        menu = self.db_session.query(Menu).filter_by(name=menu_name).first()
+
+        self._check_version()
+        trees = self._trees
+        if menu_name in trees:
+            return trees[menu_name]
+
+        menu = next((menu for menu in self._get_menus() if menu['name'] == menu_name), None)
         if not menu:
             return None
 
-        # Get root tiers (those without parents or with parent_id=None)
-        root_tiers = self.db_session.query(MenuTier).filter(
-            and_(
-                MenuTier.menu_id == menu.id,
-                MenuTier.parent_id == None,
+        menu_structure = self._build_menu_structure(menu)
+        trees[menu_name] = menu_structure
+        return menu_structure
+
+    def _build_menu_structure(self, menu):
+        """Load a menu's visible tiers and links in two queries and assemble the tree"""
+        menu_id = uuid.UUID(menu['id'])
+        with db_registry.session_scope() as session:
+            tiers = session.query(MenuTier).filter(
+                MenuTier.menu_id == menu_id,
                 MenuTier.is_active == True,
                 MenuTier.visible == True
-            )
-        ).order_by(MenuTier.position).all()
-
-        # Build the menu structure recursively
-        menu_structure = {
-            "menu_type": {
-                "name": menu.name,
-                "display": menu.display,
-                "description": menu.description
-            },
-            "items": []
-        }
+            ).order_by(MenuTier.position).all()
+
+            links = session.query(MenuLink).join(
+                MenuTier, MenuLink.tier_id == MenuTier.id
+            ).filter(
+                MenuTier.menu_id == menu_id,
+                MenuLink.is_active == True,
+                MenuLink.visible == True
+            ).order_by(MenuLink.position).all()
+
+            tiers_by_parent = {}
+            for tier in tiers:
+                tiers_by_parent.setdefault(tier.parent_id, []).append(tier)
+
+            links_by_tier = {}
+            for link in links:
+                links_by_tier.setdefault(link.tier_id, []).append(link)
+
+            # Build the menu structure from the root tiers
+            menu_structure = {
+                "menu_type": {
+                    "name": menu['name'],
+                    "display": menu['display'],
+                    "description": menu['description']
+                },
+                "items": []
+            }
 
-        # Build nested structure
-        for tier in root_tiers:
-            tier_dict = self._build_tier_nested(tier, user_id)
-            if tier_dict:  # Only add if tier has content or is visible
-                menu_structure["items"].append(tier_dict)
+            for tier in tiers_by_parent.get(None, []):
+                tier_dict = self._build_tier_nested(tier, tiers_by_parent, links_by_tier)
+                if tier_dict:  # Only add if tier has content or is visible
+                    menu_structure["items"].append(tier_dict)
 
-        # pprint(menu_structure)
         return menu_structure
 
     def _user_has_menu_permission(self, user_id, menu_name):
@@ -168,50 +256,30 @@ class MenuBuilder:
         Returns:
             bool: True if user has access
         """
-        permission_name = f"menu:{menu_name.lower()}:view"
-        
-        has_access = self.rbac_checker.check_permission(
-            user_id=user_id,
-            permission_name=permission_name,
-        )
-        return has_access
+        from app.classes import PermissionCache
+
+        role_id = PermissionCache.get_role_id(user_id)
+        if not role_id:
+            return False
+        return self._role_can_view(role_id, menu_name)
     
-    def _build_tier_nested(self, tier, user_id=None):
+    def _build_tier_nested(self, tier, tiers_by_parent, links_by_tier):
         """
-        Recursively build nested structure for a tier.
+        Recursively build nested structure for a tier from preloaded rows.
 
         Args:
             tier: MenuTier object
-            user_id: Optional UUID of user for permission filtering
+            tiers_by_parent: parent tier id -> visible child tiers, by position
+            links_by_tier: tier id -> visible links, by position
 
         Returns:
             Dictionary representing the tier with nested items
         """
-        # Get links for this tier
-        links_query = self.db_session.query(MenuLink).filter(
-            MenuLink.tier_id == tier.id,
-            MenuLink.is_active == True,
-            MenuLink.visible == True
-        ).order_by(MenuLink.position)
-
-        # For now, we'll show all links if user has menu access
-        # You can later add per-link permission checking here
-        links = links_query.all()
-
-        # Get child tiers
-        child_tiers = [child for child in tier.children if child.is_active and child.visible]
-        child_tiers.sort(key=lambda x: x.position)
-
         # Build items list combining links and child tiers
         items = []
 
         # Add links as items
-        for link in links:
-            # Optional: Add per-link permission checking here
-            # permission_name = f"menu:link:{link.name.lower()}:view"
-            # if user_id and not self.rbac_checker.check_permission(user_id, permission_name):
-            #     continue
-            
+        for link in links_by_tier.get(tier.id, []):
             link_item = {
                 "type": "link",
                 "id": str(link.id),
@@ -228,8 +296,8 @@ class MenuBuilder:
             items.append(link_item)
 
         # Add child tiers as nested items
-        for child_tier in child_tiers:
-            child_dict = self._build_tier_nested(child_tier, user_id)
+        for child_tier in tiers_by_parent.get(tier.id, []):
+            child_dict = self._build_tier_nested(child_tier, tiers_by_parent, links_by_tier)
             if child_dict:
                 items.append(child_dict)
 
@@ -334,4 +402,7 @@ class MenuBuilder:
             self.db_session.commit()
             return True
 
-        return False
\ No newline at end of file
+        return False
+
+
+MenuBuilder.register_invalidation()
@@ -0,0 +1,452 @@
+import uuid
+
+from flask import Response
+from sqlalchemy import inspect, insert, update, delete, select, Uuid
+
+from app.base.model import BaseModel
+from app.register.classes import get_model
+from app.register.database import db_registry
+
+from .handler_class import MinerError
+
+
+class BatchEngine:
+    """
+    Transactional, set-based execution of Miner batch operations
+
+    Operations are grouped by (model, operation) in order of first
+    appearance, and each group is permission-checked once and run as a few
+    set-based statements instead of one transaction per item. An operation
+    on a row that a later group already touched (an update after a delete
+    of the same id) starts a new group instead, so operations on one row
+    always run in request order:
+
+    - create: one multi-row INSERT ... RETURNING (models with a custom
+      constructor or validators are added through the unit of work, which
+      batches the INSERT the same way)
+    - update: one SELECT of the targets by primary key, then a batched
+      UPDATE per distinct column set on flush
+    - delete: one UPDATE ... SET is_active = false (soft) or DELETE
+      (hard) WHERE pk IN (...)
+
+    Operations on brokered models and non-CRUD operations run one by one
+    through broker_data, in their place in the group order; later
+    operations on the same model are not grouped with earlier ones across
+    them. Their handlers
+    manage their own transactions, so a handler that commits also commits
+    the groups before it, even in atomic mode.
+
+    Modes:
+        savepoint: each group (brokered ones included) runs in a SAVEPOINT;
+                   a failing group is rolled back on its own and the rest
+                   is committed
+        atomic:    the first failure rolls back the whole batch
+
+    Results are reported per item with the index it had in the request.
+    """
+    __depends_on__ = ['MinerError', 'VersionStamp']
+
+    MODES = ('savepoint', 'atomic')
+    SET_OPERATIONS = ('create', 'update', 'delete')
+
+    def __init__(self, miner, mode=None):
+        self.miner = miner
+        self.mode = mode or 'savepoint'
+        if self.mode not in self.MODES:
+            raise MinerError(
+                f"Invalid batch mode '{self.mode}', expected one of: {', '.join(self.MODES)}",
+                'ValidationError', 400
+            )
+
+    def execute(self, operations):
+        """
+        Run a batch and return the per-item results
+
+        Args:
+            operations: List of dicts with model_name, operation, data and
+                        optional context
+
+        Returns:
+            Dict with results (ordered by index), errors and totals
+        """
+        db_session = db_registry._routing_session()
+        results = [None] * len(operations)
+        failed = False
+        committed = False
+
+        for group in self._plan(operations):
+            try:
+                # Brokered groups get a savepoint too, so a database error in
+                # a handler does not leave the session unusable for later groups
+                if self.mode == 'savepoint':
+                    with db_session.begin_nested():
+                        group_results = self._run_group(db_session, group)
+                else:
+                    group_results = self._run_group(db_session, group)
+            except Exception as e:
+                group_results = {index: self._error(index, e) for index, data in group['items']}
+
+            for index, result in group_results.items():
+                results[index] = result
+            if self.mode == 'atomic' and any(not result['success'] for result in group_results.values()):
+                failed = True
+                break
+
+        if failed:
+            db_session.rollback()
+            results = self._rolled_back(results)
+        else:
+            try:
+                db_session.commit()
+                committed = True
+            except Exception as e:
+                db_session.rollback()
+                if self.miner.logger:
+                    self.miner.logger.error(f"Batch commit failed: {e}")
+                results = self._rolled_back(results, e)
+
+        errors = [result for result in results if not result['success']]
+        return {
+            'results': results,
+            'errors': errors,
+            'total': len(operations),
+            'successful': len(operations) - len(errors),
+            'failed': len(errors),
+            'mode': self.mode,
+            'committed': committed
+        }
+
+    def _plan(self, operations):
+        """
+        Group operations by (model, operation), keeping first-appearance order
+
+        An item joins the open group for its (model, operation) unless a
+        later group has touched the same row, or a one-by-one operation on
+        the same model ran since; then it opens a new group at the end.
+        """
+        groups = []
+        open_groups = {}   # (model, operation) -> position of the group taking items
+        row_touched = {}   # (model, row) -> position of the last group touching it
+        model_barrier = {} # model -> position of its last one-by-one operation
+
+        for index, op in enumerate(operations):
+            op = op if isinstance(op, dict) else {}
+            model_name = op.get('model_name')
+            operation = (op.get('operation') or '').lower()
+            data = op.get('data')
+            set_based = operation in self.SET_OPERATIONS and model_name not in self.miner.data_handlers
+
+            position = None
+            row = None
+            if set_based:
+                key = (model_name, operation)
+                row = self._plan_row(model_name, operation, data)
+                position = open_groups.get(key)
+                after = max(
+                    row_touched.get((model_name, row), -1) if row is not None else -1,
+                    model_barrier.get(model_name, -1)
+                )
+                if position is not None and position < after:
+                    position = None
+
+            if position is None:
+                position = len(groups)
+                groups.append({
+                    'model_name': model_name,
+                    'operation': operation,
+                    'set_based': set_based,
+                    'context': op.get('context'),
+                    'items': []
+                })
+                if set_based:
+                    open_groups[key] = position
+                else:
+                    model_barrier[model_name] = position
+
+            if row is not None:
+                row_touched[(model_name, row)] = position
+            groups[position]['items'].append((index, data))
+        return groups
+
+    def _plan_row(self, model_name, operation, data):
+        """Row an update/delete targets, as text good enough to order by"""
+        if operation == 'create':
+            return None
+        if not isinstance(data, dict):
+            data = {'id': data}
+
+        pk_field = 'id'
+        model_class = get_model(model_name) if model_name else None
+        if model_class is not None:
+            try:
+                pk_field = self.miner._get_primary_key_field(model_class)
+            except MinerError:
+                pass
+
+        pk_value = self._item_pk(data, pk_field)
+        return str(pk_value).strip().lower() if pk_value is not None else None
+
+    def _run_group(self, db_session, group):
+        model_name = group['model_name']
+        operation = group['operation']
+
+        if not model_name or not operation:
+            raise MinerError('model_name and operation are required', 'ValidationError', 400)
+
+        if not group['set_based']:
+            index, data = group['items'][0]
+            result = self.miner.broker_data(
+                model_name=model_name,
+                operation=operation,
+                data=data,
+                context=group['context']
+            )
+            return {index: self._success(index, self._unwrap(result))}
+
+        model_class = get_model(model_name)
+        if not model_class:
+            raise MinerError(f'Model {model_name} not found', 'ValidationError', 404)
+
+        # One permission check (and audit row) for the whole group
+        permission_required = self.miner._get_required_permission(model_class, operation, {})
+        self.miner._check_permission(permission_required, model_class, operation, {})
+
+        handler = getattr(self, f'_run_{operation}')
+        return handler(db_session, model_class, group['items'])
+
+    def _run_create(self, db_session, model_class, items):
+        from app.classes import VersionStamp
+
+        results = {}
+        rows = []
+        for index, data in items:
+            if not isinstance(data, dict) or not data:
+                results[index] = self._error(index, MinerError('data field is required for create operation', 'ValidationError', 400))
+                continue
+            # is_active always uses the model's default
+            rows.append((index, {k: v for k, v in data.items() if k != 'is_active'}))
+
+        if not rows:
+            return results
+
+        column_keys = {attr.key for attr in inspect(model_class).column_attrs}
+        if self._is_plain(model_class) and all(set(row) <= column_keys for index, row in rows):
+            statement = insert(model_class).returning(model_class, sort_by_parameter_order=True)
+            instances = db_session.scalars(statement, [row for index, row in rows]).all()
+            VersionStamp.mark_bulk(db_session, model_class, 'insert')
+        else:
+            instances = [model_class(**row) for index, row in rows]
+            db_session.add_all(instances)
+            db_session.flush()
+
+        for (index, row), instance in zip(rows, instances):
+            results[index] = self._success(index, {
+                'success': True,
+                'data': self.miner._serialize_instance(instance),
+                'message': f'{model_class.__name__} created successfully'
+            })
+        return results
+
+    def _run_update(self, db_session, model_class, items):
+        results = {}
+        pk_field = self.miner._get_primary_key_field(model_class)
+        pk_attr = getattr(model_class, pk_field)
+        pk_type = inspect(model_class).columns[pk_field].type
+        readonly_fields = getattr(model_class, '__readonly_fields__', [])
+
+        changes = []
+        for index, data in items:
+            pk_value = self._item_pk(data, pk_field)
+            if pk_value is None:
+                results[index] = self._error(index, MinerError(f'{pk_field} is required for update operation', 'ValidationError', 400))
+                continue
+            try:
+                pk_value = self._normalize_pk(pk_type, pk_value)
+            except (TypeError, ValueError):
+                results[index] = self._error(index, MinerError(f'Invalid {pk_field}: {pk_value}', 'ValidationError', 400))
+                continue
+
+            fields = data.get('data') if isinstance(data.get('data'), dict) else {
+                k: v for k, v in data.items() if k not in ('id', pk_field)
+            }
+            # is_active is never updated via the API
+            fields = {k: v for k, v in fields.items() if k != 'is_active'}
+            if not fields:
+                results[index] = self._error(index, MinerError('data field is required for update operation', 'ValidationError', 400))
+                continue
+            changes.append((index, pk_value, fields))
+
+        if not changes:
+            return results
+
+        instances = db_session.query(model_class).filter(
+            pk_attr.in_({pk_value for index, pk_value, fields in changes})
+        ).all()
+        by_pk = {self._normalize_pk(pk_type, getattr(instance, pk_field)): instance for instance in instances}
+
+        updated = []
+        for index, pk_value, fields in changes:
+            instance = by_pk.get(pk_value)
+            if instance is None:
+                results[index] = self._error(index, MinerError('Record not found', 'NotFoundError', 404))
+                continue
+
+            readonly_attempts = []
+            for field, value in fields.items():
+                if hasattr(instance, field):
+                    if field in readonly_fields:
+                        readonly_attempts.append(field)
+                    else:
+                        setattr(instance, field, value)
+            updated.append((index, instance, readonly_attempts))
+
+        # The unit of work sends one batched UPDATE per distinct column set
+        db_session.flush()
+
+        for index, instance, readonly_attempts in updated:
+            result = {
+                'success': True,
+                'data': self.miner._serialize_instance(instance),
+                'message': f'{model_class.__name__} updated successfully'
+            }
+            if readonly_attempts:
+                result['warning'] = f'The following readonly fields were not updated: {", ".join(readonly_attempts)}'
+                result['readonly_fields_attempted'] = readonly_attempts
+            results[index] = self._success(index, result)
+        return results
+
+    def _run_delete(self, db_session, model_class, items):
+        from app.classes import VersionStamp
+
+        results = {}
+        pk_field = self.miner._get_primary_key_field(model_class)
+        pk_attr = getattr(model_class, pk_field)
+        pk_type = inspect(model_class).columns[pk_field].type
+
+        targets = {True: [], False: []}  # hard delete -> [(index, pk value)]
+        for index, data in items:
+            if not isinstance(data, dict):
+                data = {'id': data}
+            pk_value = self._item_pk(data, pk_field)
+            if pk_value is None:
+                results[index] = self._error(index, MinerError(f'{pk_field} is required for delete operation', 'ValidationError', 400))
+                continue
+            try:
+                pk_value = self._normalize_pk(pk_type, pk_value)
+            except (TypeError, ValueError):
+                results[index] = self._error(index, MinerError(f'Invalid {pk_field}: {pk_value}', 'ValidationError', 400))
+                continue
+            hard_delete = bool(data.get('hard_delete')) or not hasattr(model_class, 'is_active')
+            targets[hard_delete].append((index, pk_value))
+
+        wanted = {pk_value for group in targets.values() for index, pk_value in group}
+        if not wanted:
+            return results
+        existing = {
+            self._normalize_pk(pk_type, pk)
+            for pk in db_session.scalars(select(pk_attr).where(pk_attr.in_(wanted)))
+        }
+
+        cascades = any(rel.cascade.delete for rel in inspect(model_class).relationships)
+        for hard_delete, group in targets.items():
+            found = []
+            for index, pk_value in group:
+                if pk_value in existing:
+                    found.append((index, pk_value))
+                else:
+                    results[index] = self._error(index, MinerError('Record not found', 'NotFoundError', 404))
+            if not found:
+                continue
+
+            pk_values = [pk_value for index, pk_value in found]
+            if not hard_delete:
+                db_session.execute(
+                    update(model_class).where(pk_attr.in_(pk_values)).values(is_active=False)
+                )
+                VersionStamp.mark_bulk(db_session, model_class, 'update')
+            elif cascades:
+                # ORM-level cascades need the instances
+                for instance in db_session.query(model_class).filter(pk_attr.in_(pk_values)):
+                    db_session.delete(instance)
+                db_session.flush()
+            else:
+                db_session.execute(delete(model_class).where(pk_attr.in_(pk_values)))
+                VersionStamp.mark_bulk(db_session, model_class, 'delete')
+
+            delete_type = 'permanently deleted' if hard_delete else 'deactivated'
+            for index, pk_value in found:
+                results[index] = self._success(index, {
+                    'success': True,
+                    'message': f'{model_class.__name__} {delete_type} successfully'
+                })
+        return results
+
+    @staticmethod
+    def _is_plain(model_class):
+        """True when rows can be inserted without running model constructors or validators"""
+        return model_class.__init__ is BaseModel.__init__ and not inspect(model_class).validators
+
+    @staticmethod
+    def _normalize_pk(column_type, value):
+        """
+        Coerce a primary key to the column's Python type, so a requested
+        key compares equal to the stored one ('ABC...' vs UUID('abc...'),
+        '7' vs 7). Raises ValueError/TypeError for a malformed key.
+        """
+        if isinstance(column_type, Uuid):
+            if not isinstance(value, uuid.UUID):
+                value = uuid.UUID(str(value))
+            return value if column_type.as_uuid else str(value)
+
+        try:
+            python_type = column_type.python_type
+        except NotImplementedError:
+            return value
+        if python_type is int and isinstance(value, str):
+            return int(value)
+        return value
+
+    @staticmethod
+    def _item_pk(data, pk_field):
+        if not isinstance(data, dict):
+            return None
+        return data.get(pk_field, data.get('id'))
+
+    @staticmethod
+    def _unwrap(result):
+        """Turn a handler's Flask response back into its JSON body"""
+        if isinstance(result, tuple) and result and isinstance(result[0], Response):
+            result = result[0]
+        if isinstance(result, Response):
+            return result.get_json()
+        return result
+
+    @staticmethod
+    def _success(index, result):
+        return {'index': index, 'success': True, 'result': result}
+
+    @staticmethod
+    def _error(index, error):
+        return {
+            'index': index,
+            'success': False,
+            'error': error.message if isinstance(error, MinerError) else str(error),
+            'error_type': error.error_type if isinstance(error, MinerError) else type(error).__name__
+        }
+
+    def _rolled_back(self, results, error=None):
+        """Mark every item as failed after the batch transaction was rolled back"""
+        failed_at = next((result['index'] for result in results if result and not result['success']), None)
+        reason = f'Rolled back: {error}' if error else f'Rolled back: batch failed at index {failed_at}'
+
+        rolled_back = []
+        for index, result in enumerate(results):
+            if result is None or result['success']:
+                result = {
+                    'index': index,
+                    'success': False,
+                    'error': reason,
+                    'error_type': 'BatchRolledBack'
+                }
+            rolled_back.append(result)
+        return rolled_back
@@ -0,0 +1,135 @@
+import uuid
+import base64
+import binascii
+from decimal import Decimal
+from datetime import datetime, date, time
+
+import msgspec
+from sqlalchemy import and_, or_, asc, desc, tuple_
+
+from .handler_class import MinerError
+
+
+class KeysetCursor:
+    """
+    Seek position for keyset pagination of Miner lists
+
+    Lists are ordered by the sort column and then the primary key, and the
+    next page starts after the (sort value, primary key) of the last row
+    instead of at an OFFSET, so page N costs the same as page 1 on an
+    index over (sort column, id).
+
+    The token is URL-safe base64 JSON of the sort it was issued for and
+    the last row's values. A token only works with the sort it was issued
+    for.
+    """
+    __depends_on__ = ['MinerError']
+
+    def __init__(self, sort_by, sort_order, value, pk):
+        self.sort_by = sort_by
+        self.sort_order = sort_order
+        self.value = value
+        self.pk = pk
+
+    def encode(self):
+        payload = msgspec.json.encode({
+            's': self.sort_by,
+            'o': self.sort_order,
+            'v': self._dump(self.value),
+            'k': self._dump(self.pk),
+        })
+        return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+    @classmethod
+    def decode(cls, token, sort_by, sort_order, sort_attr, pk_attr):
+        """Read a cursor token issued for this sort, raising ValidationError otherwise"""
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = msgspec.json.decode(base64.urlsafe_b64decode(padded.encode('ascii')))
+            cursor = cls(
+                payload['s'],
+                payload['o'],
+                cls._load(payload['v'], sort_attr),
+                cls._load(payload['k'], pk_attr)
+            )
+        except (binascii.Error, msgspec.DecodeError, KeyError, TypeError, ValueError, UnicodeEncodeError):
+            raise MinerError('Invalid cursor', 'ValidationError', 400)
+
+        if cursor.sort_by != sort_by or cursor.sort_order != sort_order:
+            raise MinerError('Cursor does not match the requested sort', 'ValidationError', 400)
+        return cursor
+
+    @staticmethod
+    def order(query, sort_attr, pk_attr, sort_order):
+        """Order by the sort column, then the primary key as tie breaker"""
+        direction = desc if sort_order == 'desc' else asc
+        if sort_attr is pk_attr:
+            return query.order_by(direction(pk_attr))
+        return query.order_by(direction(sort_attr), direction(pk_attr))
+
+    def seek(self, query, sort_attr, pk_attr):
+        """
+        Filter a query to rows after this cursor
+
+        Postgres sorts NULLs last ascending and first descending, so a
+        nullable sort column needs the expanded form; otherwise a row
+        comparison lets the planner use a composite index directly.
+        """
+        descending = self.sort_order == 'desc'
+
+        if sort_attr is pk_attr:
+            return query.filter(pk_attr < self.pk if descending else pk_attr > self.pk)
+
+        nullable = any(column.nullable for column in sort_attr.property.columns)
+        if self.value is not None and not nullable:
+            row, after = tuple_(sort_attr, pk_attr), tuple_(self.value, self.pk)
+            return query.filter(row < after if descending else row > after)
+
+        if self.value is None:
+            if descending:
+                return query.filter(or_(
+                    and_(sort_attr.is_(None), pk_attr < self.pk),
+                    sort_attr.isnot(None)
+                ))
+            return query.filter(and_(sort_attr.is_(None), pk_attr > self.pk))
+
+        if descending:
+            return query.filter(or_(
+                sort_attr < self.value,
+                and_(sort_attr == self.value, pk_attr < self.pk)
+            ))
+        return query.filter(or_(
+            sort_attr > self.value,
+            and_(sort_attr == self.value, pk_attr > self.pk),
+            sort_attr.is_(None)
+        ))
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, (datetime, date, time)):
+            return value.isoformat()
+        if isinstance(value, (uuid.UUID, Decimal)):
+            return str(value)
+        return value
+
+    @staticmethod
+    def _load(value, attr):
+        """Convert a token value back to the column's Python type"""
+        if value is None:
+            return None
+        try:
+            python_type = attr.property.columns[0].type.python_type
+        except NotImplementedError:
+            return value
+
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        if python_type is time:
+            return time.fromisoformat(value)
+        if python_type is uuid.UUID:
+            return uuid.UUID(str(value))
+        if python_type is Decimal:
+            return Decimal(str(value))
+        return value
@@ -0,0 +1,142 @@
+import json
+import time
+import hashlib
+import threading
+
+from sqlalchemy import func, inspect, text
+
+from app.config import config
+
+from .handler_class import MinerError
+
+
+class ListCounter:
+    """
+    Row counts for Miner list responses, in one of four modes
+
+    - exact:     COUNT(*) over the query, the original behaviour
+    - estimated: planner estimate - pg_class.reltuples for an unfiltered
+                 table, otherwise the row estimate from EXPLAIN. Constant
+                 time; falls back to exact on non-Postgres binds
+    - cached:    exact count, reused by this worker for count_cache_ttl
+                 seconds per distinct statement and parameters
+    - none:      no count; lists report has_more instead
+
+    The mode comes from the request ('count_mode'), then the model's
+    __count_mode__, then the miner_count_mode setting.
+    """
+    __depends_on__ = ['MinerError']
+
+    MODES = ('exact', 'estimated', 'cached', 'none')
+
+    default_mode = config.get('miner_count_mode', 'exact')
+    ttl = config.get('miner_count_cache_ttl_seconds', 60)
+    max_size = config.get('miner_count_cache_size', 2000)
+
+    _entries = {}  # statement hash -> (count, expires_at)
+    _lock = threading.Lock()
+
+    @classmethod
+    def resolve_mode(cls, model_class, requested=None):
+        """Pick the count mode for a request"""
+        mode = requested or getattr(model_class, '__count_mode__', None) or cls.default_mode
+        if mode not in cls.MODES:
+            raise MinerError(
+                f"Invalid count_mode '{mode}', expected one of: {', '.join(cls.MODES)}",
+                'ValidationError', 400
+            )
+        return mode
+
+    @classmethod
+    def count(cls, db_session, model_class, query, mode):
+        """
+        Count the rows an ORM query would return
+
+        Args:
+            db_session: Session the query runs in
+            model_class: Model the query selects from (picks the bind)
+            query: ORM query with filters applied; ordering is ignored
+            mode: One of MODES
+
+        Returns:
+            int, or None in 'none' mode
+        """
+        if mode == 'none':
+            return None
+
+        query = query.order_by(None)
+        if mode == 'estimated':
+            estimate = cls._estimate(db_session, model_class, query)
+            if estimate is not None:
+                return estimate
+            return cls._exact(db_session, query)
+
+        if mode == 'cached':
+            return cls._cached(db_session, model_class, query)
+
+        return cls._exact(db_session, query)
+
+    @classmethod
+    def clear(cls):
+        """Drop this worker's cached counts"""
+        with cls._lock:
+            cls._entries = {}
+
+    @staticmethod
+    def _exact(db_session, query):
+        return db_session.query(func.count()).select_from(query.subquery()).scalar() or 0
+
+    @classmethod
+    def _cached(cls, db_session, model_class, query):
+        sql, params = cls._compile(db_session, model_class, query)
+        key = hashlib.sha256(repr((sql, sorted(params.items()))).encode('utf-8')).hexdigest()
+
+        now = time.monotonic()
+        entry = cls._entries.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        count = cls._exact(db_session, query)
+        with cls._lock:
+            if len(cls._entries) >= cls.max_size:
+                cls._entries = {k: v for k, v in cls._entries.items() if v[1] > now}
+                if len(cls._entries) >= cls.max_size:
+                    cls._entries = {}
+            cls._entries[key] = (count, now + cls.ttl)
+        return count
+
+    @classmethod
+    def _estimate(cls, db_session, model_class, query):
+        """Planner row estimate, or None when the bind is not Postgres"""
+        mapper = inspect(model_class)
+        bind = db_session.get_bind(mapper=mapper)
+        if bind.dialect.name != 'postgresql':
+            return None
+
+        statement = query.statement
+        if statement.whereclause is None:
+            reltuples = db_session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+                {'table_name': model_class.__table__.fullname},
+                bind_arguments={'mapper': mapper}
+            ).scalar()
+            # -1 means the table has never been analyzed
+            if reltuples is not None and reltuples >= 0:
+                return int(reltuples)
+
+        sql, params = cls._compile(db_session, model_class, query)
+        connection = db_session.connection(bind_arguments={'mapper': mapper})
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}", params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @staticmethod
+    def _compile(db_session, model_class, query):
+        """Compile a query for its bind, with IN lists expanded"""
+        bind = db_session.get_bind(mapper=inspect(model_class))
+        compiled = query.statement.compile(
+            dialect=bind.dialect,
+            compile_kwargs={'render_postcompile': True}
+        )
+        return str(compiled), dict(compiled.params)
@@ -0,0 +1,154 @@
+import threading
+from decimal import Decimal
+
+import msgspec
+from sqlalchemy import inspect, DateTime, Date, Time, Numeric, Interval
+
+from app.base.model import SerializableMixin
+from app.utils import SQLAlchemyEncoder
+
+
+class ListProjection:
+    """
+    Precompiled column projection and encoder for Miner list responses
+
+    Built once per (model, return_columns, slim) and cached for the life of
+    the worker. It selects only the needed columns as plain rows, so a list
+    never loads ORM instances into the identity map. Rows are turned into
+    dicts (or arrays in slim mode) with converters picked per column type
+    up front, then encoded with msgspec. The output matches
+    Miner._serialize_instance.
+
+    get() returns None when the columns cannot be projected (a requested
+    name is not a column, or the model has its own to_dict). Miner then
+    falls back to the ORM path.
+    """
+    __depends_on__ = []
+
+    EXCLUDED_FIELDS = ('is_active',)
+    STREAM_CHUNK_ROWS = 500
+
+    _plans = {}
+    _lock = threading.Lock()
+    _fallback = SQLAlchemyEncoder()
+    encoder = msgspec.json.Encoder(enc_hook=_fallback.default)
+
+    def __init__(self, model_class, keys, attributes, converters, slim):
+        self.model_class = model_class
+        self.keys = keys
+        self.attributes = attributes
+        self.converters = converters
+        self.slim = slim
+
+    @classmethod
+    def get(cls, model_class, return_columns=None, slim=False):
+        """Get the cached projection for a model and column list, or None"""
+        cache_key = (model_class, tuple(return_columns or ()), bool(slim))
+        if cache_key in cls._plans:
+            return cls._plans[cache_key]
+
+        plan = cls._compile(model_class, return_columns, slim)
+        with cls._lock:
+            cls._plans[cache_key] = plan
+        return plan
+
+    @classmethod
+    def _compile(cls, model_class, return_columns, slim):
+        mapper = inspect(model_class)
+        column_attrs = {attr.key: attr for attr in mapper.column_attrs}
+
+        if not slim and model_class.to_dict is not SerializableMixin.to_dict:
+            # Custom to_dict output can't be reproduced from columns
+            return None
+
+        if return_columns:
+            keys = []
+            for name in return_columns:
+                if name in cls.EXCLUDED_FIELDS or (not slim and name in keys):
+                    continue
+                if name not in column_attrs:
+                    return None
+                keys.append(name)
+            # Full mode always includes id for row actions
+            if not slim and 'id' in column_attrs and 'id' not in keys:
+                keys.append('id')
+        elif slim:
+            # Slim rows follow table column order, same as _get_model_metadata
+            keys = [
+                mapper.get_property_by_column(column).key
+                for column in model_class.__table__.columns
+                if column.name not in cls.EXCLUDED_FIELDS
+            ]
+        else:
+            keys = [key for key in column_attrs if key not in cls.EXCLUDED_FIELDS]
+
+        attributes = [getattr(model_class, key) for key in keys]
+        converters = [cls._converter(column_attrs[key].columns[0].type, slim) for key in keys]
+        return cls(model_class, keys, attributes, converters, slim)
+
+    @classmethod
+    def _converter(cls, column_type, slim):
+        """Pick the value conversion for a column type once, instead of isinstance per value"""
+        if isinstance(column_type, (DateTime, Date, Time)):
+            return _isoformat
+        if isinstance(column_type, Interval):
+            return cls._fallback.default
+        if isinstance(column_type, Numeric) and not slim:
+            # BaseModel.to_dict sends Decimal as float; slim mode sends it as a string
+            return _decimal_to_float
+        return None
+
+    def apply(self, query, *extra):
+        """
+        Restrict an ORM query to the projected columns
+
+        Extra columns are selected after the projected ones and ignored by
+        convert(), e.g. the sort values a keyset cursor is built from.
+        """
+        return query.with_entities(*self.attributes, *extra)
+
+    def convert(self, row):
+        """Turn one result row into the response item"""
+        values = [
+            value if converter is None or value is None else converter(value)
+            for value, converter in zip(row, self.converters)
+        ]
+        if self.slim:
+            return values
+        return dict(zip(self.keys, values))
+
+    def encode(self, payload):
+        """Encode a response payload to JSON bytes"""
+        return self.encoder.encode(payload)
+
+    def iter_json(self, header, rows):
+        """
+        Yield a JSON object whose 'data' array is streamed row by row
+
+        Args:
+            header: Response keys that go before 'data'
+            rows: Iterable of result rows
+        """
+        prefix = self.encode(header)
+        yield prefix[:-1] + (b',"data":[' if len(prefix) > 2 else b'"data":[')
+
+        first = True
+        chunk = []
+        for row in rows:
+            chunk.append(self.encode(self.convert(row)))
+            if len(chunk) >= self.STREAM_CHUNK_ROWS:
+                yield (b'' if first else b',') + b','.join(chunk)
+                first = False
+                chunk = []
+        if chunk:
+            yield (b'' if first else b',') + b','.join(chunk)
+
+        yield b']}'
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _decimal_to_float(value):
+    return float(value) if isinstance(value, Decimal) else value
@@ -1,10 +1,11 @@
+import copy
 import uuid
 import time
 import traceback
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import RelationshipProperty
-from sqlalchemy import or_,  desc, asc, func
-from flask import request, g
+from sqlalchemy import desc, asc, func, inspect
+from flask import request, g, Response, stream_with_context, has_request_context
 from app.utils import jsonify
 
 
@@ -17,13 +18,21 @@ from .handler_class import  (
         DataBrokerError,
         BaseDataHandler
         )
+from .list_projection_class import ListProjection
+from .list_counter_class import ListCounter
+from .keyset_cursor_class import KeysetCursor
+from .model_descriptor_class import ModelDescriptor
+from .batch_engine_class import BatchEngine
+from .search_plan_class import SearchPlan
 
 class Miner:
     """
     Enhanced Data API handler with RBAC, logging, audit trails, and slim output
     Now includes data broker functionality for delegating to specialized handlers
     """
-    __depends_on__ = ['MinerError', 'MinerPermissionError', 'DataBrokerError', 'RbacPermissionChecker']
+    __depends_on__ = ['MinerError', 'MinerPermissionError', 'DataBrokerError', 'RbacPermissionChecker', 'ListProjection',
+                      'ListCounter', 'KeysetCursor', 'ModelDescriptor',
+                      'BatchEngine', 'SearchPlan']
 
     def __init__(self, app=None):
         self.app = app
@@ -40,6 +49,9 @@ class Miner:
         self.logger = app.logger
         app.miner = self
 
+        # Model structure is fixed from here on; build it once up front
+        ModelDescriptor.build_all(self)
+
     def register_data_handler(self, model_name, handler_class):
         """
         Register a specialized handler for a specific model
@@ -111,7 +123,7 @@ class Miner:
             )
             raise
 
-    def broker_batch_data(self, operations):
+    def broker_batch_data(self, operations, mode=None):
         """
         Process multiple operations in a batch
         
@@ -121,43 +133,13 @@ class Miner:
                 - operation: Operation to perform
                 - data: Data for the operation
                 - context: Optional context override
+            mode: 'savepoint' (default) commits every group that succeeded,
+                  'atomic' rolls the whole batch back on the first failure
                 
         Returns:
-            List of results in the same order as operations
+            Dict with per-item results (same indices as operations) and totals
         """
-        results = []
-        errors = []
-        
-        for idx, op in enumerate(operations):
-            try:
-                result = self.broker_data(
-                    model_name=op.get('model_name'),
-                    operation=op.get('operation'),
-                    data=op.get('data'),
-                    context=op.get('context')
-                )
-                results.append({
-                    'index': idx,
-                    'success': True,
-                    'result': result
-                })
-            except Exception as e:
-                error_detail = {
-                    'index': idx,
-                    'success': False,
-                    'error': str(e),
-                    'error_type': type(e).__name__
-                }
-                errors.append(error_detail)
-                results.append(error_detail)
-        
-        return {
-            'results': results,
-            'errors': errors,
-            'total': len(operations),
-            'successful': len(operations) - len(errors),
-            'failed': len(errors)
-        }
+        return BatchEngine(self, mode).execute(operations)
 
     def data_endpoint(self):
         """Single POST endpoint for all model operations with full RBAC and logging"""
@@ -205,7 +187,7 @@ class Miner:
 
             # Check if this is a batch operation
             if data.get('batch'):
-                return self._handle_batch_endpoint(data.get('operations', []), audit_data)
+                return self._handle_batch_endpoint(data.get('operations', []), audit_data, data.get('mode'))
 
             # Validate required fields
             model_name = data.get('model')
@@ -276,9 +258,9 @@ class Miner:
         except Exception as e:
             return self._handle_error(MinerError('Internal server error', 'SystemError', 500, {'original_error': str(e)}), audit_data, start_time)
 
-    def _handle_batch_endpoint(self, operations, audit_data):
+    def _handle_batch_endpoint(self, operations, audit_data, mode=None):
         """Handle batch operations through the endpoint"""
-        result = self.broker_batch_data(operations)
+        result = self.broker_batch_data(operations, mode)
         
         # Log batch operation
         self.logger.info(
@@ -435,7 +417,15 @@ class Miner:
 
     def handle_metadata(self, model_class, data, audit_data):
         """Handle metadata operations - return model structure information"""
-        
+        document = ModelDescriptor.for_model(model_class).document('metadata', self._build_metadata)
+
+        # Update audit data
+        audit_data['operation_details'] = 'metadata_retrieved'
+
+        return self._document_response(document)
+
+    def _build_metadata(self, model_class):
+        """Build the model structure document served by handle_metadata"""
         # Define fields to exclude from API
         excluded_fields = ['is_active']
         
@@ -590,14 +580,17 @@ class Miner:
         # Add model docstring if available
         if model_class.__doc__:
             metadata['description'] = model_class.__doc__.strip()
-        
-        # Update audit data
-        audit_data['operation_details'] = 'metadata_retrieved'
-        
-        return jsonify({
-            'success': True,
-            'metadata': metadata
-        })
+
+        return metadata
+
+    def _document_response(self, document):
+        """Serve a pre-encoded metadata document, answering 304 when the ETag matches"""
+        payload, body, etag = document
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+
     def handle_read(self, model_class, data, audit_data):
         """Handle read operations - single record by any column"""
         db_session = db_registry._routing_session()
@@ -862,34 +855,91 @@ class Miner:
 
         # Apply search using searchable columns
         if search_value and searchable_columns:
-            query = self._apply_search(query, model_class, search_value, searchable_columns)
+            query = self._apply_search(query, model_class, search_value, searchable_columns, data.get('search_mode'))
             audit_data['search_terms'] = search_value
 
+        # Count strategy and pagination mode, per request or per model
+        count_mode = ListCounter.resolve_mode(model_class, data.get('count_mode'))
+        keyset = (data.get('pagination') or getattr(model_class, '__pagination__', 'offset')) == 'keyset'
+
         # Get total count before filtering (for DataTables recordsTotal)
-        pk_field = self._get_primary_key_field(model_class)
-        pk_column = getattr(model_class, pk_field)
-        total_query = db_session.query(func.count(pk_column))
+        total_query = db_session.query(model_class)
         if hasattr(model_class, 'is_active') and not include_inactive:
             total_query = total_query.filter(model_class.is_active == True)
-        records_total = total_query.scalar() or 0
+        records_total = ListCounter.count(db_session, model_class, total_query, count_mode)
 
-        # Get filtered count (for DataTables recordsFiltered) - using subquery approach
-        # Create a subquery from the current query without ordering
-        subquery = query.order_by(None).subquery()
-        records_filtered = db_session.query(func.count()).select_from(subquery).scalar() or 0
+        # Get filtered count (for DataTables recordsFiltered)
+        records_filtered = ListCounter.count(db_session, model_class, query, count_mode)
 
-        # Apply sorting
-        query = self._apply_sorting(query, model_class, sort_by, sort_order)
+        # Without a count (or with a cursor) fetch one extra row to report has_more
+        peek = bool(length) and (keyset or records_filtered is None)
 
-        # Apply pagination using DataTables parameters
-        if length==0:
-            query = query.offset(start)
+        if keyset:
+            if not length:
+                raise MinerError('Keyset pagination requires a page length', 'ValidationError', 400)
+
+            pk_attr = getattr(model_class, self._get_primary_key_field(model_class))
+            sort_attr = pk_attr
+            if sort_by in inspect(model_class).column_attrs:
+                sort_attr = getattr(model_class, sort_by)
+            else:
+                sort_by = pk_attr.key
+            sort_order = 'desc' if sort_order.lower() == 'desc' else 'asc'
+
+            if data.get('cursor'):
+                cursor = KeysetCursor.decode(data['cursor'], sort_by, sort_order, sort_attr, pk_attr)
+                query = cursor.seek(query, sort_attr, pk_attr)
+            query = KeysetCursor.order(query, sort_attr, pk_attr, sort_order)
+            query = query.limit(length + 1)
         else:
-            query = query.offset(start).limit(length)
+            # Apply sorting
+            query = self._apply_sorting(query, model_class, sort_by, sort_order)
+
+            # Apply pagination using DataTables parameters
+            if length==0:
+                query = query.offset(start)
+            else:
+                query = query.offset(start).limit(length + 1 if peek else length)
+
+        # Column projection: select only the returned columns as plain rows
+        # and encode them with a precompiled encoder. Falls back to loading
+        # instances when the columns can't be projected.
+        projection = None
+        if data.get('projection', True):
+            projection = ListProjection.get(model_class, return_columns, slim)
+
+        if projection is not None:
+            # Keyset rows carry the cursor values after the projected columns
+            query = projection.apply(query, sort_attr, pk_attr) if keyset else projection.apply(query)
+
+            # Unbounded lists are streamed unless the client opts out
+            stream = data.get('stream')
+            if stream is None:
+                stream = length == 0
+            if stream and not peek:
+                return self._stream_list(projection, query, {
+                    'success': True,
+                    'draw': draw,
+                    'recordsTotal': records_total,
+                    'recordsFiltered': records_filtered,
+                }, slim, model_class, start, length, filters, audit_data)
 
         # Execute query
         instances = query.all()
 
+        has_more = None
+        next_cursor = None
+        if peek:
+            has_more = len(instances) > length
+            instances = instances[:length]
+            if keyset and has_more:
+                last = instances[-1]
+                if projection is not None:
+                    value, pk = last[-2], last[-1]
+                else:
+                    value, pk = getattr(last, sort_attr.key), getattr(last, pk_attr.key)
+                next_cursor = KeysetCursor(sort_by, sort_order, value, pk).encode()
+
         # Update audit data
         audit_data.update({
             'records_returned': len(instances),
@@ -898,7 +948,10 @@ class Miner:
         })
 
         # Serialize results with only requested columns
-        data_list = [self._serialize_instance(instance, slim, return_columns) for instance in instances]
+        if projection is not None:
+            data_list = [projection.convert(row) for row in instances]
+        else:
+            data_list = [self._serialize_instance(instance, slim, return_columns) for instance in instances]
 
         # Return DataTables-compatible response
         response = {
@@ -909,11 +962,44 @@ class Miner:
             'data': data_list
         }
 
+        if count_mode != 'exact':
+            response['count_mode'] = count_mode
+        if has_more is not None:
+            response['has_more'] = has_more
+        if keyset:
+            response['next_cursor'] = next_cursor
+
         if slim:
             response['metadata'] = self._get_model_metadata(model_class)
 
+        if projection is not None:
+            return Response(projection.encode(response), mimetype='application/json')
+
         return jsonify(response)
 
+    def _stream_list(self, projection, query, header, slim, model_class, start, length, filters, audit_data):
+        """Stream a projected list response, encoding rows in chunks as they are fetched"""
+        if slim:
+            header['metadata'] = self._get_model_metadata(model_class)
+
+        # Row count is known from recordsFiltered, no need to buffer the rows
+        returned = None
+        if header['recordsFiltered'] is not None:
+            returned = max(0, header['recordsFiltered'] - (start or 0))
+            if length:
+                returned = min(returned, length)
+        audit_data.update({
+            'records_returned': returned,
+            'total_records': header['recordsFiltered'],
+            'filters_applied': filters
+        })
+
+        rows = query.yield_per(projection.STREAM_CHUNK_ROWS)
+        return Response(
+            stream_with_context(projection.iter_json(header, rows)),
+            mimetype='application/json'
+        )
+
     def handle_count(self, model_class, data, audit_data):
         """Handle count operations with optional filtering"""
         db_session = db_registry._routing_session()
@@ -952,27 +1038,10 @@ class Miner:
 
     def _get_primary_key_field(self, model_class):
         """Get the primary key field name(s) for a model"""
-        pk_columns = list(model_class.__table__.primary_key.columns)
-        if not pk_columns:
-            # Fallback to 'id' if no PK defined
-            if hasattr(model_class, 'id'):
-                return 'id'
+        pk_field = ModelDescriptor.for_model(model_class).pk_field
+        if pk_field is None:
             raise MinerError(f"No primary key defined for {model_class.__name__}", 'ConfigurationError', 500)
-        
-        # Find the attribute name that corresponds to this column
-        pk_column = pk_columns[0]
-        
-        # Search through the model's mapper to find the attribute name
-        for attr_name, attr in model_class.__mapper__.all_orm_descriptors.items():
-            if hasattr(attr, 'property') and hasattr(attr.property, 'columns'):
-                # Check if this attribute maps to our primary key column
-                if pk_column in attr.property.columns:
-                    return attr_name
-        
-        # If we can't find the mapping, log an error and return the column name as fallback
-        if self.logger:
-            self.logger.error(f"Could not find attribute name for primary key column {pk_column.name} in {model_class.__name__}")
-        return pk_column.name
+        return pk_field
 
     def _get_instance_pk_value(self, instance):
         """Get primary key value from an instance"""
@@ -1045,182 +1114,16 @@ class Miner:
         
         return query
 
-    def _apply_search(self, query, model_class, search_term, search_fields):
-        """Apply search across specified fields"""
+    def _apply_search(self, query, model_class, search_term, search_fields, search_mode=None):
+        """Apply search across specified fields using the model's precompiled search plan"""
         if not search_term:
             return query
 
-        # Determine if search term is numeric
-        is_numeric_search = False
-        numeric_value = None
-        try:
-            numeric_value = float(search_term)
-            is_numeric_search = True
-        except ValueError:
-            pass
-
-        # Check if search term looks like a date/time
-        is_date_time_search = self._looks_like_date_time(search_term)
-
-        # If no search fields specified, auto-detect appropriate fields
-        if not search_fields:
-            search_fields = []
-            for column in model_class.__table__.columns:
-                column_type = str(column.type).upper()
-
-                # Skip booleans always
-                if 'BOOLEAN' in column_type:
-                    continue
-
-                # Include date/time fields only if search term looks like date/time
-                if 'DATE' in column_type or 'TIME' in column_type or 'TIMESTAMP' in column_type:
-                    if is_date_time_search:
-                        search_fields.append(column.name)
-                    continue
-
-                # Include numeric fields only if search term is numeric
-                if any(num_type in column_type for num_type in ['INTEGER', 'NUMERIC', 'FLOAT', 'DECIMAL']):
-                    if is_numeric_search:
-                        search_fields.append(column.name)
-                    continue
-
-                # Skip UUID fields unless search term looks like a UUID
-                if 'UUID' in column_type:
-                    try:
-                        import uuid
-                        uuid.UUID(search_term)
-                        search_fields.append(column.name)
-                    except ValueError:
-                        pass
-                    continue
-
-                # Include text fields
-                if any(text_type in column_type for text_type in ['VARCHAR', 'TEXT', 'STRING', 'CHAR']):
-                    search_fields.append(column.name)
-        else:
-            # Filter out boolean fields from explicitly provided search_fields
-            valid_search_fields = []
-            for field_name in search_fields:
-                if hasattr(model_class, field_name):
-                    column = model_class.__table__.columns.get(field_name)
-                    if column is not None:
-                        column_type = str(column.type).upper()
-                        
-                        # Skip boolean fields
-                        if 'BOOLEAN' in column_type:
-                            if self.logger:
-                                self.logger.debug(f"Removing boolean field {field_name} from search fields")
-                            continue
-                        
-                        # For date/time fields, only include if search term looks like date/time
-                        if 'DATE' in column_type or 'TIME' in column_type or 'TIMESTAMP' in column_type:
-                            if not is_date_time_search:
-                                if self.logger:
-                                    self.logger.debug(f"Removing date/time field {field_name} from search - term doesn't look like date/time")
-                                continue
-                        
-                        valid_search_fields.append(field_name)
-
-            search_fields = valid_search_fields
-
-        # If no valid searchable fields found, return query unchanged
-        if not search_fields:
-            if self.logger:
-                self.logger.debug(f"No valid search fields for model {model_class.__name__}")
-            return query
-
-        # Build OR conditions for search
-        search_conditions = []
-        for field_name in search_fields:
-            if not hasattr(model_class, field_name):
-                continue
-
-            field = getattr(model_class, field_name)
-            column = model_class.__table__.columns.get(field_name)
-            if column is None:
-                continue
-
-            column_type = str(column.type).upper()
-
-            # Handle date/time fields
-            if 'DATE' in column_type or 'TIME' in column_type or 'TIMESTAMP' in column_type:
-                # Cast to text and use ILIKE for partial date matching
-                # This allows searching for "2024" to match "2024-01-15 10:30:00"
-                from sqlalchemy import cast, String
-                search_conditions.append(cast(field, String).ilike(f'%{search_term}%'))
-
-            # Handle numeric fields
-            elif any(num_type in column_type for num_type in ['INTEGER', 'NUMERIC', 'FLOAT', 'DECIMAL']):
-                if is_numeric_search:
-                    search_conditions.append(field == numeric_value)
-
-            # Handle UUID fields
-            elif 'UUID' in column_type:
-                try:
-                    import uuid
-                    id_value = uuid.UUID(search_term)
-                    search_conditions.append(field == id_value)
-                except ValueError:
-                    pass
-
-            # Handle text fields with ILIKE
-            else:
-                search_conditions.append(field.ilike(f'%{search_term}%'))
-
-        # Only apply filter if we have valid conditions
-        if search_conditions:
-            if len(search_conditions) == 1:
-                # Single condition doesn't need OR
-                query = query.filter(search_conditions[0])
-            else:
-                # Multiple conditions need OR
-                query = query.filter(or_(*search_conditions))
-        else:
-            if self.logger:
-                self.logger.debug(f"No search conditions generated for term '{search_term}'")
-
-        return query
+        return SearchPlan.for_model(model_class).apply(query, search_term, search_fields, search_mode)
 
     def _looks_like_date_time(self, search_term):
         """Check if search term looks like it could be a date or time"""
-        if not search_term:
-            return False
-        
-        # Common date/time patterns to check for
-        date_time_indicators = [
-            # Year patterns
-            r'\b(19|20)\d{2}\b',  # 1900-2099
-            # Date separators
-            r'[-/.]',
-            # Month names
-            r'(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)',
-            # Time indicators
-            r'[:\s](am|pm|AM|PM)\b',
-            r'\d{1,2}:\d{2}',  # HH:MM
-            # ISO date patterns
-            r'\d{4}-\d{1,2}',  # YYYY-MM
-            r'\d{1,2}-\d{1,2}',  # MM-DD or DD-MM
-            # Common date formats
-            r'\d{1,2}/\d{1,2}',  # MM/DD or DD/MM
-        ]
-        
-        import re
-        search_lower = search_term.lower()
-        
-        for pattern in date_time_indicators:
-            if re.search(pattern, search_lower):
-                return True
-        
-        # Check if it's just a 4-digit year
-        if re.match(r'^\d{4}$', search_term):
-            try:
-                year = int(search_term)
-                if 1900 <= year <= 2100:
-                    return True
-            except ValueError:
-                pass
-        
-        return False
+        return SearchPlan.looks_like_date_time(search_term)
     
     def _apply_sorting(self, query, model_class, sort_by, sort_order):
         """Apply sorting to query"""
@@ -1302,21 +1205,26 @@ class Miner:
 
     def _get_model_metadata(self, model_class):
         """Get model metadata for slim responses"""
-        # Exclude is_active from metadata columns
-        excluded_fields = ['is_active']
-        columns = [col.name for col in model_class.__table__.columns if col.name not in excluded_fields]
-        
-        return {
-            'columns': columns,
-            'table_name': model_class.__tablename__,
-            'model_name': model_class.__name__
-        }
-    
+        return ModelDescriptor.for_model(model_class).list_metadata
+
     def handle_form_metadata(self, model_class, data, audit_data):
         """
         Handle form_metadata operations - return rich metadata for form generation
         Includes field types, constraints, relationships, and smart FK detection
         """
+        document = ModelDescriptor.for_model(model_class).document('form_metadata', self._build_form_metadata)
+
+        # Update audit data
+        audit_data['operation_details'] = 'form_metadata_retrieved'
+
+        # Outside a request (e.g. the form CLI) hand back a copy of the dict
+        if not has_request_context():
+            return copy.deepcopy(document[0])
+
+        return self._document_response(document)
+
+    def _build_form_metadata(self, model_class):
+        """Build the form metadata document served by handle_form_metadata"""
         # Get basic metadata first
         basic_metadata = self._get_form_basic_metadata(model_class)
         
@@ -1343,20 +1251,8 @@ class Miner:
             'form_config': form_config,
             'primary_key': [col.name for col in model_class.__table__.primary_key][0] if model_class.__table__.primary_key else 'id'
         }
-        
-        # Update audit data
-        audit_data['operation_details'] = 'form_metadata_retrieved'
-        
-        try:
-            return jsonify({
-                'success': True,
-                'metadata': metadata
-            })
-        except:
-            return {
-                'success': True,
-                'metadata': metadata
-            }
+
+        return metadata
 
     def _get_form_basic_metadata(self, model_class):
         """Get basic field metadata for form generation"""
@@ -1684,15 +1580,9 @@ class Miner:
 
     def _get_model_from_table_name(self, table_name):
         """Get model name from table name by looking it up in the registry"""
-        # Import all registered models
-        from app.register.classes import _model_registry
-
-        
-        # Get all models from the registry
-        # Find the model with matching table name
-        for model_name, model_class in _model_registry.items():
-            if hasattr(model_class, '__tablename__') and model_class.__tablename__ == table_name:
-                return model_class.__name__
+        model_name = ModelDescriptor.model_name_for_table(table_name)
+        if model_name:
+            return model_name
         
         # If not found in registry, fall back to simple conversion
         # but log a warning
@@ -10,6 +10,7 @@ import sys
 from tabulate import tabulate
 
 from app.base.cli_v1 import BaseCLI
+from app.register.database import db_registry
 
 CLI_DESCRIPTION = "Test API endpoints with authentication tokens"
 
@@ -115,6 +116,42 @@ class APITestCLI(BaseCLI):
             self.output_error(f"Connection failed: {e}")
             return False
 
+    def search_index(self, model_name, mode, columns=None, drop=False, dry_run=False):
+        """Create (or drop) the Postgres indexes behind a model's search mode"""
+        from app.classes import SearchPlan
+
+        model_class = self.get_model(model_name)
+        if not model_class:
+            self.output_error(f"Model {model_name} not found")
+            return 1
+
+        try:
+            statements = SearchPlan.for_model(model_class).index_statements(mode, columns, drop)
+        except Exception as e:
+            self.output_error(str(e))
+            return 1
+
+        if dry_run:
+            for statement in statements:
+                print(statement)
+            return 0
+
+        # CONCURRENTLY can't run inside a transaction block
+        bind_key = getattr(model_class, '__bind_key__', None)
+        engine = db_registry.get_or_create_engine(bind_key) if bind_key else db_registry.main_engine
+        try:
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                for statement in statements:
+                    self.output_info(statement)
+                    connection.exec_driver_sql(statement)
+        except Exception as e:
+            self.log_error(f"Error building search indexes: {e}")
+            self.output_error(f"Error building search indexes: {e}")
+            return 1
+
+        self.output_success(f"{model_name} search indexes {'dropped' if drop else 'ready'} for mode '{mode}'")
+        return 0
+
 
 def main():
     """Entry point"""
@@ -143,6 +180,14 @@ def main():
     full_parser.add_argument('model', help='Model name')
     full_parser.add_argument('--data', help='JSON test data for create', default='{"name": "Test Record"}')
     
+    # Search index command
+    index_parser = subparsers.add_parser('search-index', help='Create indexes backing a model search mode (Postgres)')
+    index_parser.add_argument('model', help='Model name')
+    index_parser.add_argument('mode', choices=['trigram', 'prefix', 'fulltext'])
+    index_parser.add_argument('--columns', help='Comma separated text columns (default: model search columns)')
+    index_parser.add_argument('--drop', action='store_true', help='Drop the indexes instead')
+    index_parser.add_argument('--dry-run', action='store_true', help='Print the SQL without running it')
+    
     args = parser.parse_args()
     
     if not args.command:
@@ -169,6 +214,10 @@ def main():
             results = cli.run_full_test(args.base_url, args.token, args.model, test_data)
             # Return 0 if all tests passed
             return 0 if all(r == 'PASS' for r in results.values()) else 1
+
+        elif args.command == 'search-index':
+            columns = [c.strip() for c in args.columns.split(',') if c.strip()] if args.columns else None
+            return cli.search_index(args.model, args.mode, columns, args.drop, args.dry_run)
             
     except KeyboardInterrupt:
         cli.output_info("\nOperation cancelled")
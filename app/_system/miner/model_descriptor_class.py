@@ -0,0 +1,124 @@
+import json
+import hashlib
+import logging
+import threading
+
+from sqlalchemy import inspect
+
+from app.utils import SQLAlchemyEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class ModelDescriptor:
+    """
+    Per-model structure the Miner needs on every request, computed once
+
+    Model classes do not change once the process is up, so the primary key
+    attribute, column lists, column kinds and the metadata / form_metadata
+    documents are built on first use (or for every model by build_all() when
+    the Miner starts) and served from memory. Documents are kept
+    pre-encoded with an ETag so clients can revalidate with a 304.
+    """
+    __depends_on__ = []
+
+    EXCLUDED_FIELDS = ('is_active',)
+
+    _descriptors = {}  # model class -> ModelDescriptor
+    _table_models = None  # table name -> model name
+    _lock = threading.Lock()
+
+    def __init__(self, model_class):
+        mapper = inspect(model_class)
+        table = model_class.__table__
+
+        self.model_class = model_class
+        self.pk_field = self._find_pk_field(model_class, mapper, table)
+        self.columns = [column.name for column in table.columns if column.name not in self.EXCLUDED_FIELDS]
+        self.column_kinds = {column.name: self.column_kind(column) for column in table.columns}
+        self.list_metadata = {
+            'columns': self.columns,
+            'table_name': model_class.__tablename__,
+            'model_name': model_class.__name__
+        }
+        self._documents = {}  # name -> (payload, body, etag)
+
+    @classmethod
+    def for_model(cls, model_class):
+        """Get the descriptor for a model class, building it on first use"""
+        descriptor = cls._descriptors.get(model_class)
+        if descriptor is None:
+            descriptor = cls(model_class)
+            with cls._lock:
+                descriptor = cls._descriptors.setdefault(model_class, descriptor)
+        return descriptor
+
+    @classmethod
+    def build_all(cls, miner):
+        """Build descriptors and metadata documents for every registered model"""
+        from app.register.classes import _model_registry
+
+        for model_name, model_class in _model_registry.items():
+            try:
+                descriptor = cls.for_model(model_class)
+                descriptor.document('metadata', miner._build_metadata)
+                descriptor.document('form_metadata', miner._build_form_metadata)
+            except Exception as e:
+                # Left to the first request for this model, which reports the error
+                logger.warning(f"Could not prebuild metadata for {model_name}: {e}")
+
+    @classmethod
+    def model_name_for_table(cls, table_name):
+        """Get the registered model name for a table, or None"""
+        if cls._table_models is None:
+            from app.register.classes import _model_registry
+            cls._table_models = {
+                model_class.__tablename__: model_class.__name__
+                for model_class in _model_registry.values()
+                if hasattr(model_class, '__tablename__')
+            }
+        return cls._table_models.get(table_name)
+
+    def document(self, name, build):
+        """
+        Get a pre-encoded response document, calling build(model_class) once
+
+        Returns:
+            (payload, body, etag): the response dict, its JSON bytes and ETag
+        """
+        document = self._documents.get(name)
+        if document is None:
+            payload = {
+                'success': True,
+                'metadata': build(self.model_class)
+            }
+            body = json.dumps(payload, cls=SQLAlchemyEncoder, indent=2).encode('utf-8')
+            etag = hashlib.sha256(body).hexdigest()[:32]
+            with self._lock:
+                document = self._documents.setdefault(name, (payload, body, etag))
+        return document
+
+    @staticmethod
+    def column_kind(column):
+        """Classify a column as boolean, datetime, numeric, uuid, text or other"""
+        column_type = str(column.type).upper()
+        if 'BOOLEAN' in column_type:
+            return 'boolean'
+        if 'DATE' in column_type or 'TIME' in column_type or 'TIMESTAMP' in column_type:
+            return 'datetime'
+        if any(num_type in column_type for num_type in ['INTEGER', 'NUMERIC', 'FLOAT', 'DECIMAL']):
+            return 'numeric'
+        if 'UUID' in column_type:
+            return 'uuid'
+        if any(text_type in column_type for text_type in ['VARCHAR', 'TEXT', 'STRING', 'CHAR']):
+            return 'text'
+        return 'other'
+
+    @staticmethod
+    def _find_pk_field(model_class, mapper, table):
+        """Attribute name of the first primary key column, or None"""
+        pk_columns = list(table.primary_key.columns)
+        if not pk_columns:
+            # Fallback to 'id' if no PK defined
+            return 'id' if hasattr(model_class, 'id') else None
+        return mapper.get_property_by_column(pk_columns[0]).key
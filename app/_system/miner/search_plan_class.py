@@ -0,0 +1,283 @@
+import re
+import uuid
+import threading
+
+from sqlalchemy import func, inspect, or_, cast, String
+from sqlalchemy.dialects import postgresql
+
+from .handler_class import MinerError
+
+# Same indicators the old per-pattern loop checked, as one expression
+DATE_TIME_RE = re.compile(
+    r'\b(19|20)\d{2}\b'                                   # 1900-2099
+    r'|[-/.]'                                             # date separators
+    r'|(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)'  # month names
+    r'|[:\s](am|pm)\b'                                    # time indicators
+    r'|\d{1,2}:\d{2}'                                     # HH:MM
+    r'|\d{4}-\d{1,2}'                                     # YYYY-MM
+    r'|\d{1,2}-\d{1,2}'                                   # MM-DD or DD-MM
+    r'|\d{1,2}/\d{1,2}'                                   # MM/DD or DD/MM
+)
+YEAR_RE = re.compile(r'^\d{4}$')
+
+
+class SearchPlan:
+    """
+    Per-model search plan for Miner list search, built once per model
+
+    Column kinds come from the ModelDescriptor, so a request only
+    classifies the search term and picks the prepared columns. Modes:
+
+    - contains: ILIKE '%term%' on text columns, plus typed matches on
+                numeric, uuid and (for date-like terms) date columns.
+                The original behaviour; sequential scan unless indexed
+    - trigram:  same SQL as contains on text columns only, meant to be
+                backed by pg_trgm GIN indexes
+    - prefix:   lower(column) LIKE 'term%' on text columns, backed by
+                btree (lower(column) text_pattern_ops) indexes
+    - fulltext: one tsvector over the model's search columns matched
+                with plainto_tsquery, backed by a GIN expression index
+
+    Index-backed modes only add conditions their indexes cover (plus the
+    primary key for UUID terms); one unindexed branch in the OR would
+    turn the whole search back into a sequential scan. Models choose
+    defaults with __search_mode__ and __search_columns__; `miner_cli.py
+    search-index` creates the matching indexes.
+    """
+    __depends_on__ = ['ModelDescriptor', 'MinerError']
+
+    MODES = ('contains', 'trigram', 'prefix', 'fulltext')
+    TS_CONFIG = 'simple'
+
+    _plans = {}
+    _lock = threading.Lock()
+
+    def __init__(self, model_class):
+        from app.classes import ModelDescriptor
+
+        descriptor = ModelDescriptor.for_model(model_class)
+        table = model_class.__table__
+
+        self.model_class = model_class
+        self.table_name = table.name
+        self.pk_name = descriptor.pk_field
+        self.kinds = {}
+        self.fields = {}
+        for column in table.columns:
+            if hasattr(model_class, column.name):
+                self.kinds[column.name] = descriptor.column_kinds[column.name]
+                self.fields[column.name] = getattr(model_class, column.name)
+
+        self.columns_by_kind = {}
+        for name, kind in self.kinds.items():
+            self.columns_by_kind.setdefault(kind, []).append(name)
+
+        self.default_mode = getattr(model_class, '__search_mode__', None) or 'contains'
+        self.search_columns = [
+            name for name in (getattr(model_class, '__search_columns__', None) or self.columns_by_kind.get('text', []))
+            if self.kinds.get(name) == 'text'
+        ]
+        self._dialect_name = None
+
+    @classmethod
+    def for_model(cls, model_class):
+        """Get the cached plan for a model"""
+        plan = cls._plans.get(model_class)
+        if plan is None:
+            plan = cls(model_class)
+            with cls._lock:
+                plan = cls._plans.setdefault(model_class, plan)
+        return plan
+
+    @staticmethod
+    def looks_like_date_time(search_term):
+        """Check if search term looks like it could be a date or time"""
+        if not search_term:
+            return False
+        if DATE_TIME_RE.search(search_term.lower()):
+            return True
+        # Just a 4-digit year
+        return bool(YEAR_RE.match(search_term)) and 1900 <= int(search_term) <= 2100
+
+    def resolve_mode(self, requested=None):
+        mode = requested or self.default_mode
+        if mode not in self.MODES:
+            raise MinerError(
+                f"Invalid search_mode '{mode}', expected one of: {', '.join(self.MODES)}",
+                'ValidationError', 400
+            )
+        return mode
+
+    def apply(self, query, search_term, search_fields=None, mode=None):
+        """
+        Apply a search term to a query
+
+        Args:
+            query: ORM query over the plan's model
+            search_term: Raw search string
+            search_fields: Column names to search, or None/[] to auto-detect
+            mode: One of MODES, or None for the model default
+        """
+        if not search_term:
+            return query
+
+        mode = self.resolve_mode(mode)
+        if mode in ('prefix', 'fulltext', 'trigram') and self._dialect(query) != 'postgresql':
+            # Index strategies are Postgres specific; prefix works anywhere
+            if mode != 'prefix':
+                mode = 'contains'
+
+        if mode == 'contains':
+            conditions = self._contains_conditions(search_term, search_fields)
+        else:
+            conditions = self._indexed_conditions(search_term, search_fields, mode)
+
+        if not conditions:
+            return query
+        return query.filter(or_(*conditions))
+
+    def _contains_conditions(self, search_term, search_fields):
+        numeric_value = None
+        try:
+            numeric_value = float(search_term)
+        except ValueError:
+            pass
+        uuid_value = self._uuid_value(search_term)
+        is_date_time_search = self.looks_like_date_time(search_term)
+
+        if search_fields:
+            # Explicit fields: drop booleans, dates unless the term looks like one
+            names = [
+                name for name in search_fields
+                if name in self.kinds
+                and self.kinds[name] != 'boolean'
+                and (self.kinds[name] != 'datetime' or is_date_time_search)
+            ]
+        else:
+            names = list(self.columns_by_kind.get('text', []))
+            if is_date_time_search:
+                names += self.columns_by_kind.get('datetime', [])
+            if numeric_value is not None:
+                names += self.columns_by_kind.get('numeric', [])
+            if uuid_value is not None:
+                names += self.columns_by_kind.get('uuid', [])
+
+        pattern = f'%{search_term}%'
+        conditions = []
+        for name in names:
+            field = self.fields[name]
+            kind = self.kinds[name]
+            if kind == 'datetime':
+                # Cast to text so "2024" matches "2024-01-15 10:30:00"
+                conditions.append(cast(field, String).ilike(pattern))
+            elif kind == 'numeric':
+                if numeric_value is not None:
+                    conditions.append(field == numeric_value)
+            elif kind == 'uuid':
+                if uuid_value is not None:
+                    conditions.append(field == uuid_value)
+            else:
+                conditions.append(field.ilike(pattern))
+        return conditions
+
+    def _indexed_conditions(self, search_term, search_fields, mode):
+        conditions = []
+
+        if mode == 'fulltext':
+            # Must be the exact expression the index was built on
+            if self.search_columns:
+                conditions.append(
+                    self.tsvector(self.search_columns).op('@@')(
+                        func.plainto_tsquery(self.TS_CONFIG, search_term)
+                    )
+                )
+        else:
+            names = [name for name in (search_fields or self.search_columns) if self.kinds.get(name) == 'text']
+            if mode == 'prefix':
+                pattern = self._escape_like(search_term.lower()) + '%'
+                conditions += [func.lower(self.fields[name]).like(pattern, escape='\\') for name in names]
+            else:
+                pattern = f'%{search_term}%'
+                conditions += [self.fields[name].ilike(pattern) for name in names]
+
+        uuid_value = self._uuid_value(search_term)
+        if uuid_value is not None and self.pk_name in self.fields:
+            conditions.append(self.fields[self.pk_name] == uuid_value)
+        return conditions
+
+    def tsvector(self, columns):
+        """The tsvector expression fulltext mode searches and indexes"""
+        document = func.coalesce(self.fields[columns[0]], '')
+        for name in columns[1:]:
+            document = document + ' ' + func.coalesce(self.fields[name], '')
+        return func.to_tsvector(self.TS_CONFIG, document)
+
+    def index_statements(self, mode, columns=None, drop=False):
+        """
+        DDL for the indexes backing an index strategy
+
+        Args:
+            mode: 'trigram', 'prefix' or 'fulltext'
+            columns: Text columns to index (default: the model's search columns);
+                     fulltext always uses the model's search columns so the
+                     index matches the query expression
+            drop: Return DROP statements instead
+
+        Returns:
+            list of SQL strings; CREATE/DROP INDEX CONCURRENTLY, so run them
+            outside a transaction
+        """
+        if mode not in ('trigram', 'prefix', 'fulltext'):
+            raise MinerError(f"No index strategy for search mode '{mode}'", 'ValidationError', 400)
+
+        if mode == 'fulltext':
+            columns = self.search_columns
+        else:
+            columns = columns or self.search_columns
+        invalid = [name for name in columns if self.kinds.get(name) != 'text']
+        if invalid:
+            raise MinerError(f"Not text columns of {self.model_class.__name__}: {', '.join(invalid)}", 'ValidationError', 400)
+        if not columns:
+            raise MinerError(f"{self.model_class.__name__} has no text columns to index", 'ValidationError', 400)
+
+        table = self.table_name
+        if mode == 'fulltext':
+            indexes = [(f'ix_{table}_search_tsv', f'USING gin (({self._compile(self.tsvector(columns))}))')]
+        elif mode == 'prefix':
+            indexes = [(f'ix_{table}_{name}_prefix', f'(lower({name}) text_pattern_ops)') for name in columns]
+        else:
+            indexes = [(f'ix_{table}_{name}_trgm', f'USING gin ({name} gin_trgm_ops)') for name in columns]
+
+        if drop:
+            return [f'DROP INDEX CONCURRENTLY IF EXISTS {index_name}' for index_name, definition in indexes]
+
+        statements = ['CREATE EXTENSION IF NOT EXISTS pg_trgm'] if mode == 'trigram' else []
+        statements += [
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {table} {definition}'
+            for index_name, definition in indexes
+        ]
+        return statements
+
+    def _dialect(self, query):
+        if self._dialect_name is None:
+            bind = query.session.get_bind(mapper=inspect(self.model_class))
+            self._dialect_name = bind.dialect.name
+        return self._dialect_name
+
+    @staticmethod
+    def _compile(expression):
+        return str(expression.compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={'literal_binds': True}
+        ))
+
+    @staticmethod
+    def _uuid_value(search_term):
+        try:
+            return uuid.UUID(search_term)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _escape_like(value):
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
@@ -1,151 +1,146 @@
 import re
-from bs4 import BeautifulSoup, Comment
-from typing import Dict, List, Tuple, Optional
+import html
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.config import config
+
+try:
+    from csscompressor import compress as _compress_css
+except ImportError:
+    _compress_css = None
+
+try:
+    from jsmin import jsmin as _compress_js
+except ImportError:
+    _compress_js = None
+
+
+# One token per match: comments, raw-text elements (whole), doctype /
+# processing instructions, tags, text. A lone '<' that starts nothing
+# valid falls through as text.
+_ATTRS = r'''(?:\s+[^\s"'>/=]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'>]+))?)*'''
+TOKEN_RE = re.compile(
+    r'(?P<comment><!--.*?-->)'
+    r'|(?P<raw>(?P<raw_start><(?P<raw_name>script|style)\b(?P<raw_attrs>' + _ATTRS + r')\s*/?>)(?P<raw_body>.*?)</(?P=raw_name)\s*>)'
+    r'|(?P<decl><![^>]*>|<\?[^>]*>)'
+    r'|(?P<tag><(?P<closing>/)?(?P<name>[a-zA-Z][\w:-]*)(?P<attrs>' + _ATTRS + r')\s*/?>)'
+    r'|(?P<text>[^<]+|<)',
+    re.S | re.I
+)
+ATTR_RE = re.compile(r'''([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?''')
+WHITESPACE_RE = re.compile(r'\s+')
+
+EVENT_HANDLERS = (
+    'onclick', 'onload', 'onchange', 'onsubmit', 'onmouseover',
+    'onmouseout', 'onkeyup', 'onkeydown', 'onfocus', 'onblur',
+    'ondblclick', 'onmousedown', 'onmouseup', 'onmousemove',
+    'onkeypress', 'onerror', 'onresize', 'onscroll'
+)
+PRESERVE_WHITESPACE = ('pre', 'textarea')
 
 
 class HTMLCompressor:
-    """Clean and reorganize HTML template output by consolidating CSS and JS"""
-    __depends_on__=[]
-    
+    """
+    Clean and reorganize HTML template output by consolidating CSS and JS
+
+    Works in one pass over a regex tokenizer instead of building a DOM:
+    tags are only parsed into attributes when they carry something to move
+    (style, on* handlers, stylesheet links, scripts) and everything else is
+    copied through verbatim. The consolidated <style> goes at the end of
+    <head> (start of a fragment) and scripts at the end of <body> (end of a
+    fragment), as before.
+
+    Minified CSS/JS is memoized per worker by content hash, so the inline
+    blocks every page repeats are only minified once.
+    """
+    __depends_on__ = []
+
+    max_cache_size = config.get('html_minify_cache_size', 2000)
+
+    _minified = OrderedDict()  # (kind, content hash) -> minified text
+    _minified_lock = threading.Lock()
+    hits = 0
+    misses = 0
+
     def __init__(self):
         self.css_parts = []
         self.js_parts = []
         self.external_css = []
         self.external_js = []
-        
-    def extract_inline_styles(self, soup: BeautifulSoup) -> None:
-        """Extract all inline style attributes and convert to CSS rules"""
-        elements_with_style = soup.find_all(style=True)
-        for idx, elem in enumerate(elements_with_style):
-            style_content = elem.get('style', '').strip()
-            if style_content:
-                # Generate unique class for this element
-                class_name = f"inline_style_{idx}"
-                existing_classes = elem.get('class', [])
-                if isinstance(existing_classes, str):
-                    existing_classes = existing_classes.split()
-                existing_classes.append(class_name)
-                elem['class'] = ' '.join(existing_classes)
-                
-                # Create CSS rule
-                css_rule = f".{class_name} {{ {style_content} }}"
-                self.css_parts.append(('inline_style', css_rule))
-                
-                # Remove inline style
-                del elem['style']
-
-    def extract_css(self, soup: BeautifulSoup) -> None:
-        """Extract all CSS from style tags and link tags"""
-        # Extract <style> tags
-        style_tags = soup.find_all('style')
-        for tag in style_tags:
-            css_content = tag.string or ''
-            if css_content.strip():
-                self.css_parts.append(('style_tag', css_content))
-            tag.decompose()
-        
-        # Try different ways to find stylesheet links
-        link_tags = []
-        for link in soup.find_all('link'):
-            rel = link.get('rel', [])
-            # Handle rel as list or string
-            if isinstance(rel, list):
-                if 'stylesheet' in rel:
-                    link_tags.append(link)
-            elif isinstance(rel, str):
-                if 'stylesheet' in rel:
-                    link_tags.append(link)
-        
-        # Extract without using decompose
-        for tag in link_tags:
-            href = tag.get('href', '')
-            if href:
-                self.external_css.append(href)
-            # Try extract() instead of decompose()
-            parent = tag.parent
-            tag.extract()
-            # Ensure we're not breaking the tree
-            if parent:
-                parent.smooth()
-
-    def extract_inline_js(self, soup: BeautifulSoup) -> None:
-        """Extract inline JavaScript from event handlers"""
-        # Common event handlers
-        event_handlers = [
-            'onclick', 'onload', 'onchange', 'onsubmit', 'onmouseover',
-            'onmouseout', 'onkeyup', 'onkeydown', 'onfocus', 'onblur',
-            'ondblclick', 'onmousedown', 'onmouseup', 'onmousemove',
-            'onkeypress', 'onerror', 'onresize', 'onscroll'
-        ]
-        
-        for handler in event_handlers:
-            elements_with_handler = soup.find_all(attrs={handler: True})
-            for elem in elements_with_handler:
-                js_content = elem.get(handler, '').strip()
-                if js_content:
-                    # Generate unique function name
-                    func_name = f"{handler}_{id(elem)}"
-                    
-                    # Wrap in function and bind to element
-                    js_function = f"""
-// Inline {handler} handler
-function {func_name}(event) {{
-    {js_content}
-}}
-document.addEventListener('DOMContentLoaded', function() {{
-    var elem = document.querySelector('[data-handler-id="{func_name}"]');
-    if (elem) {{
-        elem.addEventListener('{handler[2:]}', {func_name});
-    }}
-}});
-"""
-                    self.js_parts.append(('inline_handler', js_function))
-                    
-                    # Add data attribute for binding
-                    elem['data-handler-id'] = func_name
-                    
-                    # Remove inline handler
-                    del elem[handler]
-    
-    
+
+    @classmethod
+    def _memoized(cls, kind, content, minify):
+        key = (kind, hashlib.sha1(content.encode('utf-8')).digest())
+        with cls._minified_lock:
+            result = cls._minified.get(key)
+            if result is not None:
+                cls._minified.move_to_end(key)
+                cls.hits += 1
+                return result
+
+        cls.misses += 1
+        result = minify(content)
+
+        with cls._minified_lock:
+            cls._minified[key] = result
+            while len(cls._minified) > cls.max_cache_size:
+                cls._minified.popitem(last=False)
+        return result
+
+    @classmethod
+    def stats(cls):
+        return {
+            'minified': len(cls._minified),
+            'max_size': cls.max_cache_size,
+            'hits': cls.hits,
+            'misses': cls.misses,
+        }
+
     def minify_css_content(self, css: str) -> str:
         """Basic CSS minification"""
-        try:
-            from csscompressor import compress
-            return compress(css)
-        except ImportError:
-            # Fallback to basic minification
-            # Remove comments
-            css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
-            # Remove unnecessary whitespace
-            css = re.sub(r'\s+', ' ', css)
-            css = re.sub(r'\s*([{}:;,])\s*', r'\1', css)
-            return css.strip()
-    
+        return self._memoized('css', css, self._minify_css)
+
     def minify_js_content(self, js: str) -> str:
         """Basic JavaScript minification"""
-        try:
-            from jsmin import jsmin
-            return jsmin(js)
-        except ImportError:
-            # Fallback to basic minification
-            # Remove single-line comments
-            js = re.sub(r'//.*?$', '', js, flags=re.MULTILINE)
-            # Remove multi-line comments
-            js = re.sub(r'/\*.*?\*/', '', js, flags=re.DOTALL)
-            # Remove unnecessary whitespace
-            js = re.sub(r'\s+', ' ', js)
-            js = re.sub(r'\s*([{}();,=+\-*/])\s*', r'\1', js)
-            return js.strip()
-    
+        return self._memoized('js', js, self._minify_js)
+
+    @staticmethod
+    def _minify_css(css: str) -> str:
+        if _compress_css is not None:
+            return _compress_css(css)
+        # Fallback to basic minification
+        # Remove comments
+        css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+        # Remove unnecessary whitespace
+        css = re.sub(r'\s+', ' ', css)
+        css = re.sub(r'\s*([{}:;,])\s*', r'\1', css)
+        return css.strip()
+
+    @staticmethod
+    def _minify_js(js: str) -> str:
+        if _compress_js is not None:
+            return _compress_js(js)
+        # Fallback to basic minification
+        # Remove single-line comments
+        js = re.sub(r'//.*?$', '', js, flags=re.MULTILINE)
+        # Remove multi-line comments
+        js = re.sub(r'/\*.*?\*/', '', js, flags=re.DOTALL)
+        # Remove unnecessary whitespace
+        js = re.sub(r'\s+', ' ', js)
+        js = re.sub(r'\s*([{}();,=+\-*/])\s*', r'\1', js)
+        return js.strip()
+
     def build_consolidated_css(self, minify: bool = False) -> str:
         """Build consolidated CSS block"""
         css_blocks = []
-        
+
         # Add external CSS references first
         for href in self.external_css:
             css_blocks.append(f'@import url("{href}");')
-        
+
         # Add all CSS content in order
         for source, content in self.css_parts:
             if content.strip():
@@ -154,16 +149,14 @@ document.addEventListener('DOMContentLoaded', function() {{
                 else:
                     css_blocks.append(f"/* Source: {source} */")
                 css_blocks.append(content)
-        
+
         separator = '' if minify else '\n\n'
-        combined_css = separator.join(css_blocks)
-        
-        return combined_css
-    
+        return separator.join(css_blocks)
+
     def build_consolidated_js(self, minify: bool = False) -> str:
         """Build consolidated JavaScript block"""
         js_blocks = []
-        
+
         # Only consolidate inline JS content
         for source, content in self.js_parts:
             if content.strip():
@@ -172,73 +165,11 @@ document.addEventListener('DOMContentLoaded', function() {{
                 else:
                     js_blocks.append(f"// Source: {source}")
                 js_blocks.append(content)
-        
+
         separator = '' if minify else '\n\n'
-        combined_js = separator.join(js_blocks)
-        
-        return combined_js
-    
-    def extract_javascript(self, soup: BeautifulSoup) -> None:
-        """Extract all JavaScript from script tags"""
-        script_tags = soup.find_all('script')
-        for tag in script_tags:
-            src = tag.get('src', '')
-            if src:
-                # Store as dictionary with tag attributes to recreate later
-                tag_attrs = dict(tag.attrs)
-                self.external_js.append(tag_attrs)
-                tag.decompose()
-            else:
-                js_content = tag.string or ''
-                if js_content.strip():
-                    self.js_parts.append(('script_tag', js_content))
-                tag.decompose()
-
-    def fix_unclosed_tags(self, html_content: str) -> str:
-        """Fix unclosed self-closing tags like <link>, <meta>, <img>, etc."""
-        # List of tags that should be self-closing
-        self_closing_tags = ['link', 'meta', 'img', 'br', 'hr', 'input', 'area', 'base', 'col', 'embed', 'source', 'track', 'wbr']
-        
-        for tag in self_closing_tags:
-            # Pattern: <tag ...> followed by anything that's not whitespace/newline and not another tag
-            # If we find content between the tag and the next tag, close it
-            pattern = rf'(<{tag}\b[^>]*>)(\s*[^\s<]+)'
-            
-            def replace_func(match):
-                tag_part = match.group(1)
-                content_after = match.group(2)
-                
-                # If the tag already ends with />, leave it alone
-                if tag_part.rstrip().endswith('/>'):
-                    return match.group(0)
-                
-                # If there's non-whitespace content after the tag, close it
-                if content_after.strip():
-                    # Remove any trailing > and add />
-                    closed_tag = tag_part[:-1] + ' />'
-                    return closed_tag + content_after
-                else:
-                    return match.group(0)
-            
-            html_content = re.sub(pattern, replace_func, html_content, flags=re.IGNORECASE)
-        
-        return html_content
-
-    def fix_self_closing_tags(self, html_content: str) -> str:
-        """Convert self-closing tags to regular open/close pairs"""
-        # Tags that are commonly self-closing but can be regular tags
-        void_elements = ['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr']
-        
-        for tag in void_elements:
-            # Pattern to match self-closing tags: <tag ... />
-            pattern = rf'<{tag}\b([^>]*?)\s*/>'
-            # Replace with open and close tags: <tag ...></tag>
-            replacement = rf'<{tag}\1></{tag}>'
-            html_content = re.sub(pattern, replacement, html_content, flags=re.IGNORECASE)
-        
-        return html_content
-
-    def clean_html(self, 
+        return separator.join(js_blocks)
+
+    def clean_html(self,
             html_content: str,
             consolidate_css: bool = True,
             consolidate_js: bool = True,
@@ -251,135 +182,260 @@ document.addEventListener('DOMContentLoaded', function() {{
         # Early return if no options are enabled
         if not any([consolidate_css, consolidate_js, minify_css, minify_js, minify_html]):
             return html_content
-        
+
         # Reset state
         self.css_parts = []
         self.js_parts = []
         self.external_css = []
         self.external_js = []
-        
-        # Fix unclosed tags before parsing
-        html_content = self.fix_unclosed_tags(html_content)
-        html_content = self.fix_self_closing_tags(html_content)
-        
-        # Parse HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Detect if this is a fragment (no html or body tags)
-        is_fragment = not soup.find('html') and not soup.find('body')
-        
-        # Extract CSS if consolidating
-        if consolidate_css:
-            self.extract_inline_styles(soup)
-            self.extract_css(soup)
-        elif minify_css:
-            # Minify CSS in place without consolidating
-            style_tags = soup.find_all('style')
-            for tag in style_tags:
-                if tag.string:
-                    tag.string = self.minify_css_content(tag.string)
-            
-            # Minify inline styles
-            elements_with_style = soup.find_all(style=True)
-            for elem in elements_with_style:
-                style_content = elem.get('style', '').strip()
-                if style_content:
-                    elem['style'] = self.minify_css_content(f"dummy{{{style_content}}}")[5:-1]
-        
-        # Extract JS if consolidating
-        if consolidate_js:
-            self.extract_inline_js(soup)
-            self.extract_javascript(soup)
-        elif minify_js:
-            # Minify JS in place without consolidating
-            script_tags = soup.find_all('script')
-            for tag in script_tags:
-                if not tag.get('src') and tag.string:
-                    tag.string = self.minify_js_content(tag.string)
-            
-            # Minify inline event handlers
-            event_handlers = [
-                'onclick', 'onload', 'onchange', 'onsubmit', 'onmouseover',
-                'onmouseout', 'onkeyup', 'onkeydown', 'onfocus', 'onblur',
-                'ondblclick', 'onmousedown', 'onmouseup', 'onmousemove',
-                'onkeypress', 'onerror', 'onresize', 'onscroll'
-            ]
-            for handler in event_handlers:
-                elements_with_handler = soup.find_all(attrs={handler: True})
-                for elem in elements_with_handler:
-                    js_content = elem.get(handler, '').strip()
-                    if js_content:
-                        elem[handler] = self.minify_js_content(js_content)
-        
-        # Add consolidated CSS
+
+        inline_styles = []
+        style_tags = []
+        handlers: Dict[str, List[str]] = {}
+        scripts = []
+        style_index = 0
+        handler_index = 0
+
+        out = []
+        slots = {}  # where consolidated blocks go: name -> index into out
+        preserve = 0  # depth inside <pre>/<textarea>
+
+        for match in TOKEN_RE.finditer(html_content):
+            if match.group('text') is not None:
+                text = match.group(0)
+                if minify_html and not preserve:
+                    text = WHITESPACE_RE.sub(' ', text)
+                out.append(text)
+
+            elif match.group('tag') is not None:
+                token = match.group(0)
+                name = match.group('name').lower()
+
+                if match.group('closing'):
+                    if name in PRESERVE_WHITESPACE and preserve:
+                        preserve -= 1
+                    elif name == 'head' and 'head_close' not in slots:
+                        slots['head_close'] = len(out)
+                    elif name == 'body':
+                        slots['body_close'] = len(out)
+                    elif name == 'html':
+                        slots['html_close'] = len(out)
+                    out.append(token)
+                    continue
+
+                if name in PRESERVE_WHITESPACE and not token.endswith('/>'):
+                    preserve += 1
+                elif name == 'html':
+                    slots.setdefault('html_open', len(out) + 1)
+                elif name == 'head':
+                    slots.setdefault('head_open', len(out) + 1)
+                elif name == 'body':
+                    slots.setdefault('body_open', len(out) + 1)
+
+                attrs_text = match.group('attrs')
+                if not attrs_text:
+                    out.append(token)
+                    continue
+
+                lowered = attrs_text.lower()
+                if name == 'link' and consolidate_css and 'stylesheet' in lowered:
+                    attrs = self._parse_attrs(attrs_text)
+                    if 'stylesheet' in (self._attr(attrs, 'rel') or '').lower().split():
+                        href = self._attr(attrs, 'href')
+                        if href:
+                            self.external_css.append(href)
+                        continue
+
+                has_style = 'style' in lowered
+                has_handler = 'on' in lowered
+                if not (has_style and (consolidate_css or minify_css)) and not (has_handler and (consolidate_js or minify_js)):
+                    out.append(token)
+                    continue
+
+                attrs = self._parse_attrs(attrs_text)
+                changed = False
+
+                style = self._attr(attrs, 'style')
+                if style is not None and (consolidate_css or minify_css):
+                    style_content = style.strip()
+                    if consolidate_css:
+                        if style_content:
+                            # Unique class for this element replaces the style attribute
+                            class_name = f"inline_style_{style_index}"
+                            existing = self._attr(attrs, 'class')
+                            self._set_attr(attrs, 'class', f"{existing} {class_name}".strip() if existing else class_name)
+                            self._del_attr(attrs, 'style')
+                            inline_styles.append(f".{class_name} {{ {style_content} }}")
+                            changed = True
+                        style_index += 1
+                    elif style_content:
+                        self._set_attr(attrs, 'style', self.minify_css_content(f"dummy{{{style_content}}}")[6:-1])
+                        changed = True
+
+                if consolidate_js or minify_js:
+                    element_id = None
+                    for attr_name, value in list(attrs):
+                        handler = attr_name.lower()
+                        if handler not in EVENT_HANDLERS or value is None:
+                            continue
+                        js_content = value.strip()
+                        if not js_content:
+                            continue
+                        if consolidate_js:
+                            if element_id is None:
+                                element_id = f"h{handler_index}"
+                                handler_index += 1
+                            func_name = f"{handler}_{element_id}"
+                            handlers.setdefault(handler, []).append(self._handler_function(handler, func_name, element_id, js_content))
+                            self._del_attr(attrs, attr_name)
+                        else:
+                            self._set_attr(attrs, attr_name, self.minify_js_content(js_content))
+                        changed = True
+                    if element_id is not None:
+                        self._set_attr(attrs, 'data-handler-id', element_id)
+
+                out.append(self._build_tag(match.group('name'), attrs, token) if changed else token)
+
+            elif match.group('raw') is not None:
+                raw_name = match.group('raw_name').lower()
+                attrs_text = match.group('raw_attrs')
+                body = match.group('raw_body')
+                start_tag = match.group('raw_start')
+
+                if raw_name == 'style':
+                    if consolidate_css:
+                        if body.strip():
+                            style_tags.append(body)
+                    elif minify_css and body:
+                        out.append(f"{start_tag}{self.minify_css_content(body)}</style>")
+                    else:
+                        out.append(match.group(0))
+                    continue
+
+                attrs = self._parse_attrs(attrs_text) if attrs_text else []
+                if self._attr(attrs, 'src'):
+                    if consolidate_js:
+                        # Re-added at the end of the body, after everything else
+                        self.external_js.append(dict((k, v) for k, v in attrs))
+                        scripts.append(start_tag)
+                    else:
+                        out.append(match.group(0))
+                elif consolidate_js:
+                    if body.strip():
+                        self.js_parts.append(('script_tag', body))
+                elif minify_js and body:
+                    out.append(f"{start_tag}{self.minify_js_content(body)}</script>")
+                else:
+                    out.append(match.group(0))
+
+            elif match.group('comment') is not None:
+                comment = match.group(0)
+                # Conditional comments carry markup for old IE; keep those
+                if not minify_html or comment.startswith('<!--[if'):
+                    out.append(comment)
+
+            else:
+                out.append(match.group(0))
+
+        # Inline styles come before <style> blocks, handlers before <script> blocks
+        self.css_parts = [('inline_style', rule) for rule in inline_styles] + [('style_tag', css) for css in style_tags]
+        self.js_parts = [
+            ('inline_handler', function)
+            for handler in EVENT_HANDLERS for function in handlers.get(handler, [])
+        ] + self.js_parts
+
+        is_fragment = 'html_open' not in slots and 'body_open' not in slots
+        inserts = []
+
         if consolidate_css:
             consolidated_css = self.build_consolidated_css(minify_css)
             if consolidated_css.strip():
+                block = f"<style>{consolidated_css}</style>"
                 if is_fragment:
-                    # For fragments, just add style tag at the beginning
-                    style_tag = soup.new_tag('style')
-                    style_tag.string = consolidated_css
-                    soup.insert(0, style_tag)
+                    position = 0
+                elif 'head_close' in slots or 'head_open' in slots:
+                    position = slots.get('head_close', slots.get('head_open'))
                 else:
-                    # For full HTML, find or create head
-                    head = soup.find('head')
-                    if not head:
-                        head = soup.new_tag('head')
-                        html_tag = soup.find('html')
-                        if html_tag:
-                            html_tag.insert(0, head)
-                        else:
-                            soup.insert(0, head)
-                    
-                    # Add consolidated CSS
-                    style_tag = soup.new_tag('style')
-                    style_tag.string = consolidated_css
-                    head.append(style_tag)
-        
-        # Add consolidated JS
+                    # Full document without a head: give it one
+                    position = slots.get('html_open', 0)
+                    block = f"<head>{block}</head>"
+                inserts.append((position, block))
+
         if consolidate_js:
-            if is_fragment:
-                # For fragments, append scripts at the end without creating body
-                # Re-add all external scripts
-                for script_attrs in self.external_js:
-                    script_tag = soup.new_tag('script', attrs=script_attrs)
-                    soup.append(script_tag)
-                
-                # Then add consolidated inline JS
-                consolidated_js = self.build_consolidated_js(minify_js)
-                if consolidated_js.strip():
-                    script_tag = soup.new_tag('script')
-                    script_tag.string = consolidated_js
-                    soup.append(script_tag)
+            blocks = [f"{start_tag}</script>" for start_tag in scripts]
+            consolidated_js = self.build_consolidated_js(minify_js)
+            if consolidated_js.strip():
+                blocks.append(f"<script>{consolidated_js}</script>")
+            if blocks:
+                if is_fragment:
+                    position = len(out)
+                else:
+                    position = slots.get('body_close', slots.get('html_close', len(out)))
+                inserts.append((position, ''.join(blocks)))
+
+        # Insert from the back so earlier positions stay valid
+        for position, block in sorted(inserts, key=lambda insert: insert[0], reverse=True):
+            out.insert(position, block)
+
+        return ''.join(out)
+
+    @staticmethod
+    def _handler_function(handler, func_name, element_id, js_content):
+        return f"""
+// Inline {handler} handler
+function {func_name}(event) {{
+    {js_content}
+}}
+document.addEventListener('DOMContentLoaded', function() {{
+    var elem = document.querySelector('[data-handler-id="{element_id}"]');
+    if (elem) {{
+        elem.addEventListener('{handler[2:]}', {func_name});
+    }}
+}});
+"""
+
+    @staticmethod
+    def _parse_attrs(attrs_text):
+        """Parse a tag's attributes into [name, value] pairs, entities decoded"""
+        attrs = []
+        for match in ATTR_RE.finditer(attrs_text):
+            name, double, single, bare = match.groups()
+            value = next((v for v in (double, single, bare) if v is not None), None)
+            # None marks a valueless attribute like `disabled`
+            attrs.append([name, html.unescape(value) if value is not None else None])
+        return attrs
+
+    @staticmethod
+    def _attr(attrs, name) -> Optional[str]:
+        for attr_name, value in attrs:
+            if attr_name.lower() == name:
+                return value
+        return None
+
+    @staticmethod
+    def _set_attr(attrs, name, value):
+        for attr in attrs:
+            if attr[0].lower() == name:
+                attr[1] = value
+                return
+        attrs.append([name, value])
+
+    @staticmethod
+    def _del_attr(attrs, name):
+        attrs[:] = [attr for attr in attrs if attr[0].lower() != name.lower()]
+
+    @staticmethod
+    def _build_tag(name, attrs, original):
+        parts = [name]
+        for attr_name, value in attrs:
+            if value is None:
+                parts.append(attr_name)
             else:
-                # For full HTML, find or create body
-                body = soup.find('body')
-                if not body:
-                    body = soup.new_tag('body')
-                    html_tag = soup.find('html')
-                    if html_tag:
-                        html_tag.append(body)
-                    else:
-                        soup.append(body)
-                
-                # Re-add all external scripts at end of body
-                for script_attrs in self.external_js:
-                    script_tag = soup.new_tag('script', attrs=script_attrs)
-                    body.append(script_tag)
-                
-                # Then add consolidated inline JS
-                consolidated_js = self.build_consolidated_js(minify_js)
-                if consolidated_js.strip():
-                    script_tag = soup.new_tag('script')
-                    script_tag.string = consolidated_js
-                    body.append(script_tag)
-        
-        # Return prettified or minified HTML
-        if minify_html:
-            return str(soup)
-        else:
-            return soup.prettify()
-        
+                parts.append(f'{attr_name}="{html.escape(value, quote=True)}"')
+        closing = ' />' if original.endswith('/>') else '>'
+        return f"<{' '.join(parts)}{closing}"
+
+
 def clean_template_output(html_content: str,
                          consolidate_css: bool = True,
                          consolidate_js: bool = True,
@@ -388,7 +444,7 @@ def clean_template_output(html_content: str,
                          minify_html: bool = False) -> str:
     """
     Clean and reorganize HTML template output
-    
+
     Args:
         html_content: HTML string from template renderer
         consolidate_css: Whether to consolidate CSS into head
@@ -396,14 +452,14 @@ def clean_template_output(html_content: str,
         minify_css: Whether to minify CSS content
         minify_js: Whether to minify JavaScript content
         minify_html: Whether to minify the output HTML
-        
+
     Returns:
         Cleaned HTML with optional consolidation and minification
     """
     cleaner = HTMLCompressor()
-    return cleaner.clean_html(html_content, 
+    return cleaner.clean_html(html_content,
                              consolidate_css=consolidate_css,
                              consolidate_js=consolidate_js,
                              minify_css=minify_css,
                              minify_js=minify_js,
-                             minify_html=minify_html)
\ No newline at end of file
+                             minify_html=minify_html)
@@ -0,0 +1,167 @@
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class PageOutputCache:
+    """
+    Cache of fully rendered pages (after theme CSS, menus and HTML compression)
+
+    Entries are keyed by:
+        - page id and the ids + content hashes of its active fragments
+        - the 'templates' stamp (template fragments) and the 'page_output'
+          stamp (pages, templates, themes, menus, site config)
+        - the viewer variant: anonymous, or role + set of available menus
+        - the HTMX fragment-only flag and the request's query string
+    so any committed change - publish/unpublish, fragment activation,
+    theme or menu edits - moves every worker to new keys.
+
+    Off unless page_output_cache_enabled is set: role scoped entries are
+    shared by every user with the same role and menus, so only turn it on
+    for sites whose pages do not print per-user details (or give those
+    pages a cache_duration of 0). Entries live for the page's
+    cache_duration.
+
+    Each worker keeps a bounded LRU; set page_output_cache_dir to also share
+    entries between workers through a cachelib FileSystemCache.
+    """
+    __depends_on__ = ['VersionStamp', 'TemplateCache', 'Page', 'Template', 'Theme', 'SiteConfig',
+                      'Menu', 'MenuTier', 'MenuLink']
+
+    VERSION_KEY = 'page_output'
+
+    enabled = config.get('page_output_cache_enabled', False)
+    max_size = config.get('page_output_cache_size', 1000)
+    shared_dir = config.get('page_output_cache_dir', '')
+
+    _entries = OrderedDict()  # key -> (page id, body, etag, expires_at)
+    _lock = threading.Lock()
+    _shared = None
+    _shared_failed = False
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def register_invalidation(cls):
+        """Bump the page_output stamp on any committed change that shows up in a rendered page"""
+        from app.classes import VersionStamp
+        from app.models import Page, Template, Theme, SiteConfig, Menu, MenuTier, MenuLink
+
+        for model in (Page, Template, Theme, SiteConfig, Menu, MenuTier, MenuLink):
+            VersionStamp.watch(model, cls.VERSION_KEY)
+
+    @classmethod
+    def invalidate(cls):
+        """Drop every cached page in every worker"""
+        from app.classes import VersionStamp
+        VersionStamp.bump(cls.VERSION_KEY)
+
+    @classmethod
+    def make_key(cls, page_id, fragment_signature, variant, fragment_only, query_string=b''):
+        """Build the cache key for one rendering of a page"""
+        from app.classes import VersionStamp, TemplateCache
+
+        parts = (
+            str(page_id),
+            fragment_signature,
+            VersionStamp.current(TemplateCache.VERSION_KEY),
+            VersionStamp.current(cls.VERSION_KEY),
+            variant,
+            bool(fragment_only),
+            query_string,
+        )
+        return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def get(cls, key):
+        """Get (body, etag) for a key, or None"""
+        now = time.time()
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None:
+                if entry[3] > now:
+                    cls._entries.move_to_end(key)
+                    cls.hits += 1
+                    return entry[1], entry[2]
+                del cls._entries[key]
+
+        shared = cls._get_shared()
+        if shared is not None:
+            try:
+                entry = shared.get(key)
+            except Exception as e:
+                logger.error(f"Shared page cache read failed: {e}")
+                entry = None
+            if entry is not None and entry[3] > now:
+                cls._store(key, entry)
+                cls.hits += 1
+                return entry[1], entry[2]
+
+        cls.misses += 1
+        return None
+
+    @classmethod
+    def put(cls, key, page_id, body, ttl):
+        """Cache a rendered page for ttl seconds and return its ETag"""
+        etag = hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+        entry = (str(page_id), body, etag, time.time() + ttl)
+        cls._store(key, entry)
+
+        shared = cls._get_shared()
+        if shared is not None:
+            try:
+                shared.set(key, entry, timeout=int(ttl))
+            except Exception as e:
+                logger.error(f"Shared page cache write failed: {e}")
+        return etag
+
+    @classmethod
+    def evict_page(cls, page_id):
+        """Drop this worker's cached renderings of a page"""
+        page_id = str(page_id)
+        with cls._lock:
+            for key in [key for key, entry in cls._entries.items() if entry[0] == page_id]:
+                del cls._entries[key]
+
+    @classmethod
+    def stats(cls):
+        return {
+            'enabled': cls.enabled,
+            'entries': len(cls._entries),
+            'max_size': cls.max_size,
+            'hits': cls.hits,
+            'misses': cls.misses,
+            'shared_dir': cls.shared_dir or None,
+        }
+
+    @classmethod
+    def _store(cls, key, entry):
+        with cls._lock:
+            cls._entries[key] = entry
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > cls.max_size:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def _get_shared(cls):
+        """Get the cross-worker store, or None when not configured"""
+        if not cls.shared_dir or cls._shared_failed:
+            return None
+        if cls._shared is None:
+            try:
+                from cachelib import FileSystemCache
+                cls._shared = FileSystemCache(cls.shared_dir, threshold=cls.max_size)
+            except Exception as e:
+                logger.error(f"Shared page cache unavailable, using per-worker cache only: {e}")
+                cls._shared_failed = True
+                return None
+        return cls._shared
+
+
+PageOutputCache.register_invalidation()
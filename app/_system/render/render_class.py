@@ -1,12 +1,19 @@
+import re
 import logging
-from jinja2 import Environment as JinjaEnvironment, BaseLoader, TemplateNotFound, pass_context, Undefined
+import threading
+from contextlib import contextmanager
+from jinja2 import Environment as JinjaEnvironment, Template as JinjaTemplate, BaseLoader, TemplateNotFound, pass_context, Undefined
 from flask import current_app, has_app_context, request, g
 import uuid
 
 from app.register.database import db_registry
+from app.config import config
 
 from pprint import pprint
 
+# Body of a {% block content %} ... {% endblock %} page fragment
+CONTENT_BLOCK_RE = re.compile(r'{%\s*block\s+content\s*%}(.*?){%\s*endblock\s*%}', re.DOTALL)
+
 class SilentUndefined(Undefined):
     """
     A truly silent undefined that handles all cases including format operations.
@@ -170,36 +177,125 @@ class ContextWrapper:
         return getattr(self._data, name)
   
 
+class ContextAwareTemplate(JinjaTemplate):
+    """
+    Template that renders inside a processor scope of its environment
+
+    Flask context processor results are merged into every new top-level
+    context (explicitly passed variables win, as in Flask). Nested
+    template.render() calls - fragment includes - share the processor
+    results computed for the outermost render.
+    """
+    __depends_on__ = []
+
+    def render(self, *args, **kwargs):
+        with self.environment.render_scope():
+            return super().render(*args, **kwargs)
+
+    @classmethod
+    def _from_namespace(cls, environment, namespace, globals):
+        template = super()._from_namespace(environment, namespace, globals)
+
+        # While a fragment renders, relative names inside it resolve against
+        # it: its context is pushed for exactly the length of its render
+        parts = (template.name or '').split(':')
+        if len(parts) == 3:
+            context_type = parts[0].replace('_fragment', '')
+            root_render_func = template.root_render_func
+
+            def render_in_context(context):
+                renderer = environment._renderer
+                if renderer is None:
+                    yield from root_render_func(context)
+                    return
+                renderer._push_context(context_type, parts[1], parts[2])
+                try:
+                    yield from root_render_func(context)
+                finally:
+                    renderer._pop_context()
+
+            template.root_render_func = render_in_context
+        return template
+
+    def new_context(self, vars=None, shared=False, locals=None):
+        # Shared contexts ({% include %}) already carry the parent's variables
+        if not shared:
+            processor_vars = self.environment.processor_context()
+            if processor_vars:
+                vars = {**processor_vars, **(vars or {})}
+        return super().new_context(vars, shared, locals)
+
+
 class ContextAwareEnvironment(JinjaEnvironment):
-    __depends_on__=[]
+    __depends_on__=['ContextAwareTemplate']
+
+    template_class = ContextAwareTemplate
     
-    def __init__(self, renderer, *args, **kwargs):
+    def __init__(self, renderer=None, *args, **kwargs):
         # Set the undefined handler before calling super().__init__
         kwargs['undefined'] = SilentUndefined
         
         super().__init__(*args, **kwargs)
         self.db_session=db_registry._routing_session()
-        self._renderer = renderer
-        self._context_renderer = renderer
+
+        # One environment is shared by every renderer in the worker, so the
+        # renderer that owns the current render is tracked per thread
+        self._local = threading.local()
+        if renderer is not None:
+            self.bind(renderer)
 
         self.original_getattr = super().getattr
         self.getattr = self._custom_getattr
 
-    def make_context(self, vars_=None, shared=False, locals_=None):
-        """Override to inject Flask context processors"""
-        context = super().make_context(vars_, shared, locals_)
-        
-        # Debug logging
-        #print("=== MAKE CONTEXT CALLED ===")
-        
-        if has_app_context():
-            processors = current_app.template_context_processors.get(None, [])
-            
-            for func in processors:
-                data = func()
-                context.vars.update(data)
-        
-        return context
+    def bind(self, renderer):
+        """Make renderer the target of globals and relative names in this thread"""
+        self._local.renderer = renderer
+
+    @property
+    def _renderer(self):
+        return getattr(self._local, 'renderer', None)
+
+    @property
+    def _context_renderer(self):
+        return self._renderer
+
+    @contextmanager
+    def render_scope(self):
+        """
+        Share one run of the context processors across a render
+
+        Scopes nest; the processors run at most once between entering the
+        outermost scope and leaving it.
+        """
+        local = self._local
+        depth = getattr(local, 'render_depth', 0)
+        if depth == 0:
+            local.processor_vars = None
+        local.render_depth = depth + 1
+        try:
+            yield
+        finally:
+            local.render_depth = depth
+            if depth == 0:
+                local.processor_vars = None
+
+    def processor_context(self):
+        """Flask context processor results, computed once per render scope"""
+        if not has_app_context():
+            return {}
+
+        local = self._local
+        in_scope = getattr(local, 'render_depth', 0) > 0
+        if in_scope and local.processor_vars is not None:
+            return local.processor_vars
+
+        processor_vars = {}
+        for func in current_app.template_context_processors.get(None, []):
+            processor_vars.update(func())
+
+        if in_scope:
+            local.processor_vars = processor_vars
+        return processor_vars
 
     def _custom_getattr(self, obj, attribute):
         """
@@ -215,13 +311,14 @@ class ContextAwareEnvironment(JinjaEnvironment):
         return self.original_getattr(obj, attribute)
 
     def get_template(self, name, parent=None, globals=None):
-        """Override to include Flask globals and context processors"""
+        """Override to resolve relative fragment names against the current render"""
         # Your existing logic
         if not name or not isinstance(name, str):
             raise TemplateNotFound(name)
 
-        if ':' not in name:
-            ctx = self._renderer._get_current_context()
+        renderer = self._renderer
+        if ':' not in name and renderer:
+            ctx = renderer._get_current_context()
             if ctx:
                 if ctx['type'] == 'template':
                     name = f"template_fragment:{ctx['id']}:{name}"
@@ -229,29 +326,7 @@ class ContextAwareEnvironment(JinjaEnvironment):
                     name = f"page_fragment:{ctx['id']}:{name}"
         
         # Get the template
-        template = super().get_template(name, parent, globals)
-        
-        # Inject Flask's context processors into the template module
-        if has_app_context():
-            # Create a new module with Flask's context
-            def get_flask_context():
-                ctx = {}
-                for func in current_app.template_context_processors[None]:
-                    ctx.update(func())
-                return ctx
-            
-            # Monkey patch the template module to include Flask context
-            original_root_render = template.root_render_func
-            
-            def wrapped_root_render(context):
-                # Inject Flask context processors
-                flask_ctx = get_flask_context()
-                context.vars.update(flask_ctx)
-                return original_root_render(context)
-            
-            template.root_render_func = wrapped_root_render
-        
-        return template
+        return super().get_template(name, parent, globals)
     
 
 class DbLoader(BaseLoader):
@@ -269,22 +344,17 @@ class DbLoader(BaseLoader):
             return current_app.logger
         return logging.getLogger('db_loader')
 
-
-    def get_source(self, environment, template):
-        #self._logger.debug(f"get_source: {template}")
-
+    def _load_fragment(self, template):
+        """Resolve a fragment template name to (source, fragment id, hash, valid_until)"""
         parts = template.split(':')
         if len(parts) != 3:
             raise TemplateNotFound(template)
 
         fragment_type, id, fragment_key = parts
 
-        renderer = getattr(environment, "_context_renderer", None)
-        if renderer:
-            renderer._push_context(fragment_type.replace('_fragment', ''), id, fragment_key)
-
         # --- Import models needed for the type check ---
         from app.models import PageFragment, TemplateFragment
+        from app.classes import TemplateCache
 
         if fragment_type == 'template_fragment':
             fragment = TemplateFragment.get_active_by_key( id, fragment_key)
@@ -296,45 +366,62 @@ class DbLoader(BaseLoader):
         if not fragment:
             raise TemplateNotFound(template)
 
-        is_template_fragment = isinstance(fragment, TemplateFragment)
-
-        if is_template_fragment:
+        if isinstance(fragment, TemplateFragment):
             source = fragment.template_source
+            source_hash = fragment.template_hash
+            valid_until = None
         else:
             # Fallback logic for PageFragment, etc.
             source = getattr(fragment, 'template_source', None) or fragment.content_source
+            source_hash = getattr(fragment, 'template_hash', None) or fragment.content_hash
+            # Page fragments stop being visible at expire_date without any write
+            valid_until = fragment.expire_date
 
-        def uptodate():
-            current_fragment = type(fragment).get_active_by_key( id, fragment_key)
-            if not current_fragment:
-                return False
-
-            if is_template_fragment:
-                # TemplateFragment only has a template_hash
-                current_hash = getattr(current_fragment, 'template_hash', None)
-                original_hash = getattr(fragment, 'template_hash', None)
-            else:
-                # PageFragment logic
-                current_hash = getattr(current_fragment, 'template_hash', None) or getattr(current_fragment, 'content_hash', None)
-                original_hash = getattr(fragment, 'template_hash', None) or getattr(fragment, 'content_hash', None)
+        if source_hash is None:
+            source_hash = TemplateCache.source_hash(source)
 
-            if original_hash is None:
-                return current_hash is None
-                
-            return current_hash == original_hash
+        return source, fragment.id, source_hash, valid_until
+
+    def get_source(self, environment, template):
+        #self._logger.debug(f"get_source: {template}")
+        from app.classes import TemplateCache
+
+        source, fragment_id, source_hash, valid_until = self._load_fragment(template)
+        TemplateCache.remember(template, fragment_id, source_hash, valid_until)
+
+        def uptodate():
+            return TemplateCache.is_current(template, fragment_id, source_hash)
 
         return source, template, uptodate
 
+    def load(self, environment, name, globals=None):
+        """Load a fragment, re-using compiled code for an unchanged (fragment id, hash)"""
+        from app.classes import TemplateCache
+
+        source, fragment_id, source_hash, valid_until = self._load_fragment(name)
+        code = TemplateCache.get_code(
+            (fragment_id, source_hash),
+            lambda: environment.compile(source, name, name)
+        )
+        TemplateCache.remember(name, fragment_id, source_hash, valid_until)
+
+        def uptodate():
+            return TemplateCache.is_current(name, fragment_id, source_hash)
+
+        return environment.template_class.from_code(
+            environment, code, globals if globals is not None else {}, uptodate
+        )
+
 class TemplateRenderer:
     """Dynamic template render engine for Flask"""
-    __depends_on__ = ['ContextAwareEnvironment', 'DbLoader', 'MenuBuilder','Template', 'TemplateFragment','Page','PageFragment']
+    __depends_on__ = ['ContextAwareEnvironment', 'DbLoader', 'TemplateCache', 'PageOutputCache', 'MenuBuilder','Template', 'TemplateFragment','Page','PageFragment']
 
     def __init__(self):
         self._logger = self._get_logger()
-        self._jinja_env = None
         self._recursion_depth = 0
         self._max_recursion = 5
         self._context_stack = []
+        self.etag = None
         from app.models import SiteConfig,User
         from app.classes import MenuBuilder
         self.db_session=db_registry._routing_session()
@@ -365,63 +452,69 @@ class TemplateRenderer:
     
     @property
     def jinja_env(self):
-        """Lazy initialize Jinja2 environment"""
-        if self._jinja_env is None:
-            loader = DbLoader()
-            self._jinja_env = ContextAwareEnvironment(
-                    renderer=self,
-                    loader=loader,
-                    autoescape=True
-                )
-            
+        """Shared per-worker Jinja2 environment, bound to this renderer for the current thread"""
+        from app.classes import TemplateCache
 
+        env = TemplateCache.get_environment(self._create_environment)
+        env.bind(self)
+        return env
 
-            
-            original_compile = self._jinja_env.compile_expression
-            
-            def custom_compile(source, undefined_to_none=True):
-                # Handle import statements for database templates
-                if 'import' in source:
-                    # Let Jinja2 handle it normally - our loader will resolve the path
-                    pass
-                return original_compile(source, undefined_to_none)
-            
-            self._jinja_env.compile_expression = custom_compile
-            
-            @pass_context
-            def context_include_wrapper(context, fragment_key, **kwargs):
-                # build the template name exactly as before
-                template_name = f"template_fragment:{ context.get('page')['id'] }:{ fragment_key }"
-                tpl = context.environment.get_template(template_name)
+    @staticmethod
+    def _create_environment():
+        """Build the worker's Jinja2 environment; globals dispatch to the bound renderer"""
+        env = ContextAwareEnvironment(
+                loader=DbLoader(),
+                autoescape=True,
+                cache_size=config.get('template_cache_size', 400)
+            )
+
+        original_compile = env.compile_expression
+        
+        def custom_compile(source, undefined_to_none=True):
+            # Handle import statements for database templates
+            if 'import' in source:
+                # Let Jinja2 handle it normally - our loader will resolve the path
+                pass
+            return original_compile(source, undefined_to_none)
+        
+        env.compile_expression = custom_compile
+        
+        @pass_context
+        def context_include_wrapper(context, fragment_key, **kwargs):
+            # build the template name exactly as before
+            template_name = f"template_fragment:{ context.get('page')['id'] }:{ fragment_key }"
+            tpl = context.environment.get_template(template_name)
 
-                # merge Jinja context + any overrides
-                merged = context.get_all()
-                merged.update(kwargs)
+            # merge Jinja context + any overrides
+            merged = context.get_all()
+            merged.update(kwargs)
 
-                # **use the Template's new_context**, not env.new_context**
-                subctx = tpl.new_context(merged)
+            # **use the Template's new_context**, not env.new_context**
+            subctx = tpl.new_context(merged)
 
-                # render with root_render_func to keep Jinja's dot‐lookup logic
-                return tpl.root_render_func(subctx)
+            # render with root_render_func to keep Jinja's dot‐lookup logic
+            return tpl.root_render_func(subctx)
 
-            self._jinja_env.globals['include'] = context_include_wrapper
+        env.globals['include'] = context_include_wrapper
 
-            self._jinja_env.globals['include_page_fragment'] = self._include_fragment
-            self._jinja_env.globals['include_template_fragment'] = self._include_template_fragment
-            self._jinja_env.globals['theme_css'] = lambda theme_id_or_name=None: self.theme_css( theme_id_or_name)
-            self._jinja_env.globals['url_for'] = self._url_for
-            self._jinja_env.globals['model_url'] = self._model_url
-            @pass_context
-            def render_menu_wrapper(context, menu_name=None, user_id=None, **kwargs):
-                if menu_name is None:
-                    menu_name = context.get('menu_name')
-                if user_id is None:
-                    user_id = context.get('user_id')
-                return self._render_menu(menu_name, user_id, **kwargs)
+        env.globals['include_page_fragment'] = lambda *args, **kwargs: env._renderer._include_fragment(*args, **kwargs)
+        env.globals['include_template_fragment'] = lambda *args, **kwargs: env._renderer._include_template_fragment(*args, **kwargs)
+        env.globals['theme_css'] = lambda theme_id_or_name=None: env._renderer.theme_css( theme_id_or_name)
+        env.globals['theme_css_url'] = lambda theme_id_or_name=None: env._renderer.theme_css_url(theme_id_or_name)
+        env.globals['theme_css_link'] = lambda theme_id_or_name=None: env._renderer.theme_css_link(theme_id_or_name)
+        env.globals['url_for'] = lambda *args, **kwargs: env._renderer._url_for(*args, **kwargs)
+        env.globals['model_url'] = lambda endpoint: env._renderer._model_url(endpoint)
+        @pass_context
+        def render_menu_wrapper(context, menu_name=None, user_id=None, **kwargs):
+            if menu_name is None:
+                menu_name = context.get('menu_name')
+            if user_id is None:
+                user_id = context.get('user_id')
+            return env._renderer._render_menu(menu_name, user_id, **kwargs)
 
-            self._jinja_env.globals['render_menu'] = render_menu_wrapper
+        env.globals['render_menu'] = render_menu_wrapper
 
-        return self._jinja_env
+        return env
 
     
     def _model_url(self,endpoint):
@@ -685,11 +778,10 @@ class TemplateRenderer:
         
         return context
     
-    def _create_extended_template(self, page_id, page_template, theme_template):
-        """Create a template that extends template base with page fragments"""
-        from app.models import PageFragment, TemplateFragment
+    def _find_base_fragment(self, page_template, theme_template):
+        """Get the active base fragment of the page template, falling back to the theme template"""
+        from app.models import TemplateFragment
         
-        # Get template base fragment
         template_base = None
         if page_template:
             template_base = TemplateFragment.get_active_by_key( page_template.id, 'base'
@@ -701,11 +793,21 @@ class TemplateRenderer:
         
         if not template_base:
             raise ValueError("No base template found")
-        
-        # Get all active page fragments
-        page_fragments = PageFragment.get_all_active_for_page( page_id)
-        
-        # Build extended template source
+
+        return template_base
+
+    @staticmethod
+    def _fragment_hashes(page_fragments):
+        """(id, content hash) per fragment, in render order - the page cache signature"""
+        from app.classes import TemplateCache
+        return tuple(
+            (fragment.id, fragment.content_hash or TemplateCache.source_hash(fragment.content_source))
+            for fragment in page_fragments
+        )
+
+    @staticmethod
+    def _build_extended_source(template_base, page_fragments):
+        """Build the source of a template that extends the base with page fragment blocks"""
         extends_line = f"template_fragment:{template_base.template_id}:base"
         
         template_source = f"{{% extends '{extends_line}' %}}\n\n"
@@ -723,16 +825,10 @@ class TemplateRenderer:
                 template_source += f"{{% block content %}}\n{content}\n{{% endblock %}}\n\n"
         
         return template_source
-    
-    def _render_page_fragments_only(self, page_id, context):
-        """Render only page fragments without base template"""
-        from app.models import PageFragment
-        import re
-        
-        # Get all active page fragments
-        page_fragments = PageFragment.get_all_active_for_page( page_id)
-        
-        # Build content template
+
+    @staticmethod
+    def _build_fragments_only_source(page_fragments):
+        """Build the source of a template with just the page fragments' content"""
         content_parts = []
         for fragment in page_fragments:
             content = fragment.content_source.strip()
@@ -740,15 +836,53 @@ class TemplateRenderer:
             # If content has {% block %} declarations, extract the content
             if '{% block content %}' in content:
                 # Extract content between block tags
-                match = re.search(r'{%\s*block\s+content\s*%}(.*?){%\s*endblock\s*%}', content, re.DOTALL)
+                match = CONTENT_BLOCK_RE.search(content)
                 if match:
                     content = match.group(1).strip()
             
             content_parts.append(content)
         
-        # Combine and render
-        content_template_source = "\n".join(content_parts)
-        template = self.jinja_env.from_string(content_template_source)
+        return "\n".join(content_parts)
+
+    def _create_extended_template(self, page_id, page_template, theme_template):
+        """Create a template that extends template base with page fragments"""
+        from app.models import PageFragment
+        
+        template_base = self._find_base_fragment(page_template, theme_template)
+        
+        # Get all active page fragments
+        page_fragments = PageFragment.get_all_active_for_page( page_id)
+        
+        return self._build_extended_source(template_base, page_fragments)
+
+    def _get_extended_template(self, page_id, page_template, theme_template, page_fragments=None):
+        """Get the compiled extended page template, compiling only when a fragment changed"""
+        from app.models import PageFragment
+        from app.classes import TemplateCache
+
+        template_base = self._find_base_fragment(page_template, theme_template)
+        if page_fragments is None:
+            page_fragments = PageFragment.get_all_active_for_page( page_id)
+        signature = (template_base.template_id, self._fragment_hashes(page_fragments))
+
+        return TemplateCache.get_page_template(
+            page_id, 'extended', signature,
+            lambda: self.jinja_env.from_string(self._build_extended_source(template_base, page_fragments))
+        )
+    
+    def _render_page_fragments_only(self, page_id, context, page_fragments=None):
+        """Render only page fragments without base template"""
+        from app.models import PageFragment
+        from app.classes import TemplateCache
+        
+        # Get all active page fragments
+        if page_fragments is None:
+            page_fragments = PageFragment.get_all_active_for_page( page_id)
+        
+        template = TemplateCache.get_page_template(
+            page_id, 'fragments', self._fragment_hashes(page_fragments),
+            lambda: self.jinja_env.from_string(self._build_fragments_only_source(page_fragments))
+        )
         return template.render(**context)
     
     
@@ -756,11 +890,38 @@ class TemplateRenderer:
         """Alias for render_template for backward compatibility"""
         return self.render_template(page_identifier, **kwargs)
 
+    def render_response(self, page_identifier, fragment_only=None, **data):
+        """
+        Render a page into a response with ETag / If-None-Match support
+
+        Cached pages answer a matching If-None-Match with 304 and no body.
+        """
+        from flask import make_response
+
+        response = make_response(self.render_template(page_identifier, fragment_only=fragment_only, **data))
+        response.vary.update(('Cookie', 'HX-Request'))
+        if self.etag:
+            response.set_etag(self.etag)
+            response.cache_control.no_cache = True
+            if self.data['user']:
+                response.cache_control.private = True
+            response = response.make_conditional(request)
+        return response
+
+    def _output_variant(self):
+        """Who the page is rendered for: anonymous, or the user's role and menu set"""
+        user = self.data['user']
+        if not user:
+            return ('anonymous',)
+        menus = tuple(menu['id'] for menu in self.data['menus'])
+        return ('role', str(user.role_id), menus)
+
     def render_template(self, page_identifier, fragment_only=None, **data):
         """Main render function with htmx support"""
         #self._logger.info(f"Rendering page: {page_identifier}")
         self._reset_recursion()
         self._context_stack = []  # Clear context stack
+        self.etag = None
         
         try:
             # Load page
@@ -773,6 +934,25 @@ class TemplateRenderer:
             if fragment_only is None:
                 # Auto-detect from request header
                 fragment_only = request.headers.get('HX-Request') == 'true'
+
+            # Pages rendered without caller data are served from the output cache
+            # when it is enabled
+            page_fragments = None
+            cache_key = None
+            from app.classes import PageOutputCache
+            if PageOutputCache.enabled and not data and page.cache_duration:
+                from app.models import PageFragment
+
+                page_fragments = PageFragment.get_all_active_for_page(str(page.id))
+                cache_key = PageOutputCache.make_key(
+                    page.id, self._fragment_hashes(page_fragments), self._output_variant(), fragment_only,
+                    request.query_string
+                )
+                cached = PageOutputCache.get(cache_key)
+                if cached is not None:
+                    page.increment_view_count()
+                    rendered_content, self.etag = cached
+                    return rendered_content
             
             # Load page template
             page_template = None
@@ -794,13 +974,10 @@ class TemplateRenderer:
             
             if fragment_only:
                 # Render only fragments for htmx requests
-                rendered_content = self._render_page_fragments_only(str(page.id), context)
+                rendered_content = self._render_page_fragments_only(str(page.id), context, page_fragments)
             else:
-                # Create extended template with auto-extension
-                extended_template_source = self._create_extended_template(str(page.id), page_template, theme_template)
-                
-                # Render the extended template
-                template = self.jinja_env.from_string(extended_template_source)
+                # Extended template with auto-extension, compiled once per fragment set
+                template = self._get_extended_template(str(page.id), page_template, theme_template, page_fragments)
                 rendered_content = template.render(**context)
             
             # Increment view count
@@ -819,6 +996,9 @@ class TemplateRenderer:
                     minify_js=theme.minify_js,
                     minify_html=theme.minify_html)
 
+            if cache_key:
+                from app.classes import PageOutputCache
+                self.etag = PageOutputCache.put(cache_key, page.id, rendered_content, page.cache_duration)
 
             #self._logger.info(f"Successfully rendered page: {page.slug}")
             return rendered_content
@@ -833,6 +1013,10 @@ class TemplateRenderer:
         """
         Generate complete CSS for a theme including variables and custom styles.
         Can be called in templates like {{ theme_css() }}
+
+        The CSS is built once per theme revision by ThemeStylesheet; prefer
+        {{ theme_css_link() }} so browsers cache it instead of receiving it
+        inline with every page.
         
         Args:
             theme_id_or_name: Theme UUID string, name, or None for default theme
@@ -841,515 +1025,36 @@ class TemplateRenderer:
             Complete CSS as a string ready for <style> block
         """
         try:
-            from app.models import Theme
-            from sqlalchemy import or_
+            from app.classes import ThemeStylesheet
             from markupsafe import Markup
-            
-            # Get the theme
-            theme = None
-            if theme_id_or_name:
-                theme = self.db_session.query(Theme).filter(
-                    or_(
-                        Theme.id == theme_id_or_name,
-                        Theme.name == theme_id_or_name
-                    )
-                ).first()
-            
-            if not theme:
-                theme = self.db_session.query(Theme).filter_by(is_default=True).first()
-                
-            if not theme:
-                theme = self.db_session.query(Theme).first()
-                
-            if not theme:
+
+            artifact = ThemeStylesheet.get(theme_id_or_name)
+            if not artifact:
                 return "/* No theme found */"
-                
-            # Build CSS variables section
-            css_vars = []
-            
-            # Core color variables (light theme)
-            css_vars.extend([
-                f"--theme-primary: {theme.primary_color};",
-                f"--theme-secondary: {theme.secondary_color};",
-                f"--theme-success: {theme.success_color};",
-                f"--theme-warning: {theme.warning_color};",
-                f"--theme-danger: {theme.danger_color};",
-                f"--theme-info: {theme.info_color};",
-                f"--theme-background: {theme.background_color};",
-                f"--theme-surface: {theme.surface_color};",
-                f"--theme-text: {theme.text_color};",
-                f"--theme-text-muted: {theme.text_muted_color};",
-                f"--theme-border-color: {theme.border_color};",
-                f"--theme-content-area: {theme.content_area_color};",
-                f"--theme-sidebar: {theme.sidebar_color};",
-                f"--theme-component: {theme.component_color};"
-            ])
-            
-            # Bootstrap variable mappings
-            css_vars.extend([
-                "/* Bootstrap Integration */",
-                "--bs-primary: var(--theme-primary);",
-                "--bs-secondary: var(--theme-secondary);",
-                "--bs-success: var(--theme-success);",
-                "--bs-warning: var(--theme-warning);",
-                "--bs-danger: var(--theme-danger);",
-                "--bs-info: var(--theme-info);",
-                "--bs-body-bg: var(--theme-content-area);",
-                "--bs-body-color: var(--theme-text);",
-                "--bs-border-color: var(--theme-border-color);",
-                "--bs-card-bg: var(--theme-component);",
-                "--bs-card-border-color: var(--theme-border-color);",
-                "--bs-secondary-bg: var(--theme-surface);",
-                "--bs-tertiary-bg: var(--theme-surface);",
-                "--bs-emphasis-color: var(--theme-text);"
-            ])
-            
-            # Dark mode color variables
-            if theme.supports_dark_mode:
-                css_vars.extend([
-                    f"--theme-primary-dark: {theme.primary_color_dark or theme.primary_color};",
-                    f"--theme-secondary-dark: {theme.secondary_color_dark or theme.secondary_color};",
-                    f"--theme-success-dark: {theme.success_color_dark or theme.success_color};",
-                    f"--theme-warning-dark: {theme.warning_color_dark or theme.warning_color};",
-                    f"--theme-danger-dark: {theme.danger_color_dark or theme.danger_color};",
-                    f"--theme-info-dark: {theme.info_color_dark or theme.info_color};",
-                    f"--theme-background-dark: {theme.background_color_dark or theme.background_color};",
-                    f"--theme-surface-dark: {theme.surface_color_dark or theme.surface_color};",
-                    f"--theme-text-dark: {theme.text_color_dark or theme.text_color};",
-                    f"--theme-text-muted-dark: {theme.text_muted_color_dark or theme.text_muted_color};",
-                    f"--theme-border-color-dark: {theme.border_color_dark or theme.border_color};",
-                    f"--theme-content-area-dark: {theme.content_area_color_dark or theme.content_area_color};",
-                    f"--theme-sidebar-dark: {theme.sidebar_color_dark or theme.sidebar_color};",
-                    f"--theme-component-dark: {theme.component_color_dark or theme.component_color};"
-                ])
-            
-            # Typography variables
-            css_vars.extend([
-                f"--theme-font-primary: {theme.font_family_primary};",
-                f"--theme-font-heading: {theme.font_family_heading or theme.font_family_primary};",
-                f"--theme-font-mono: {theme.font_family_mono};",
-                f"--theme-font-size-base: {theme.font_size_base};",
-                f"--theme-font-weight-normal: {theme.font_weight_normal};",
-                f"--theme-font-weight-bold: {theme.font_weight_bold};",
-                f"--theme-line-height-base: {theme.line_height_base};"
-            ])
-            
-            # Layout variables
-            css_vars.extend([
-                f"--theme-container-max-width: {theme.container_max_width};",
-                f"--theme-grid-columns: {theme.grid_columns};",
-                f"--theme-border-radius: {theme.border_radius};",
-                f"--theme-spacing-unit: {theme.spacing_unit};"
-            ])
-            
-            # Responsive breakpoints
-            css_vars.extend([
-                f"--theme-breakpoint-xs: {theme.breakpoint_xs};",
-                f"--theme-breakpoint-sm: {theme.breakpoint_sm};",
-                f"--theme-breakpoint-md: {theme.breakpoint_md};",
-                f"--theme-breakpoint-lg: {theme.breakpoint_lg};",
-                f"--theme-breakpoint-xl: {theme.breakpoint_xl};",
-                f"--theme-breakpoint-xxl: {theme.breakpoint_xxl};"
-            ])
-            
-            # Visual effects
-            css_vars.extend([
-                f"--theme-shadow-sm: {theme.shadow_sm};",
-                f"--theme-shadow-md: {theme.shadow_md};",
-                f"--theme-shadow-lg: {theme.shadow_lg};",
-                f"--theme-border-width: {theme.border_width};",
-                f"--theme-focus-ring-color: {theme.focus_ring_color};",
-                f"--theme-focus-ring-width: {theme.focus_ring_width};"
-            ])
-            
-            # Animation variables
-            css_vars.extend([
-                f"--theme-transition-duration: {theme.transition_duration};",
-                f"--theme-animation-easing: {theme.animation_easing};"
-            ])
-            
-            # Component styling
-            css_vars.extend([
-                f"--theme-button-border-radius: {theme.button_border_radius or theme.border_radius};",
-                f"--theme-input-border-radius: {theme.input_border_radius or theme.border_radius};",
-                f"--theme-card-border-radius: {theme.card_border_radius or theme.border_radius};",
-                f"--theme-navbar-height: {theme.navbar_height};",
-                f"--theme-sidebar-width: {theme.sidebar_width};",
-                f"--theme-footer-height: {theme.footer_height};",
-                f"--theme-breadcrumb-height: {theme.breadcrumb_height};",
-                f"--theme-topbar-height: {theme.topbar_height};"
-            ])
-            
-            # Parse JSON CSS variables if they exist
-            if theme.css_variables:
-                try:
-                    import json
-                    # Ensure it's a string before parsing
-                    if isinstance(theme.css_variables, str) and theme.css_variables.strip():
-                        custom_vars = json.loads(theme.css_variables)
-                        # Ensure we got a dict
-                        if isinstance(custom_vars, dict):
-                            for key, value in custom_vars.items():
-                                # Ensure key and value are strings
-                                key = str(key)
-                                value = str(value)
-                                if not key.startswith('--'):
-                                    key = f"--{key}"
-                                css_vars.append(f"{key}: {value};")
-                except Exception as e:
-                    # Log but don't fail
-                    self._logger.warning(f"Failed to parse theme CSS variables: {e}")
-                    pass
-            
-            # Build the complete CSS
-            css_output = []
-            
-            # CSS Variables in :root
-            css_output.append(":root {")
-            for var in css_vars:
-                css_output.append(f"  {var}")
-            css_output.append("}")
-            
-            # Body defaults using theme variables
-            css_output.extend([
-                "",
-                "body {",
-                "  font-family: var(--theme-font-primary);",
-                "  font-size: var(--theme-font-size-base);",
-                "  font-weight: var(--theme-font-weight-normal);",
-                "  line-height: var(--theme-line-height-base);",
-                "  color: var(--theme-text);",
-                "  background-color: var(--theme-background);",
-                "}"
-            ])
-            
-            # Heading defaults
-            css_output.extend([
-                "",
-                "h1, h2, h3, h4, h5, h6 {",
-                "  font-family: var(--theme-font-heading);",
-                "  font-weight: var(--theme-font-weight-bold);",
-                "}"
-            ])
-            
-            # Bootstrap component overrides
-            css_output.extend([
-                "",
-                "/* Bootstrap Component Integration */",
-                ".form-control, .form-select {",
-                "  background-color: var(--theme-surface);",
-                "  border-color: var(--theme-border-color);",
-                "  color: var(--theme-text);",
-                "}",
-                "",
-                ".form-control:focus, .form-select:focus {",
-                "  background-color: var(--theme-surface);",
-                "  border-color: var(--theme-primary);",
-                "  color: var(--theme-text);",
-                "}",
-                "",
-                ".card {",
-                "  background-color: var(--theme-component);",
-                "  border-color: var(--theme-border-color);",
-                "  color: var(--theme-text);",
-                "}",
-                "",
-                ".card-header {",
-                "  background-color: rgba(0, 0, 0, 0.05);",
-                "  border-bottom-color: var(--theme-border-color);",
-                "}",
-                "",
-                ".table {",
-                "  --bs-table-bg: transparent;",
-                "  color: var(--theme-text);",
-                "}",
-                "",
-                ".table > :not(caption) > * > * {",
-                "  background-color: var(--bs-table-bg);",
-                "  border-bottom-color: var(--theme-border-color);",
-                "}",
-                "",
-                ".modal-content {",
-                "  background-color: var(--theme-component);",
-                "  border-color: var(--theme-border-color);",
-                "  color: var(--theme-text);",
-                "}",
-                "",
-                ".modal-header, .modal-footer {",
-                "  border-color: var(--theme-border-color);",
-                "}",
-                "",
-                ".dropdown-menu {",
-                "  background-color: var(--theme-surface);",
-                "  border-color: var(--theme-border-color);",
-                "}",
-                "",
-                ".dropdown-item {",
-                "  color: var(--theme-text);",
-                "}",
-                "",
-                ".dropdown-item:hover, .dropdown-item:focus {",
-                "  background-color: rgba(0, 0, 0, 0.05);",
-                "  color: var(--theme-text);",
-                "}"
-            ])
-            
-            # Logo handling for dark/light themes
-            css_output.extend([
-                "",
-                "/* Logo switching for dark/light themes */",
-                ".logo_light {",
-                "  display: block;",
-                "}",
-                "",
-                ".logo_dark {",
-                "  display: none;",
-                "}",
-                "",
-                "/* Hide broken/missing images */",
-                ".logo_light:not([src]), .logo_light[src=''], .logo_light[src='None'],",
-                ".logo_dark:not([src]), .logo_dark[src=''], .logo_dark[src='None'] {",
-                "  display: none !important;",
-                "}",
-                "",
-                "/* Bootstrap dark theme */",
-                "[data-bs-theme='dark'] .logo_light {",
-                "  display: none;",
-                "}",
-                "",
-                "[data-bs-theme='dark'] .logo_dark {",
-                "  display: block;",
-                "}"
-            ])
-            
-            # RTL support
-            if theme.rtl_support:
-                css_output.extend([
-                    "",
-                    "/* RTL support */",
-                    "[dir='rtl'] {",
-                    "  text-align: right;",
-                    "}",
-                    "",
-                    "[dir='rtl'] .float-left {",
-                    "  float: right !important;",
-                    "}",
-                    "",
-                    "[dir='rtl'] .float-right {",
-                    "  float: left !important;",
-                    "}"
-                ])
-            
-            # High contrast support
-            if theme.supports_high_contrast:
-                css_output.extend([
-                    "",
-                    "@media (prefers-contrast: high) {",
-                    "  :root {",
-                    "    --theme-border-width: 2px;",
-                    "    --theme-focus-ring-width: 0.5rem;",
-                    "  }",
-                    "  ",
-                    "  .btn, .form-control, .card {",
-                    "    border-width: var(--theme-border-width);",
-                    "  }",
-                    "}"
-                ])
-            
-            # Dark mode support
-            if theme.supports_dark_mode:
-                # Dark mode Bootstrap integration
-                dark_mode_css = [
-                    "",
-                    "/* Dark mode Bootstrap variable mappings */",
-                    "[data-theme='dark'], [data-bs-theme='dark'] {",
-                    "  --bs-primary: var(--theme-primary-dark);",
-                    "  --bs-secondary: var(--theme-secondary-dark);",
-                    "  --bs-success: var(--theme-success-dark);",
-                    "  --bs-warning: var(--theme-warning-dark);",
-                    "  --bs-danger: var(--theme-danger-dark);",
-                    "  --bs-info: var(--theme-info-dark);",
-                    "  --bs-body-bg: var(--theme-content-area-dark);",
-                    "  --bs-body-color: var(--theme-text-dark);",
-                    "  --bs-border-color: var(--theme-border-color-dark);",
-                    "  --bs-card-bg: var(--theme-component-dark);",
-                    "  --bs-card-border-color: var(--theme-border-color-dark);",
-                    "  --bs-secondary-bg: var(--theme-surface-dark);",
-                    "  --bs-tertiary-bg: var(--theme-surface-dark);",
-                    "  --bs-emphasis-color: var(--theme-text-dark);",
-                    "}",
-                    "",
-                    "/* Dark mode component overrides */",
-                    "[data-theme='dark'] .form-control,",
-                    "[data-theme='dark'] .form-select,",
-                    "[data-bs-theme='dark'] .form-control,",
-                    "[data-bs-theme='dark'] .form-select {",
-                    "  background-color: var(--theme-surface-dark);",
-                    "  border-color: var(--theme-border-color-dark);",
-                    "  color: var(--theme-text-dark);",
-                    "}",
-                    "",
-                    "[data-theme='dark'] .form-control:focus,",
-                    "[data-theme='dark'] .form-select:focus,",
-                    "[data-bs-theme='dark'] .form-control:focus,",
-                    "[data-bs-theme='dark'] .form-select:focus {",
-                    "  background-color: var(--theme-surface-dark);",
-                    "  border-color: var(--theme-primary-dark);",
-                    "  color: var(--theme-text-dark);",
-                    "}",
-                    "",
-                    "[data-theme='dark'] .card,",
-                    "[data-bs-theme='dark'] .card {",
-                    "  background-color: var(--theme-component-dark);",
-                    "  border-color: var(--theme-border-color-dark);",
-                    "  color: var(--theme-text-dark);",
-                    "}",
-                    "",
-                    "[data-theme='dark'] .card-header,",
-                    "[data-bs-theme='dark'] .card-header {",
-                    "  background-color: rgba(255, 255, 255, 0.05);",
-                    "  border-bottom-color: var(--theme-border-color-dark);",
-                    "}",
-                    "",
-                    "[data-theme='dark'] .dropdown-menu,",
-                    "[data-bs-theme='dark'] .dropdown-menu {",
-                    "  background-color: var(--theme-surface-dark);",
-                    "  border-color: var(--theme-border-color-dark);",
-                    "}",
-                    "",
-                    "[data-theme='dark'] .dropdown-item,",
-                    "[data-bs-theme='dark'] .dropdown-item {",
-                    "  color: var(--theme-text-dark);",
-                    "}",
-                    "",
-                    "[data-theme='dark'] .dropdown-item:hover,",
-                    "[data-theme='dark'] .dropdown-item:focus,",
-                    "[data-bs-theme='dark'] .dropdown-item:hover,",
-                    "[data-bs-theme='dark'] .dropdown-item:focus {",
-                    "  background-color: rgba(255, 255, 255, 0.05);",
-                    "  color: var(--theme-text-dark);",
-                    "}"
-                ]
-                
-                css_output.extend(dark_mode_css)
-                
-                if theme.mode == 'dark':
-                    # Force dark mode - override root variables
-                    css_output.extend([
-                        "",
-                        "/* Force dark mode */",
-                        ":root {",
-                        f"  --theme-primary: {theme.primary_color_dark or theme.primary_color};",
-                        f"  --theme-secondary: {theme.secondary_color_dark or theme.secondary_color};",
-                        f"  --theme-success: {theme.success_color_dark or theme.success_color};",
-                        f"  --theme-warning: {theme.warning_color_dark or theme.warning_color};",
-                        f"  --theme-danger: {theme.danger_color_dark or theme.danger_color};",
-                        f"  --theme-info: {theme.info_color_dark or theme.info_color};",
-                        f"  --theme-background: {theme.background_color_dark or theme.background_color};",
-                        f"  --theme-surface: {theme.surface_color_dark or theme.surface_color};",
-                        f"  --theme-text: {theme.text_color_dark or theme.text_color};",
-                        f"  --theme-text-muted: {theme.text_muted_color_dark or theme.text_muted_color};",
-                        f"  --theme-border-color: {theme.border_color_dark or theme.border_color};",
-                        f"  --theme-content-area: {theme.content_area_color_dark or theme.content_area_color};",
-                        f"  --theme-sidebar: {theme.sidebar_color_dark or theme.sidebar_color};",
-                        f"  --theme-component: {theme.component_color_dark or theme.component_color};",
-                        "}"
-                    ])
-                elif theme.mode == 'auto':
-                    # Auto mode with manual override support
-                    css_output.extend([
-                        "",
-                        "/* Auto dark mode (only when no manual theme is set) */",
-                        "@media (prefers-color-scheme: dark) {",
-                        "  :root:not([data-theme]) {",
-                        f"    --theme-primary: {theme.primary_color_dark or theme.primary_color};",
-                        f"    --theme-secondary: {theme.secondary_color_dark or theme.secondary_color};",
-                        f"    --theme-success: {theme.success_color_dark or theme.success_color};",
-                        f"    --theme-warning: {theme.warning_color_dark or theme.warning_color};",
-                        f"    --theme-danger: {theme.danger_color_dark or theme.danger_color};",
-                        f"    --theme-info: {theme.info_color_dark or theme.info_color};",
-                        f"    --theme-background: {theme.background_color_dark or theme.background_color};",
-                        f"    --theme-surface: {theme.surface_color_dark or theme.surface_color};",
-                        f"    --theme-text: {theme.text_color_dark or theme.text_color};",
-                        f"    --theme-text-muted: {theme.text_muted_color_dark or theme.text_muted_color};",
-                        f"    --theme-border-color: {theme.border_color_dark or theme.border_color};",
-                        f"    --theme-content-area: {theme.content_area_color_dark or theme.content_area_color};",
-                        f"    --theme-sidebar: {theme.sidebar_color_dark or theme.sidebar_color};",
-                        f"    --theme-component: {theme.component_color_dark or theme.component_color};",
-                        "  }",
-                        "}",
-                        "",
-                        "/* Manual dark theme override */",
-                        ":root[data-theme=\"dark\"] {",
-                        f"  --theme-primary: {theme.primary_color_dark or theme.primary_color};",
-                        f"  --theme-secondary: {theme.secondary_color_dark or theme.secondary_color};",
-                        f"  --theme-success: {theme.success_color_dark or theme.success_color};",
-                        f"  --theme-warning: {theme.warning_color_dark or theme.warning_color};",
-                        f"  --theme-danger: {theme.danger_color_dark or theme.danger_color};",
-                        f"  --theme-info: {theme.info_color_dark or theme.info_color};",
-                        f"  --theme-background: {theme.background_color_dark or theme.background_color};",
-                        f"  --theme-surface: {theme.surface_color_dark or theme.surface_color};",
-                        f"  --theme-text: {theme.text_color_dark or theme.text_color};",
-                        f"  --theme-text-muted: {theme.text_muted_color_dark or theme.text_muted_color};",
-                        f"  --theme-border-color: {theme.border_color_dark or theme.border_color};",
-                        f"  --theme-content-area: {theme.content_area_color_dark or theme.content_area_color};",
-                        f"  --theme-sidebar: {theme.sidebar_color_dark or theme.sidebar_color};",
-                        f"  --theme-component: {theme.component_color_dark or theme.component_color};",
-                        "}",
-                        "",
-                        "/* Manual light theme override */",
-                        ":root[data-theme=\"light\"] {",
-                        f"  --theme-primary: {theme.primary_color};",
-                        f"  --theme-secondary: {theme.secondary_color};",
-                        f"  --theme-success: {theme.success_color};",
-                        f"  --theme-warning: {theme.warning_color};",
-                        f"  --theme-danger: {theme.danger_color};",
-                        f"  --theme-info: {theme.info_color};",
-                        f"  --theme-background: {theme.background_color};",
-                        f"  --theme-surface: {theme.surface_color};",
-                        f"  --theme-text: {theme.text_color};",
-                        f"  --theme-text-muted: {theme.text_muted_color};",
-                        f"  --theme-border-color: {theme.border_color};",
-                        f"  --theme-content-area: {theme.content_area_color};",
-                        f"  --theme-sidebar: {theme.sidebar_color};",
-                        f"  --theme-component: {theme.component_color};",
-                        "}"
-                    ])
-            
-            # Animation controls
-            if not theme.enable_animations:
-                css_output.extend([
-                    "",
-                    "/* Disable animations */",
-                    "*, *::before, *::after {",
-                    "  animation-duration: 0s !important;",
-                    "  animation-delay: 0s !important;",
-                    "}"
-                ])
-                
-            if not theme.enable_transitions:
-                css_output.extend([
-                    "",
-                    "/* Disable transitions */", 
-                    "*, *::before, *::after {",
-                    "  transition-duration: 0s !important;",
-                    "  transition-delay: 0s !important;",
-                    "}"
-                ])
-            
-            # Add custom CSS if present
-            if theme.custom_css:
-                css_output.extend([
-                    "",
-                    "/* Custom theme CSS */",
-                    theme.custom_css.strip()
-                ])
-            
-            return Markup("\n".join(css_output))
+
+            return Markup(artifact.css)
             
         except Exception as e:
             return f"/* Error generating theme CSS: {e} */"
 
+    def theme_css_url(self, theme_id_or_name=None):
+        """Fingerprinted URL of a theme's stylesheet, served with immutable caching"""
+        from app.classes import ThemeStylesheet
+
+        artifact = ThemeStylesheet.get(theme_id_or_name)
+        if not artifact:
+            return ""
+        return self._url_for('theme.stylesheet', theme_id=artifact.theme_id, css_hash=artifact.hash)
+
+    def theme_css_link(self, theme_id_or_name=None):
+        """<link> tag for a theme's fingerprinted stylesheet"""
+        from markupsafe import Markup
+
+        url = self.theme_css_url(theme_id_or_name)
+        if not url:
+            return Markup("<!-- No theme found -->")
+        return Markup(f'<link rel="stylesheet" href="{url}">')
+
     def _render_menu(self, menu_name=None, user_id=None, **kwargs):
         """
         Render menu directly in templates using {{ render_menu('ADMIN') }}
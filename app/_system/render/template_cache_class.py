@@ -0,0 +1,186 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from app.config import config
+
+
+class TemplateCache:
+    """
+    Per-worker cache behind the DB-backed Jinja2 environment
+
+    - One shared ContextAwareEnvironment per worker instead of one per
+      TemplateRenderer, so Jinja's own template cache survives requests
+    - Compiled template code in a bounded LRU keyed by
+      (fragment id, template_hash/content_hash); a fragment is only
+      re-compiled when its content actually changes
+    - An in-memory map of template name -> loaded (fragment id, hash), so
+      Jinja's uptodate check is a dict lookup instead of a query. Any
+      committed change to a template or page fragment bumps the 'templates'
+      stamp, which clears the map in every worker and makes the next
+      get_template reload (and usually re-use the compiled code)
+    - Synthesized page templates (base + page fragments, or fragments only
+      for HTMX requests) compiled once per page and set of fragment hashes
+    """
+    __depends_on__ = ['VersionStamp', 'TemplateFragment', 'PageFragment']
+
+    VERSION_KEY = 'templates'
+
+    max_size = config.get('template_cache_size', 400)
+
+    _env = None
+    _env_lock = threading.Lock()
+
+    _compiled = OrderedDict()  # (fragment id, hash) -> compiled code
+    _compiled_lock = threading.Lock()
+    hits = 0
+    misses = 0
+
+    _sources = {}  # template name -> (fragment id, hash, valid_until)
+    _version = None
+
+    _pages = OrderedDict()  # (page id, mode) -> (fragment signature, Template)
+    page_hits = 0
+    page_misses = 0
+
+    @staticmethod
+    def source_hash(source):
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def register_invalidation(cls):
+        """Bump the templates stamp on any committed fragment change"""
+        from app.classes import VersionStamp
+        from app.models import TemplateFragment, PageFragment
+
+        VersionStamp.watch(TemplateFragment, cls.VERSION_KEY)
+        VersionStamp.watch(PageFragment, cls.VERSION_KEY)
+
+    @classmethod
+    def invalidate(cls):
+        """Force every worker to re-check its loaded templates"""
+        from app.classes import VersionStamp
+        VersionStamp.bump(cls.VERSION_KEY)
+
+    @classmethod
+    def get_environment(cls, factory):
+        """Get this worker's shared environment, building it once with factory()"""
+        if cls._env is None:
+            with cls._env_lock:
+                if cls._env is None:
+                    cls._env = factory()
+        return cls._env
+
+    @classmethod
+    def get_code(cls, key, compile_source):
+        """Get compiled code for key, calling compile_source() on a miss"""
+        with cls._compiled_lock:
+            code = cls._compiled.get(key)
+            if code is not None:
+                cls._compiled.move_to_end(key)
+                cls.hits += 1
+                return code
+
+        cls.misses += 1
+        code = compile_source()
+
+        with cls._compiled_lock:
+            cls._compiled[key] = code
+            cls._compiled.move_to_end(key)
+            while len(cls._compiled) > cls.max_size:
+                cls._compiled.popitem(last=False)
+        return code
+
+    @classmethod
+    def get_page_template(cls, page_id, mode, signature, build):
+        """
+        Get a synthesized page template, calling build() when the page's
+        fragment signature differs from the cached one
+
+        Args:
+            page_id: Page the template belongs to
+            mode: 'extended' or 'fragments'
+            signature: Hashable summary of the active fragments (ids + hashes)
+            build: Returns a compiled Template for the current fragments
+        """
+        key = (str(page_id), mode)
+        with cls._compiled_lock:
+            entry = cls._pages.get(key)
+            if entry is not None and entry[0] == signature:
+                cls._pages.move_to_end(key)
+                cls.page_hits += 1
+                return entry[1]
+
+        cls.page_misses += 1
+        template = build()
+
+        with cls._compiled_lock:
+            cls._pages[key] = (signature, template)
+            cls._pages.move_to_end(key)
+            while len(cls._pages) > cls.max_size:
+                cls._pages.popitem(last=False)
+        return template
+
+    @classmethod
+    def evict_page(cls, page_id):
+        """Drop this worker's synthesized templates for a page"""
+        page_id = str(page_id)
+        with cls._compiled_lock:
+            for key in [key for key in cls._pages if key[0] == page_id]:
+                del cls._pages[key]
+
+    @classmethod
+    def evict_fragment(cls, name):
+        """Make the next get_template of a fragment name reload it in this worker"""
+        cls._sources.pop(name, None)
+
+    @classmethod
+    def remember(cls, name, fragment_id, source_hash, valid_until=None):
+        """Record which fragment version a template name was loaded from"""
+        cls._check_version()
+        cls._sources[name] = (fragment_id, source_hash, valid_until)
+
+    @classmethod
+    def is_current(cls, name, fragment_id, source_hash):
+        """Jinja uptodate check - True while the loaded version is still the active one"""
+        cls._check_version()
+        entry = cls._sources.get(name)
+        if entry is None:
+            return False
+
+        loaded_id, loaded_hash, valid_until = entry
+        if loaded_id != fragment_id or loaded_hash != source_hash:
+            return False
+        if valid_until is not None and datetime.now(timezone.utc) >= valid_until:
+            cls._sources.pop(name, None)
+            return False
+        return True
+
+    @classmethod
+    def stats(cls):
+        return {
+            'compiled': len(cls._compiled),
+            'max_size': cls.max_size,
+            'hits': cls.hits,
+            'misses': cls.misses,
+            'sources': len(cls._sources),
+            'pages': len(cls._pages),
+            'page_hits': cls.page_hits,
+            'page_misses': cls.page_misses,
+            'version': cls._version,
+        }
+
+    @classmethod
+    def _check_version(cls):
+        from app.classes import VersionStamp
+
+        version = VersionStamp.current(cls.VERSION_KEY)
+        if version != cls._version:
+            with cls._env_lock:
+                if version != cls._version:
+                    cls._sources = {}
+                    cls._version = version
+
+
+TemplateCache.register_invalidation()
@@ -3,8 +3,8 @@ Report API Views/Routes
 JSON API endpoints for report operations
 """
 
-from flask import Blueprint, request, jsonify, g, send_file
-from app.classes import ReportService
+from flask import Blueprint, Response, request, jsonify, g, send_file
+from app.classes import ReportService, ReportExporter
 from app.config import config
 import io
 
@@ -281,26 +281,28 @@ def export_report():
         execution_params = {k: v for k, v in request_data.items() 
                           if k not in ['report_id', 'format']}
         
-        # For now, handle JSON export using existing method
+        # JSON exports the report definition
         if format.lower() == 'json':
             definition = service.export_report_definition(
                 report_id=report_id
             )
             return json_response(data=definition)
         
-        # For CSV/Excel, execute report and format results
-        elif format.lower() in ['csv', 'xlsx']:
-            result = service.execute_report(
+        # Data exports stream straight from a server-side cursor as a chunked response
+        elif format.lower() in ReportExporter.FORMATS:
+            exporter = service.export_report_data(
                 report_id=report_id,
                 request_data=execution_params,
+                export_format=format,
                 user_id=None  # TODO: Add auth later
             )
-            
-            # TODO: Implement CSV/Excel formatting
-            # For now, return error
-            return json_response(
-                error=f"Export format '{format}' not yet implemented",
-                status=501
+            return Response(
+                exporter.stream(),
+                content_type=exporter.content_type,
+                headers={
+                    'Content-Disposition': f'attachment; filename="{exporter.filename}"',
+                    'X-Accel-Buffering': 'no'
+                }
             )
         else:
             return json_response(
@@ -623,6 +625,17 @@ def get_stats():
         return json_response(error=str(e), status=500)
 
 
+@bp.route('/pools', methods=['POST'])
+def get_pool_stats():
+    """Get connection pool usage for report connections"""
+    try:
+        service = get_service()
+        return json_response(data=service.get_pool_stats())
+
+    except Exception as e:
+        return json_response(error=str(e), status=500)
+
+
 # =====================================================================
 # IMPORT/EXPORT ROUTES
 # =====================================================================
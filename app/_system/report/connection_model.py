@@ -35,11 +35,31 @@ class Connection(BaseModel):
 
     database_type = relationship('DatabaseType', backref='connections')
 
+    # Options that configure the engine's pool rather than the driver
+    POOL_OPTIONS = {
+        'pool_size': int,
+        'max_overflow': int,
+        'pool_timeout': float,
+        'pool_recycle': int,
+        'pool_pre_ping': bool,
+    }
+
+    def get_pool_options(self):
+        """Pool settings from options, typed; keys not set use the registry defaults"""
+        pool_options = {}
+        for key, value in (self.options or {}).items():
+            if key not in self.POOL_OPTIONS or value is None:
+                continue
+            if self.POOL_OPTIONS[key] is bool and isinstance(value, str):
+                value = value.lower() in ('1', 'true', 'yes', 'on')
+            pool_options[key] = self.POOL_OPTIONS[key](value)
+        return pool_options
+
     def get_connection_string(self):
         conn_str = self.connection_string
         username = self.username
         password = self.password
-        options = self.options or {}
+        options = {k: v for k, v in (self.options or {}).items() if k not in self.POOL_OPTIONS}
 
         db_type_name = self.database_type.name.lower()
 
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+
+class CronExpression:
+    """
+    Standard five-field cron expression: minute hour day-of-month month day-of-week
+
+    Supports *, lists (1,15), ranges (1-5), steps (*/10, 8-18/2) and month
+    and weekday names (jan, mon). Day of week is 0-7 with 0 and 7 both
+    Sunday. As in cron, when both day fields are restricted a day matches
+    if either does.
+
+    Usage:
+        CronExpression('30 2 * * mon-fri').next_after(datetime(2026, 1, 1))
+    """
+    __depends_on__ = []
+
+    FIELDS = (
+        ('minute', 0, 59),
+        ('hour', 0, 23),
+        ('day', 1, 31),
+        ('month', 1, 12),
+        ('weekday', 0, 7),
+    )
+    NAMES = {
+        'month': {name: i for i, name in enumerate(
+            ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], 1)},
+        'weekday': {name: i for i, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])},
+    }
+    MAX_DAYS = 366 * 5
+
+    def __init__(self, expression):
+        parts = (expression or '').split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expression}'")
+
+        self.expression = expression
+        values = {}
+        for part, (name, low, high) in zip(parts, self.FIELDS):
+            values[name] = self._parse_field(part, name, low, high)
+
+        self.minutes = sorted(values['minute'])
+        self.hours = sorted(values['hour'])
+        self.days = values['day']
+        self.months = values['month']
+        # cron counts from Sunday; Python's weekday() from Monday
+        self.weekdays = {(day - 1) % 7 for day in values['weekday']}
+        self.day_restricted = parts[2] != '*'
+        self.weekday_restricted = parts[4] != '*'
+
+    def _parse_field(self, field, name, low, high):
+        names = self.NAMES.get(name, {})
+        values = set()
+        for item in field.lower().split(','):
+            step = 1
+            if '/' in item:
+                item, step_text = item.split('/', 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f"Invalid step in cron field '{field}'")
+
+            if item == '*':
+                start, end = low, high
+            elif '-' in item:
+                start_text, end_text = item.split('-', 1)
+                start, end = self._value(start_text, names), self._value(end_text, names)
+            else:
+                start = self._value(item, names)
+                end = high if step > 1 else start
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field '{field}' out of range {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    @staticmethod
+    def _value(text, names):
+        return names[text] if text in names else int(text)
+
+    def _day_matches(self, day):
+        if day.month not in self.months:
+            return False
+        in_month = day.day in self.days
+        in_week = day.weekday() in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return in_month or in_week
+        return in_month and in_week
+
+    def next_after(self, moment):
+        """First matching minute strictly after moment (same tzinfo as moment)"""
+        start = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+
+        for _ in range(self.MAX_DAYS):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression never matches: '{self.expression}'")
@@ -1,6 +1,6 @@
 import re
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, func, ForeignKey, Index, UniqueConstraint, event
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, Text, func, ForeignKey, Index, UniqueConstraint, event
 from sqlalchemy.orm import relationship, validates
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID, JSONB
 
@@ -35,7 +35,7 @@ class ReportExecution(BaseModel):
     
     # Export info
     export_format = Column(String(20))  # csv, xlsx, json, pdf
-    file_size_bytes = Column(Integer)
+    file_size_bytes = Column(BigInteger)  # streamed exports can pass 2GB
     
     # Relationships
     report = relationship("Report", back_populates="executions")
@@ -0,0 +1,20 @@
+
+def register_report_scheduler(app):
+    """Run due report schedules from the web workers when report_scheduler_in_worker is set"""
+    from app.config import config
+
+    if not config.get('report_scheduler_in_worker'):
+        return
+
+    try:
+        from app.classes import ReportScheduler
+    except ImportError:
+        app.logger.info("Report scheduler not available")
+        return
+
+    # Schedules are claimed with SKIP LOCKED, so every worker can poll safely.
+    # start() is a no-op once running; calling it per request restarts the
+    # thread in workers forked after create_app (gunicorn --preload).
+    ReportScheduler.start()
+    app.before_request(ReportScheduler.start)
+    app.logger.info("Report scheduler started in worker")
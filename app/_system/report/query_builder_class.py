@@ -1,44 +1,211 @@
-from abc import ABC, abstractmethod
-from sqlalchemy import text
-
-from app.register.database import db_registry 
-
+import re
 from abc import ABC, abstractmethod
 from sqlalchemy import text
 
 from app.register.database import db_registry 
 
 class ReportQueryGenerator(ABC):
-    """Abstract base class for report query generation"""
+    """
+    Abstract base class for report query generation
+
+    Generated SQL only varies with the shape of a request (which columns
+    are filtered, sort column and direction), never with its values:
+    variables, search terms and the paging window are bound parameters
+    collected into the `params` dict passed to each builder. Identical
+    text lets the server reuse cached plans across requests.
+    """
     __depends_on__ = []  
+
+    # Prefix for parameters the generator adds, so they cannot collide with report variables
+    PARAM_PREFIX = 'rq_'
+    PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+    WHOLE_LITERAL_RE = re.compile(r"'\{(\w+)\}'")
+    # {name}, with the surrounding "IN (" and ")" when it is the whole list
+    SQL_PLACEHOLDER_RE = re.compile(
+        r"(?P<open>\bIN\s*\(\s*)?\{(?P<name>\w+)\}(?P<close>\s*\))?", re.IGNORECASE
+    )
+    # Single-quoted literals and comments, or a run of anything else
+    SQL_SEGMENT_RE = re.compile(
+        r"(?P<literal>'(?:[^']|'')*'?)|(?P<comment>--[^\n]*|/\*.*?(?:\*/|$))|[^'/-]+|.",
+        re.DOTALL
+    )
+    # Placeholders, words, multi-character operators and single characters
+    SQL_TOKEN_RE = re.compile(r"\{\w+\}|\w+|::|<=|>=|<>|!=|\|\||\S")
+    # Tokens after which a placeholder stands for a value
+    VALUE_OPERATORS = {'=', '<', '>', '<=', '>=', '<>', '!=', '+', '-', '*', '/', '%', '||', '^', '~', '&', '|'}
+    VALUE_KEYWORDS = {'LIKE', 'ILIKE', 'BETWEEN', 'IS', 'ESCAPE', 'WHEN', 'THEN', 'ELSE', 'LIMIT', 'OFFSET', 'FIRST', 'NEXT'}
+
     def __init__(self):
         self.db_session = db_registry._routing_session()
 
     @abstractmethod
-    def build_paginated_query(self, base_query, columns, filters, order_by, limit, offset):
+    def build_paginated_query(self, base_query, columns, filters, order_by, limit, offset, params):
         """Build a paginated query with filters and ordering"""
         pass
     
-    @abstractmethod
     def build_count_query(self, base_query, filters=None):
         """Build a count query"""
-        pass
+        where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
+        return f"SELECT COUNT(*) AS count FROM ({base_query}) AS counted {where_clause}"
     
     @abstractmethod
     def get_row_number_syntax(self):
         """Get the row number syntax for the database"""
         pass
     
-    def process_variables(self, query, variables):
-        """Replace variable placeholders in the query"""
-        processed_query = query
-        for name, value in variables.items():
-            placeholder = f"{{{name}}}"
-            processed_query = processed_query.replace(placeholder, str(value))
-        return processed_query
-    
-    def build_filter_conditions(self, columns, column_search, global_search, report=None):
-        """Build WHERE conditions from search parameters"""
+    def build_filtered_query(self, base_query, columns, filters):
+        """Build the unpaginated, unordered query for every row matching filters"""
+        where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
+        col_list = ', '.join([self._quote_identifier(col) for col in columns])
+        return f"SELECT {col_list} FROM ({base_query}) AS base_data {where_clause}"
+
+    def process_variables(self, query, variables, params):
+        """
+        Turn {name} placeholders into bound parameters
+
+        - {name} in SQL, or a literal that is exactly '{name}', becomes :name
+        - IN ({name}) binds one parameter per item of a list value, or of
+          a comma-separated string ('1,2,3' or "'a','b'")
+        - {name} inside a longer literal ('{prefix}%', '{year}-01-01') is
+          substituted into the literal text with quotes escaped, since a
+          parameter cannot be part of a literal
+
+        Placeholders without a value are left as they are; comments are
+        not touched. A placeholder with a value where SQL expects a name or
+        clause (SELECT {column}, WHERE {where_clause}, ORDER BY {sort})
+        raises ValueError, as it cannot be bound.
+        """
+        self.check_placeholders(query, variables)
+
+        def bind_sql(match):
+            name = match.group('name')
+            if name not in variables:
+                return match.group(0)
+
+            if match.group('open') and match.group('close'):
+                names = []
+                for i, item in enumerate(self._list_items(variables[name])):
+                    params[f"{name}_{i}"] = item
+                    names.append(f":{name}_{i}")
+                # An empty list matches nothing, as IN () is not valid SQL
+                return f"{match.group('open')}{', '.join(names) or 'NULL'}{match.group('close')}"
+
+            params[name] = variables[name]
+            placeholder = f":{name}"
+            # {name}::type would read as one token; (:name)::type binds
+            if match.string.startswith(':', match.end()):
+                placeholder = f"({placeholder})"
+            return f"{match.group('open') or ''}{placeholder}{match.group('close') or ''}"
+
+        def substitute(match):
+            name = match.group(1)
+            if name not in variables:
+                return match.group(0)
+            return self._escape_literal(variables[name])
+
+        parts = []
+        for segment in self.SQL_SEGMENT_RE.finditer(query):
+            text_part = segment.group(0)
+            if segment.group('literal'):
+                whole = self.WHOLE_LITERAL_RE.fullmatch(text_part)
+                if whole and whole.group(1) in variables:
+                    params[whole.group(1)] = variables[whole.group(1)]
+                    text_part = f":{whole.group(1)}"
+                else:
+                    text_part = self.PLACEHOLDER_RE.sub(substitute, text_part)
+            elif not segment.group('comment'):
+                text_part = self.SQL_PLACEHOLDER_RE.sub(bind_sql, text_part)
+            parts.append(text_part)
+        return ''.join(parts)
+
+    @classmethod
+    def check_placeholders(cls, query, names=None):
+        """
+        Reject {name} placeholders standing for a column, table or clause
+
+        Variables are bound as values, so they can only go where a value
+        goes: after a comparison or arithmetic operator, LIKE, BETWEEN ...
+        AND, THEN, LIMIT and the like, or inside a parenthesised
+        expression list. Placeholders inside literals are always accepted.
+
+        Args:
+            query: Report SQL
+            names: Only check these variable names (default: all)
+
+        Raises:
+            ValueError: naming the first misplaced variable
+        """
+        for name, after in cls._identifier_placeholders(query or ''):
+            if names is None or name in names:
+                raise ValueError(
+                    f"Report variable '{name}' is used after '{after}', where SQL expects a name or clause; "
+                    f"variables are bound as values and can only be used where a value goes"
+                )
+
+    @classmethod
+    def _identifier_placeholders(cls, query):
+        """(name, preceding token) of each placeholder outside a value position"""
+        tokens = []
+        for segment in cls.SQL_SEGMENT_RE.finditer(query):
+            if segment.group('literal'):
+                tokens.append("'")
+            elif not segment.group('comment'):
+                tokens.extend(cls.SQL_TOKEN_RE.findall(segment.group(0)))
+
+        found = []
+        subquery = []     # per open parenthesis: whether it holds a SELECT
+        between = [0]     # per nesting level: BETWEENs still waiting for their AND
+        value_next = False
+        previous = 'start of query'
+        for i, token in enumerate(tokens):
+            upper = token.upper()
+            following = tokens[i + 1].upper() if i + 1 < len(tokens) else ''
+
+            if token.startswith('{'):
+                if not value_next or following == '.':
+                    found.append((token[1:-1], previous))
+                value_next = False
+            elif token == '(':
+                subquery.append(following in ('SELECT', 'WITH'))
+                between.append(0)
+                value_next = not subquery[-1]
+            elif token == ')':
+                if subquery:
+                    subquery.pop()
+                    between.pop()
+                value_next = False
+            elif token == ',':
+                value_next = bool(subquery) and not subquery[-1]
+            elif upper == 'AND' and between[-1]:
+                between[-1] -= 1
+                value_next = True
+            else:
+                if upper == 'BETWEEN':
+                    between[-1] += 1
+                value_next = token in cls.VALUE_OPERATORS or upper in cls.VALUE_KEYWORDS
+            previous = token
+        return found
+
+    @staticmethod
+    def _list_items(value):
+        """Items for IN ({name}): a list as is, or a comma-separated string"""
+        if isinstance(value, (list, tuple, set)):
+            return list(value)
+        items = []
+        for item in str(value).split(','):
+            item = item.strip()
+            if len(item) >= 2 and item[0] == item[-1] == "'":
+                item = item[1:-1].replace("''", "'")
+            if item:
+                items.append(item)
+        return items
+
+    def _escape_literal(self, value):
+        """Text of value for use inside a single-quoted SQL literal"""
+        return str(value).replace("'", "''")
+
+    def build_filter_conditions(self, columns, column_search, global_search, params, report=None):
+        """Build WHERE conditions from search parameters, binding search values into params"""
         conditions = []
         
         # Get column metadata if report is provided
@@ -53,7 +220,7 @@ class ReportQueryGenerator(ABC):
             for col_idx, search_text in column_search.items():
                 if search_text and search_text.strip():
                     col_name = columns[int(col_idx)] if col_idx.isdigit() else col_idx
-                    condition = self._build_column_condition(col_name, search_text.strip(), column_types.get(col_name))
+                    condition = self._build_column_condition(col_name, search_text.strip(), params, column_types.get(col_name))
                     if condition:
                         conditions.append(condition)
         
@@ -63,7 +230,7 @@ class ReportQueryGenerator(ABC):
             for col in report.columns:
                 # Only search on searchable text-like columns
                 if col.is_searchable and col.data_type and col.data_type.name.lower() in ['string', 'text', 'varchar', 'char']:
-                    condition = self._build_column_condition(col.name, global_search, col.data_type.name.lower())
+                    condition = self._build_column_condition(col.name, global_search, params, col.data_type.name.lower())
                     if condition:
                         global_conditions.append(condition)
             
@@ -75,65 +242,77 @@ class ReportQueryGenerator(ABC):
             for col_name in columns:
                 # Skip columns that are likely not text based on common naming patterns
                 if not any(pattern in col_name.lower() for pattern in ['_id', '_at', 'is_', 'has_', 'version', 'count', 'amount', 'price']):
-                    global_conditions.append(f"{self._quote_identifier(col_name)} LIKE '%{self._escape_sql_string(global_search)}%'")
+                    global_conditions.append(self._build_column_condition(col_name, global_search, params))
             
             if global_conditions:
                 conditions.append(f"({' OR '.join(global_conditions)})")
         
         return conditions
     
-    def _build_column_condition(self, col_name, search_value, data_type=None):
+    def _build_column_condition(self, col_name, search_value, params, data_type=None):
         """Build appropriate filter condition based on column data type"""
-        escaped_value = self._escape_sql_string(search_value)
         quoted_col = self._quote_identifier(col_name)
         
         # Handle different data types
         if data_type:
             if data_type in ['string', 'text', 'varchar', 'char']:
-                return f"{quoted_col} ILIKE '%{escaped_value}%'"
+                return self._contains(quoted_col, search_value, params)
             elif data_type in ['integer', 'bigint', 'smallint', 'numeric', 'decimal', 'float', 'double']:
                 # For numeric types, only filter if search value is numeric
                 try:
                     float(search_value)
-                    return f"{quoted_col}::text LIKE '%{escaped_value}%'"
+                    return self._contains(self._cast_text(quoted_col), search_value, params)
                 except ValueError:
                     return None
             elif data_type in ['boolean', 'bool']:
                 # For boolean, check for true/false variations
                 lower_val = search_value.lower()
                 if lower_val in ['true', '1', 'yes', 'y', 't']:
-                    return f"{quoted_col} = true"
+                    return f"{quoted_col} = {self._bind(params, True)}"
                 elif lower_val in ['false', '0', 'no', 'n', 'f']:
-                    return f"{quoted_col} = false"
+                    return f"{quoted_col} = {self._bind(params, False)}"
                 return None
-            elif data_type in ['date', 'datetime', 'timestamp']:
-                # Cast to text for date/time searching
-                return f"{quoted_col}::text ILIKE '%{escaped_value}%'"
-            elif data_type in ['uuid', 'id']:
-                # For UUIDs, exact match or cast to text
-                return f"{quoted_col}::text ILIKE '%{escaped_value}%'"
-            elif data_type in ['json', 'jsonb']:
-                # For JSON fields, cast to text
-                return f"{quoted_col}::text ILIKE '%{escaped_value}%'"
             else:
-                # Unknown type, try text casting
-                return f"{quoted_col}::text ILIKE '%{escaped_value}%'"
+                # Dates, UUIDs, JSON and unknown types: search their text form
+                return self._contains(self._cast_text(quoted_col), search_value, params)
         else:
             # No type info, use LIKE
-            return f"{quoted_col} LIKE '%{escaped_value}%'"
+            return self._contains(quoted_col, search_value, params)
+
+    def _contains(self, expression, search_value, params):
+        """Case-insensitive substring match against a bound pattern"""
+        pattern = self._bind(params, f"%{self._escape_like(search_value)}%")
+        return f"{expression} {self.LIKE_OPERATOR} {pattern} ESCAPE {self.LIKE_ESCAPE}"
+
+    def _bind(self, params, value):
+        """Add a generator parameter and return its placeholder"""
+        name = f"{self.PARAM_PREFIX}{len([key for key in params if key.startswith(self.PARAM_PREFIX)])}"
+        params[name] = value
+        return f":{name}"
     
-    def _escape_sql_string(self, value):
-        """Escape SQL string to prevent injection"""
+    def _escape_like(self, value):
+        """Escape LIKE wildcards so the search value matches literally"""
         if value is None:
             return ''
-        # Escape single quotes
-        return str(value).replace("'", "''").replace("%", "\\%").replace("_", "\\_")
+        return str(value).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    # Dialect hooks; PostgreSQL defaults
+    LIKE_OPERATOR = 'ILIKE'
+    LIKE_ESCAPE = "'\\'"
+
+    def _cast_text(self, expression):
+        return f"CAST({expression} AS TEXT)"
     
     @abstractmethod
     def _quote_identifier(self, identifier):
         """Quote identifier based on database type"""
         pass
 
+    @staticmethod
+    def _has_limit(limit):
+        # DataTables sends -1 for "all rows"
+        return limit is not None and int(limit) >= 0
+
 
 class PostgreSQLQueryGenerator(ReportQueryGenerator):
     """Query generator for PostgreSQL"""
@@ -146,10 +325,16 @@ class PostgreSQLQueryGenerator(ReportQueryGenerator):
         """Quote identifier for PostgreSQL"""
         return f'"{identifier}"'
     
-    def build_paginated_query(self, base_query, columns, filters, order_by, limit, offset):
+    def build_paginated_query(self, base_query, columns, filters, order_by, limit, offset, params):
         """Build PostgreSQL paginated query using LIMIT/OFFSET"""
         where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
         col_list = ', '.join([self._quote_identifier(col) for col in columns])
+
+        paging = ""
+        if self._has_limit(limit):
+            params['rq_limit'] = int(limit)
+            params['rq_offset'] = int(offset)
+            paging = "LIMIT :rq_limit OFFSET :rq_offset"
         
         # PostgreSQL can use simpler LIMIT/OFFSET syntax
         query = f"""
@@ -157,56 +342,85 @@ class PostgreSQLQueryGenerator(ReportQueryGenerator):
         FROM ({base_query}) AS base_data
         {where_clause}
         {order_by}
-        LIMIT {limit} OFFSET {offset}
+        {paging}
         """
         return query
-    
-    def build_count_query(self, base_query, filters=None):
-        """Build PostgreSQL count query"""
-        where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
-        return f"SELECT COUNT(*) as count FROM ({base_query}) AS counted {where_clause}"
 
 
 class MSSQLQueryGenerator(ReportQueryGenerator):
     """Query generator for Microsoft SQL Server"""
     __depends_on__ = []  
 
+    # OFFSET ... FETCH needs SQL Server 2012+; set False to page with ROW_NUMBER()
+    use_offset_fetch = True
+
+    # Case sensitivity follows the column collation (insensitive by default)
+    LIKE_OPERATOR = 'LIKE'
+
     def get_row_number_syntax(self):
         return "ROW_NUMBER() OVER"
     
     def _quote_identifier(self, identifier):
         """Quote identifier for SQL Server"""
         return f'[{identifier}]'
+
+    def _cast_text(self, expression):
+        return f"CAST({expression} AS NVARCHAR(MAX))"
+
+    def _build_column_condition(self, col_name, search_value, params, data_type=None):
+        condition = super()._build_column_condition(col_name, search_value, params, data_type)
+        if condition and data_type in ('boolean', 'bool'):
+            # BIT columns compare against 1/0
+            name = condition.rsplit(':', 1)[1]
+            params[name] = 1 if params[name] else 0
+        return condition
     
-    def build_paginated_query(self, base_query, columns, filters, order_by, limit, offset):
-        """Build MSSQL paginated query using ROW_NUMBER()"""
+    def build_paginated_query(self, base_query, columns, filters, order_by, limit, offset, params):
+        """Build MSSQL paginated query using OFFSET/FETCH (ROW_NUMBER() before 2012)"""
         where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
         col_list = ', '.join([self._quote_identifier(col) for col in columns])
-        
-        query = f"""
+
+        if not self._has_limit(limit):
+            return f"""
+        SELECT {col_list}
+        FROM ({base_query}) AS base_data
+        {where_clause}
+        {order_by}
+        """
+
+        params['rq_limit'] = int(limit)
+        params['rq_offset'] = int(offset)
+
+        if self.use_offset_fetch:
+            # OFFSET requires an ORDER BY
+            return f"""
+        SELECT {col_list}
+        FROM ({base_query}) AS base_data
+        {where_clause}
+        {order_by or 'ORDER BY (SELECT NULL)'}
+        OFFSET :rq_offset ROWS FETCH NEXT :rq_limit ROWS ONLY
+        """
+
+        return f"""
         SELECT {col_list}
         FROM (
-            SELECT ROW_NUMBER() OVER ({order_by}) AS RowNo, *
-            FROM (
-                SELECT *
-                FROM ({base_query}) AS INTERNAL
-            ) AS WRAPPEDROWS
+            SELECT ROW_NUMBER() OVER ({order_by or 'ORDER BY (SELECT NULL)'}) AS RowNo, *
+            FROM ({base_query}) AS INTERNAL
             {where_clause}
         ) AS PAGINATED
-        WHERE RowNo > {offset} AND RowNo <= {offset + limit}
+        WHERE RowNo > :rq_offset AND RowNo <= :rq_offset + :rq_limit
         """
-        return query
-    
-    def build_count_query(self, base_query, filters=None):
-        """Build MSSQL count query"""
-        where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
-        return f"SELECT COUNT(*) as count FROM ({base_query}) AS counted {where_clause}"
 
 
 class MySQLQueryGenerator(ReportQueryGenerator):
     """Query generator for MySQL"""
     __depends_on__ = []  
 
+    # Case sensitivity follows the column collation (insensitive by default)
+    LIKE_OPERATOR = 'LIKE'
+    # Backslash is an escape character inside MySQL string literals
+    LIKE_ESCAPE = "'\\\\'"
+
     def get_row_number_syntax(self):
         # MySQL 8.0+ supports ROW_NUMBER()
         return "ROW_NUMBER() OVER"
@@ -214,31 +428,73 @@ class MySQLQueryGenerator(ReportQueryGenerator):
     def _quote_identifier(self, identifier):
         """Quote identifier for MySQL"""
         return f'`{identifier}`'
+
+    def _cast_text(self, expression):
+        return f"CAST({expression} AS CHAR)"
+
+    def _escape_literal(self, value):
+        return str(value).replace('\\', '\\\\').replace("'", "''")
     
-    def build_paginated_query(self, base_query, columns, filters, order_by, limit, offset):
+    def build_paginated_query(self, base_query, columns, filters, order_by, limit, offset, params):
         """Build MySQL paginated query using LIMIT/OFFSET"""
         where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
         col_list = ', '.join([self._quote_identifier(col) for col in columns])
+
+        paging = ""
+        if self._has_limit(limit):
+            params['rq_limit'] = int(limit)
+            params['rq_offset'] = int(offset)
+            paging = "LIMIT :rq_limit OFFSET :rq_offset"
         
         query = f"""
         SELECT {col_list}
         FROM ({base_query}) AS base_data
         {where_clause}
         {order_by}
-        LIMIT {limit} OFFSET {offset}
+        {paging}
         """
         return query
-    
-    def build_count_query(self, base_query, filters=None):
-        """Build MySQL count query"""
-        where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
-        return f"SELECT COUNT(*) as count FROM ({base_query}) AS counted {where_clause}"
+
+
+class _LazyConnection:
+    """Checks out a pooled connection only when a query actually has to run"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._conn = None
+
+    @property
+    def opened(self):
+        return self._conn is not None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = db_registry.get_engine_for_connection(self.connection).connect()
+        return self._conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._conn is not None:
+            self._conn.close()
+        return False
+
 
 class ReportQueryExecutor:
-    """Main class for executing report queries across different database types"""
+    """
+    Main class for executing report queries across different database types
+
+    Reports with caching enabled (options cache_enabled) reuse pages and
+    counts from ReportResultCache; with cache_materialize the whole filtered
+    result is fetched once into a ReportBuffer and paged/sorted locally.
+    """
     __depends_on__ = ['MSSQLQueryGenerator',
                       'PostgreSQLQueryGenerator',
-                      'MySQLQueryGenerator']
+                      'MySQLQueryGenerator',
+                      'ReportResultCache',
+                      'ReportBuffer']
     
     GENERATORS = {
         'mssql': MSSQLQueryGenerator,
@@ -256,8 +512,15 @@ class ReportQueryExecutor:
         self.db_type = db_type.lower()
         self.db_session=None
     
-    def execute_report(self, report, request_data):
-        """Execute a report with the given parameters"""
+    def prepare_request(self, report, request_data):
+        """
+        Parse a DataTables-style request into the query pieces
+
+        Returns:
+            dict: draw, start, length, search_value, order_column, order_dir,
+            order_by, return_columns, column_names, vars_form, params,
+            base_query, filters, filter_key
+        """
         # Extract parameters from request
         draw = int(request_data.get('draw', 1))
         start = int(request_data.get('start', 0))
@@ -347,18 +610,19 @@ class ReportQueryExecutor:
             order_column = default_sort_column if default_sort_column else column_names[0] if column_names else None
             order_dir = 'ASC'  # Default direction when no order specified
         
+        # Sort column and direction go into the SQL text, so only known values
+        if order_column not in column_names:
+            order_column = column_names[0] if column_names else None
+        order_dir = 'DESC' if str(order_dir).upper() == 'DESC' else 'ASC'
+
         # Always build ORDER BY since ROW_NUMBER() requires it
         if order_column:
-            if self.db_type == 'mssql':
-                order_by = f"ORDER BY [{order_column}] {order_dir}"
-            elif self.db_type in ('postgresql', 'postgres'):
-                order_by = f'ORDER BY "{order_column}" {order_dir}'
-            else:  # mysql
-                order_by = f"ORDER BY `{order_column}` {order_dir}"
+            order_by = f"ORDER BY {self.generator._quote_identifier(order_column)} {order_dir}"
         
-        # Process base query
+        # Process base query; variables become bound parameters
+        params = dict(vars_form)
         base_query = report.query.strip().rstrip(';')
-        base_query = self.generator.process_variables(base_query, vars_form)
+        base_query = self.generator.process_variables(base_query, vars_form, params)
         
         # Get searchable columns from request or use report metadata
         searchable_columns = request_data.get('searchable_columns', [])
@@ -372,65 +636,117 @@ class ReportQueryExecutor:
         
         # Build filter conditions - pass report for column type information
         filters = self.generator.build_filter_conditions(
-            search_column_names, column_search, search_value, report
+            search_column_names, column_search, search_value, params, report
         )
-        
+        # Filter SQL is the same for every search term; the values are in params
+        filter_key = (filters, {k: v for k, v in params.items() if k.startswith(self.generator.PARAM_PREFIX)})
+
+        return {
+            'draw': draw,
+            'start': start,
+            'length': length,
+            'search_value': search_value,
+            'order_column': order_column,
+            'order_dir': order_dir,
+            'order_by': order_by,
+            'return_columns': return_columns,
+            'column_names': column_names,
+            'vars_form': vars_form,
+            'params': params,
+            'base_query': base_query,
+            'filters': filters,
+            'filter_key': filter_key,
+        }
+
+    def execute_report(self, report, request_data):
+        """Execute a report with the given parameters"""
+        from app.classes import ReportResultCache, ReportBuffer
+
+        prepared = self.prepare_request(report, request_data)
+        draw, start, length = prepared['draw'], prepared['start'], prepared['length']
+        order_column, order_dir, order_by = prepared['order_column'], prepared['order_dir'], prepared['order_by']
+        return_columns, column_names = prepared['return_columns'], prepared['column_names']
+        vars_form, params, base_query = prepared['vars_form'], prepared['params'], prepared['base_query']
+        filters, filter_key = prepared['filters'], prepared['filter_key']
+
+        ttl, materialize, row_limit = report.get_cache_settings()
+        cache = ReportResultCache if ttl > 0 else None
+        pk_columns = [col.name for col in report.columns if col.is_pk or col.is_identity]
+        cached = False
+
         try:
-            # Build and execute paginated query
-            paginated_query = self.generator.build_paginated_query(
-                base_query, column_names, filters, order_by, length, start
-            )
-            
-            engine = db_registry.get_or_create_engine(report.connection.name)
-            if engine:
-                with engine.connect() as conn:
-                    results = conn.execute(text(paginated_query), vars_form).fetchall()
-                    
-                    # Convert results to list of dicts
-                    data_rows = []
-                    for row in results:
-                        # If return_columns specified, return only those columns in order
-                        if return_columns:
-                            row_data = {}
-                            row_mapping = dict(row._mapping)
-                            
-                            # Always include PK/identity columns for row actions
-                            if report and hasattr(report, 'columns'):
-                                for col in report.columns:
-                                    if (col.is_pk or col.is_identity) and col.name in row_mapping:
-                                        # Add PK/identity columns even if not in return_columns
-                                        if col.name not in return_columns:
-                                            row_data[col.name] = row_mapping[col.name]
-                            
-                            # Add requested columns
-                            for col in return_columns:
-                                row_data[col] = row_mapping.get(col)
-                            
-                            data_rows.append(row_data)
-                        else:
-                            data_rows.append(dict(row._mapping))
-                    
-                    # Get total count
-                    count_query = self.generator.build_count_query(base_query)
-                    count_result = conn.execute(text(count_query), vars_form).fetchone()
-                    total_rows = count_result.count if count_result else 0
-                    
-                    # Get filtered count
+            with _LazyConnection(report.connection) as lazy:
+                data_rows = None
+                filtered_count = None
+
+                if cache and materialize:
+                    buffer_key = cache.make_key(report, 'buffer', vars_form, filter_key)
+                    buffer = cache.get(buffer_key)
+                    if buffer is None:
+                        filtered_query = self.generator.build_filtered_query(base_query, column_names, filters)
+                        buffer = ReportBuffer.load(lazy.conn.execute(text(filtered_query), params), row_limit)
+                        # False remembers a result too large to materialize
+                        cache.put(buffer_key, report.id, buffer or False, ttl)
+                    else:
+                        cached = True
+                    if buffer:
+                        data_rows = buffer.page(order_column, order_dir, start, length, return_columns, pk_columns)
+                        filtered_count = buffer.row_count
+
+                if data_rows is None:
+                    page_key = cache.make_key(
+                        report, 'page', vars_form, filter_key, order_column, order_dir, start, length, return_columns
+                    ) if cache else None
+                    data_rows = cache.get(page_key) if cache else None
+                    if data_rows is None:
+                        # Build and execute paginated query
+                        page_params = dict(params)
+                        paginated_query = self.generator.build_paginated_query(
+                            base_query, column_names, filters, order_by, length, start, page_params
+                        )
+                        results = lazy.conn.execute(text(paginated_query), page_params).fetchall()
+                        data_rows = self._rows_to_dicts(results, return_columns, pk_columns)
+                        if cache:
+                            cache.put(page_key, report.id, data_rows, ttl)
+                    else:
+                        cached = True
+
+                # Get total count
+                total_key = cache.make_key(report, 'total', vars_form) if cache else None
+                total_rows = cache.get(total_key) if cache else None
+                if total_rows is None:
+                    if filtered_count is not None and not filters:
+                        total_rows = filtered_count
+                    else:
+                        count_query = self.generator.build_count_query(base_query)
+                        count_result = lazy.conn.execute(text(count_query), params).fetchone()
+                        total_rows = count_result.count if count_result else 0
+                    if cache:
+                        cache.put(total_key, report.id, total_rows, ttl)
+
+                # Get filtered count
+                if filtered_count is None:
                     filtered_count = total_rows
                     if filters:
-                        filtered_query = self.generator.build_count_query(base_query, filters)
-                        filtered_result = conn.execute(text(filtered_query), vars_form).fetchone()
-                        filtered_count = filtered_result.count if filtered_result else 0
-                    
-                    return {
-                        "success": True,
-                        "draw": draw,
-                        "recordsTotal": total_rows,
-                        "recordsFiltered": filtered_count,
-                        "data": data_rows,
-                        "headers": return_columns if return_columns else column_names
-                    }
-        
+                        filtered_key = cache.make_key(report, 'filtered', vars_form, filter_key) if cache else None
+                        filtered_count = cache.get(filtered_key) if cache else None
+                        if filtered_count is None:
+                            filtered_query = self.generator.build_count_query(base_query, filters)
+                            filtered_result = lazy.conn.execute(text(filtered_query), params).fetchone()
+                            filtered_count = filtered_result.count if filtered_result else 0
+                            if cache:
+                                cache.put(filtered_key, report.id, filtered_count, ttl)
+
+                return {
+                    "success": True,
+                    "draw": draw,
+                    "recordsTotal": total_rows,
+                    "recordsFiltered": filtered_count,
+                    "data": data_rows,
+                    "headers": return_columns if return_columns else column_names,
+                    "cached": cached and not lazy.opened
+                }
+
         except Exception as e:
             return {
                 "success": False,
@@ -440,8 +756,67 @@ class ReportQueryExecutor:
                 "data": [],
                 "error": str(e)
             }
-        
-    def test_query(self, query, params=None):
+
+    @staticmethod
+    def _rows_to_dicts(results, return_columns, pk_columns):
+        """Convert result rows to dicts, limited to return_columns when given"""
+        data_rows = []
+        for row in results:
+            row_mapping = dict(row._mapping)
+            # If return_columns specified, return only those columns in order
+            if return_columns:
+                row_data = {}
+
+                # Always include PK/identity columns for row actions
+                for col_name in pk_columns:
+                    if col_name in row_mapping and col_name not in return_columns:
+                        row_data[col_name] = row_mapping[col_name]
+
+                # Add requested columns
+                for col in return_columns:
+                    row_data[col] = row_mapping.get(col)
+
+                data_rows.append(row_data)
+            else:
+                data_rows.append(row_mapping)
+        return data_rows
+
+    def build_export_query(self, report, request_data):
+        """
+        Build the query for a full export: every filtered row, in the requested order
+
+        Returns:
+            tuple: (sql, params, columns)
+        """
+        prepared = self.prepare_request(report, request_data)
+        column_names = prepared['column_names']
+
+        # Only known columns reach the SQL text
+        columns = [col for col in prepared['return_columns'] if col in column_names] or column_names
+
+        query = self.generator.build_filtered_query(prepared['base_query'], columns, prepared['filters'])
+        if prepared['order_column'] in columns:
+            query = f"{query} {prepared['order_by']}"
+        return query, prepared['params'], columns
+
+    @staticmethod
+    def stream_query(engine, query, params, chunk_rows=5000):
+        """
+        Run a query with a server-side cursor
+
+        Yields lists of row tuples of at most chunk_rows, so memory stays
+        flat however large the result is. The pooled connection is held
+        until the generator is exhausted or closed.
+        """
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(text(query), params)
+            try:
+                for partition in result.partitions(chunk_rows):
+                    yield [tuple(row) for row in partition]
+            finally:
+                result.close()
+
+    def test_query(self, query, params=None, connection=None):
         """Test a query and return column information"""
         try:
             # Execute query with LIMIT 1 to get column info
@@ -450,7 +825,7 @@ class ReportQueryExecutor:
             else:
                 test_query = f"SELECT * FROM ({query}) AS test LIMIT 1"
             
-            result = self.db_session.execute(text(test_query), params or {}).first()
+            result = (connection or self.db_session).execute(text(test_query), params or {}).first()
             
             columns = []
             if result:
@@ -0,0 +1,99 @@
+import threading
+
+
+class ReportBuffer:
+    """
+    A report's full filtered result held in memory, column by column
+
+    Built once from the source database and then paged and sorted locally,
+    so flipping through a heavy report does not re-run it. Sort orders are
+    computed once per (column, direction) and reused; NULLs sort last
+    ascending and first descending, as in PostgreSQL.
+    """
+    __depends_on__ = []
+
+    FETCH_CHUNK_ROWS = 1000
+
+    def __init__(self, columns, data):
+        self.columns = columns
+        self.data = data  # column name -> list of values
+        self.row_count = len(data[columns[0]]) if columns else 0
+        self._orders = {}  # (column, descending) -> row indexes
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, result, max_rows):
+        """
+        Read a result into a buffer
+
+        Args:
+            result: SQLAlchemy CursorResult for the full filtered query
+            max_rows: Give up past this many rows (0 for no limit)
+
+        Returns:
+            ReportBuffer, or None when the result has more than max_rows rows
+        """
+        columns = list(result.keys())
+        data = {column: [] for column in columns}
+        appends = [data[column].append for column in columns]
+        row_count = 0
+
+        while True:
+            rows = result.fetchmany(cls.FETCH_CHUNK_ROWS)
+            if not rows:
+                break
+            row_count += len(rows)
+            if max_rows and row_count > max_rows:
+                result.close()
+                return None
+            for row in rows:
+                for append, value in zip(appends, row):
+                    append(value)
+
+        return cls(columns, data)
+
+    def page(self, order_column, order_dir, start, length, return_columns=None, extra_columns=()):
+        """
+        Get one page of rows as dicts
+
+        Args:
+            order_column: Column to sort by, or None for source order
+            order_dir: 'ASC' or 'DESC'
+            start: Offset of the first row
+            length: Page size; negative for every row from start
+            return_columns: Columns to return, in order (default: all)
+            extra_columns: Columns always included ahead of return_columns
+        """
+        order = self._order(order_column, str(order_dir).upper() == 'DESC')
+        end = self.row_count if length is None or length < 0 else start + length
+        indexes = order[start:end] if order is not None else range(start, min(end, self.row_count))
+
+        if return_columns:
+            names = [name for name in extra_columns if name not in return_columns and name in self.data]
+            names += list(return_columns)
+        else:
+            names = self.columns
+
+        empty = [None] * self.row_count
+        selected = [(name, self.data.get(name, empty)) for name in names]
+        return [{name: values[index] for name, values in selected} for index in indexes]
+
+    def _order(self, column, descending):
+        if column not in self.data:
+            return None
+
+        key = (column, descending)
+        order = self._orders.get(key)
+        if order is None:
+            values = self.data[column]
+            present = [index for index, value in enumerate(values) if value is not None]
+            missing = [index for index, value in enumerate(values) if value is None]
+            try:
+                present.sort(key=values.__getitem__, reverse=descending)
+            except TypeError:
+                # Mixed types in one column: fall back to comparing as text
+                present.sort(key=lambda index: str(values[index]), reverse=descending)
+            order = missing + present if descending else present + missing
+            with self._lock:
+                order = self._orders.setdefault(key, order)
+        return order
@@ -8,7 +8,7 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 try:
     from app.classes import QueryMetadataError, QueryMetadataExtractor
-    from app.classes import ReportQueryExecutor
+    from app.classes import ReportQueryExecutor, ReportExporter
 except Exception as ex:
     pass
 
@@ -29,7 +29,7 @@ class ReportService:
     Comprehensive service for managing reports, templates, and executions.
     Handles all report-related operations including CRUD, execution, and template management.
     """
-    __depends_on__ = ['ReportTemplate','ReportQueryExecutor','QueryMetadataExtractor','Report', 
+    __depends_on__ = ['ReportTemplate','ReportQueryExecutor','ReportExporter','QueryMetadataExtractor','Report', 
                       'ReportColumn', 'ReportVariable', 'ReportExecution',
                         'ReportSchedule',  'Connection', 'DataType', 
                         'VariableType', 'DatabaseType', 'Template' ]
@@ -441,7 +441,6 @@ class ReportService:
         # Get database connection
         connection = report.connection
         db_type = connection.database_type.name.lower()
-        connection_string = connection.get_connection_string()
 
         # Create executor for the database type
         executor = ReportQueryExecutor(db_type)
@@ -450,12 +449,8 @@ class ReportService:
         start_time = datetime.utcnow()
 
         try:
-            from sqlalchemy import create_engine
-            engine = create_engine(connection_string)
-
-            with engine.connect() as db_connection:
-                # Execute report
-                result = executor.execute_report(db_connection, report, request_data)
+            # The executor checks out a pooled connection only on a cache miss
+            result = executor.execute_report(report, request_data)
 
             # Calculate execution time
             execution_time = (datetime.utcnow() - start_time).total_seconds() * 1000
@@ -493,6 +488,33 @@ class ReportService:
             self.logger.error(f"Report {report.slug} execution failed: {e}")
             raise
 
+    def export_report_data(self, report_id: UUID, request_data: Dict[str, Any], export_format: str,
+                           user_id: Optional[UUID] = None, check_download_flags: bool = True) -> 'ReportExporter':
+        """
+        Prepare a streaming export of a report's full filtered result
+
+        Returns a ReportExporter; nothing runs until its stream() is consumed,
+        and the execution is recorded when the stream ends
+        """
+        report = self.get_report(report_id)
+        if not report:
+            raise ValueError(f"Report {report_id} not found")
+
+        if user_id and not Report.check_permission(user_id, report.slug, 'execute'):
+            raise PermissionError(f"User does not have permission to execute report {report.slug}")
+
+        export_format = (export_format or '').lower()
+        allowed = {
+            'csv': report.is_download_csv,
+            'xlsx': report.is_download_xlsx,
+            'ndjson': report.is_download_csv or report.is_download_xlsx,
+        }
+        if check_download_flags and not allowed.get(export_format, True):
+            raise PermissionError(f"Report {report.slug} does not allow {export_format} downloads")
+
+        self.logger.info(f"Exporting report {report.slug} as {export_format}")
+        return ReportExporter(report, request_data, export_format, user_id)
+
     def test_report_query(self, report_id: UUID, params: Optional[Dict] = None) -> List[Dict]:
         """Test a report query and return column information"""
         report = self.get_report(report_id)
@@ -502,17 +524,15 @@ class ReportService:
         # Get database connection
         connection = report.connection
         db_type = connection.database_type.name.lower()
-        connection_string = connection.get_connection_string()
 
         # Create executor
         executor = ReportQueryExecutor(db_type)
 
         try:
-            from sqlalchemy import create_engine
-            engine = create_engine(connection_string)
+            engine = db_registry.get_engine_for_connection(connection)
 
             with engine.connect() as db_connection:
-                columns = executor.test_query(db_connection, report.query, params)
+                columns = executor.test_query(report.query, params, connection=db_connection)
 
             return columns
         except Exception as e:
@@ -626,6 +646,10 @@ class ReportService:
         except Exception as e:
             return False, str(e)
 
+    def get_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Pool usage for the pooled report connection engines"""
+        return db_registry.pool_stats()
+
     # =====================================================================
     # UTILITY METHODS
     # =====================================================================
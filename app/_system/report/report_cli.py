@@ -4,8 +4,10 @@ Report CLI - Manage reports, templates, and executions
 Provides comprehensive report management capabilities
 """
 
+import os
 import sys
 import json
+import uuid
 import argparse
 from tabulate import tabulate
 from datetime import datetime, timedelta
@@ -702,6 +704,34 @@ class ReportCLI(BaseCLI):
             self.output_error(f"Error generating statistics: {e}")
             return 1
 
+    def pools(self):
+        """Show connection pool usage for report connections"""
+        try:
+            stats = self.service.get_pool_stats()
+            if not stats:
+                self.output_info("No pooled report connections in this process")
+                return 0
+
+            rows = []
+            for name, pool in sorted(stats.items()):
+                rows.append([
+                    name,
+                    pool['pool_class'],
+                    pool['size'],
+                    pool['checked_in'],
+                    pool['checked_out'],
+                    pool['overflow'],
+                    pool['connects'],
+                    pool['checkouts']
+                ])
+            self.output_table(rows, headers=['Connection', 'Pool', 'Size', 'Idle', 'In Use', 'Overflow', 'Connects', 'Checkouts'])
+            return 0
+
+        except Exception as e:
+            self.log_error(f"Error reading pool stats: {e}")
+            self.output_error(f"Error reading pool stats: {e}")
+            return 1
+
     def export_report(self, report_id, output_file):
         """Export report definition"""
         self.log_info(f"Exporting report: {report_id}")
@@ -728,6 +758,108 @@ class ReportCLI(BaseCLI):
             self.output_error(f"Error exporting report: {e}")
             return 1
 
+    def export_data(self, report_id, output_file, export_format=None, params=None, search=None):
+        """Stream a report's full result to a CSV, NDJSON or XLSX file"""
+        self.log_info(f"Exporting data for report: {report_id}")
+
+        try:
+            report = self.service.get_report(report_id)
+            if not report:
+                self.output_error(f"Report '{report_id}' not found")
+                return 1
+
+            # Format from the file extension unless given
+            export_format = (export_format or os.path.splitext(output_file)[1].lstrip('.') or 'csv').lower()
+
+            request_data = {'vars': {}, 'search': search or ''}
+            if params:
+                for param in params:
+                    if '=' in param:
+                        key, value = param.split('=', 1)
+                        request_data['vars'][key] = value
+
+            exporter = self.service.export_report_data(
+                report.id, request_data, export_format, check_download_flags=False
+            )
+
+            self.output_info(f"Exporting {report.name} as {export_format} to {output_file}")
+            with open(output_file, 'wb') as f:
+                rows, size = exporter.write_to(f)
+
+            self.output_success(f"Exported {rows:,} rows ({size:,} bytes) to: {output_file}")
+            return 0
+
+        except Exception as e:
+            self.log_error(f"Error exporting report data: {e}")
+            self.output_error(f"Error exporting report data: {e}")
+            return 1
+
+    def manage_scheduler(self, action, schedule_id=None):
+        """
+        Scheduled report runs
+
+        Actions:
+            run: poll and run due schedules until interrupted
+            once: claim whatever is due now, run it and exit
+            status: list enabled schedules with their last and next run
+            run-now: run one schedule immediately, outside its timetable
+        """
+        from app.classes import ReportScheduler
+
+        try:
+            if action == 'run':
+                self.output_info(f"Report scheduler running (poll every {ReportScheduler.poll_interval}s, "
+                                 f"{ReportScheduler.max_workers} workers) - Ctrl+C to stop")
+                try:
+                    ReportScheduler.run_forever()
+                finally:
+                    ReportScheduler.stop(wait=True)
+                return 0
+
+            if action == 'once':
+                claimed = ReportScheduler.poll_once()
+                ReportScheduler.stop(wait=True)
+                self.output_success(f"Ran {len(claimed)} due schedule(s)")
+                return 0
+
+            if action == 'run-now':
+                if not schedule_id:
+                    self.output_error("run-now needs a schedule id")
+                    return 1
+                result = ReportScheduler.run_schedule(uuid.UUID(schedule_id))
+                self.output_success(f"Delivered {result['row_count']:,} rows ({result['size_bytes']:,} bytes), "
+                                    f"saved to {result['path']}")
+                return 0
+
+            ReportSchedule = self.get_model('ReportSchedule')
+            schedules = self.session.query(ReportSchedule).filter(
+                ReportSchedule.is_active == True
+            ).order_by(ReportSchedule.next_run_at).all()
+
+            if not schedules:
+                self.output_info("No report schedules")
+                return 0
+
+            rows = []
+            for schedule in schedules:
+                rows.append([
+                    str(schedule.id)[:8],
+                    schedule.report.slug if schedule.report else '-',
+                    schedule.schedule_type,
+                    schedule.delivery_method or '-',
+                    'Yes' if schedule.is_enabled else 'No',
+                    schedule.last_run_at.strftime('%Y-%m-%d %H:%M') if schedule.last_run_at else '-',
+                    schedule.last_run_status or '-',
+                    schedule.next_run_at.strftime('%Y-%m-%d %H:%M') if schedule.next_run_at else '-'
+                ])
+            self.output_table(rows, headers=['ID', 'Report', 'Type', 'Delivery', 'Enabled', 'Last Run (UTC)', 'Status', 'Next Run (UTC)'])
+            return 0
+
+        except Exception as e:
+            self.log_error(f"Error during scheduler {action}: {e}")
+            self.output_error(f"Error during scheduler {action}: {e}")
+            return 1
+
     def import_report(self, input_file, connection):
         """Import report definition"""
         self.log_info(f"Importing report from: {input_file}")
@@ -845,11 +977,30 @@ def main():
     # Stats command
     stats_parser = subparsers.add_parser('stats', help='Show statistics')
 
+    # Pools command
+    subparsers.add_parser('pools', help='Show report connection pool usage')
+
     # Export command
     export_parser = subparsers.add_parser('export', help='Export report definition')
     export_parser.add_argument('report', help='Report slug or UUID')
     export_parser.add_argument('output', help='Output file')
 
+    # Export data command
+    export_data_parser = subparsers.add_parser('export-data', help='Stream report results to a CSV, NDJSON or XLSX file')
+    export_data_parser.add_argument('report', help='Report slug or UUID')
+    export_data_parser.add_argument('output', help='Output file')
+    export_data_parser.add_argument('--format', '-f', choices=['csv', 'ndjson', 'xlsx'],
+                                    help='Output format (default: from the file extension)')
+    export_data_parser.add_argument('--param', '-p', action='append', help='Parameters (key=value)')
+    export_data_parser.add_argument('--search', '-s', help='Global search term')
+
+    # Scheduler command
+    scheduler_parser = subparsers.add_parser('scheduler', help='Run or inspect scheduled reports')
+    scheduler_parser.add_argument('action', choices=['run', 'once', 'status', 'run-now'],
+                                  help='run: poll until stopped, once: run what is due, '
+                                       'status: list schedules, run-now: run one schedule')
+    scheduler_parser.add_argument('schedule', nargs='?', help='Schedule UUID (for run-now)')
+
     # Import command
     import_parser = subparsers.add_parser('import', help='Import report definition')
     import_parser.add_argument('input', help='Input file')
@@ -930,9 +1081,18 @@ def main():
         elif args.command == 'stats':
             return cli.stats()
 
+        elif args.command == 'pools':
+            return cli.pools()
+
         elif args.command == 'export':
             return cli.export_report(args.report, args.output)
 
+        elif args.command == 'export-data':
+            return cli.export_data(args.report, args.output, args.format, args.param, args.search)
+
+        elif args.command == 'scheduler':
+            return cli.manage_scheduler(args.action, args.schedule)
+
         elif args.command == 'import':
             return cli.import_report(args.input, args.connection)
 
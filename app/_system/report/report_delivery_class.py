@@ -0,0 +1,129 @@
+import os
+import json
+import smtplib
+import logging
+import mimetypes
+from email.message import EmailMessage
+
+import requests
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class ReportDelivery:
+    """
+    Sends a scheduled report's output according to its delivery_method
+
+    Handlers receive the schedule and a result dict (report_name, slug,
+    path, format, row_count, size_bytes, run_at) and raise on failure.
+    Other delivery methods can be added with register().
+
+    Methods:
+        email    - SMTP (smtp_* config) to recipient_emails, file attached
+                   when include_attachment and under the size limit
+        webhook  - POST to webhook_url: JSON, or multipart with the file
+        slack    - POST a summary message to a Slack incoming webhook_url
+    """
+    __depends_on__ = []
+
+    timeout = config.get('report_delivery_timeout_seconds', 30)
+    max_attachment_bytes = config.get('report_delivery_max_attachment_bytes', 20 * 1024 * 1024)
+
+    _handlers = {}
+
+    @classmethod
+    def register(cls, method, handler):
+        cls._handlers[method] = handler
+
+    @classmethod
+    def deliver(cls, schedule, result):
+        method = (schedule.delivery_method or 'email').lower()
+        handler = cls._handlers.get(method)
+        if handler is None:
+            raise ValueError(f"Unknown delivery method: {method}")
+        handler(schedule, result)
+        logger.info(f"Delivered report {result['slug']} by {method}")
+
+    @classmethod
+    def _attachable(cls, schedule, result):
+        return bool(schedule.include_attachment) and result['size_bytes'] <= cls.max_attachment_bytes
+
+    @staticmethod
+    def summary(result):
+        return (
+            f"{result['report_name']}: {result['row_count']:,} rows "
+            f"({result['format']}, {result['size_bytes']:,} bytes) at {result['run_at']:%Y-%m-%d %H:%M} UTC"
+        )
+
+    @classmethod
+    def send_email(cls, schedule, result):
+        recipients = [email.strip() for email in (schedule.recipient_emails or '').split(',') if email.strip()]
+        if not recipients:
+            raise ValueError("No recipient_emails for email delivery")
+
+        message = EmailMessage()
+        message['Subject'] = f"Scheduled report: {result['report_name']}"
+        message['From'] = config.get('smtp_from', 'reports@localhost')
+        message['To'] = ', '.join(recipients)
+
+        body = cls.summary(result)
+        if schedule.include_attachment and not cls._attachable(schedule, result):
+            body += f"\n\nThe file is too large to attach and was saved as {result['path']}"
+        message.set_content(body)
+
+        if cls._attachable(schedule, result):
+            content_type = mimetypes.guess_type(result['path'])[0] or 'application/octet-stream'
+            maintype, subtype = content_type.split('/', 1)
+            with open(result['path'], 'rb') as f:
+                message.add_attachment(
+                    f.read(), maintype=maintype, subtype=subtype,
+                    filename=f"{result['slug']}.{result['format']}"
+                )
+
+        with smtplib.SMTP(config.get('smtp_host', 'localhost'), config.get('smtp_port', 25), timeout=cls.timeout) as smtp:
+            if config.get('smtp_use_tls'):
+                smtp.starttls()
+            if config.get('smtp_username'):
+                smtp.login(config['smtp_username'], config.get('smtp_password', ''))
+            smtp.send_message(message)
+
+    @classmethod
+    def send_webhook(cls, schedule, result):
+        if not schedule.webhook_url:
+            raise ValueError("No webhook_url for webhook delivery")
+
+        payload = {
+            'schedule_id': str(schedule.id),
+            'report': result['slug'],
+            'report_name': result['report_name'],
+            'format': result['format'],
+            'row_count': result['row_count'],
+            'size_bytes': result['size_bytes'],
+            'run_at': result['run_at'].isoformat(),
+        }
+
+        if cls._attachable(schedule, result):
+            with open(result['path'], 'rb') as f:
+                response = requests.post(
+                    schedule.webhook_url,
+                    data={'metadata': json.dumps(payload)},
+                    files={'file': (os.path.basename(result['path']), f)},
+                    timeout=cls.timeout
+                )
+        else:
+            response = requests.post(schedule.webhook_url, json=payload, timeout=cls.timeout)
+        response.raise_for_status()
+
+    @classmethod
+    def send_slack(cls, schedule, result):
+        if not schedule.webhook_url:
+            raise ValueError("No webhook_url for slack delivery")
+        response = requests.post(schedule.webhook_url, json={'text': cls.summary(result)}, timeout=cls.timeout)
+        response.raise_for_status()
+
+
+ReportDelivery.register('email', ReportDelivery.send_email)
+ReportDelivery.register('webhook', ReportDelivery.send_webhook)
+ReportDelivery.register('slack', ReportDelivery.send_slack)
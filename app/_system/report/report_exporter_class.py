@@ -0,0 +1,352 @@
+import io
+import re
+import csv
+import json
+import math
+import itertools
+import time
+import logging
+import zipfile
+from decimal import Decimal
+from datetime import datetime, date, time as dt_time
+from xml.sax.saxutils import escape
+
+from app.config import config
+from app.register.database import db_registry
+
+logger = logging.getLogger(__name__)
+
+
+class _ChunkSink:
+    """Write-only file object collecting bytes until they are taken"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class XlsxStreamWriter:
+    """
+    Minimal XLSX writer that emits the file while rows are still coming
+
+    Each worksheet is deflated straight into the zip stream with inline
+    strings (no shared string table), and the workbook parts that list the
+    sheets are written last, so nothing but the current chunk is held in
+    memory. A new sheet is started every MAX_ROWS rows, repeating the header.
+
+    Usage:
+        writer = XlsxStreamWriter()
+        yield writer.start(columns)
+        for rows in batches:
+            yield writer.write_rows(rows)
+        yield writer.close()
+    """
+    __depends_on__ = []
+
+    MAX_ROWS = 1048576  # Excel's row limit, header included
+    MAX_CELL_CHARS = 32767
+    ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+    EPOCH = datetime(1899, 12, 30)
+
+    # Cell styles (cellXfs index): 0 general, 1 date, 2 date and time
+    STYLE_DATE = 1
+    STYLE_DATETIME = 2
+
+    NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+    def __init__(self):
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, 'w', compression=zipfile.ZIP_DEFLATED)
+        self._sheet = None
+        self._sheet_count = 0
+        self._sheet_rows = 0
+        self._header = None
+
+    def start(self, columns):
+        self._header = self._row_xml(columns)
+        self._open_sheet()
+        return self._sink.take()
+
+    def write_rows(self, rows):
+        parts = []
+        for row in rows:
+            if self._sheet_rows >= self.MAX_ROWS:
+                self._flush(parts)
+                self._close_sheet()
+                self._open_sheet()
+            parts.append(self._row_xml(row))
+            self._sheet_rows += 1
+        self._flush(parts)
+        return self._sink.take()
+
+    def close(self):
+        self._close_sheet()
+        sheets = range(1, self._sheet_count + 1)
+
+        self._zip.writestr('xl/styles.xml', (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<styleSheet xmlns="{self.NS}">'
+            '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+            '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+            '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+            '</styleSheet>'
+        ))
+        self._zip.writestr('xl/workbook.xml', (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<workbook xmlns="{self.NS}" xmlns:r="{self.REL_NS}"><sheets>'
+            + ''.join(f'<sheet name="Sheet{n}" sheetId="{n}" r:id="rId{n}"/>' for n in sheets)
+            + '</sheets></workbook>'
+        ))
+        self._zip.writestr('xl/_rels/workbook.xml.rels', (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<Relationships xmlns="{self.PKG_REL_NS}">'
+            + ''.join(
+                f'<Relationship Id="rId{n}" Type="{self.REL_NS}/worksheet" Target="worksheets/sheet{n}.xml"/>'
+                for n in sheets
+            )
+            + f'<Relationship Id="rId{self._sheet_count + 1}" Type="{self.REL_NS}/styles" Target="styles.xml"/>'
+            + '</Relationships>'
+        ))
+        self._zip.writestr('_rels/.rels', (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<Relationships xmlns="{self.PKG_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{self.REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ))
+        self._zip.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            + ''.join(
+                f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                for n in sheets
+            )
+            + '</Types>'
+        ))
+        self._zip.close()
+        return self._sink.take()
+
+    def _open_sheet(self):
+        self._sheet_count += 1
+        # force_zip64: a sheet's size is not known up front and may pass 4GB
+        self._sheet = self._zip.open(f'xl/worksheets/sheet{self._sheet_count}.xml', 'w', force_zip64=True)
+        self._sheet.write(
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><worksheet xmlns="{self.NS}"><sheetData>'.encode('utf-8')
+        )
+        self._sheet.write(self._header)
+        self._sheet_rows = 1
+
+    def _close_sheet(self):
+        if self._sheet is not None:
+            self._sheet.write(b'</sheetData></worksheet>')
+            self._sheet.close()
+            self._sheet = None
+
+    def _flush(self, parts):
+        if parts:
+            self._sheet.write(b''.join(parts))
+            parts.clear()
+
+    def _row_xml(self, values):
+        return ('<row>' + ''.join(self._cell_xml(value) for value in values) + '</row>').encode('utf-8')
+
+    @staticmethod
+    def _finite(value):
+        # math.isfinite raises on a signalling Decimal NaN
+        if isinstance(value, Decimal):
+            return value.is_finite()
+        return math.isfinite(value)
+
+    def _cell_xml(self, value):
+        if value is None:
+            return '<c/>'
+        if isinstance(value, bool):
+            return f'<c t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, (int, float, Decimal)) and self._finite(value):
+            return f'<c><v>{value}</v></c>'
+        if isinstance(value, datetime):
+            serial = (value.replace(tzinfo=None) - self.EPOCH).total_seconds() / 86400
+            return f'<c s="{self.STYLE_DATETIME}"><v>{serial}</v></c>'
+        if isinstance(value, date):
+            return f'<c s="{self.STYLE_DATE}"><v>{(value - self.EPOCH.date()).days}</v></c>'
+        if isinstance(value, dt_time):
+            value = value.isoformat()
+        text = self.ILLEGAL_XML.sub('', str(value))[:self.MAX_CELL_CHARS]
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+class ReportExporter:
+    """
+    Streams a report's full filtered result as CSV, NDJSON or XLSX
+
+    The export query runs on a server-side cursor and every chunk of rows
+    is encoded and handed on before the next is fetched, so memory stays
+    flat for multi-million-row exports. Output is a generator of bytes for
+    a chunked HTTP response, or written to a file with write_to(). The
+    execution is recorded in ReportExecution with the format and size once
+    the stream ends.
+
+    Usage:
+        exporter = ReportExporter(report, request_data, 'csv', user_id)
+        return Response(exporter.stream(), mimetype=exporter.content_type)
+    """
+    __depends_on__ = ['ReportQueryExecutor', 'ReportExecution']
+
+    FORMATS = {
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    }
+
+    chunk_rows = config.get('report_export_chunk_rows', 5000)
+
+    def __init__(self, report, request_data, export_format, user_id=None):
+        from app.classes import ReportQueryExecutor
+
+        export_format = (export_format or '').lower()
+        if export_format not in self.FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+
+        self.export_format = export_format
+        self.report_id = report.id
+        self.slug = report.slug
+        self.user_id = user_id
+        self.parameters = request_data.get('vars', {})
+
+        # Resolve everything from the ORM now; the stream may outlive the request's session
+        executor = ReportQueryExecutor(report.connection.database_type.name.lower())
+        self.query, self.params, self.columns = executor.build_export_query(report, request_data)
+        self.engine = db_registry.get_engine_for_connection(report.connection)
+        self._stream_query = executor.stream_query
+
+        self.row_count = 0
+        self.bytes_written = 0
+
+    @property
+    def content_type(self):
+        return self.FORMATS[self.export_format]
+
+    @property
+    def filename(self):
+        return f"{self.slug}.{self.export_format}"
+
+    def stream(self):
+        """
+        Start the export and return a generator of encoded bytes
+
+        The query runs and its first chunk is fetched here, so a bad query
+        fails before any response is sent. The execution is recorded when
+        the generator ends.
+        """
+        started = time.monotonic()
+        cursor = self._stream_query(self.engine, self.query, self.params, self.chunk_rows)
+        try:
+            first = next(cursor, None)
+        except Exception as e:
+            self._record(int((time.monotonic() - started) * 1000), 'error', str(e))
+            raise
+
+        batches = itertools.chain([first], cursor) if first is not None else cursor
+        return self._generate(cursor, batches, started)
+
+    def _generate(self, cursor, batches, started):
+        status, error = 'success', None
+        try:
+            for chunk in self._encode(batches):
+                if chunk:
+                    self.bytes_written += len(chunk)
+                    yield chunk
+        except GeneratorExit:
+            # Client went away
+            status = 'cancelled'
+            raise
+        except Exception as e:
+            status, error = 'error', str(e)
+            raise
+        finally:
+            # Releases the server-side cursor and the pooled connection
+            cursor.close()
+            self._record(int((time.monotonic() - started) * 1000), status, error)
+
+    def write_to(self, fileobj):
+        """Write the whole export to a binary file object; returns (rows, bytes)"""
+        for chunk in self.stream():
+            fileobj.write(chunk)
+        return self.row_count, self.bytes_written
+
+    def _encode(self, batches):
+        return getattr(self, f"_encode_{self.export_format}")(batches)
+
+    def _encode_csv(self, batches):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.columns)
+        # BOM so spreadsheet applications detect UTF-8
+        yield ('\ufeff' + buffer.getvalue()).encode('utf-8')
+        for rows in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            self.row_count += len(rows)
+            yield buffer.getvalue().encode('utf-8')
+
+    def _encode_ndjson(self, batches):
+        columns = self.columns
+        for rows in batches:
+            self.row_count += len(rows)
+            yield ''.join(
+                json.dumps(dict(zip(columns, row)), default=str) + '\n' for row in rows
+            ).encode('utf-8')
+
+    def _encode_xlsx(self, batches):
+        writer = XlsxStreamWriter()
+        yield writer.start(self.columns)
+        for rows in batches:
+            self.row_count += len(rows)
+            yield writer.write_rows(rows)
+        yield writer.close()
+
+    def _record(self, duration_ms, status, error=None):
+        """Add the ReportExecution row in its own transaction"""
+        from app.models import ReportExecution
+
+        try:
+            with db_registry.session_scope() as session:
+                session.add(ReportExecution(
+                    report_id=self.report_id,
+                    user_id=self.user_id,
+                    duration_ms=duration_ms,
+                    row_count=self.row_count,
+                    parameters_used=self.parameters,
+                    status=status,
+                    error_message=error,
+                    export_format=self.export_format,
+                    file_size_bytes=self.bytes_written
+                ))
+        except Exception as e:
+            logger.error(f"Failed to record export of report {self.slug}: {e}")
@@ -167,6 +167,13 @@ class Report(BaseModel):
         
         return slug
     
+    @validates('query')
+    def validate_query(self, key, query):
+        """Reject variables used where SQL expects a name or clause"""
+        from app.classes import ReportQueryGenerator
+        ReportQueryGenerator.check_placeholders(query)
+        return query
+
     #@validates('slug')
     def validate_slug(self, key, slug):
         """Validate slug format and prevent changes after creation"""
@@ -252,10 +259,29 @@ class Report(BaseModel):
             },
             "cache_enabled": False,
             "cache_duration_minutes": 60,
+            "cache_materialize": False,
             "timeout_seconds": 300,
             "refresh_interval": 0,
             "row_limit": 10000,
         }
+
+    def get_cache_settings(self):
+        """
+        Result cache settings from options
+
+        Returns:
+            (ttl_seconds, materialize, row_limit); ttl 0 means no caching.
+            materialize keeps the full filtered result (up to row_limit rows)
+            in memory and pages/sorts from it instead of re-querying.
+        """
+        options = self.options or {}
+        if not options.get('cache_enabled'):
+            return 0, False, 0
+        defaults = self.get_default_options()
+        ttl = int(float(options.get('cache_duration_minutes') or defaults['cache_duration_minutes']) * 60)
+        materialize = bool(options.get('cache_materialize', False))
+        row_limit = int(options.get('row_limit') or defaults['row_limit'])
+        return ttl, materialize, row_limit
     
     def _ensure_options_structure(self, options):
         """Ensure options has all required fields with default values"""
@@ -0,0 +1,113 @@
+import time
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class ReportResultCache:
+    """
+    Per-worker cache of report pages, counts and materialized results
+
+    Keys cover the report id, its revision (version, updated_at and the
+    'reports' stamp, bumped on any committed change to reports, their
+    columns, variables or connections), the variables, the filter
+    conditions and - for pages - the sort and paging window. Counts are
+    keyed without sort or paging, so a total is computed once and reused
+    by every page flip and sort change.
+
+    Entries live for the report's cache TTL (options cache_enabled /
+    cache_duration_minutes); reports without caching never get here.
+    Materialized results (ReportBuffer) are entries like any other and
+    count against the same size bound.
+    """
+    __depends_on__ = ['VersionStamp', 'Report', 'ReportColumn', 'ReportVariable', 'Connection']
+
+    VERSION_KEY = 'reports'
+
+    max_size = config.get('report_cache_size', 200)
+
+    _entries = OrderedDict()  # key -> (report id, value, expires_at)
+    _lock = threading.Lock()
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def register_invalidation(cls):
+        """Bump the reports stamp on any committed change to a report definition"""
+        from app.classes import VersionStamp
+        from app.models import Report, ReportColumn, ReportVariable, Connection
+
+        for model in (Report, ReportColumn, ReportVariable, Connection):
+            VersionStamp.watch(model, cls.VERSION_KEY)
+
+    @classmethod
+    def invalidate(cls):
+        """Drop every cached report result in every worker"""
+        from app.classes import VersionStamp
+        VersionStamp.bump(cls.VERSION_KEY)
+
+    @classmethod
+    def make_key(cls, report, kind, *parts):
+        """Build the cache key for one kind of entry ('page', 'total', 'filtered', 'buffer')"""
+        from app.classes import VersionStamp
+
+        material = json.dumps([
+            str(report.id),
+            report.version,
+            report.updated_at.isoformat() if report.updated_at else None,
+            VersionStamp.current(cls.VERSION_KEY),
+            kind,
+            parts,
+        ], sort_keys=True, default=str)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def get(cls, key):
+        """Get a cached value, or None"""
+        now = time.time()
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None:
+                if entry[2] > now:
+                    cls._entries.move_to_end(key)
+                    cls.hits += 1
+                    return entry[1]
+                del cls._entries[key]
+        cls.misses += 1
+        return None
+
+    @classmethod
+    def put(cls, key, report_id, value, ttl):
+        """Cache a value for ttl seconds"""
+        entry = (str(report_id), value, time.time() + ttl)
+        with cls._lock:
+            cls._entries[key] = entry
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > cls.max_size:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def evict_report(cls, report_id):
+        """Drop this worker's cached results for a report"""
+        report_id = str(report_id)
+        with cls._lock:
+            for key in [key for key, entry in cls._entries.items() if entry[0] == report_id]:
+                del cls._entries[key]
+
+    @classmethod
+    def stats(cls):
+        return {
+            'entries': len(cls._entries),
+            'max_size': cls.max_size,
+            'hits': cls.hits,
+            'misses': cls.misses,
+        }
+
+
+ReportResultCache.register_invalidation()
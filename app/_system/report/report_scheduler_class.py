@@ -0,0 +1,264 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select, or_
+
+from app.config import config
+from app.register.database import db_registry
+
+logger = logging.getLogger(__name__)
+
+
+class ReportScheduler:
+    """
+    Runs due ReportSchedules and hands their output to ReportDelivery
+
+    Every poll claims due schedules with SELECT ... FOR UPDATE SKIP LOCKED
+    and advances their next_run_at before the claim commits, so any number
+    of scheduler processes or gunicorn workers can poll the same table
+    without running a schedule twice. Only as many schedules are claimed
+    as the bounded worker pool has free slots; the rest stay due for the
+    next poll or another process. A schedule still running when it comes
+    due again is skipped until the run finishes (or goes stale).
+
+    Each run streams the report with ReportExporter to
+    report_schedule_output_dir (one file per schedule, replaced by each
+    run, so the latest output is always on disk), delivers it and records
+    last_run_at / last_run_status / last_error.
+
+    Run it as its own process (`report scheduler run`) or inside the web
+    workers with report_scheduler_in_worker.
+    """
+    __depends_on__ = ['ReportSchedule', 'ReportExporter', 'ReportDelivery']
+
+    poll_interval = config.get('report_scheduler_poll_seconds', 30)
+    max_workers = config.get('report_scheduler_workers', 2)
+    stale_seconds = config.get('report_scheduler_stale_seconds', 3600)
+    output_dir = config.get('report_schedule_output_dir', 'exports/schedules')
+
+    _pool = None
+    _pid = None
+    _thread = None
+    _lock = threading.Lock()
+    _start_lock = threading.Lock()
+    _stopping = threading.Event()
+    _in_flight = 0
+
+    # -----------------------------------------------------------------
+    # Polling
+    # -----------------------------------------------------------------
+
+    @classmethod
+    def poll_once(cls):
+        """
+        Claim due schedules and submit them to the worker pool
+
+        Returns:
+            list: ids of the schedules submitted
+        """
+        cls._ensure_pool()
+        with cls._lock:
+            free = max(0, int(cls.max_workers) - cls._in_flight)
+        if free == 0:
+            return []
+
+        claimed = cls._claim(free)
+        for schedule_id in claimed:
+            with cls._lock:
+                cls._in_flight += 1
+            cls._pool.submit(cls._run_claimed, schedule_id)
+        return claimed
+
+    @classmethod
+    def _claim(cls, limit):
+        """Lock up to limit due schedules, skipping ones another poller holds, and move them on"""
+        from app.models import ReportSchedule
+
+        now = datetime.utcnow()
+        # A run still 'running' after this long died with its process
+        stale = now - timedelta(seconds=cls.stale_seconds)
+        claimed = []
+
+        with db_registry.session_scope() as session:
+            # Enabled schedules that were never scheduled get their first run time
+            unscheduled = session.execute(
+                select(ReportSchedule).where(
+                    ReportSchedule.is_enabled == True,
+                    ReportSchedule.is_active == True,
+                    ReportSchedule.next_run_at.is_(None)
+                ).with_for_update(skip_locked=True)
+            ).scalars().all()
+            for schedule in unscheduled:
+                cls._advance(schedule, now)
+
+            due = session.execute(
+                select(ReportSchedule).where(
+                    ReportSchedule.is_enabled == True,
+                    ReportSchedule.is_active == True,
+                    ReportSchedule.next_run_at <= now,
+                    or_(
+                        ReportSchedule.last_run_status.is_(None),
+                        ReportSchedule.last_run_status != 'running',
+                        ReportSchedule.last_run_at < stale
+                    )
+                ).order_by(
+                    ReportSchedule.next_run_at
+                ).limit(limit).with_for_update(skip_locked=True)
+            ).scalars().all()
+
+            for schedule in due:
+                if not cls._advance(schedule, now):
+                    continue
+                schedule.last_run_at = now
+                schedule.last_run_status = 'running'
+                claimed.append(schedule.id)
+
+        return claimed
+
+    @staticmethod
+    def _advance(schedule, now):
+        """Set next_run_at; a schedule that cannot be computed is disabled"""
+        try:
+            schedule.next_run_at = schedule.calculate_next_run(now)
+            return True
+        except Exception as e:
+            logger.error(f"Disabling report schedule {schedule.id}: {e}")
+            schedule.is_enabled = False
+            schedule.last_run_status = 'error'
+            schedule.last_error = f"Invalid schedule: {e}"
+            return False
+
+    # -----------------------------------------------------------------
+    # Running
+    # -----------------------------------------------------------------
+
+    @classmethod
+    def _run_claimed(cls, schedule_id):
+        try:
+            cls.run_schedule(schedule_id)
+        except Exception as e:
+            logger.error(f"Report schedule {schedule_id} failed: {e}")
+        finally:
+            with cls._lock:
+                cls._in_flight -= 1
+
+    @classmethod
+    def run_schedule(cls, schedule_id):
+        """
+        Run one schedule now: export, deliver, record the outcome
+
+        Returns:
+            dict: the result handed to delivery
+        """
+        from app.classes import ReportExporter, ReportDelivery
+        from app.models import ReportSchedule
+
+        status, error, result = 'success', None, None
+        try:
+            with db_registry.session_scope() as session:
+                schedule = session.get(ReportSchedule, schedule_id)
+                if schedule is None:
+                    raise ValueError(f"Report schedule {schedule_id} not found")
+                report = schedule.report
+
+                export_format = (schedule.attachment_format or 'xlsx').lower()
+                if export_format not in ReportExporter.FORMATS:
+                    logger.warning(f"Schedule {schedule_id}: {export_format} output is not supported, using xlsx")
+                    export_format = 'xlsx'
+
+                run_at = datetime.utcnow()
+                exporter = ReportExporter(report, {'vars': schedule.parameters or {}}, export_format)
+
+                os.makedirs(cls.output_dir, exist_ok=True)
+                path = os.path.join(cls.output_dir, f"{report.slug}_{str(schedule.id)[:8]}.{export_format}")
+                partial = f"{path}.part"
+                with open(partial, 'wb') as f:
+                    row_count, size_bytes = exporter.write_to(f)
+                os.replace(partial, path)
+
+                result = {
+                    'report_name': report.name,
+                    'slug': report.slug,
+                    'path': path,
+                    'format': export_format,
+                    'row_count': row_count,
+                    'size_bytes': size_bytes,
+                    'run_at': run_at,
+                }
+                ReportDelivery.deliver(schedule, result)
+            return result
+
+        except Exception as e:
+            status, error = 'error', str(e)
+            raise
+
+        finally:
+            cls._finish(schedule_id, status, error)
+
+    @staticmethod
+    def _finish(schedule_id, status, error):
+        from app.models import ReportSchedule
+
+        try:
+            with db_registry.session_scope() as session:
+                schedule = session.get(ReportSchedule, schedule_id)
+                if schedule is not None:
+                    schedule.last_run_status = status
+                    schedule.last_error = error
+        except Exception as e:
+            logger.error(f"Failed to record run of report schedule {schedule_id}: {e}")
+
+    # -----------------------------------------------------------------
+    # Loop
+    # -----------------------------------------------------------------
+
+    @classmethod
+    def _ensure_pool(cls):
+        """Worker pool for this process (again after a fork)"""
+        pid = os.getpid()
+        if cls._pool is None or cls._pid != pid:
+            with cls._lock:
+                if cls._pool is None or cls._pid != pid:
+                    cls._pool = ThreadPoolExecutor(
+                        max_workers=max(1, int(cls.max_workers)),
+                        thread_name_prefix='report-schedule'
+                    )
+                    cls._pid = pid
+                    cls._in_flight = 0
+
+    @classmethod
+    def run_forever(cls):
+        """Poll until stop() is called"""
+        logger.info(f"Report scheduler polling every {cls.poll_interval}s with {cls.max_workers} workers")
+        while not cls._stopping.is_set():
+            try:
+                cls.poll_once()
+            except Exception as e:
+                logger.error(f"Report scheduler poll failed: {e}")
+            cls._stopping.wait(max(1, int(cls.poll_interval)))
+
+    @classmethod
+    def start(cls):
+        """Poll from a background thread in this process"""
+        pid = os.getpid()
+        if cls._thread is not None and cls._pid == pid and cls._thread.is_alive():
+            return
+
+        with cls._start_lock:
+            if cls._thread is not None and cls._pid == pid and cls._thread.is_alive():
+                return
+            cls._ensure_pool()
+            cls._stopping.clear()
+            cls._thread = threading.Thread(target=cls.run_forever, name="report-scheduler", daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def stop(cls, wait=True):
+        """Stop polling; with wait, let running schedules finish"""
+        cls._stopping.set()
+        if cls._pool is not None:
+            cls._pool.shutdown(wait=wait)
+            cls._pool = None
@@ -1,16 +1,19 @@
 import re
-from datetime import datetime
+import calendar
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, func, ForeignKey, Index, UniqueConstraint, event
 from sqlalchemy.orm import relationship, validates
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID, JSONB
 
 from app.base.model import BaseModel
+from app.config import config
 
 
 class ReportSchedule(BaseModel):
     """Model for scheduled report executions"""
     __tablename__ = 'report_schedules'
-    __depends_on__ = ['Report']
+    __depends_on__ = ['Report', 'CronExpression']
     
     report_id = Column(
         PG_UUID(as_uuid=True),
@@ -23,7 +26,7 @@ class ReportSchedule(BaseModel):
     cron_expression = Column(String(255))  # For cron type
     interval_minutes = Column(Integer)  # For interval type
     time_of_day = Column(String(10))  # HH:MM for daily/weekly/monthly
-    day_of_week = Column(Integer)  # 0-6 for weekly
+    day_of_week = Column(Integer)  # 0-6 for weekly, 0 = Monday
     day_of_month = Column(Integer)  # 1-31 for monthly
     
     # Delivery configuration
@@ -38,8 +41,8 @@ class ReportSchedule(BaseModel):
     
     # Status
     is_enabled = Column(Boolean, default=True)
-    last_run_at = Column(DateTime)
-    next_run_at = Column(DateTime)
+    last_run_at = Column(DateTime)  # UTC
+    next_run_at = Column(DateTime)  # UTC
     last_run_status = Column(String(50))
     last_error = Column(Text)
     
@@ -51,6 +54,70 @@ class ReportSchedule(BaseModel):
         Index('idx_schedule_next_run', 'is_enabled', 'next_run_at'),
     )
     
+    SCHEDULE_TYPES = ('cron', 'interval', 'daily', 'weekly', 'monthly')
+
+    def calculate_next_run(self, after=None):
+        """
+        Next time this schedule is due, strictly after `after` (default now)
+
+        time_of_day, cron expressions and the day fields are wall-clock
+        times in report_schedule_timezone; the result is naive UTC like
+        the next_run_at column. Intervals step from the previous
+        next_run_at so runs do not drift, skipping any that were missed.
+
+        Returns:
+            datetime, naive UTC
+        """
+        after = after or datetime.utcnow()
+        tz = ZoneInfo(config.get('report_schedule_timezone', 'UTC'))
+
+        if self.schedule_type == 'interval':
+            if not self.interval_minutes or self.interval_minutes < 1:
+                raise ValueError("Interval schedules need interval_minutes")
+            step = timedelta(minutes=self.interval_minutes)
+            next_run = self.next_run_at or after
+            if next_run <= after:
+                next_run += step * ((after - next_run) // step + 1)
+            return next_run
+
+        local_after = after.replace(tzinfo=timezone.utc).astimezone(tz).replace(tzinfo=None)
+
+        if self.schedule_type == 'cron':
+            from app.classes import CronExpression
+            local_next = CronExpression(self.cron_expression).next_after(local_after)
+
+        elif self.schedule_type in ('daily', 'weekly', 'monthly'):
+            hour, minute = self._parse_time_of_day()
+            day = local_after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            local_next = None
+            for _ in range(62):
+                if day > local_after and self._runs_on(day):
+                    local_next = day
+                    break
+                day += timedelta(days=1)
+            if local_next is None:
+                raise ValueError(f"Schedule never runs: {self.schedule_type}")
+
+        else:
+            raise ValueError(f"Unknown schedule type: {self.schedule_type}")
+
+        return local_next.replace(tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+    def _parse_time_of_day(self):
+        match = re.match(r'^(\d{1,2}):(\d{2})$', (self.time_of_day or '00:00').strip())
+        if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+            raise ValueError(f"Invalid time_of_day: {self.time_of_day}")
+        return int(match.group(1)), int(match.group(2))
+
+    def _runs_on(self, day):
+        if self.schedule_type == 'weekly':
+            return day.weekday() == (self.day_of_week or 0)
+        if self.schedule_type == 'monthly':
+            # Days past the end of a month run on its last day
+            last_day = calendar.monthrange(day.year, day.month)[1]
+            return day.day == min(self.day_of_month or 1, last_day)
+        return True
+
     def __repr__(self):
         return f"<ReportSchedule {self.schedule_type} for report {self.report_id}>"
 
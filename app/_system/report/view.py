@@ -25,7 +25,7 @@ def get_service():
 def list():
     slug="report"
     renderer = TemplateRenderer()
-    rendered_content = renderer.render_page(slug)
+    rendered_content = renderer.render_response(slug)
     return rendered_content
 
 
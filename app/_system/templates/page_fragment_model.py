@@ -255,6 +255,8 @@ class PageFragment(BaseModel):
         # Activate this version
         fragment.is_active = True
         db_session.commit()
+
+        fragment.evict_render_cache()
         
         return fragment
 
@@ -296,6 +298,17 @@ class PageFragment(BaseModel):
         self.content_hash = hashlib.sha256(new_content.encode('utf-8')).hexdigest()
         
         logger.info(f"Updated content hash for fragment {self.fragment_key}: {old_hash} -> {self.content_hash}")
+        self.evict_render_cache()
+
+    def evict_render_cache(self):
+        """Drop this worker's compiled templates and cached output for the fragment's page
+
+        Other workers pick the change up from the 'templates' stamp bumped on commit
+        """
+        from app.classes import TemplateCache, PageOutputCache
+        TemplateCache.evict_page(self.page_id)
+        PageOutputCache.evict_page(self.page_id)
+        TemplateCache.evict_fragment(f"page_fragment:{self.page_id}:{self.fragment_key}")
 
     def get_display_version(self):
         """Get human-readable version string"""
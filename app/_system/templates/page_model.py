@@ -30,7 +30,8 @@ class Page(BaseModel):
     - expire_date: When page should be hidden (optional)
     - view_count: Number of times page has been viewed
     - requires_auth: Whether page requires user authentication
-    - cache_duration: How long to cache page in seconds (0 = no cache)
+    - cache_duration: How long to cache page in seconds (0 = no cache; only
+      used when page_output_cache_enabled is set)
     """
     __depends_on__ = ['Template','Module']
     __tablename__ = 'pages'
@@ -132,19 +133,14 @@ class Page(BaseModel):
         return True
 
     def increment_view_count(self):
-        """Increment the view count for this page"""
-        logger = self._get_logger()
-        old_count = self.view_count
-        self.view_count += 1
-        
-        try:
-            db_session=db_registry._routing_session()
+        """
+        Count a view of this page
 
-            db_session.commit()
-        except Exception as e:
-            logger.error(f"Failed to increment view count for page '{self.slug}': {e}")
-            db_session.rollback()
-            raise
+        The count is buffered per worker and added to view_count by a
+        background flush, so rendering does not write to the pages row.
+        """
+        from app.classes import PageViewCounter
+        PageViewCounter.increment(self.id)
 
     def update_seo_metadata(self, meta_description=None, meta_keywords=None, 
                            og_title=None, og_description=None, og_image=None):
@@ -192,6 +188,7 @@ class Page(BaseModel):
         try:
             db_session.commit()
             logger.info(f"Page '{self.slug}' publish status committed to database")
+            self.evict_render_cache()
         except Exception as e:
             logger.error(f"Failed to publish page '{self.slug}': {e}")
             db_session.rollback()
@@ -209,11 +206,20 @@ class Page(BaseModel):
         try:
             db_session.commit()
             logger.info(f"Page '{self.slug}' unpublished successfully")
+            self.evict_render_cache()
         except Exception as e:
             logger.error(f"Failed to unpublish page '{self.slug}': {e}")
             db_session.rollback()
             raise
 
+    def evict_render_cache(self):
+        """Drop this worker's cached renderings of the page
+
+        Other workers move to new cache keys when the 'page_output' stamp is bumped on commit
+        """
+        from app.classes import PageOutputCache
+        PageOutputCache.evict_page(self.id)
+
     def set_expiration(self, expire_date):
         """Set expiration date for the page"""
         logger = self._get_logger()
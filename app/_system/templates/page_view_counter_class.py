@@ -0,0 +1,82 @@
+import threading
+
+from sqlalchemy import bindparam
+
+from app.config import config
+
+
+class PageViewCounter:
+    """
+    Write-behind page view counter
+
+    Views are added up per page in this worker and written by a BatchWriter
+    as one `view_count = view_count + n` UPDATE per page and flush, so
+    rendering a page never opens a write transaction and hot pages do not
+    serialize on their row lock. Views still pending when a worker is
+    killed hard are lost; a clean shutdown flushes them.
+    """
+    __depends_on__ = ['Page', 'BatchWriter']
+
+    _pending = {}  # page id -> views waiting to be written
+    _lock = threading.Lock()
+    _writer = None
+
+    @classmethod
+    def increment(cls, page_id, count=1):
+        """Count views of a page; they are written by the next flush"""
+        with cls._lock:
+            pending = page_id in cls._pending
+            cls._pending[page_id] = cls._pending.get(page_id, 0) + count
+        if not pending and not cls._get_writer().put(page_id):
+            # Dropped: these views are lost, but the next one queues the page again
+            with cls._lock:
+                cls._pending.pop(page_id, None)
+
+    @classmethod
+    def pending(cls, page_id):
+        """Views of a page not yet written to the database"""
+        return cls._pending.get(page_id, 0)
+
+    @classmethod
+    def flush(cls):
+        """Write all pending view counts now"""
+        if cls._writer is not None:
+            cls._writer.flush()
+
+    @classmethod
+    def _get_writer(cls):
+        if cls._writer is None:
+            with cls._lock:
+                if cls._writer is None:
+                    from app.classes import BatchWriter
+                    cls._writer = BatchWriter(
+                        'page_views',
+                        handler=cls._write_views,
+                        batch_size=config.get('page_view_batch_size', 500),
+                        flush_interval_ms=config.get('page_view_flush_ms', 5000),
+                        max_queue_size=config.get('page_view_queue_size', 10000)
+                    )
+        return cls._writer
+
+    @classmethod
+    def _write_views(cls, connection, page_ids):
+        """BatchWriter handler: one executemany UPDATE adding each page's views"""
+        from app.models import Page
+
+        with cls._lock:
+            params = [
+                {'page_id': page_id, 'views': cls._pending.pop(page_id)}
+                for page_id in set(page_ids) if page_id in cls._pending
+            ]
+        if not params:
+            return
+
+        # updated_at is left alone - a view is not an edit of the page
+        table = Page.__table__
+        stmt = table.update().where(
+            table.c.id == bindparam('page_id')
+        ).values(
+            view_count=table.c.view_count + bindparam('views'),
+            updated_at=table.c.updated_at
+        )
+        connection.execute(stmt, params)
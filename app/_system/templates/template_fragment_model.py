@@ -294,6 +294,8 @@ class TemplateFragment(BaseModel):
         fragment.is_active = True
         fragment.last_compiled = datetime.datetime.now(datetime.timezone.utc)
         db_session.commit()
+
+        fragment.evict_render_cache()
         
         logger.info(f"Activated fragment '{fragment.fragment_key}' version {fragment.version_number}")
         return fragment
@@ -336,6 +338,15 @@ class TemplateFragment(BaseModel):
         self.template_hash = hashlib.sha256(new_content.encode('utf-8')).hexdigest()
         
         logger.info(f"Updated content hash for fragment '{self.fragment_key}': {old_hash} -> {self.template_hash}")
+        self.evict_render_cache()
+
+    def evict_render_cache(self):
+        """Make this worker reload the fragment on its next get_template
+
+        Other workers pick the change up from the 'templates' stamp bumped on commit
+        """
+        from app.classes import TemplateCache
+        TemplateCache.evict_fragment(f"template_fragment:{self.template_id}:{self.fragment_key}")
 
     def get_display_version(self):
         """Get human-readable version string"""
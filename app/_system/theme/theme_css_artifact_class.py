@@ -0,0 +1,18 @@
+import time
+import hashlib
+
+
+class ThemeCssArtifact:
+    """One built theme stylesheet and its content hash"""
+    __depends_on__ = []
+
+    def __init__(self, theme_id, theme_name, css):
+        self.theme_id = str(theme_id)
+        self.theme_name = theme_name
+        self.css = css
+        self.hash = hashlib.sha256(css.encode('utf-8')).hexdigest()[:16]
+        self.built_at = time.time()
+
+    @property
+    def filename(self):
+        return f"{self.theme_id}-{self.hash}.css"
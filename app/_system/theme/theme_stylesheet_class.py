@@ -0,0 +1,631 @@
+import os
+import logging
+import threading
+
+from app.config import config
+from app.register.database import db_registry
+
+logger = logging.getLogger(__name__)
+
+
+class ThemeStylesheet:
+    """
+    Per-worker cache of generated theme CSS
+
+    Each theme's CSS is built once per theme revision and kept as a hashed
+    artifact, used inline by {{ theme_css() }} and served by
+    /theme/<theme_id>/<hash>.css with immutable cache headers. Any committed
+    Theme change bumps the 'themes' stamp, which drops the artifacts in
+    every worker so the next request rebuilds them.
+
+    Set theme_css_dir to also write artifacts to disk as <theme_id>-<hash>.css
+    (e.g. for a front-end web server to serve directly).
+    """
+    __depends_on__ = ['VersionStamp', 'Theme', 'ThemeCssArtifact']
+
+    VERSION_KEY = 'themes'
+
+    css_dir = config.get('theme_css_dir', '')
+
+    _artifacts = {}  # theme id -> ThemeCssArtifact
+    _aliases = {}    # theme id, name or None (default theme) -> theme id
+    _version = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def register_invalidation(cls):
+        """Rebuild theme CSS after any committed Theme change"""
+        from app.classes import VersionStamp
+        from app.models import Theme
+
+        VersionStamp.watch(Theme, cls.VERSION_KEY)
+
+    @classmethod
+    def invalidate(cls):
+        """Drop built theme CSS in every worker"""
+        from app.classes import VersionStamp
+        VersionStamp.bump(cls.VERSION_KEY)
+
+    @classmethod
+    def get(cls, theme_id_or_name=None, fallback=True):
+        """
+        Get the CSS artifact for a theme
+
+        Args:
+            theme_id_or_name: Theme UUID string, name, or None for default theme
+            fallback: Use the default theme when no theme matches
+
+        Returns:
+            ThemeCssArtifact or None if there is no such theme
+        """
+        cls._check_version()
+
+        alias = str(theme_id_or_name) if theme_id_or_name else None
+        theme_id = cls._aliases.get(alias)
+        if theme_id is not None:
+            artifact = cls._artifacts.get(theme_id)
+            if artifact is not None:
+                return artifact
+
+        theme = cls._find_theme(theme_id_or_name, fallback)
+        if not theme:
+            return None
+
+        artifact = cls._artifacts.get(str(theme.id))
+        if artifact is None:
+            from app.classes import ThemeCssArtifact
+            artifact = ThemeCssArtifact(theme.id, theme.name, cls.build_css(theme))
+            with cls._lock:
+                cls._artifacts[artifact.theme_id] = artifact
+            cls._write_file(artifact)
+
+        # Only real ids and names are remembered, so lookups of made-up
+        # names cannot grow the alias map
+        if alias in (None, artifact.theme_id, artifact.theme_name):
+            with cls._lock:
+                cls._aliases[alias] = artifact.theme_id
+        return artifact
+
+    @classmethod
+    def _find_theme(cls, theme_id_or_name=None, fallback=True):
+        """Resolve a theme by id or name, falling back to the default, then any theme"""
+        import uuid
+        from app.models import Theme
+        from sqlalchemy import or_
+
+        with db_registry.session_scope() as session:
+            theme = None
+            if theme_id_or_name:
+                try:
+                    theme_id = uuid.UUID(str(theme_id_or_name))
+                    theme = session.query(Theme).filter(
+                        or_(Theme.id == theme_id, Theme.name == str(theme_id_or_name))
+                    ).first()
+                except ValueError:
+                    theme = session.query(Theme).filter(Theme.name == theme_id_or_name).first()
+
+            if not theme and (fallback or not theme_id_or_name):
+                theme = session.query(Theme).filter_by(is_default=True).first()
+
+                if not theme:
+                    theme = session.query(Theme).first()
+
+            if theme:
+                session.expunge(theme)
+            return theme
+
+    @classmethod
+    def _write_file(cls, artifact):
+        if not cls.css_dir:
+            return
+        try:
+            os.makedirs(cls.css_dir, exist_ok=True)
+            path = os.path.join(cls.css_dir, artifact.filename)
+            if not os.path.exists(path):
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(artifact.css)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Failed to write theme CSS {artifact.filename}: {e}")
+
+    @classmethod
+    def _check_version(cls):
+        from app.classes import VersionStamp
+
+        version = VersionStamp.current(cls.VERSION_KEY)
+        if version != cls._version:
+            with cls._lock:
+                if version != cls._version:
+                    cls._artifacts = {}
+                    cls._aliases = {}
+                    cls._version = version
+
+    @staticmethod
+    def build_css(theme):
+        """Generate complete CSS for a theme including variables and custom styles"""
+        # Build CSS variables section
+        css_vars = []
+        
+        # Core color variables (light theme)
+        css_vars.extend([
+            f"--theme-primary: {theme.primary_color};",
+            f"--theme-secondary: {theme.secondary_color};",
+            f"--theme-success: {theme.success_color};",
+            f"--theme-warning: {theme.warning_color};",
+            f"--theme-danger: {theme.danger_color};",
+            f"--theme-info: {theme.info_color};",
+            f"--theme-background: {theme.background_color};",
+            f"--theme-surface: {theme.surface_color};",
+            f"--theme-text: {theme.text_color};",
+            f"--theme-text-muted: {theme.text_muted_color};",
+            f"--theme-border-color: {theme.border_color};",
+            f"--theme-content-area: {theme.content_area_color};",
+            f"--theme-sidebar: {theme.sidebar_color};",
+            f"--theme-component: {theme.component_color};"
+        ])
+        
+        # Bootstrap variable mappings
+        css_vars.extend([
+            "/* Bootstrap Integration */",
+            "--bs-primary: var(--theme-primary);",
+            "--bs-secondary: var(--theme-secondary);",
+            "--bs-success: var(--theme-success);",
+            "--bs-warning: var(--theme-warning);",
+            "--bs-danger: var(--theme-danger);",
+            "--bs-info: var(--theme-info);",
+            "--bs-body-bg: var(--theme-content-area);",
+            "--bs-body-color: var(--theme-text);",
+            "--bs-border-color: var(--theme-border-color);",
+            "--bs-card-bg: var(--theme-component);",
+            "--bs-card-border-color: var(--theme-border-color);",
+            "--bs-secondary-bg: var(--theme-surface);",
+            "--bs-tertiary-bg: var(--theme-surface);",
+            "--bs-emphasis-color: var(--theme-text);"
+        ])
+        
+        # Dark mode color variables
+        if theme.supports_dark_mode:
+            css_vars.extend([
+                f"--theme-primary-dark: {theme.primary_color_dark or theme.primary_color};",
+                f"--theme-secondary-dark: {theme.secondary_color_dark or theme.secondary_color};",
+                f"--theme-success-dark: {theme.success_color_dark or theme.success_color};",
+                f"--theme-warning-dark: {theme.warning_color_dark or theme.warning_color};",
+                f"--theme-danger-dark: {theme.danger_color_dark or theme.danger_color};",
+                f"--theme-info-dark: {theme.info_color_dark or theme.info_color};",
+                f"--theme-background-dark: {theme.background_color_dark or theme.background_color};",
+                f"--theme-surface-dark: {theme.surface_color_dark or theme.surface_color};",
+                f"--theme-text-dark: {theme.text_color_dark or theme.text_color};",
+                f"--theme-text-muted-dark: {theme.text_muted_color_dark or theme.text_muted_color};",
+                f"--theme-border-color-dark: {theme.border_color_dark or theme.border_color};",
+                f"--theme-content-area-dark: {theme.content_area_color_dark or theme.content_area_color};",
+                f"--theme-sidebar-dark: {theme.sidebar_color_dark or theme.sidebar_color};",
+                f"--theme-component-dark: {theme.component_color_dark or theme.component_color};"
+            ])
+        
+        # Typography variables
+        css_vars.extend([
+            f"--theme-font-primary: {theme.font_family_primary};",
+            f"--theme-font-heading: {theme.font_family_heading or theme.font_family_primary};",
+            f"--theme-font-mono: {theme.font_family_mono};",
+            f"--theme-font-size-base: {theme.font_size_base};",
+            f"--theme-font-weight-normal: {theme.font_weight_normal};",
+            f"--theme-font-weight-bold: {theme.font_weight_bold};",
+            f"--theme-line-height-base: {theme.line_height_base};"
+        ])
+        
+        # Layout variables
+        css_vars.extend([
+            f"--theme-container-max-width: {theme.container_max_width};",
+            f"--theme-grid-columns: {theme.grid_columns};",
+            f"--theme-border-radius: {theme.border_radius};",
+            f"--theme-spacing-unit: {theme.spacing_unit};"
+        ])
+        
+        # Responsive breakpoints
+        css_vars.extend([
+            f"--theme-breakpoint-xs: {theme.breakpoint_xs};",
+            f"--theme-breakpoint-sm: {theme.breakpoint_sm};",
+            f"--theme-breakpoint-md: {theme.breakpoint_md};",
+            f"--theme-breakpoint-lg: {theme.breakpoint_lg};",
+            f"--theme-breakpoint-xl: {theme.breakpoint_xl};",
+            f"--theme-breakpoint-xxl: {theme.breakpoint_xxl};"
+        ])
+        
+        # Visual effects
+        css_vars.extend([
+            f"--theme-shadow-sm: {theme.shadow_sm};",
+            f"--theme-shadow-md: {theme.shadow_md};",
+            f"--theme-shadow-lg: {theme.shadow_lg};",
+            f"--theme-border-width: {theme.border_width};",
+            f"--theme-focus-ring-color: {theme.focus_ring_color};",
+            f"--theme-focus-ring-width: {theme.focus_ring_width};"
+        ])
+        
+        # Animation variables
+        css_vars.extend([
+            f"--theme-transition-duration: {theme.transition_duration};",
+            f"--theme-animation-easing: {theme.animation_easing};"
+        ])
+        
+        # Component styling
+        css_vars.extend([
+            f"--theme-button-border-radius: {theme.button_border_radius or theme.border_radius};",
+            f"--theme-input-border-radius: {theme.input_border_radius or theme.border_radius};",
+            f"--theme-card-border-radius: {theme.card_border_radius or theme.border_radius};",
+            f"--theme-navbar-height: {theme.navbar_height};",
+            f"--theme-sidebar-width: {theme.sidebar_width};",
+            f"--theme-footer-height: {theme.footer_height};",
+            f"--theme-breadcrumb-height: {theme.breadcrumb_height};",
+            f"--theme-topbar-height: {theme.topbar_height};"
+        ])
+        
+        # Parse JSON CSS variables if they exist
+        if theme.css_variables:
+            try:
+                import json
+                # Ensure it's a string before parsing
+                if isinstance(theme.css_variables, str) and theme.css_variables.strip():
+                    custom_vars = json.loads(theme.css_variables)
+                    # Ensure we got a dict
+                    if isinstance(custom_vars, dict):
+                        for key, value in custom_vars.items():
+                            # Ensure key and value are strings
+                            key = str(key)
+                            value = str(value)
+                            if not key.startswith('--'):
+                                key = f"--{key}"
+                            css_vars.append(f"{key}: {value};")
+            except Exception as e:
+                # Log but don't fail
+                logger.warning(f"Failed to parse theme CSS variables: {e}")
+                pass
+        
+        # Build the complete CSS
+        css_output = []
+        
+        # CSS Variables in :root
+        css_output.append(":root {")
+        for var in css_vars:
+            css_output.append(f"  {var}")
+        css_output.append("}")
+        
+        # Body defaults using theme variables
+        css_output.extend([
+            "",
+            "body {",
+            "  font-family: var(--theme-font-primary);",
+            "  font-size: var(--theme-font-size-base);",
+            "  font-weight: var(--theme-font-weight-normal);",
+            "  line-height: var(--theme-line-height-base);",
+            "  color: var(--theme-text);",
+            "  background-color: var(--theme-background);",
+            "}"
+        ])
+        
+        # Heading defaults
+        css_output.extend([
+            "",
+            "h1, h2, h3, h4, h5, h6 {",
+            "  font-family: var(--theme-font-heading);",
+            "  font-weight: var(--theme-font-weight-bold);",
+            "}"
+        ])
+        
+        # Bootstrap component overrides
+        css_output.extend([
+            "",
+            "/* Bootstrap Component Integration */",
+            ".form-control, .form-select {",
+            "  background-color: var(--theme-surface);",
+            "  border-color: var(--theme-border-color);",
+            "  color: var(--theme-text);",
+            "}",
+            "",
+            ".form-control:focus, .form-select:focus {",
+            "  background-color: var(--theme-surface);",
+            "  border-color: var(--theme-primary);",
+            "  color: var(--theme-text);",
+            "}",
+            "",
+            ".card {",
+            "  background-color: var(--theme-component);",
+            "  border-color: var(--theme-border-color);",
+            "  color: var(--theme-text);",
+            "}",
+            "",
+            ".card-header {",
+            "  background-color: rgba(0, 0, 0, 0.05);",
+            "  border-bottom-color: var(--theme-border-color);",
+            "}",
+            "",
+            ".table {",
+            "  --bs-table-bg: transparent;",
+            "  color: var(--theme-text);",
+            "}",
+            "",
+            ".table > :not(caption) > * > * {",
+            "  background-color: var(--bs-table-bg);",
+            "  border-bottom-color: var(--theme-border-color);",
+            "}",
+            "",
+            ".modal-content {",
+            "  background-color: var(--theme-component);",
+            "  border-color: var(--theme-border-color);",
+            "  color: var(--theme-text);",
+            "}",
+            "",
+            ".modal-header, .modal-footer {",
+            "  border-color: var(--theme-border-color);",
+            "}",
+            "",
+            ".dropdown-menu {",
+            "  background-color: var(--theme-surface);",
+            "  border-color: var(--theme-border-color);",
+            "}",
+            "",
+            ".dropdown-item {",
+            "  color: var(--theme-text);",
+            "}",
+            "",
+            ".dropdown-item:hover, .dropdown-item:focus {",
+            "  background-color: rgba(0, 0, 0, 0.05);",
+            "  color: var(--theme-text);",
+            "}"
+        ])
+        
+        # Logo handling for dark/light themes
+        css_output.extend([
+            "",
+            "/* Logo switching for dark/light themes */",
+            ".logo_light {",
+            "  display: block;",
+            "}",
+            "",
+            ".logo_dark {",
+            "  display: none;",
+            "}",
+            "",
+            "/* Hide broken/missing images */",
+            ".logo_light:not([src]), .logo_light[src=''], .logo_light[src='None'],",
+            ".logo_dark:not([src]), .logo_dark[src=''], .logo_dark[src='None'] {",
+            "  display: none !important;",
+            "}",
+            "",
+            "/* Bootstrap dark theme */",
+            "[data-bs-theme='dark'] .logo_light {",
+            "  display: none;",
+            "}",
+            "",
+            "[data-bs-theme='dark'] .logo_dark {",
+            "  display: block;",
+            "}"
+        ])
+        
+        # RTL support
+        if theme.rtl_support:
+            css_output.extend([
+                "",
+                "/* RTL support */",
+                "[dir='rtl'] {",
+                "  text-align: right;",
+                "}",
+                "",
+                "[dir='rtl'] .float-left {",
+                "  float: right !important;",
+                "}",
+                "",
+                "[dir='rtl'] .float-right {",
+                "  float: left !important;",
+                "}"
+            ])
+        
+        # High contrast support
+        if theme.supports_high_contrast:
+            css_output.extend([
+                "",
+                "@media (prefers-contrast: high) {",
+                "  :root {",
+                "    --theme-border-width: 2px;",
+                "    --theme-focus-ring-width: 0.5rem;",
+                "  }",
+                "  ",
+                "  .btn, .form-control, .card {",
+                "    border-width: var(--theme-border-width);",
+                "  }",
+                "}"
+            ])
+        
+        # Dark mode support
+        if theme.supports_dark_mode:
+            # Dark mode Bootstrap integration
+            dark_mode_css = [
+                "",
+                "/* Dark mode Bootstrap variable mappings */",
+                "[data-theme='dark'], [data-bs-theme='dark'] {",
+                "  --bs-primary: var(--theme-primary-dark);",
+                "  --bs-secondary: var(--theme-secondary-dark);",
+                "  --bs-success: var(--theme-success-dark);",
+                "  --bs-warning: var(--theme-warning-dark);",
+                "  --bs-danger: var(--theme-danger-dark);",
+                "  --bs-info: var(--theme-info-dark);",
+                "  --bs-body-bg: var(--theme-content-area-dark);",
+                "  --bs-body-color: var(--theme-text-dark);",
+                "  --bs-border-color: var(--theme-border-color-dark);",
+                "  --bs-card-bg: var(--theme-component-dark);",
+                "  --bs-card-border-color: var(--theme-border-color-dark);",
+                "  --bs-secondary-bg: var(--theme-surface-dark);",
+                "  --bs-tertiary-bg: var(--theme-surface-dark);",
+                "  --bs-emphasis-color: var(--theme-text-dark);",
+                "}",
+                "",
+                "/* Dark mode component overrides */",
+                "[data-theme='dark'] .form-control,",
+                "[data-theme='dark'] .form-select,",
+                "[data-bs-theme='dark'] .form-control,",
+                "[data-bs-theme='dark'] .form-select {",
+                "  background-color: var(--theme-surface-dark);",
+                "  border-color: var(--theme-border-color-dark);",
+                "  color: var(--theme-text-dark);",
+                "}",
+                "",
+                "[data-theme='dark'] .form-control:focus,",
+                "[data-theme='dark'] .form-select:focus,",
+                "[data-bs-theme='dark'] .form-control:focus,",
+                "[data-bs-theme='dark'] .form-select:focus {",
+                "  background-color: var(--theme-surface-dark);",
+                "  border-color: var(--theme-primary-dark);",
+                "  color: var(--theme-text-dark);",
+                "}",
+                "",
+                "[data-theme='dark'] .card,",
+                "[data-bs-theme='dark'] .card {",
+                "  background-color: var(--theme-component-dark);",
+                "  border-color: var(--theme-border-color-dark);",
+                "  color: var(--theme-text-dark);",
+                "}",
+                "",
+                "[data-theme='dark'] .card-header,",
+                "[data-bs-theme='dark'] .card-header {",
+                "  background-color: rgba(255, 255, 255, 0.05);",
+                "  border-bottom-color: var(--theme-border-color-dark);",
+                "}",
+                "",
+                "[data-theme='dark'] .dropdown-menu,",
+                "[data-bs-theme='dark'] .dropdown-menu {",
+                "  background-color: var(--theme-surface-dark);",
+                "  border-color: var(--theme-border-color-dark);",
+                "}",
+                "",
+                "[data-theme='dark'] .dropdown-item,",
+                "[data-bs-theme='dark'] .dropdown-item {",
+                "  color: var(--theme-text-dark);",
+                "}",
+                "",
+                "[data-theme='dark'] .dropdown-item:hover,",
+                "[data-theme='dark'] .dropdown-item:focus,",
+                "[data-bs-theme='dark'] .dropdown-item:hover,",
+                "[data-bs-theme='dark'] .dropdown-item:focus {",
+                "  background-color: rgba(255, 255, 255, 0.05);",
+                "  color: var(--theme-text-dark);",
+                "}"
+            ]
+            
+            css_output.extend(dark_mode_css)
+            
+            if theme.mode == 'dark':
+                # Force dark mode - override root variables
+                css_output.extend([
+                    "",
+                    "/* Force dark mode */",
+                    ":root {",
+                    f"  --theme-primary: {theme.primary_color_dark or theme.primary_color};",
+                    f"  --theme-secondary: {theme.secondary_color_dark or theme.secondary_color};",
+                    f"  --theme-success: {theme.success_color_dark or theme.success_color};",
+                    f"  --theme-warning: {theme.warning_color_dark or theme.warning_color};",
+                    f"  --theme-danger: {theme.danger_color_dark or theme.danger_color};",
+                    f"  --theme-info: {theme.info_color_dark or theme.info_color};",
+                    f"  --theme-background: {theme.background_color_dark or theme.background_color};",
+                    f"  --theme-surface: {theme.surface_color_dark or theme.surface_color};",
+                    f"  --theme-text: {theme.text_color_dark or theme.text_color};",
+                    f"  --theme-text-muted: {theme.text_muted_color_dark or theme.text_muted_color};",
+                    f"  --theme-border-color: {theme.border_color_dark or theme.border_color};",
+                    f"  --theme-content-area: {theme.content_area_color_dark or theme.content_area_color};",
+                    f"  --theme-sidebar: {theme.sidebar_color_dark or theme.sidebar_color};",
+                    f"  --theme-component: {theme.component_color_dark or theme.component_color};",
+                    "}"
+                ])
+            elif theme.mode == 'auto':
+                # Auto mode with manual override support
+                css_output.extend([
+                    "",
+                    "/* Auto dark mode (only when no manual theme is set) */",
+                    "@media (prefers-color-scheme: dark) {",
+                    "  :root:not([data-theme]) {",
+                    f"    --theme-primary: {theme.primary_color_dark or theme.primary_color};",
+                    f"    --theme-secondary: {theme.secondary_color_dark or theme.secondary_color};",
+                    f"    --theme-success: {theme.success_color_dark or theme.success_color};",
+                    f"    --theme-warning: {theme.warning_color_dark or theme.warning_color};",
+                    f"    --theme-danger: {theme.danger_color_dark or theme.danger_color};",
+                    f"    --theme-info: {theme.info_color_dark or theme.info_color};",
+                    f"    --theme-background: {theme.background_color_dark or theme.background_color};",
+                    f"    --theme-surface: {theme.surface_color_dark or theme.surface_color};",
+                    f"    --theme-text: {theme.text_color_dark or theme.text_color};",
+                    f"    --theme-text-muted: {theme.text_muted_color_dark or theme.text_muted_color};",
+                    f"    --theme-border-color: {theme.border_color_dark or theme.border_color};",
+                    f"    --theme-content-area: {theme.content_area_color_dark or theme.content_area_color};",
+                    f"    --theme-sidebar: {theme.sidebar_color_dark or theme.sidebar_color};",
+                    f"    --theme-component: {theme.component_color_dark or theme.component_color};",
+                    "  }",
+                    "}",
+                    "",
+                    "/* Manual dark theme override */",
+                    ":root[data-theme=\"dark\"] {",
+                    f"  --theme-primary: {theme.primary_color_dark or theme.primary_color};",
+                    f"  --theme-secondary: {theme.secondary_color_dark or theme.secondary_color};",
+                    f"  --theme-success: {theme.success_color_dark or theme.success_color};",
+                    f"  --theme-warning: {theme.warning_color_dark or theme.warning_color};",
+                    f"  --theme-danger: {theme.danger_color_dark or theme.danger_color};",
+                    f"  --theme-info: {theme.info_color_dark or theme.info_color};",
+                    f"  --theme-background: {theme.background_color_dark or theme.background_color};",
+                    f"  --theme-surface: {theme.surface_color_dark or theme.surface_color};",
+                    f"  --theme-text: {theme.text_color_dark or theme.text_color};",
+                    f"  --theme-text-muted: {theme.text_muted_color_dark or theme.text_muted_color};",
+                    f"  --theme-border-color: {theme.border_color_dark or theme.border_color};",
+                    f"  --theme-content-area: {theme.content_area_color_dark or theme.content_area_color};",
+                    f"  --theme-sidebar: {theme.sidebar_color_dark or theme.sidebar_color};",
+                    f"  --theme-component: {theme.component_color_dark or theme.component_color};",
+                    "}",
+                    "",
+                    "/* Manual light theme override */",
+                    ":root[data-theme=\"light\"] {",
+                    f"  --theme-primary: {theme.primary_color};",
+                    f"  --theme-secondary: {theme.secondary_color};",
+                    f"  --theme-success: {theme.success_color};",
+                    f"  --theme-warning: {theme.warning_color};",
+                    f"  --theme-danger: {theme.danger_color};",
+                    f"  --theme-info: {theme.info_color};",
+                    f"  --theme-background: {theme.background_color};",
+                    f"  --theme-surface: {theme.surface_color};",
+                    f"  --theme-text: {theme.text_color};",
+                    f"  --theme-text-muted: {theme.text_muted_color};",
+                    f"  --theme-border-color: {theme.border_color};",
+                    f"  --theme-content-area: {theme.content_area_color};",
+                    f"  --theme-sidebar: {theme.sidebar_color};",
+                    f"  --theme-component: {theme.component_color};",
+                    "}"
+                ])
+        
+        # Animation controls
+        if not theme.enable_animations:
+            css_output.extend([
+                "",
+                "/* Disable animations */",
+                "*, *::before, *::after {",
+                "  animation-duration: 0s !important;",
+                "  animation-delay: 0s !important;",
+                "}"
+            ])
+            
+        if not theme.enable_transitions:
+            css_output.extend([
+                "",
+                "/* Disable transitions */", 
+                "*, *::before, *::after {",
+                "  transition-duration: 0s !important;",
+                "  transition-delay: 0s !important;",
+                "}"
+            ])
+        
+        # Add custom CSS if present
+        if theme.custom_css:
+            css_output.extend([
+                "",
+                "/* Custom theme CSS */",
+                theme.custom_css.strip()
+            ])
+
+        return "\n".join(css_output)
+
+
+ThemeStylesheet.register_invalidation()
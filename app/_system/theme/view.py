@@ -0,0 +1,26 @@
+from flask import Blueprint, Response, abort, redirect, url_for
+
+from app.classes import ThemeStylesheet
+
+# Create blueprint
+bp = Blueprint('theme', __name__, url_prefix='/theme')
+
+
+@bp.route('/<theme_id>/<css_hash>.css')
+def stylesheet(theme_id, css_hash):
+    """Serve a theme's generated CSS; the hash in the URL makes it immutable"""
+    # No default-theme fallback: an unknown id is a 404
+    artifact = ThemeStylesheet.get(theme_id, fallback=False)
+    if not artifact or artifact.theme_id != theme_id:
+        abort(404)
+
+    if artifact.hash != css_hash:
+        # Stale fingerprint from an old page - point at the current revision
+        return redirect(url_for('theme.stylesheet', theme_id=artifact.theme_id, css_hash=artifact.hash))
+
+    response = Response(artifact.css, mimetype='text/css')
+    response.set_etag(artifact.hash)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response
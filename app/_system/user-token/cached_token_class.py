@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+
+from sqlalchemy.orm.util import identity_key
+
+from app.register.database import db_registry
+
+
+class CachedToken:
+    """
+    Read-only snapshot of a validated UserToken
+
+    Exposes the same read API the request path uses on the ORM object
+    (id, user_id, token_type, get_auth_context, expires_in_seconds, ...)
+    without holding a session or the raw token value.
+    """
+    __depends_on__ = []
+
+    def __init__(self, token):
+        self.id = token.id
+        self.user_id = token.user_id
+        self.name = token.name
+        self.application = token.application
+        self.token_type = token.token_type
+        self.expires_at = token.expires_at
+        self.ignore_expiration = token.ignore_expiration
+        self.is_active = token.is_active
+        self.is_system_temporary = token.is_system_temporary
+        self.refresh_token_id = token.refresh_token_id
+
+    @property
+    def user(self):
+        """
+        The owning user, from the current request's session
+
+        Never stored on the snapshot: it is shared by every thread in the
+        worker, and an ORM object belongs to the session that loaded it.
+        Repeat access within a request is served by that session's identity
+        map without another query.
+        """
+        if not self.user_id:
+            return None
+        from app.models import User
+        return db_registry._routing_session().get(User, self.user_id)
+
+    def _loaded_user(self):
+        """The owning user if this request's session already holds it, without a query"""
+        if not self.user_id:
+            return None
+        from app.models import User
+        db_session = db_registry._routing_session()
+        return db_session.identity_map.get(identity_key(User, self.user_id))
+
+    def is_expired(self):
+        if self.ignore_expiration or not self.expires_at:
+            return False
+        return datetime.now(timezone.utc) > self.expires_at
+
+    def expires_in_seconds(self):
+        """Get seconds until expiration"""
+        if self.ignore_expiration or not self.expires_at:
+            return None
+
+        now = datetime.now(timezone.utc)
+        if now >= self.expires_at:
+            return 0
+
+        return int((self.expires_at - now).total_seconds())
+
+    def get_auth_context(self):
+        # 'user' is only populated if this request already loaded it; nothing
+        # on the request path reads it and loading it would cost a query per call
+        return {
+            'token_id': str(self.id),
+            'token_type': self.token_type,
+            'user': self._loaded_user(),
+            'user_id': str(self.user_id) if self.user_id else None,
+            'application': self.application,
+            'refresh_token_id': str(self.refresh_token_id) if self.refresh_token_id else None
+        }
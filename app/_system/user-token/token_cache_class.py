@@ -0,0 +1,146 @@
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam
+
+from app.config import config
+
+
+class TokenCache:
+    """
+    Short-TTL per-worker cache of validated tokens, keyed by SHA-256 of the token
+
+    - Entries live for token_cache_ttl_seconds and are re-checked against
+      expires_at on every hit
+    - Any committed change to a token's active flag, expiry or type (revoke,
+      refresh, soft delete) bumps the 'user_tokens' stamp and clears the
+      cache in every worker
+    - last_used_at is coalesced per token and written in bulk by a
+      BatchWriter, so read-only API traffic does not open a write transaction
+    """
+    __depends_on__ = ['UserToken', 'VersionStamp', 'BatchWriter', 'CachedToken']
+
+    VERSION_KEY = 'user_tokens'
+
+    ttl = config.get('token_cache_ttl_seconds', 30)
+    max_size = config.get('token_cache_max_size', 20000)
+
+    _entries = {}  # token hash -> (CachedToken, cached_at)
+    _version = None
+    _lock = threading.Lock()
+
+    _touched = {}  # token id -> latest last_used_at waiting to be written
+    _touch_lock = threading.Lock()
+    _writer = None
+
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def register_invalidation(cls):
+        """Clear token caches when a token is revoked, expired or retyped"""
+        from app.classes import VersionStamp
+        from app.models import UserToken
+
+        VersionStamp.watch(
+            UserToken, cls.VERSION_KEY,
+            columns=['is_active', 'expires_at', 'ignore_expiration', 'token_type', 'user_id'],
+            events=('update', 'delete')
+        )
+
+    @classmethod
+    def get(cls, token):
+        """Get a cached, still-valid token snapshot or None"""
+        from app.classes import VersionStamp
+
+        version = VersionStamp.current(cls.VERSION_KEY)
+        if version != cls._version:
+            with cls._lock:
+                if version != cls._version:
+                    cls._entries = {}
+                    cls._version = version
+
+        entry = cls._entries.get(cls.hash_token(token))
+        if entry is None:
+            return None
+
+        cached, cached_at = entry
+        if time.monotonic() - cached_at > cls.ttl or cached.is_expired():
+            cls._entries.pop(cls.hash_token(token), None)
+            return None
+        return cached
+
+    @classmethod
+    def put(cls, token, user_token):
+        """Cache a validated token and return its snapshot"""
+        from app.classes import CachedToken
+
+        cached = CachedToken(user_token)
+        entries = cls._entries
+        if len(entries) >= cls.max_size:
+            entries.clear()
+        entries[cls.hash_token(token)] = (cached, time.monotonic())
+        return cached
+
+    @classmethod
+    def evict(cls, token):
+        """Drop one token from this worker's cache"""
+        cls._entries.pop(cls.hash_token(token), None)
+
+    @classmethod
+    def touch(cls, token_id):
+        """Record a token use; last_used_at is written by the next flush"""
+        now = datetime.now(timezone.utc)
+        with cls._touch_lock:
+            pending = token_id in cls._touched
+            cls._touched[token_id] = now
+        if not pending and not cls._get_writer().put(token_id):
+            # Dropped: forget it so the next use queues it again
+            with cls._touch_lock:
+                cls._touched.pop(token_id, None)
+
+    @classmethod
+    def flush_touches(cls):
+        """Write all pending last_used_at updates now"""
+        if cls._writer is not None:
+            cls._writer.flush()
+
+    @classmethod
+    def _get_writer(cls):
+        if cls._writer is None:
+            with cls._touch_lock:
+                if cls._writer is None:
+                    from app.classes import BatchWriter
+                    cls._writer = BatchWriter(
+                        'user_token_last_used',
+                        handler=cls._write_touches,
+                        batch_size=config.get('token_touch_batch_size', 1000),
+                        flush_interval_ms=config.get('token_touch_flush_ms', 5000),
+                        max_queue_size=config.get('token_cache_max_size', 20000)
+                    )
+        return cls._writer
+
+    @classmethod
+    def _write_touches(cls, connection, token_ids):
+        """BatchWriter handler: one executemany UPDATE for the distinct tokens"""
+        from app.models import UserToken
+
+        with cls._touch_lock:
+            params = [
+                {'token_id': token_id, 'used_at': cls._touched.pop(token_id)}
+                for token_id in set(token_ids) if token_id in cls._touched
+            ]
+        if not params:
+            return
+
+        table = UserToken.__table__
+        stmt = table.update().where(
+            table.c.id == bindparam('token_id')
+        ).values(last_used_at=bindparam('used_at'))
+        connection.execute(stmt, params)
+
+
+TokenCache.register_invalidation()
@@ -161,9 +161,21 @@ class UserToken(BaseModel):
         return db_session.query(cls).filter(cls.token == token).first()
 
     @classmethod
-    def validate_token(cls, token):
-        """Validate any token type"""
-        db_session=db_registry._routing_session()
+    def validate_token(cls, token, use_cache=True):
+        """Validate any token type
+
+        Served from the per-worker TokenCache when possible, which returns a
+        read-only CachedToken. last_used_at is written behind in bulk.
+        Pass use_cache=False to get the live ORM object.
+        """
+        from app.classes import TokenCache
+
+        if use_cache:
+            cached = TokenCache.get(token)
+            if cached is not None:
+                TokenCache.touch(cached.id)
+                return cached
+
         user_token = cls.find_by_token(token)
         if not user_token or not user_token.is_active:
             return None
@@ -172,14 +184,14 @@ class UserToken(BaseModel):
             if datetime.now(timezone.utc) > user_token.expires_at:
                 return None
 
-        user_token.last_used_at = datetime.now(timezone.utc)
-        db_session.commit()
+        TokenCache.touch(user_token.id)
+        if use_cache:
+            return TokenCache.put(token, user_token)
         return user_token
 
     @classmethod
     def validate_access_token(cls, token):
         """Validate specifically access tokens"""
-        db_session=db_registry._routing_session()
         user_token = cls.validate_token( token)
         if user_token and user_token.token_type == 'access':
             return user_token
@@ -187,9 +199,8 @@ class UserToken(BaseModel):
 
     @classmethod
     def validate_refresh_token(cls,  token):
-        """Validate specifically refresh tokens"""
-        db_session=db_registry._routing_session()
-        user_token = cls.validate_token( token)
+        """Validate specifically refresh tokens (live ORM object - callers refresh from it)"""
+        user_token = cls.validate_token( token, use_cache=False)
         if user_token and user_token.token_type == 'refresh':
             return user_token
         return None
@@ -248,9 +259,16 @@ class UserToken(BaseModel):
         return int((self.expires_at - now).total_seconds())
 
     def revoke(self):
-        """Revoke token and any linked tokens"""
+        """Revoke token and any linked tokens
+
+        Evicts the token from this worker's TokenCache now; the commit bumps
+        the 'user_tokens' stamp so the other workers drop it too
+        """
+        from app.classes import TokenCache
+
         db_session=db_registry._routing_session()
         self.soft_delete()
+        TokenCache.evict(self.token)
         
         # If this is a refresh token, revoke all linked access tokens
         if self.token_type == 'refresh':
@@ -24,7 +24,53 @@ DEFAULT_CONFIG = {
     "log_level": "DEBUG",
     "route_prefix": "",
     "log_file": "logs/app.log",
-    "encryption_key":"u1tOOtBW2ECTWXSMS_pZ9wwdn4dEZzg_-ihYJfbYbd8="
+    "encryption_key":"u1tOOtBW2ECTWXSMS_pZ9wwdn4dEZzg_-ihYJfbYbd8=",
+    "cache_version_poll_seconds": 5,
+    "firewall_log_batch_size": 500,
+    "firewall_log_flush_ms": 1000,
+    "firewall_log_queue_size": 10000,
+    "firewall_log_overflow": "drop",
+    "rbac_audit_grant_sample_rate": 1.0,
+    "rbac_audit_aggregate_grants": True,
+    "rbac_audit_batch_size": 1000,
+    "rbac_audit_flush_ms": 2000,
+    "rbac_audit_queue_size": 20000,
+    "rbac_audit_overflow": "drop",
+    "rbac_audit_partition_interval": "day",
+    "firewall_log_partition_interval": "day",
+    "log_partition_premake": 7,
+    "log_rollup_enabled": True,
+    "log_rollup_interval_seconds": 300,
+    "log_rollup_grace_seconds": 120,
+    "log_rollup_max_hours": 24,
+    "token_cache_ttl_seconds": 30,
+    "token_cache_max_size": 20000,
+    "token_touch_flush_ms": 5000,
+    "template_cache_size": 400,
+    "page_view_flush_ms": 5000,
+    "page_output_cache_enabled": False,
+    "page_output_cache_size": 1000,
+    "page_output_cache_dir": "",
+    "theme_css_dir": "",
+    "miner_count_mode": "exact",
+    "miner_count_cache_ttl_seconds": 60,
+    "html_minify_cache_size": 2000,
+    "report_cache_size": 200,
+    "report_export_chunk_rows": 5000,
+    "report_scheduler_in_worker": False,
+    "report_scheduler_poll_seconds": 30,
+    "report_scheduler_workers": 2,
+    "report_scheduler_stale_seconds": 3600,
+    "report_schedule_timezone": "UTC",
+    "report_schedule_output_dir": "exports/schedules",
+    "report_delivery_timeout_seconds": 30,
+    "report_delivery_max_attachment_bytes": 20 * 1024 * 1024,
+    "smtp_host": "localhost",
+    "smtp_port": 25,
+    "smtp_username": "",
+    "smtp_password": "",
+    "smtp_use_tls": False,
+    "smtp_from": "reports@localhost"
 }
 
 
@@ -44,7 +90,53 @@ config = {
     "log_level": os.environ.get("TEMURAGI_LOG_LEVEL", DEFAULT_CONFIG["log_level"]),
     "route_prefix": os.environ.get("TEMURAGI_ROUTE_PREFIX",DEFAULT_CONFIG["route_prefix"]),
     "log_file": DEFAULT_CONFIG["log_file"],
-    "encryption_key": os.environ.get("TEMURAGI_ENCRYPTION_KEY", DEFAULT_CONFIG["encryption_key"])
+    "encryption_key": os.environ.get("TEMURAGI_ENCRYPTION_KEY", DEFAULT_CONFIG["encryption_key"]),
+    "cache_version_poll_seconds": float(os.environ.get("TEMURAGI_CACHE_VERSION_POLL_SECONDS", DEFAULT_CONFIG["cache_version_poll_seconds"])),
+    "firewall_log_batch_size": int(os.environ.get("TEMURAGI_FIREWALL_LOG_BATCH_SIZE", DEFAULT_CONFIG["firewall_log_batch_size"])),
+    "firewall_log_flush_ms": int(os.environ.get("TEMURAGI_FIREWALL_LOG_FLUSH_MS", DEFAULT_CONFIG["firewall_log_flush_ms"])),
+    "firewall_log_queue_size": int(os.environ.get("TEMURAGI_FIREWALL_LOG_QUEUE_SIZE", DEFAULT_CONFIG["firewall_log_queue_size"])),
+    "firewall_log_overflow": os.environ.get("TEMURAGI_FIREWALL_LOG_OVERFLOW", DEFAULT_CONFIG["firewall_log_overflow"]),
+    "rbac_audit_grant_sample_rate": float(os.environ.get("TEMURAGI_RBAC_AUDIT_GRANT_SAMPLE_RATE", DEFAULT_CONFIG["rbac_audit_grant_sample_rate"])),
+    "rbac_audit_aggregate_grants": os.environ.get("TEMURAGI_RBAC_AUDIT_AGGREGATE_GRANTS", str(DEFAULT_CONFIG["rbac_audit_aggregate_grants"])).lower() == "true",
+    "rbac_audit_batch_size": int(os.environ.get("TEMURAGI_RBAC_AUDIT_BATCH_SIZE", DEFAULT_CONFIG["rbac_audit_batch_size"])),
+    "rbac_audit_flush_ms": int(os.environ.get("TEMURAGI_RBAC_AUDIT_FLUSH_MS", DEFAULT_CONFIG["rbac_audit_flush_ms"])),
+    "rbac_audit_queue_size": int(os.environ.get("TEMURAGI_RBAC_AUDIT_QUEUE_SIZE", DEFAULT_CONFIG["rbac_audit_queue_size"])),
+    "rbac_audit_overflow": os.environ.get("TEMURAGI_RBAC_AUDIT_OVERFLOW", DEFAULT_CONFIG["rbac_audit_overflow"]),
+    "rbac_audit_partition_interval": os.environ.get("TEMURAGI_RBAC_AUDIT_PARTITION_INTERVAL", DEFAULT_CONFIG["rbac_audit_partition_interval"]),
+    "firewall_log_partition_interval": os.environ.get("TEMURAGI_FIREWALL_LOG_PARTITION_INTERVAL", DEFAULT_CONFIG["firewall_log_partition_interval"]),
+    "log_partition_premake": int(os.environ.get("TEMURAGI_LOG_PARTITION_PREMAKE", DEFAULT_CONFIG["log_partition_premake"])),
+    "log_rollup_enabled": os.environ.get("TEMURAGI_LOG_ROLLUP_ENABLED", str(DEFAULT_CONFIG["log_rollup_enabled"])).lower() == "true",
+    "log_rollup_interval_seconds": int(os.environ.get("TEMURAGI_LOG_ROLLUP_INTERVAL_SECONDS", DEFAULT_CONFIG["log_rollup_interval_seconds"])),
+    "log_rollup_grace_seconds": int(os.environ.get("TEMURAGI_LOG_ROLLUP_GRACE_SECONDS", DEFAULT_CONFIG["log_rollup_grace_seconds"])),
+    "log_rollup_max_hours": int(os.environ.get("TEMURAGI_LOG_ROLLUP_MAX_HOURS", DEFAULT_CONFIG["log_rollup_max_hours"])),
+    "token_cache_ttl_seconds": float(os.environ.get("TEMURAGI_TOKEN_CACHE_TTL_SECONDS", DEFAULT_CONFIG["token_cache_ttl_seconds"])),
+    "token_cache_max_size": int(os.environ.get("TEMURAGI_TOKEN_CACHE_MAX_SIZE", DEFAULT_CONFIG["token_cache_max_size"])),
+    "token_touch_flush_ms": int(os.environ.get("TEMURAGI_TOKEN_TOUCH_FLUSH_MS", DEFAULT_CONFIG["token_touch_flush_ms"])),
+    "template_cache_size": int(os.environ.get("TEMURAGI_TEMPLATE_CACHE_SIZE", DEFAULT_CONFIG["template_cache_size"])),
+    "page_view_flush_ms": int(os.environ.get("TEMURAGI_PAGE_VIEW_FLUSH_MS", DEFAULT_CONFIG["page_view_flush_ms"])),
+    "page_output_cache_enabled": os.environ.get("TEMURAGI_PAGE_OUTPUT_CACHE_ENABLED", str(DEFAULT_CONFIG["page_output_cache_enabled"])).lower() == "true",
+    "page_output_cache_size": int(os.environ.get("TEMURAGI_PAGE_OUTPUT_CACHE_SIZE", DEFAULT_CONFIG["page_output_cache_size"])),
+    "page_output_cache_dir": os.environ.get("TEMURAGI_PAGE_OUTPUT_CACHE_DIR", DEFAULT_CONFIG["page_output_cache_dir"]),
+    "theme_css_dir": os.environ.get("TEMURAGI_THEME_CSS_DIR", DEFAULT_CONFIG["theme_css_dir"]),
+    "miner_count_mode": os.environ.get("TEMURAGI_MINER_COUNT_MODE", DEFAULT_CONFIG["miner_count_mode"]),
+    "miner_count_cache_ttl_seconds": float(os.environ.get("TEMURAGI_MINER_COUNT_CACHE_TTL_SECONDS", DEFAULT_CONFIG["miner_count_cache_ttl_seconds"])),
+    "html_minify_cache_size": int(os.environ.get("TEMURAGI_HTML_MINIFY_CACHE_SIZE", DEFAULT_CONFIG["html_minify_cache_size"])),
+    "report_cache_size": int(os.environ.get("TEMURAGI_REPORT_CACHE_SIZE", DEFAULT_CONFIG["report_cache_size"])),
+    "report_export_chunk_rows": int(os.environ.get("TEMURAGI_REPORT_EXPORT_CHUNK_ROWS", DEFAULT_CONFIG["report_export_chunk_rows"])),
+    "report_scheduler_in_worker": os.environ.get("TEMURAGI_REPORT_SCHEDULER_IN_WORKER", str(DEFAULT_CONFIG["report_scheduler_in_worker"])).lower() == "true",
+    "report_scheduler_poll_seconds": int(os.environ.get("TEMURAGI_REPORT_SCHEDULER_POLL_SECONDS", DEFAULT_CONFIG["report_scheduler_poll_seconds"])),
+    "report_scheduler_workers": int(os.environ.get("TEMURAGI_REPORT_SCHEDULER_WORKERS", DEFAULT_CONFIG["report_scheduler_workers"])),
+    "report_scheduler_stale_seconds": int(os.environ.get("TEMURAGI_REPORT_SCHEDULER_STALE_SECONDS", DEFAULT_CONFIG["report_scheduler_stale_seconds"])),
+    "report_schedule_timezone": os.environ.get("TEMURAGI_REPORT_SCHEDULE_TIMEZONE", DEFAULT_CONFIG["report_schedule_timezone"]),
+    "report_schedule_output_dir": os.environ.get("TEMURAGI_REPORT_SCHEDULE_OUTPUT_DIR", DEFAULT_CONFIG["report_schedule_output_dir"]),
+    "report_delivery_timeout_seconds": int(os.environ.get("TEMURAGI_REPORT_DELIVERY_TIMEOUT_SECONDS", DEFAULT_CONFIG["report_delivery_timeout_seconds"])),
+    "report_delivery_max_attachment_bytes": int(os.environ.get("TEMURAGI_REPORT_DELIVERY_MAX_ATTACHMENT_BYTES", DEFAULT_CONFIG["report_delivery_max_attachment_bytes"])),
+    "smtp_host": os.environ.get("TEMURAGI_SMTP_HOST", DEFAULT_CONFIG["smtp_host"]),
+    "smtp_port": int(os.environ.get("TEMURAGI_SMTP_PORT", DEFAULT_CONFIG["smtp_port"])),
+    "smtp_username": os.environ.get("TEMURAGI_SMTP_USERNAME", DEFAULT_CONFIG["smtp_username"]),
+    "smtp_password": os.environ.get("TEMURAGI_SMTP_PASSWORD", DEFAULT_CONFIG["smtp_password"]),
+    "smtp_use_tls": os.environ.get("TEMURAGI_SMTP_USE_TLS", str(DEFAULT_CONFIG["smtp_use_tls"])).lower() == "true",
+    "smtp_from": os.environ.get("TEMURAGI_SMTP_FROM", DEFAULT_CONFIG["smtp_from"])
 }
 
 
@@ -1,6 +1,7 @@
+import hashlib
 import threading
 from flask import Flask, g
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, scoped_session, Session
 from contextlib import contextmanager
 
@@ -32,9 +33,20 @@ class RoutingSession(Session):
 class DynamicDatabaseRegistry:
     """Registry for dynamically created database engines based on stored connections"""
 
+    # Overridden per connection by the pool_* keys of Connection.options
+    DEFAULT_POOL_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 0,
+        'pool_timeout': 30,
+        'pool_pre_ping': True,
+        'pool_recycle': 3600
+    }
+
     def __init__(self):
         self.main_engine = None
         self._dynamic_engines = {}
+        self._engine_fingerprints = {}
+        self._pool_counters = {}
         self._routing_session = None
         self._app = None
         self._lock = threading.RLock()  # Use RLock for reentrant locking
@@ -139,23 +151,9 @@ class DynamicDatabaseRegistry:
                         return None
 
                     connection_string = connection.get_connection_string()
-                print(connection_string)
-                # Create engine with appropriate settings
-                engine_config = {
-                    'pool_size': 10,
-                    'max_overflow': 0,
-                    'pool_pre_ping': True,
-                    'pool_recycle': 3600,
-                    'isolation_level': 'READ COMMITTED'
-                }
-
-                # Add database-specific settings
-                if 'mssql' in connection_string.lower():
-                    # For MSSQL, ensure proper connection string format
-                    if 'TrustServerCertificate' not in connection_string:
-                        connection_string += '&TrustServerCertificate=yes' if '?' in connection_string else '?TrustServerCertificate=yes'
-
-                engine = create_engine(connection_string, **engine_config)
+                    pool_options = connection.get_pool_options()
+
+                engine = self._build_engine(bind_key, connection_string, pool_options)
 
                 # Test connection
                 with engine.connect() as conn:
@@ -164,6 +162,7 @@ class DynamicDatabaseRegistry:
 
                 # Cache it
                 self._dynamic_engines[bind_key] = engine
+                self._engine_fingerprints[bind_key] = self._fingerprint(connection_string, pool_options)
                 self._app.logger.info(f"Created engine for bind_key: {bind_key}")
 
                 return engine
@@ -174,6 +173,101 @@ class DynamicDatabaseRegistry:
                 traceback.print_exc()
                 return None
 
+    def get_engine_for_connection(self, connection):
+        """
+        Get the pooled engine for a loaded Connection, keyed by its name
+
+        Shares the cache with get_or_create_engine. The connection string
+        and pool options are fingerprinted, so an edited connection gets a
+        fresh engine (and the old pool is disposed) on next use. Unlike
+        get_or_create_engine, failures raise so callers can report them.
+        """
+        connection_string = connection.get_connection_string()
+        pool_options = connection.get_pool_options()
+        fingerprint = self._fingerprint(connection_string, pool_options)
+        name = connection.name
+
+        engine = self._dynamic_engines.get(name)
+        if engine is not None and self._engine_fingerprints.get(name) == fingerprint:
+            return engine
+
+        with self._lock:
+            engine = self._dynamic_engines.get(name)
+            if engine is not None and self._engine_fingerprints.get(name) == fingerprint:
+                return engine
+
+            new_engine = self._build_engine(name, connection_string, pool_options)
+            self._dynamic_engines[name] = new_engine
+            self._engine_fingerprints[name] = fingerprint
+            if engine is not None:
+                # Checked-out connections finish normally; idle ones are closed
+                engine.dispose()
+                if self._app:
+                    self._app.logger.info(f"Connection {name} changed, replaced its engine")
+            elif self._app:
+                self._app.logger.info(f"Created engine for connection: {name}")
+            return new_engine
+
+    def _build_engine(self, name, connection_string, pool_options=None):
+        """Create an engine with pool settings from the connection's options"""
+        engine_config = dict(self.DEFAULT_POOL_OPTIONS)
+        engine_config.update(pool_options or {})
+
+        if connection_string.lower().startswith('sqlite'):
+            # SQLite picks its own pool class and isolation levels
+            engine_config = {'pool_pre_ping': engine_config['pool_pre_ping']}
+        else:
+            engine_config['isolation_level'] = 'READ COMMITTED'
+
+        # Add database-specific settings
+        if 'mssql' in connection_string.lower():
+            # For MSSQL, ensure proper connection string format
+            if 'TrustServerCertificate' not in connection_string:
+                connection_string += '&TrustServerCertificate=yes' if '?' in connection_string else '?TrustServerCertificate=yes'
+
+        engine = create_engine(connection_string, **engine_config)
+
+        counters = {'connects': 0, 'checkouts': 0}
+        self._pool_counters[name] = counters
+
+        @event.listens_for(engine, 'connect')
+        def count_connect(dbapi_connection, connection_record):
+            counters['connects'] += 1
+
+        @event.listens_for(engine, 'checkout')
+        def count_checkout(dbapi_connection, connection_record, connection_proxy):
+            counters['checkouts'] += 1
+
+        return engine
+
+    @staticmethod
+    def _fingerprint(connection_string, pool_options):
+        material = connection_string + repr(sorted((pool_options or {}).items()))
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def pool_stats(self):
+        """
+        Pool usage per dynamic engine
+
+        connects counts new DBAPI connections (logins) and checkouts counts
+        pool checkouts, so reuse = 1 - connects / checkouts.
+        """
+        stats = {}
+        for name, engine in list(self._dynamic_engines.items()):
+            pool = engine.pool
+            counters = self._pool_counters.get(name, {})
+            stats[name] = {
+                'pool_class': type(pool).__name__,
+                'size': pool.size() if hasattr(pool, 'size') else None,
+                'checked_in': pool.checkedin() if hasattr(pool, 'checkedin') else None,
+                'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+                'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+                'connects': counters.get('connects', 0),
+                'checkouts': counters.get('checkouts', 0),
+                'status': pool.status()
+            }
+        return stats
+
     #def create_all_tables(self, base_model, app):
     #    """Create tables in main database only"""
     #    if not hasattr(base_model, 'metadata'):
@@ -216,6 +310,7 @@ def refresh_dynamic_engine(bind_key):
             old_engine = db_registry._dynamic_engines[bind_key]
             old_engine.dispose()
             del db_registry._dynamic_engines[bind_key]
+            db_registry._engine_fingerprints.pop(bind_key, None)
 
     return db_registry.get_or_create_engine(bind_key)
 
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app package from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def classes():
+    """The autoloaded class registry (no database connection is opened)"""
+    from app.register.classes import register_classes
+    import app.classes
+
+    register_classes()
+    return app.classes
+
+
+@pytest.fixture
+def versions(classes, monkeypatch):
+    """In-memory cache version stamps: bump a name with versions[name] += 1"""
+    stamps = {}
+    monkeypatch.setattr(classes.VersionStamp, 'current', classmethod(lambda cls, name: stamps.get(name, 0)))
+    return stamps
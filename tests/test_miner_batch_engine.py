@@ -0,0 +1,150 @@
+import uuid
+
+import pytest
+from sqlalchemy import Column, Integer, String, Uuid, create_engine, func, select
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.orm import Session, declarative_base
+
+from app._system.miner import batch_engine_class
+from app._system.miner.batch_engine_class import BatchEngine
+
+
+class FakeMiner:
+    data_handlers = {'Brokered': object()}
+    logger = None
+
+    def _get_primary_key_field(self, model_class):
+        return 'id'
+
+
+def plan(operations):
+    groups = BatchEngine(FakeMiner())._plan(operations)
+    return [(group['model_name'], group['operation'], [index for index, data in group['items']]) for group in groups]
+
+
+def op(model_name, operation, data=None):
+    return {'model_name': model_name, 'operation': operation, 'data': data}
+
+
+ROW = 'a3e1c2d4-0000-4000-8000-00000000000a'
+
+
+def test_groups_by_model_and_operation_in_first_appearance_order():
+    assert plan([
+        op('Page', 'create', {'name': 'a'}),
+        op('Menu', 'update', {'id': 1, 'name': 'x'}),
+        op('Page', 'create', {'name': 'b'}),
+        op('Menu', 'update', {'id': 2, 'name': 'y'}),
+    ]) == [('Page', 'create', [0, 2]), ('Menu', 'update', [1, 3])]
+
+
+def test_update_after_delete_of_same_row_keeps_request_order():
+    assert plan([
+        op('Page', 'update', {'id': 'other', 'name': 'x'}),
+        op('Page', 'delete', {'id': ROW}),
+        op('Page', 'update', {'id': ROW.upper(), 'name': 'y'}),
+        op('Page', 'update', {'id': 'third', 'name': 'z'}),
+    ]) == [
+        ('Page', 'update', [0]),
+        ('Page', 'delete', [1]),
+        ('Page', 'update', [2, 3]),
+    ]
+
+
+def test_rows_of_other_models_do_not_split_groups():
+    assert plan([
+        op('Page', 'update', {'id': 1, 'name': 'x'}),
+        op('Menu', 'delete', {'id': 1}),
+        op('Page', 'update', {'id': 2, 'name': 'y'}),
+    ]) == [('Page', 'update', [0, 2]), ('Menu', 'delete', [1])]
+
+
+def test_one_by_one_operations_are_barriers_for_their_model():
+    assert plan([
+        op('Page', 'update', {'id': 1, 'name': 'x'}),
+        op('Page', 'publish', {'id': 1}),
+        op('Page', 'update', {'id': 2, 'name': 'y'}),
+        op('Brokered', 'update', {'id': 3}),
+        op('Brokered', 'update', {'id': 4}),
+    ]) == [
+        ('Page', 'update', [0]),
+        ('Page', 'publish', [1]),
+        ('Page', 'update', [2]),
+        ('Brokered', 'update', [3]),
+        ('Brokered', 'update', [4]),
+    ]
+
+
+def test_delete_accepts_a_bare_id():
+    assert plan([
+        op('Page', 'delete', ROW),
+        op('Page', 'update', {'id': ROW, 'name': 'y'}),
+        op('Page', 'delete', {'id': ROW}),
+    ]) == [('Page', 'delete', [0]), ('Page', 'update', [1]), ('Page', 'delete', [2])]
+
+
+@pytest.mark.parametrize('column_type', [PG_UUID(as_uuid=True), Uuid()])
+def test_uuid_keys_match_regardless_of_case_or_format(column_type):
+    stored = uuid.UUID(ROW)
+    for requested in (ROW, ROW.upper(), ROW.replace('-', ''), '{' + ROW + '}', stored):
+        assert BatchEngine._normalize_pk(column_type, requested) == stored
+
+
+def test_uuid_keys_stored_as_text_normalise_to_canonical_text():
+    column_type = PG_UUID(as_uuid=False)
+    assert BatchEngine._normalize_pk(column_type, ROW.upper()) == ROW
+    assert BatchEngine._normalize_pk(column_type, ROW) == BatchEngine._normalize_pk(column_type, ROW)
+
+
+def test_integer_keys_match_their_text_form():
+    assert BatchEngine._normalize_pk(Integer(), '7') == 7
+    assert BatchEngine._normalize_pk(Integer(), 7) == 7
+
+
+def test_other_keys_are_left_alone():
+    assert BatchEngine._normalize_pk(String(), 'Key') == 'Key'
+
+
+@pytest.mark.parametrize('column_type, value', [(PG_UUID(as_uuid=True), 'not-a-uuid'), (Integer(), 'seven')])
+def test_malformed_keys_raise(column_type, value):
+    with pytest.raises(ValueError):
+        BatchEngine._normalize_pk(column_type, value)
+
+
+Base = declarative_base()
+
+
+class Row(Base):
+    __tablename__ = 'rows'
+    id = Column(Integer, primary_key=True)
+
+
+class BrokeringMiner(FakeMiner):
+    """Brokered handler that inserts data['id'] through the batch session"""
+
+    def __init__(self, session):
+        self.session = session
+
+    def broker_data(self, model_name, operation, data, context=None):
+        self.session.add(Row(id=data['id']))
+        self.session.flush()
+        return {'id': data['id']}
+
+
+def test_failing_brokered_group_does_not_poison_later_groups(monkeypatch):
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    monkeypatch.setattr(batch_engine_class.db_registry, '_routing_session', lambda: session, raising=False)
+
+    outcome = BatchEngine(BrokeringMiner(session)).execute([
+        op('Brokered', 'update', {'id': 1}),
+        op('Brokered', 'update', {'id': 1}),
+        op('Brokered', 'update', {'id': 2}),
+    ])
+
+    assert [result['success'] for result in outcome['results']] == [True, False, True]
+    assert outcome['results'][1]['error_type'] == 'IntegrityError'
+    assert outcome['committed']
+    with Session(engine) as check:
+        assert check.scalar(select(func.count()).select_from(Row)) == 2
@@ -0,0 +1,26 @@
+import uuid
+
+from app.config import DEFAULT_CONFIG
+
+
+def key(classes, variant=('anonymous',), query_string=b''):
+    return classes.PageOutputCache.make_key(uuid.UUID(int=1), 'fragments', variant, False, query_string)
+
+
+def test_output_cache_is_off_by_default():
+    assert DEFAULT_CONFIG['page_output_cache_enabled'] is False
+
+
+def test_query_string_is_part_of_the_key(classes, versions):
+    assert key(classes, query_string=b'page=1') == key(classes, query_string=b'page=1')
+    assert key(classes, query_string=b'page=1') != key(classes, query_string=b'page=2')
+    assert key(classes, query_string=b'page=1') != key(classes)
+
+
+def test_viewer_variant_and_stamps_are_part_of_the_key(classes, versions):
+    first = key(classes, ('role', 'r1', ('m1',)))
+    assert first != key(classes, ('role', 'r2', ('m1',)))
+    assert first != key(classes)
+
+    versions['page_output'] = 1
+    assert first != key(classes, ('role', 'r1', ('m1',)))
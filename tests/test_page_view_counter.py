@@ -0,0 +1,43 @@
+import pytest
+
+
+class FakeWriter:
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.items = []
+
+    def put(self, item):
+        if self.accept:
+            self.items.append(item)
+        return self.accept
+
+
+@pytest.fixture
+def counter(classes, monkeypatch):
+    PageViewCounter = classes.PageViewCounter
+    writer = FakeWriter()
+    monkeypatch.setattr(PageViewCounter, '_pending', {})
+    monkeypatch.setattr(PageViewCounter, '_get_writer', classmethod(lambda cls: writer))
+    return PageViewCounter, writer
+
+
+def test_views_add_up_and_queue_the_page_once(counter):
+    PageViewCounter, writer = counter
+    PageViewCounter.increment('p1')
+    PageViewCounter.increment('p1', 2)
+    PageViewCounter.increment('p2')
+
+    assert writer.items == ['p1', 'p2']
+    assert PageViewCounter.pending('p1') == 3
+
+
+def test_dropped_page_is_queued_again_by_the_next_view(counter):
+    PageViewCounter, writer = counter
+    writer.accept = False
+    PageViewCounter.increment('p1')
+    assert PageViewCounter.pending('p1') == 0
+
+    writer.accept = True
+    PageViewCounter.increment('p1')
+    assert writer.items == ['p1']
+    assert PageViewCounter.pending('p1') == 1
@@ -0,0 +1,69 @@
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def cache(classes, versions, monkeypatch):
+    PermissionCache = classes.PermissionCache
+    grants = {}
+    compiled = []
+
+    def compile_role(cls, role_id):
+        compiled.append(role_id)
+        return classes.RolePermissionSet(role_id, grants.get(str(role_id), []))
+
+    monkeypatch.setattr(PermissionCache, '_compile_role', classmethod(compile_role))
+    monkeypatch.setattr(PermissionCache, '_role_sets', {})
+    monkeypatch.setattr(PermissionCache, '_role_version', None)
+    monkeypatch.setattr(PermissionCache, 'grants', grants, raising=False)
+    monkeypatch.setattr(PermissionCache, 'compiled', compiled, raising=False)
+    return PermissionCache
+
+
+def test_invalidation_watches_the_rbac_tables(classes):
+    watched = {(model.__name__, name) for model, name, columns, events in classes.VersionStamp._watched}
+    assert {('RolePermission', 'rbac'), ('Permission', 'rbac'), ('User', 'rbac_users')} <= watched
+
+
+def test_role_sets_are_keyed_by_role_id_text(cache):
+    role_id = uuid.uuid4()
+    cache.grants[str(role_id)] = ['svc:res:read']
+
+    assert cache.get_role_set(role_id).has('svc:res:read')
+    assert cache.get_role_set(str(role_id)) is cache.get_role_set(role_id)
+    assert cache.compiled == [role_id]
+
+
+def test_rbac_stamp_drops_compiled_sets(cache, versions):
+    cache.grants['r1'] = ['svc:res:read']
+    first = cache.get_role_set('r1')
+
+    cache.grants['r1'] = ['svc:res:write']
+    assert cache.get_role_set('r1') is first
+
+    versions['rbac'] = 1
+    second = cache.get_role_set('r1')
+    assert second is not first
+    assert second.has('svc:res:write') and not second.has('svc:res:read')
+
+
+def test_user_stamp_does_not_drop_role_sets(cache, versions):
+    first = cache.get_role_set('r1')
+    versions['rbac_users'] = 1
+    assert cache.get_role_set('r1') is first
+
+
+@pytest.mark.parametrize('grant', [
+    '*:*:*', 'svc:*:*', '*:res:*', '*:*:read', 'svc:res:*', 'svc:*:read', '*:res:read',
+])
+def test_wildcards_cover_matching_permissions(classes, grant):
+    role_set = classes.RolePermissionSet('r1', [grant])
+    assert role_set.allows('svc:res:read')
+    assert not role_set.has('svc:res:read')
+
+
+def test_wildcards_do_not_cover_other_permissions(classes):
+    role_set = classes.RolePermissionSet('r1', ['svc:res:*'])
+    assert not role_set.allows('svc:other:read')
+    assert not role_set.allows('malformed')
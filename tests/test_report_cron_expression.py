@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pytest
+
+from app._system.report.cron_expression_class import CronExpression
+
+
+def next_after(expression, moment):
+    return CronExpression(expression).next_after(moment)
+
+
+def test_every_minute_is_strictly_after():
+    assert next_after('* * * * *', datetime(2026, 1, 1, 10, 0, 30)) == datetime(2026, 1, 1, 10, 1)
+
+
+def test_daily_time_rolls_to_next_day():
+    assert next_after('30 2 * * *', datetime(2026, 1, 1, 2, 30)) == datetime(2026, 1, 2, 2, 30)
+
+
+def test_steps_and_ranges():
+    expression = '*/15 8-18/2 * * *'
+    assert next_after(expression, datetime(2026, 1, 1, 8, 50)) == datetime(2026, 1, 1, 10, 0)
+    assert next_after(expression, datetime(2026, 1, 1, 18, 45)) == datetime(2026, 1, 2, 8, 0)
+
+
+def test_single_value_with_step_runs_to_the_end_of_the_range():
+    assert next_after('5/20 * * * *', datetime(2026, 1, 1, 0, 6)) == datetime(2026, 1, 1, 0, 25)
+
+
+def test_month_and_weekday_names():
+    # 2026-01-01 is a Thursday
+    assert next_after('0 9 * * mon-fri', datetime(2026, 1, 2, 9, 0)) == datetime(2026, 1, 5, 9, 0)
+    assert next_after('0 0 1 mar *', datetime(2026, 1, 1)) == datetime(2026, 3, 1)
+
+
+@pytest.mark.parametrize('weekday', ['0', '7', 'sun'])
+def test_sunday_is_zero_or_seven(weekday):
+    assert next_after(f'0 12 * * {weekday}', datetime(2026, 1, 1)) == datetime(2026, 1, 4, 12, 0)
+
+
+def test_day_of_month_or_weekday_when_both_are_restricted():
+    # The 15th, or any Monday - whichever comes first
+    expression = '0 6 15 * mon'
+    assert next_after(expression, datetime(2026, 1, 1)) == datetime(2026, 1, 5, 6, 0)
+    assert next_after(expression, datetime(2026, 1, 12, 7, 0)) == datetime(2026, 1, 15, 6, 0)
+
+
+def test_day_of_month_only_when_weekday_is_unrestricted():
+    assert next_after('0 0 31 * *', datetime(2026, 2, 1)) == datetime(2026, 3, 31)
+
+
+def test_leap_day():
+    assert next_after('0 0 29 2 *', datetime(2026, 1, 1)) == datetime(2028, 2, 29)
+
+
+@pytest.mark.parametrize('expression', ['* * * *', '60 * * * *', '* * 0 * *', '*/0 * * * *', '* * * foo *', '5-1 * * * *'])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+
+def test_expression_that_never_matches():
+    with pytest.raises(ValueError):
+        next_after('0 0 31 2 *', datetime(2026, 1, 1))
@@ -0,0 +1,131 @@
+import pytest
+
+from app._system.report.query_builder_class import ReportQueryGenerator, PostgreSQLQueryGenerator, MySQLQueryGenerator
+
+
+def make_generator(generator_class=PostgreSQLQueryGenerator):
+    # Skip __init__, which opens a database session
+    return generator_class.__new__(generator_class)
+
+
+def process(query, variables, generator_class=PostgreSQLQueryGenerator):
+    params = {}
+    sql = make_generator(generator_class).process_variables(query, variables, params)
+    return sql, params
+
+
+def test_bare_placeholder_is_bound():
+    sql, params = process("SELECT * FROM t WHERE a = {a}", {'a': 5})
+    assert sql == "SELECT * FROM t WHERE a = :a"
+    assert params == {'a': 5}
+
+
+def test_whole_literal_is_bound():
+    sql, params = process("WHERE b = '{b}'", {'b': "x'y"})
+    assert sql == "WHERE b = :b"
+    assert params == {'b': "x'y"}
+
+
+def test_placeholder_inside_literal_is_substituted_and_escaped():
+    sql, params = process("WHERE name LIKE '{prefix}%'", {'prefix': "O'Br"})
+    assert sql == "WHERE name LIKE 'O''Br%'"
+    assert params == {}
+
+
+def test_date_literal_keeps_its_text():
+    sql, params = process("WHERE d >= '{year}-01-01'", {'year': 2024})
+    assert sql == "WHERE d >= '2024-01-01'"
+    assert params == {}
+
+
+def test_mysql_literal_escapes_backslashes():
+    sql, _ = process("WHERE p LIKE '{path}%'", {'path': 'a\\'}, MySQLQueryGenerator)
+    assert sql == "WHERE p LIKE 'a\\\\%'"
+
+
+@pytest.mark.parametrize('value', ['1, 2,3', [1, 2, 3]])
+def test_in_list_binds_each_item(value):
+    sql, params = process("WHERE id IN ({ids})", {'ids': value})
+    assert sql == "WHERE id IN (:ids_0, :ids_1, :ids_2)"
+    assert [params[f'ids_{i}'] for i in range(3)] == [str(v) if isinstance(value, str) else v for v in (1, 2, 3)]
+
+
+def test_in_list_strips_quoted_items():
+    sql, params = process("WHERE name in ( {names} )", {'names': "'a', 'O''Br'"})
+    assert sql == "WHERE name in ( :names_0, :names_1 )"
+    assert params == {'names_0': 'a', 'names_1': "O'Br"}
+
+
+def test_empty_in_list_matches_nothing():
+    sql, _ = process("WHERE id IN ({ids})", {'ids': []})
+    assert sql == "WHERE id IN (NULL)"
+
+
+def test_in_with_several_placeholders_binds_each():
+    sql, params = process("WHERE a IN ({a}, {b})", {'a': 1, 'b': 2})
+    assert sql == "WHERE a IN (:a, :b)"
+    assert params == {'a': 1, 'b': 2}
+
+
+def test_cast_suffix_is_parenthesised():
+    sql, _ = process("WHERE x = {x}::int", {'x': '5'})
+    assert sql == "WHERE x = (:x)::int"
+
+
+def test_function_argument_keeps_closing_paren():
+    sql, _ = process("WHERE y = coalesce({y}, 0) AND z = lower({z})", {'y': 1, 'z': 'a'})
+    assert sql == "WHERE y = coalesce(:y, 0) AND z = lower(:z)"
+
+
+def test_comments_and_unknown_placeholders_are_untouched():
+    query = "WHERE x = {x} -- don't {x}\n/* {x} */ AND z = '{missing}' AND w = {other}"
+    sql, params = process(query, {'x': 1})
+    assert sql == "WHERE x = :x -- don't {x}\n/* {x} */ AND z = '{missing}' AND w = {other}"
+    assert params == {'x': 1}
+
+
+@pytest.mark.parametrize('query, name', [
+    ("SELECT {column} FROM t", 'column'),
+    ("SELECT a, {column} FROM t", 'column'),
+    ("SELECT * FROM {table}", 'table'),
+    ("SELECT * FROM t WHERE {where_clause}", 'where_clause'),
+    ("SELECT * FROM t WHERE a = 1 AND {condition}", 'condition'),
+    ("SELECT * FROM t ORDER BY {sort}", 'sort'),
+    ("SELECT * FROM t ORDER BY a, {sort}", 'sort'),
+    ("SELECT * FROM {schema}.t", 'schema'),
+    ("SELECT t.{column} FROM t", 'column'),
+    ("SELECT a::{type} FROM t", 'type'),
+    ("WHERE id IN (SELECT {column} FROM t)", 'column'),
+])
+def test_placeholder_in_name_or_clause_position_is_rejected(query, name):
+    with pytest.raises(ValueError, match=f"'{name}'"):
+        process(query, {name: 'x'})
+
+
+@pytest.mark.parametrize('query', [
+    "WHERE a BETWEEN {low} AND {high} AND b = 1",
+    "WHERE a LIKE {pattern} ESCAPE '!'",
+    "WHERE a = CASE WHEN b > {n} THEN {yes} ELSE {no} END",
+    "SELECT * FROM t LIMIT {limit} OFFSET {offset}",
+    "WHERE a = ANY({ids}) AND b IN ({b}, {c}) AND d = -{d}",
+    "WHERE x = 1 AND y = '{y}-01-01' AND z = {z}::date",
+])
+def test_placeholder_in_value_position_is_accepted(query):
+    ReportQueryGenerator.check_placeholders(query)
+
+
+def test_only_variables_with_values_are_checked_at_execution():
+    sql, params = process("SELECT * FROM t ORDER BY {sort}", {})
+    assert sql == "SELECT * FROM t ORDER BY {sort}"
+
+    with pytest.raises(ValueError, match="'sort'"):
+        ReportQueryGenerator.check_placeholders(sql)
+
+
+def test_report_query_is_checked_when_saved(classes):
+    report = classes.Report()
+    report.query = "SELECT * FROM t WHERE a = {a}"
+
+    with pytest.raises(ValueError, match="'where_clause'"):
+        report.query = "SELECT * FROM t WHERE {where_clause}"
+    assert report.query == "SELECT * FROM t WHERE a = {a}"
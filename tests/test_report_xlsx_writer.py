@@ -0,0 +1,74 @@
+import io
+import zipfile
+from datetime import date, datetime, time
+from decimal import Decimal
+from xml.etree import ElementTree
+
+import pytest
+
+from app._system.report.report_exporter_class import XlsxStreamWriter
+
+NS = {'x': XlsxStreamWriter.NS}
+
+
+def cell(value):
+    return XlsxStreamWriter()._cell_xml(value)
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, '<c/>'),
+    (True, '<c t="b"><v>1</v></c>'),
+    (False, '<c t="b"><v>0</v></c>'),
+    (42, '<c><v>42</v></c>'),
+    (1.5, '<c><v>1.5</v></c>'),
+    (Decimal('12.30'), '<c><v>12.30</v></c>'),
+])
+def test_scalars(value, expected):
+    assert cell(value) == expected
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), Decimal('NaN'), Decimal('sNaN'), Decimal('-Infinity')])
+def test_non_finite_numbers_are_written_as_text(value):
+    assert cell(value) == f'<c t="inlineStr"><is><t xml:space="preserve">{value}</t></is></c>'
+
+
+def test_dates_are_serials_with_a_date_style():
+    assert cell(date(1900, 3, 1)) == f'<c s="{XlsxStreamWriter.STYLE_DATE}"><v>61</v></c>'
+    assert cell(datetime(1900, 3, 1, 12)) == f'<c s="{XlsxStreamWriter.STYLE_DATETIME}"><v>61.5</v></c>'
+
+
+def test_times_are_text():
+    assert cell(time(8, 30)) == '<c t="inlineStr"><is><t xml:space="preserve">08:30:00</t></is></c>'
+
+
+def test_text_is_escaped_and_stripped_of_illegal_characters():
+    assert cell('a<b & "c"\x01') == '<c t="inlineStr"><is><t xml:space="preserve">a&lt;b &amp; "c"</t></is></c>'
+
+
+def test_long_text_is_truncated_to_the_cell_limit():
+    assert cell('y' * (XlsxStreamWriter.MAX_CELL_CHARS + 10)).count('y') == XlsxStreamWriter.MAX_CELL_CHARS
+
+
+def test_workbook_is_a_valid_zip_with_rollover(monkeypatch):
+    monkeypatch.setattr(XlsxStreamWriter, 'MAX_ROWS', 3)
+    writer = XlsxStreamWriter()
+    output = io.BytesIO()
+    output.write(writer.start(['id', 'amount']))
+    output.write(writer.write_rows([(1, Decimal('sNaN')), (2, 2.5)]))
+    output.write(writer.write_rows([(3, None), (4, 4)]))
+    output.write(writer.close())
+
+    with zipfile.ZipFile(output) as workbook:
+        assert workbook.testzip() is None
+        for name in workbook.namelist():
+            if name.endswith('.xml') or name.endswith('.rels'):
+                ElementTree.fromstring(workbook.read(name))
+
+        sheets = sorted(name for name in workbook.namelist() if name.startswith('xl/worksheets/'))
+        assert len(sheets) == 2
+        rows = [
+            len(ElementTree.fromstring(workbook.read(sheet)).findall('.//x:row', NS))
+            for sheet in sheets
+        ]
+        # Each sheet repeats the header
+        assert rows == [3, 3]
@@ -0,0 +1,105 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture
+def stylesheet(classes, versions, monkeypatch, tmp_path):
+    ThemeStylesheet = classes.ThemeStylesheet
+    theme = SimpleNamespace(id=uuid.uuid4(), name='dark', css='body{color:#fff}')
+    lookups = []
+
+    def find_theme(cls, theme_id_or_name=None, fallback=True):
+        lookups.append(theme_id_or_name)
+        if fallback or theme_id_or_name in (None, theme.name, str(theme.id)):
+            return theme
+        return None
+
+    monkeypatch.setattr(ThemeStylesheet, '_find_theme', classmethod(find_theme))
+    monkeypatch.setattr(ThemeStylesheet, 'build_css', staticmethod(lambda theme: theme.css))
+    monkeypatch.setattr(ThemeStylesheet, 'css_dir', str(tmp_path))
+    monkeypatch.setattr(ThemeStylesheet, '_artifacts', {})
+    monkeypatch.setattr(ThemeStylesheet, '_aliases', {})
+    monkeypatch.setattr(ThemeStylesheet, '_version', 0)
+    return SimpleNamespace(cls=ThemeStylesheet, theme=theme, lookups=lookups, css_dir=tmp_path)
+
+
+def test_invalidation_watches_themes(classes):
+    watched = {(model.__name__, name) for model, name, columns, events in classes.VersionStamp._watched}
+    assert ('Theme', 'themes') in watched
+
+
+def test_artifact_is_built_once_and_shared_by_id_name_and_default(stylesheet):
+    by_name = stylesheet.cls.get('dark')
+    assert stylesheet.cls.get('dark') is by_name
+    assert stylesheet.lookups == ['dark']
+
+    # Each alias resolves once, then maps to the same artifact
+    assert stylesheet.cls.get(str(stylesheet.theme.id)).hash == by_name.hash
+    assert stylesheet.cls.get(None).hash == by_name.hash
+    assert stylesheet.cls.get(str(stylesheet.theme.id)) is stylesheet.cls.get(None)
+    assert stylesheet.lookups == ['dark', str(stylesheet.theme.id), None]
+
+
+def test_filename_is_fingerprinted_and_written(stylesheet):
+    artifact = stylesheet.cls.get('dark')
+    assert artifact.filename == f"{stylesheet.theme.id}-{artifact.hash}.css"
+    assert (stylesheet.css_dir / artifact.filename).read_text() == stylesheet.theme.css
+
+
+def test_stamp_change_rebuilds_with_a_new_fingerprint(stylesheet, versions):
+    first = stylesheet.cls.get('dark')
+
+    stylesheet.theme.css = 'body{color:#000}'
+    assert stylesheet.cls.get('dark') is first
+
+    versions['themes'] = 1
+    second = stylesheet.cls.get('dark')
+    assert second.css == 'body{color:#000}'
+    assert second.hash != first.hash
+
+
+def test_unknown_theme(stylesheet, monkeypatch):
+    monkeypatch.setattr(stylesheet.cls, '_find_theme', classmethod(lambda cls, theme_id_or_name=None, fallback=True: None))
+    assert stylesheet.cls.get('missing') is None
+
+
+def test_unknown_names_fall_back_without_being_remembered(stylesheet):
+    artifact = stylesheet.cls.get('no-such-theme')
+    assert artifact.theme_id == str(stylesheet.theme.id)
+    assert stylesheet.cls.get('another-one') is artifact
+    assert stylesheet.cls._aliases == {}
+
+
+def test_unknown_names_without_fallback(stylesheet):
+    assert stylesheet.cls.get('no-such-theme', fallback=False) is None
+    assert stylesheet.cls._aliases == {}
+    assert stylesheet.cls._artifacts == {}
+
+
+@pytest.fixture
+def client(stylesheet):
+    from flask import Flask
+    from app._system.theme.view import bp
+
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    return app.test_client()
+
+
+def test_route_serves_the_current_revision(client, stylesheet):
+    artifact = stylesheet.cls.get('dark')
+    response = client.get(f"/theme/{artifact.theme_id}/{artifact.hash}.css")
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == stylesheet.theme.css
+
+    stale = client.get(f"/theme/{artifact.theme_id}/0000.css")
+    assert stale.status_code == 302
+
+
+def test_route_404s_unknown_ids_without_caching_them(client, stylesheet):
+    for _ in range(3):
+        assert client.get(f"/theme/{uuid.uuid4()}/0000.css").status_code == 404
+    assert client.get("/theme/dark/0000.css").status_code == 404
+    assert set(stylesheet.cls._aliases) <= {'dark'}
@@ -0,0 +1,138 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.orm.util import identity_key
+
+from app.register.database import db_registry
+
+
+def user_token(**overrides):
+    fields = dict(
+        id=uuid.uuid4(), user_id=uuid.uuid4(), name='api', application='tests', token_type='api',
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=1), ignore_expiration=False,
+        is_active=True, is_system_temporary=False, refresh_token_id=None,
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+class FakeWriter:
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.items = []
+
+    def put(self, item):
+        if self.accept:
+            self.items.append(item)
+        return self.accept
+
+
+class FakeSession:
+    """Stands in for a request's session: get() loads into its identity map"""
+
+    def __init__(self):
+        self.identity_map = {}
+
+    def get(self, model, ident):
+        key = identity_key(model, ident)
+        if key not in self.identity_map:
+            self.identity_map[key] = SimpleNamespace(id=ident, session=self)
+        return self.identity_map[key]
+
+
+@pytest.fixture
+def cache(classes, versions, monkeypatch):
+    TokenCache = classes.TokenCache
+    monkeypatch.setattr(TokenCache, '_entries', {})
+    monkeypatch.setattr(TokenCache, '_version', 0)
+    monkeypatch.setattr(TokenCache, '_touched', {})
+    session = FakeSession()
+    monkeypatch.setattr(db_registry, '_routing_session', lambda: session, raising=False)
+    return TokenCache
+
+
+def test_invalidation_watches_user_tokens(classes):
+    watched = {(model.__name__, name) for model, name, columns, events in classes.VersionStamp._watched}
+    assert ('UserToken', 'user_tokens') in watched
+
+
+def test_entries_are_keyed_by_token_hash(cache):
+    cached = cache.put('secret-token', user_token())
+
+    assert cache.get('secret-token') is cached
+    assert cache.get('other-token') is None
+    assert 'secret-token' not in cache._entries
+    assert cache.hash_token('secret-token') in cache._entries
+
+
+def test_snapshot_does_not_keep_the_token_value(cache):
+    cached = cache.put('secret-token', user_token(token='secret-token'))
+    assert not hasattr(cached, 'token')
+    assert cached.get_auth_context()['token_type'] == 'api'
+
+
+def test_stamp_change_clears_the_cache(cache, versions):
+    cache.put('secret-token', user_token())
+    assert cache.get('secret-token') is not None
+
+    versions['user_tokens'] = 1
+    assert cache.get('secret-token') is None
+
+
+def test_entries_expire_after_the_ttl(cache, monkeypatch):
+    cache.put('secret-token', user_token())
+    monkeypatch.setattr(cache, 'ttl', -1)
+    assert cache.get('secret-token') is None
+
+
+def test_expired_tokens_are_not_served(cache):
+    cache.put('secret-token', user_token(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+    assert cache.get('secret-token') is None
+
+
+def test_evict(cache):
+    cache.put('secret-token', user_token())
+    cache.evict('secret-token')
+    assert cache.get('secret-token') is None
+
+
+def test_touch_queues_each_token_once(cache, monkeypatch):
+    writer = FakeWriter()
+    monkeypatch.setattr(cache, '_get_writer', classmethod(lambda cls: writer))
+
+    cache.touch('t1')
+    cache.touch('t1')
+    cache.touch('t2')
+    assert writer.items == ['t1', 't2']
+    assert set(cache._touched) == {'t1', 't2'}
+
+
+def test_dropped_touch_is_queued_again_on_next_use(cache, monkeypatch):
+    writer = FakeWriter(accept=False)
+    monkeypatch.setattr(cache, '_get_writer', classmethod(lambda cls: writer))
+
+    cache.touch('t1')
+    assert 't1' not in cache._touched
+
+    writer.accept = True
+    cache.touch('t1')
+    assert writer.items == ['t1']
+
+
+def test_user_comes_from_the_current_session_and_is_not_cached(cache, monkeypatch):
+    cached = cache.put('secret-token', user_token())
+    first, second = FakeSession(), FakeSession()
+
+    monkeypatch.setattr(db_registry, '_routing_session', lambda: first, raising=False)
+    assert cached.get_auth_context()['user'] is None
+    user = cached.user
+    assert user.session is first and user.id == cached.user_id
+    assert cached.get_auth_context()['user'] is user
+
+    # Another request (thread) sharing the snapshot gets its own object
+    monkeypatch.setattr(db_registry, '_routing_session', lambda: second, raising=False)
+    assert cached.get_auth_context()['user'] is None
+    assert cached.user.session is second
+    assert not any(value is user for value in vars(cached).values())